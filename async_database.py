@@ -0,0 +1,354 @@
+"""
+Асинхронный вариант API database.py для потребителей asyncio
+
+Функции database.py синхронные (sqlite3, pymysql). Здесь они выполняются
+в потоках пула соединений: пул держит не больше size соединений и столько
+же потоков, свободное соединение ожидается в цикле событий, а поток
+занимается только на время самого запроса. Поэтому один процесс
+обслуживает много одновременных корутин без потока на каждую.
+
+Для каждой функции database.py вида function(conn, ...) модуль содержит
+корутину с тем же именем; первым аргументом вместо соединения передается
+пул или соединение из pool.connection(). Генераторы database.py
+(iter_records_by_user) становятся асинхронными итераторами:
+
+    pool = sqlite_pool("database.db", size=4)
+    record_id = await async_database.insert_record(pool, user_id, 70.5, 120, 80, 60, 36.6, "", "2024-05-01")
+    async for rows in async_database.iter_records_by_user(pool, user_id):
+        ...
+    async with pool.connection() as conn:
+        settings = await async_database.select_settings_by_user(conn, user_id)
+        await async_database.update_user_settings(conn, user_id, settings[0])
+    await pool.close()
+
+Отмена: если ожидающая корутина отменена, выполняющийся запрос SQLite
+прерывается (Connection.interrupt), а соединение возвращается в пул
+только после того, как поток закончит с ним работу. Запрос MySQL
+прервать нельзя, он дорабатывает в потоке.
+"""
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import database
+
+DEFAULT_POOL_SIZE = 4
+# Сколько секунд ждать свободного соединения
+DEFAULT_TIMEOUT = 10.0
+
+# Признак конца генератора при чтении в потоке
+_DONE = object()
+
+
+def _interrupt(conn):
+    """Прерывает выполняющийся запрос, если драйвер это умеет (sqlite3)"""
+    interrupt = getattr(conn, 'interrupt', None)
+    if interrupt is not None:
+        try:
+            interrupt()
+        except Exception:
+            pass
+
+
+def _rollback(conn):
+    # У соединений pymysql нет in_transaction: откатываем всегда
+    if getattr(conn, 'in_transaction', True):
+        conn.rollback()
+
+
+def _ping(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchall()
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class AsyncConnection:
+    """
+    Соединение, взятое из пула через pool.connection()
+
+    Вызовы выполняются по очереди в потоках пула; между ними соединение
+    не отдается другим корутинам, поэтому несколько вызовов можно
+    объединить в одну транзакцию.
+    """
+
+    def __init__(self, pool, conn):
+        self.pool = pool
+        self.raw = conn
+
+    async def call(self, function, *args, **kwargs):
+        """Выполняет function(conn, *args, **kwargs) в потоке пула"""
+        return await self.pool.run(self.raw, function, *args, **kwargs)
+
+    def iterate(self, function, *args, **kwargs):
+        """Асинхронный итератор по генератору function(conn, *args, **kwargs)"""
+        return self.pool.iterate_on(self.raw, function, *args, **kwargs)
+
+    async def commit(self):
+        await self.pool.run(self.raw, lambda conn: conn.commit())
+
+    async def rollback(self):
+        await self.pool.run(self.raw, lambda conn: conn.rollback())
+
+
+class AsyncConnectionPool:
+    """
+    Пул соединений для корутин
+
+    Args:
+        connect: функция без аргументов, открывающая соединение; соединение
+            используется разными потоками по очереди (для SQLite -
+            check_same_thread=False)
+        size: наибольшее число соединений и потоков
+        timeout: сколько секунд ждать свободного соединения
+    """
+
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self.in_use = 0
+        self.waits = 0
+        self._idle = []
+        # Семафор создается в цикле событий при первом запросе
+        self._slots = None
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="async-db")
+        self._closed = False
+
+    async def acquire(self):
+        """
+        Берет соединение из пула, открывая новое при необходимости
+
+        Returns:
+            Соединение драйвера; вернуть через release()
+
+        Raises:
+            TimeoutError: все соединения заняты дольше timeout
+            RuntimeError: пул закрыт
+        """
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        if not self._slots.locked():
+            # Свободный слот занимается сразу, без задачи wait_for
+            await self._slots.acquire()
+        else:
+            self.waits += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Нет свободного соединения с базой за {self.timeout} с") from None
+
+        try:
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = await self._wait(None, asyncio.get_running_loop().run_in_executor(self._executor,
+                                                                                        self.connect))
+                self.created += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        self.in_use += 1
+        return conn
+
+    async def release(self, conn, discard=False):
+        """
+        Возвращает соединение в пул
+
+        Незавершенная транзакция откатывается; соединение после ошибки
+        (discard=True) или возвращенное в закрытый пул закрывается.
+        """
+        try:
+            if not discard and not self._closed:
+                try:
+                    await self.run(conn, _rollback)
+                except Exception:
+                    discard = True
+            if discard or self._closed:
+                await asyncio.get_running_loop().run_in_executor(self._executor, _close, conn)
+                self.created -= 1
+            else:
+                self._idle.append(conn)
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+            if self._closed and not self.in_use:
+                self._executor.shutdown(wait=False)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Соединение из пула (AsyncConnection) на время блока async with"""
+        conn = await self.acquire()
+        failed = False
+        try:
+            yield AsyncConnection(self, conn)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(conn, discard=failed and not await self._usable(conn))
+
+    async def call(self, function, *args, **kwargs):
+        """Выполняет function(conn, *args, **kwargs) с соединением из пула"""
+        async with self.connection() as conn:
+            return await conn.call(function, *args, **kwargs)
+
+    async def iterate(self, function, *args, **kwargs):
+        """
+        Асинхронный итератор по генератору function(conn, *args, **kwargs)
+
+        Соединение занято, пока итерация не закончится или не будет прервана.
+        """
+        async with self.connection() as conn:
+            async for item in conn.iterate(function, *args, **kwargs):
+                yield item
+
+    async def run(self, conn, function, *args, **kwargs):
+        """
+        Выполняет function(conn, *args, **kwargs) в потоке пула с уже взятым соединением
+
+        При отмене запрос прерывается, но корутина завершается только после
+        того, как поток освободит соединение.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(function, conn, *args, **kwargs))
+        return await self._wait(conn, future)
+
+    async def iterate_on(self, conn, function, *args, **kwargs):
+        """Асинхронный итератор по генератору function(conn, ...) с уже взятым соединением"""
+        items = function(conn, *args, **kwargs)
+        try:
+            while True:
+                item = await self.run(conn, lambda _: next(items, _DONE))
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            items.close()
+
+    def snapshot(self):
+        """
+        Состояние пула
+
+        Returns:
+            dict: size, created, in_use, idle, waits
+        """
+        return {
+            'size': self.size,
+            'created': self.created,
+            'in_use': self.in_use,
+            'idle': len(self._idle),
+            'waits': self.waits,
+        }
+
+    async def close(self):
+        """Закрывает свободные соединения и потоки; занятые закрываются при возврате"""
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        while self._idle:
+            await loop.run_in_executor(self._executor, _close, self._idle.pop())
+            self.created -= 1
+        if not self.in_use:
+            self._executor.shutdown(wait=False)
+
+    async def _wait(self, conn, future):
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if conn is not None:
+                _interrupt(conn)
+            try:
+                result = await future
+            except BaseException:
+                pass
+            else:
+                # Отменено открытие соединения: оно никому не достанется
+                if conn is None:
+                    _close(result)
+            raise
+
+    async def _usable(self, conn):
+        """Проверяет, что соединение после ошибки еще отвечает"""
+        try:
+            await self.run(conn, _ping)
+            return True
+        except Exception:
+            return False
+
+
+def sqlite_pool(path=None, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    Пул соединений с файлом SQLite
+
+    Args:
+        path: файл базы (по умолчанию - файл приложения)
+        size: наибольшее число соединений
+        timeout: сколько секунд ждать свободного соединения
+
+    Returns:
+        AsyncConnectionPool
+    """
+    path = path or database.get_default_db_path()
+    return AsyncConnectionPool(lambda: database.connect_sqlite(path, check_same_thread=False), size, timeout)
+
+
+def mysql_pool(size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    Пул соединений с сервером MySQL (database.MYSQL_CONFIG)
+
+    Соединения открываются через database.get_remote_connection: ошибка
+    подключения пробрасывается, а не заменяется локальной базой.
+
+    Returns:
+        AsyncConnectionPool
+    """
+    return AsyncConnectionPool(database.get_remote_connection, size, timeout)
+
+
+def _async_function(function):
+    @functools.wraps(function)
+    async def call(db, *args, **kwargs):
+        return await db.call(function, *args, **kwargs)
+    return call
+
+
+def _async_iterator(function):
+    @functools.wraps(function)
+    def iterate(db, *args, **kwargs):
+        return db.iterate(function, *args, **kwargs)
+    return iterate
+
+
+def database_functions():
+    """
+    Функции database.py, принимающие соединение первым аргументом
+
+    Returns:
+        dict: {имя: функция}
+    """
+    functions = {}
+    for name, function in inspect.getmembers(database, inspect.isfunction):
+        if name.startswith('_') or function.__module__ != database.__name__:
+            continue
+        parameters = list(inspect.signature(function).parameters)
+        if parameters and parameters[0] == 'conn':
+            functions[name] = function
+    return functions
+
+
+# Асинхронные варианты функций database.py с теми же именами
+for _name, _function in database_functions().items():
+    globals()[_name] = (_async_iterator if inspect.isgeneratorfunction(_function) else _async_function)(_function)
+del _name, _function
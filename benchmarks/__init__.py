@@ -0,0 +1,12 @@
+"""
+Замеры производительности приложения
+
+Запуск:
+    python -m benchmarks.bench_database --scale 100k --output results/db.json
+    python -m benchmarks.bench_database --scale 100k --compare results/db.json
+    python -m benchmarks.bench_ui --scale 10000 --output results/ui.json
+    python -m benchmarks.bench_export --sizes 1k 10k 100k --output results/export.json
+    python -m benchmarks.query_plans
+
+Результаты сохраняются в JSON и сравниваются между коммитами.
+"""
@@ -0,0 +1,179 @@
+"""
+Замеры основных запросов database.py на синтетической базе
+
+Замеряются операции, от которых зависит отклик экранов: добавление записи,
+история пользователя, списки администратора, статистика, журнал действий
+и поиск пользователя при входе.
+
+Запуск:
+    python -m benchmarks.bench_database --scale 100k --output results/db.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from database import insert_record, select_records_by_user, select_user_records_by_admin, \
+    get_user_statistics, select_admin_actions, select_user_by_email
+from benchmarks.common import measure, write_results, load_results, compare_results, print_results, \
+    print_comparison, exit_code
+from benchmarks.datagen import SCALES, scale_records, open_database, user_email
+
+SUITE = "database"
+
+# Выполнений каждой операции по умолчанию
+DEFAULT_REPEAT = 200
+
+
+def build_operations(conn, summary, repeat=DEFAULT_REPEAT, seed=42):
+    """
+    Операции для замеров с заранее выбранными аргументами
+
+    Аргументы выбираются до замеров, чтобы генерация случайных чисел не
+    попадала во время операции.
+
+    Args:
+        conn: соединение с базой
+        summary: параметры базы (generate_database)
+        repeat: число выполнений каждой операции
+        seed: начальное значение выбора аргументов
+
+    Returns:
+        dict: {название: (функция, список аргументов)}
+    """
+    rng = random.Random(seed)
+    users = summary['users']
+    admins = summary['admins']
+
+    def random_users(count):
+        return [rng.randint(1, users) for _ in range(count)]
+
+    def new_record(user_id):
+        return insert_record(conn, user_id, round(rng.uniform(50, 110), 1), rng.randint(100, 150),
+                             rng.randint(60, 95), rng.randint(55, 95), 36.6, "benchmark",
+                             "2024-07-01 08:00:00")
+
+    # Запросы по всей базе медленнее, поэтому выполняются реже
+    heavy_repeat = max(3, repeat // 10)
+
+    return {
+        'insert_record': (new_record, [(user_id,) for user_id in random_users(repeat)]),
+        'select_records_by_user': (
+            lambda user_id: select_records_by_user(conn, user_id),
+            [(user_id,) for user_id in random_users(repeat)]),
+        'select_user_records_by_admin': (
+            lambda user_id: select_user_records_by_admin(conn, user_id),
+            [(user_id,) for user_id in random_users(repeat)]),
+        'select_user_records_by_admin_all': (
+            lambda: select_user_records_by_admin(conn, None),
+            [()] * heavy_repeat),
+        'get_user_statistics': (
+            lambda: get_user_statistics(conn),
+            [()] * heavy_repeat),
+        'select_admin_actions': (
+            lambda: select_admin_actions(conn),
+            [()] * repeat),
+        'select_admin_actions_by_admin': (
+            lambda admin_id: select_admin_actions(conn, admin_id),
+            [(rng.randint(1, admins),) for _ in range(repeat)]),
+        'login_lookup': (
+            lambda email: select_user_by_email(conn, email, pass_hash=True),
+            [(user_email(user_id),) for user_id in random_users(repeat)]),
+    }
+
+
+def run(conn, summary, repeat=DEFAULT_REPEAT, seed=42, only=None):
+    """
+    Выполняет замеры
+
+    Args:
+        conn: соединение с базой
+        summary: параметры базы
+        repeat: число выполнений каждой операции
+        seed: начальное значение выбора аргументов
+        only: названия операций (None - все)
+
+    Returns:
+        dict: {операция: сводка}
+    """
+    results = {}
+    for name, (operation, arguments) in build_operations(conn, summary, repeat, seed).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(operation, arguments)
+    return results
+
+
+def table_marks(conn):
+    """
+    Последние ID таблиц, в которые пишут замеры
+
+    Returns:
+        dict: {таблица: максимальный ID}
+    """
+    return {table: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for table in ('records', 'sync_log')}
+
+
+def restore_marks(conn, marks):
+    """
+    Удаляет строки, добавленные замерами (insert_record), чтобы повторный
+    запуск работал с той же базой
+
+    Args:
+        conn: соединение с базой
+        marks: результат table_marks() до замеров
+    """
+    conn.rollback()
+    # Триггеры пересчитывают дневные итоги и пишут журнал синхронизации,
+    # поэтому журнал чистится после удаления записей
+    conn.execute("DELETE FROM records WHERE id > ?", (marks['records'],))
+    conn.execute("DELETE FROM sync_log WHERE id > ?", (marks['sync_log'],))
+    conn.commit()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры запросов database.py")
+    parser.add_argument("--scale", default="1k", help=f"число записей или {', '.join(SCALES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="выполнений каждой операции")
+    parser.add_argument("--db", help="файл базы (по умолчанию во временном каталоге, используется повторно)")
+    parser.add_argument("--only", nargs="*", help="замерять только эти операции")
+    parser.add_argument("--output", help="куда сохранить результаты JSON")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    records = scale_records(args.scale)
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"health_diary_bench_{records}_{args.seed}.db")
+
+    print(f"База: {db_path} ({records} записей)")
+    conn, summary = open_database(db_path, records, args.seed)
+    marks = table_marks(conn)
+    try:
+        results = run(conn, summary, args.repeat, args.seed, args.only)
+    finally:
+        restore_marks(conn, marks)
+        conn.close()
+
+    print_results(results)
+    parameters = {'scale': args.scale, 'records': records, 'seed': args.seed, 'repeat': args.repeat,
+                  'users': summary['users']}
+    document = {'results': results}
+    if args.output:
+        document = write_results(args.output, SUITE, results, parameters)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+    if args.compare:
+        comparison = compare_results(load_results(args.compare), document)
+        print_comparison(comparison)
+        return exit_code(comparison)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Замеры экспорта истории в Word и Excel
+
+Методы экспорта StoryWindow вызываются без интерфейса: окно, диалог,
+чекбоксы показателей и сообщения заменены простыми объектами, а файлы
+пишутся во временный каталог. Для каждого объема и типа графика
+сохраняются время, пиковая память Python (tracemalloc), размер файла и
+время построения каждого графика Excel.
+
+Время и память замеряются разными проходами: tracemalloc заметно
+замедляет выделение памяти и исказил бы время.
+
+Запуск:
+    python -m benchmarks.bench_export --sizes 1k 10k 100k --output results/export.json
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import summarize, write_results, load_results, compare_results, print_results, \
+    print_comparison, exit_code
+from benchmarks.datagen import scale_records, open_database
+
+SUITE = "export"
+
+# Объемы экспорта по умолчанию
+DEFAULT_SIZES = ('1k', '10k', '100k')
+
+# Типы графиков из меню экспорта в Excel
+CHART_TYPES = ('line', 'bar', 'scatter', 'combo')
+
+# Методы StoryWindow, участвующие в экспорте
+EXPORT_METHODS = (
+    'export_to_word', 'perform_excel_export', 'create_charts', 'create_single_chart',
+    'get_xlsxwriter_chart_type', 'get_chart_type_name', 'calculate_statistics',
+    'format_record_indicators', 'format_display_date', 'safe_convert_to_float', 'safe_convert_to_int',
+)
+
+
+class Checkbox:
+    """Чекбокс показателя в диалоге экспорта"""
+
+    def __init__(self, active=True):
+        self.active = active
+
+
+class Dialog:
+    """Диалог экспорта: закрывается после успешной выгрузки"""
+
+    def __init__(self):
+        self.dismissed = False
+
+    def dismiss(self):
+        self.dismissed = True
+
+
+def build_harness():
+    """
+    Класс с методами экспорта StoryWindow без виджета Kivy
+
+    Методы берутся из StoryWindow без изменений, поэтому замеряется тот же
+    код, что выполняется в приложении.
+
+    Returns:
+        type: класс ExportHarness
+    """
+    from windows import story
+
+    class ExportHarness:
+        selected_chart_type = "line"
+
+        def __init__(self, records, export_dir):
+            self.records = records
+            self.export_dir = export_dir
+            self.messages = []
+            self.chart_durations = []
+            self.dialog = Dialog()
+            self.weight_check = Checkbox()
+            self.pressure_sys_check = Checkbox()
+            self.pressure_dia_check = Checkbox()
+            self.pulse_check = Checkbox()
+            self.temperature_check = Checkbox()
+
+        def get_selected_records(self):
+            return self.records
+
+        def get_export_directory(self):
+            return self.export_dir
+
+        def show_message(self, title, text):
+            self.messages.append((title, text))
+
+        def create_single_chart(self, *args):
+            # Время каждого графика записывается отдельно
+            started = time.perf_counter()
+            created = story.StoryWindow.create_single_chart(self, *args)
+            self.chart_durations.append(time.perf_counter() - started)
+            return created
+
+        @property
+        def error(self):
+            """Текст сообщения об ошибке экспорта или None"""
+            for title, text in self.messages:
+                if title == "Ошибка":
+                    return text
+            return None
+
+    for name in EXPORT_METHODS:
+        if name not in ExportHarness.__dict__:
+            setattr(ExportHarness, name, story.StoryWindow.__dict__[name])
+    return ExportHarness
+
+
+def export_libraries():
+    """Доступность библиотек экспорта: (python-docx, xlsxwriter)"""
+    from windows import story
+    return story.DOCX_AVAILABLE, story.XLSXWRITER_AVAILABLE
+
+
+def load_export_records(conn, count):
+    """
+    Записи в формате истории (id, вес, давление, пульс, температура, заметки, дата)
+
+    Args:
+        conn: соединение с базой
+        count: число записей
+
+    Returns:
+        list: кортежи записей, новые сверху
+    """
+    return conn.execute("""
+        SELECT id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes, record_date
+        FROM records ORDER BY record_date DESC LIMIT ?
+    """, (count,)).fetchall()
+
+
+def run_export(harness_class, records, kind, chart_type="line", trace_memory=False):
+    """
+    Выполняет один экспорт
+
+    Args:
+        harness_class: класс build_harness()
+        records: экспортируемые записи
+        kind: 'word' или 'excel'
+        chart_type: тип графиков Excel
+        trace_memory: замерять пиковую память через tracemalloc
+
+    Returns:
+        dict: duration (с), peak_bytes, file_bytes, chart_durations
+    """
+    export_dir = tempfile.mkdtemp(prefix="health_diary_export_")
+    harness = harness_class(records, export_dir)
+    harness.selected_chart_type = chart_type
+    try:
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        if kind == 'word':
+            harness.export_to_word()
+        else:
+            harness.perform_excel_export(records)
+        duration = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+
+        if harness.error:
+            raise RuntimeError(harness.error)
+        files = os.listdir(export_dir)
+        file_bytes = sum(os.path.getsize(os.path.join(export_dir, name)) for name in files)
+        return {
+            'duration': duration,
+            'peak_bytes': peak,
+            'file_bytes': file_bytes,
+            'chart_durations': harness.chart_durations,
+        }
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def measure_export(harness_class, records, kind, chart_type="line", repeat=1):
+    """
+    Замеряет экспорт: repeat проходов по времени и один проход с tracemalloc
+
+    Returns:
+        dict: сводка summarize() с памятью, размером файла и временем графиков
+    """
+    runs = [run_export(harness_class, records, kind, chart_type) for _ in range(repeat)]
+    traced = run_export(harness_class, records, kind, chart_type, trace_memory=True)
+
+    summary = summarize([run['duration'] for run in runs], len(records) * len(runs))
+    summary['peak_mb'] = round(traced['peak_bytes'] / 1024 / 1024, 2)
+    summary['file_kb'] = round(runs[-1]['file_bytes'] / 1024, 1)
+
+    chart_durations = [duration for run in runs for duration in run['chart_durations']]
+    if chart_durations:
+        summary['charts'] = len(runs[-1]['chart_durations'])
+        summary['chart_mean_ms'] = round(sum(chart_durations) / len(chart_durations) * 1000, 3)
+        summary['chart_max_ms'] = round(max(chart_durations) * 1000, 3)
+    return summary
+
+
+def run(conn, sizes, chart_types=CHART_TYPES, repeat=1):
+    """
+    Замеряет экспорт для всех объемов и типов графиков
+
+    Args:
+        conn: соединение с базой, в которой записей не меньше наибольшего объема
+        sizes: объемы экспорта (число записей)
+        chart_types: типы графиков Excel
+        repeat: проходов по времени для каждого сочетания
+
+    Returns:
+        dict: {сценарий: сводка}
+    """
+    harness_class = build_harness()
+    docx_available, xlsx_available = export_libraries()
+    if not docx_available:
+        print("python-docx не установлен - экспорт в Word пропущен")
+    if not xlsx_available:
+        print("xlsxwriter не установлен - экспорт в Excel пропущен")
+
+    results = {}
+    for size in sizes:
+        records = load_export_records(conn, size)
+        if docx_available:
+            results[f'word_{size}'] = measure_export(harness_class, records, 'word', repeat=repeat)
+        if xlsx_available:
+            for chart_type in chart_types:
+                results[f'excel_{size}_{chart_type}'] = measure_export(
+                    harness_class, records, 'excel', chart_type, repeat)
+    return results
+
+
+def print_export_results(results):
+    """Печатает сводку и дополнительные столбцы экспорта"""
+    print_results(results)
+    print(f"\n{'сценарий':<36}{'память, МБ':>12}{'файл, КБ':>12}{'график, мс':>12}")
+    for name, summary in results.items():
+        chart = summary.get('chart_mean_ms', '-')
+        print(f"{name:<36}{summary['peak_mb']:>12}{summary['file_kb']:>12}{chart:>12}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры экспорта в Word и Excel")
+    parser.add_argument("--sizes", nargs="*", default=list(DEFAULT_SIZES), help="объемы экспорта")
+    parser.add_argument("--charts", nargs="*", default=list(CHART_TYPES), choices=CHART_TYPES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=1, help="проходов по времени для каждого сценария")
+    parser.add_argument("--db", help="файл базы (по умолчанию во временном каталоге, используется повторно)")
+    parser.add_argument("--output", help="куда сохранить результаты JSON")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [scale_records(size) for size in args.sizes]
+    records = max(sizes)
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"health_diary_bench_{records}_{args.seed}.db")
+
+    print(f"База: {db_path} ({records} записей)")
+    conn, _ = open_database(db_path, records, args.seed)
+    try:
+        results = run(conn, sizes, args.charts, args.repeat)
+    finally:
+        conn.close()
+
+    if not results:
+        print("Нет доступных библиотек экспорта")
+        return 1
+    print_export_results(results)
+
+    parameters = {'sizes': sizes, 'charts': args.charts, 'seed': args.seed, 'repeat': args.repeat}
+    document = {'results': results}
+    if args.output:
+        document = write_results(args.output, SUITE, results, parameters)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+    if args.compare:
+        comparison = compare_results(load_results(args.compare), document)
+        print_comparison(comparison)
+        return exit_code(comparison)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Замеры отрисовки списков без окна на экране
+
+Приложение запускается без дисплея: окно SDL2 с драйвером dummy и
+заглушкой OpenGL (KIVY_GL_BACKEND=mock), поэтому замеры работают на
+обычном Linux-сервере. Время считается от вызова обработчика до кадра, после
+которого разметка списка перестала меняться. В это время входят создание
+виджетов, разметка и построение инструкций canvas; растеризация на GPU с
+заглушкой OpenGL не выполняется. Если на машине заглушка не поддерживается,
+замеры можно запустить под xvfb-run с KIVY_GL_BACKEND=sdl2.
+
+Запуск:
+    python -m benchmarks.bench_ui --scale 10000 --output results/ui.json
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from database import DB_FILENAME
+from benchmarks.common import summarize, current_rss_bytes, write_results, load_results, compare_results, \
+    print_results, print_comparison, exit_code
+from benchmarks.datagen import open_database
+
+SUITE = "ui"
+
+# Выполнений каждого сценария по умолчанию
+DEFAULT_REPEAT = 10
+
+# Больше кадров разметка не ждет: список, который меняется дольше, считается ошибкой замера
+MAX_SETTLE_FRAMES = 30
+
+# Запросы поиска: часть строк совпадает, часть нет
+STORY_SEARCH_QUERY = "плохо"
+ADMIN_SEARCH_QUERY = "иван"
+
+
+def configure_headless():
+    """
+    Настраивает Kivy на работу без дисплея
+
+    Вызывается до первого импорта Kivy; уже заданные переменные окружения
+    не меняются.
+    """
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    os.environ.setdefault("KIVY_NO_FILELOG", "1")
+    os.environ.setdefault("KIVY_WINDOW", "sdl2")
+    os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def count_widgets(widget):
+    """Число виджетов в дереве, включая корневой"""
+    return sum(1 for _ in widget.walk(restrict=True))
+
+
+def layout_state(container):
+    """Состояние разметки списка: число строк и размеры контейнера"""
+    return len(container.children), tuple(container.size)
+
+
+def settle(container, idle, max_frames=MAX_SETTLE_FRAMES):
+    """
+    Прокручивает кадры, пока разметка списка не перестанет меняться
+
+    Args:
+        container: виджет списка
+        idle: функция одного кадра (EventLoop.idle)
+        max_frames: предел числа кадров
+
+    Returns:
+        int: число прокрученных кадров
+    """
+    previous = None
+    for frame in range(1, max_frames + 1):
+        idle()
+        state = layout_state(container)
+        if state == previous:
+            return frame
+        previous = state
+    return max_frames
+
+
+def measure_ui(action, container, idle, repeat=DEFAULT_REPEAT, prepare=None, warmup=1):
+    """
+    Замеряет сценарий интерфейса
+
+    Args:
+        action: обработчик без аргументов (load_story, on_search и т.д.)
+        container: виджет списка, разметку которого нужно дождаться
+        idle: функция одного кадра
+        repeat: число выполнений
+        prepare: вызывается перед каждым выполнением вне замера (сброс кэша)
+        warmup: число первых выполнений, которые не учитываются
+
+    Returns:
+        dict: сводка summarize() с числом кадров, виджетов и RSS
+    """
+    durations = []
+    frames = []
+    rows = 0
+    for index in range(repeat + warmup):
+        if prepare:
+            prepare()
+        started = time.perf_counter()
+        action()
+        frame_count = settle(container, idle)
+        elapsed = time.perf_counter() - started
+        if index < warmup:
+            continue
+        durations.append(elapsed)
+        frames.append(frame_count)
+        rows += len(container.children)
+
+    summary = summarize(durations, rows)
+    summary['frames_mean'] = round(sum(frames) / len(frames), 2) if frames else None
+    summary['widgets'] = count_widgets(container)
+    rss = current_rss_bytes()
+    summary['rss_mb'] = round(rss / 1024 / 1024, 1) if rss else None
+    return summary
+
+
+def largest_history_user(conn):
+    """Пользователь с самой длинной историей записей: (ID, число записей)"""
+    return conn.execute(
+        "SELECT user_id, COUNT(*) FROM records GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+
+
+def create_app(user_id):
+    """
+    Приложение с экранами истории и записей администратора
+
+    Остальные экраны, автоматический вход, синхронизация и фоновые службы
+    HealthDiaryApp не нужны для замеров и не запускаются.
+    """
+    from kivy.lang import Builder
+    from kivy.uix.screenmanager import ScreenManager, NoTransition
+    from kivymd.app import MDApp
+    from kv import STORY_KV, ADMIN_KV
+    from windows.story import StoryWindow
+    from windows.admin import AdminRecordsScreen
+
+    class BenchmarkApp(MDApp):
+        user_settings = {}
+        is_guest = False
+        is_admin = True
+        selected_user_id = None
+
+        def get_user_id(self):
+            return user_id
+
+        def build(self):
+            Builder.load_string(STORY_KV)
+            Builder.load_string(ADMIN_KV)
+            sm = ScreenManager(transition=NoTransition())
+            sm.add_widget(StoryWindow(name="story"))
+            sm.add_widget(AdminRecordsScreen(name="admin_records"))
+            return sm
+
+    return BenchmarkApp()
+
+
+def run(workdir, records, repeat=DEFAULT_REPEAT, seed=42):
+    """
+    Запускает приложение без дисплея и замеряет отрисовку списков
+
+    Args:
+        workdir: каталог с базой database.db (становится текущим)
+        records: число записей в базе
+        repeat: число выполнений каждого сценария
+        seed: начальное значение генератора данных
+
+    Returns:
+        tuple: ({сценарий: сводка}, параметры запуска)
+    """
+    configure_headless()
+    # Экраны открывают базу по пути по умолчанию - в текущем каталоге
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    conn, summary = open_database(os.path.join(workdir, DB_FILENAME), records, seed)
+    user_id, user_records = largest_history_user(conn)
+    conn.close()
+
+    from kivy.base import EventLoop
+    from services.records_view import record_view_cache
+
+    rss_before = current_rss_bytes()
+    app = create_app(user_id)
+    app._run_prepare()
+    idle = EventLoop.idle
+    sm = app.root
+
+    try:
+        story = sm.get_screen("story")
+        admin = sm.get_screen("admin_records")
+        story_list = story.ids.container
+        admin_list = admin.ids.records_list
+
+        sm.current = "story"
+        settle(story_list, idle)
+        results = {
+            'story_load_cold': measure_ui(story.load_story, story_list, idle, repeat,
+                                          prepare=record_view_cache.invalidate),
+            'story_load_warm': measure_ui(story.load_story, story_list, idle, repeat),
+            'story_search': measure_ui(lambda: story.on_search(None, STORY_SEARCH_QUERY),
+                                       story_list, idle, repeat),
+            'story_search_clear': measure_ui(lambda: story.on_search(None, ""), story_list, idle, repeat),
+        }
+
+        sm.current = "admin_records"
+        settle(admin_list, idle)
+        results.update({
+            'admin_load_records': measure_ui(admin.load_records, admin_list, idle, repeat),
+            'admin_search': measure_ui(lambda: admin.on_search(None, ADMIN_SEARCH_QUERY),
+                                       admin_list, idle, repeat),
+            'admin_search_clear': measure_ui(lambda: admin.on_search(None, ""), admin_list, idle, repeat),
+        })
+    finally:
+        app.stop()
+        EventLoop.exit()
+
+    parameters = {
+        'records': records,
+        'seed': seed,
+        'repeat': repeat,
+        'story_user_records': user_records,
+        'rss_before_mb': round(rss_before / 1024 / 1024, 1) if rss_before else None,
+        'gl_backend': os.environ.get("KIVY_GL_BACKEND"),
+        'window': os.environ.get("KIVY_WINDOW"),
+    }
+    return results, parameters
+
+
+def print_ui_results(results):
+    """Печатает сводку и дополнительные столбцы интерфейса"""
+    print_results(results)
+    print(f"\n{'сценарий':<36}{'кадров':>8}{'виджетов':>10}{'RSS, МБ':>10}")
+    for name, summary in results.items():
+        frames = summary['frames_mean'] if summary['frames_mean'] is not None else '-'
+        print(f"{name:<36}{frames:>8}{summary['widgets']:>10}{summary['rss_mb'] or '-':>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры отрисовки списков без дисплея")
+    parser.add_argument("--scale", type=int, default=5000, help="число записей в базе")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="выполнений каждого сценария")
+    parser.add_argument("--workdir", help="каталог с базой (по умолчанию во временном каталоге)")
+    parser.add_argument("--output", help="куда сохранить результаты JSON")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = os.path.abspath(args.workdir or os.path.join(
+        tempfile.gettempdir(), f"health_diary_ui_bench_{args.scale}_{args.seed}"))
+    # Пути результатов задаются относительно каталога запуска, а не рабочего каталога замеров
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    print(f"Рабочий каталог: {workdir} ({args.scale} записей)")
+    results, parameters = run(workdir, args.scale, args.repeat, args.seed)
+    print_ui_results(results)
+
+    document = {'results': results}
+    if output:
+        document = write_results(output, SUITE, results, parameters)
+        print(f"\nРезультаты сохранены: {output}")
+
+    if baseline:
+        comparison = compare_results(load_results(baseline), document)
+        print_comparison(comparison)
+        return exit_code(comparison)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
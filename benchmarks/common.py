@@ -0,0 +1,241 @@
+"""
+Общие функции замеров: перцентили, сохранение и сравнение результатов
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Перцентили, которые попадают в результаты
+PERCENTILES = (50, 95, 99)
+
+# Во сколько раз должен вырасти p95, чтобы сравнение считало это регрессией
+REGRESSION_THRESHOLD = 1.2
+
+
+def percentile(values, q):
+    """
+    Перцентиль с линейной интерполяцией между соседними значениями
+
+    Args:
+        values: измерения
+        q: перцентиль от 0 до 100
+
+    Returns:
+        float: значение перцентиля или None для пустого списка
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(durations, rows=0):
+    """
+    Сводка по времени выполнений операции
+
+    Args:
+        durations: длительности выполнений в секундах
+        rows: общее число строк, обработанных за все выполнения
+
+    Returns:
+        dict: число выполнений, перцентили и среднее в миллисекундах, строк в секунду
+    """
+    total = sum(durations)
+    summary = {
+        'runs': len(durations),
+        'total_s': round(total, 6),
+        'mean_ms': round(total / len(durations) * 1000, 4) if durations else None,
+        'min_ms': round(min(durations) * 1000, 4) if durations else None,
+        'max_ms': round(max(durations) * 1000, 4) if durations else None,
+    }
+    for q in PERCENTILES:
+        value = percentile(durations, q)
+        summary[f'p{q}_ms'] = round(value * 1000, 4) if value is not None else None
+    summary['rows'] = rows
+    summary['rows_per_s'] = round(rows / total, 1) if total > 0 else None
+    return summary
+
+
+def measure(operation, arguments, warmup=1):
+    """
+    Замеряет операцию на наборе аргументов
+
+    Args:
+        operation: функция; возвращает результат, по которому считаются строки
+        arguments: список кортежей аргументов, по одному на выполнение
+        warmup: число первых выполнений, которые не учитываются (прогрев кэша)
+
+    Returns:
+        dict: сводка summarize()
+    """
+    durations = []
+    rows = 0
+    for index, args in enumerate(arguments):
+        started = time.perf_counter()
+        result = operation(*args)
+        elapsed = time.perf_counter() - started
+        if index < warmup:
+            continue
+        durations.append(elapsed)
+        rows += count_rows(result)
+    return summarize(durations, rows)
+
+
+def count_rows(result):
+    """Число строк в результате операции (одна строка для скалярных результатов)"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)) and result and isinstance(result[0], (list, tuple)):
+        return len(result)
+    return 1
+
+
+def current_rss_bytes():
+    """
+    Текущий объем памяти процесса (RSS) в байтах
+
+    На Linux читается /proc/self/statm; на других системах возвращается
+    максимальный RSS из getrusage.
+
+    Returns:
+        int: байты или None, если значение недоступно
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss: килобайты на Linux, байты на macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def environment_info():
+    """
+    Сведения об окружении, без которых результаты нельзя сравнивать
+
+    Returns:
+        dict: версии Python и SQLite, платформа, коммит
+    """
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def git_commit():
+    """Текущий коммит репозитория или None"""
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, timeout=5)
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_results(path, suite, results, parameters=None):
+    """
+    Сохраняет результаты замеров в JSON
+
+    Args:
+        path: путь к файлу
+        suite: название набора замеров
+        results: {операция: сводка}
+        parameters: параметры запуска (масштаб, seed и т.д.)
+
+    Returns:
+        dict: сохраненный документ
+    """
+    document = {
+        'suite': suite,
+        'parameters': parameters or {},
+        'environment': environment_info(),
+        'results': results,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return document
+
+
+def load_results(path):
+    """Читает результаты, сохраненные write_results()"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, metric='p95_ms', threshold=REGRESSION_THRESHOLD):
+    """
+    Сравнивает два набора результатов
+
+    Args:
+        baseline: документ предыдущего запуска
+        current: документ текущего запуска
+        metric: сравниваемое значение сводки
+        threshold: отношение current / baseline, начиная с которого операция считается регрессией
+
+    Returns:
+        list: (операция, было, стало, отношение, регрессия) для операций из обоих наборов
+    """
+    rows = []
+    old_results = baseline.get('results', {})
+    for name, summary in current.get('results', {}).items():
+        old = old_results.get(name, {}).get(metric)
+        new = summary.get(metric)
+        if not old or new is None:
+            continue
+        ratio = new / old
+        rows.append((name, old, new, round(ratio, 3), ratio >= threshold))
+    return rows
+
+
+def print_results(results):
+    """Печатает сводку в виде таблицы"""
+    print(f"{'операция':<36}{'runs':>6}{'p50, мс':>11}{'p95, мс':>11}{'p99, мс':>11}{'строк/с':>13}")
+    for name, summary in results.items():
+        rows_per_s = summary.get('rows_per_s')
+        print(f"{name:<36}{summary['runs']:>6}{_ms(summary['p50_ms']):>11}{_ms(summary['p95_ms']):>11}"
+              f"{_ms(summary['p99_ms']):>11}{rows_per_s if rows_per_s is not None else '-':>13}")
+
+
+def print_comparison(rows, metric='p95_ms'):
+    """Печатает результат compare_results()"""
+    print(f"\nСравнение по {metric}:")
+    for name, old, new, ratio, regression in rows:
+        mark = "  РЕГРЕССИЯ" if regression else ""
+        print(f"{name:<36}{_ms(old):>11}{_ms(new):>11}{ratio:>9.2f}x{mark}")
+
+
+def exit_code(rows):
+    """Код завершения: 1, если сравнение нашло регрессии"""
+    return 1 if any(row[4] for row in rows) else 0
+
+
+def _ms(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.common old.json new.json
+    comparison = compare_results(load_results(sys.argv[1]), load_results(sys.argv[2]))
+    print_comparison(comparison)
+    sys.exit(exit_code(comparison))
@@ -0,0 +1,307 @@
+"""
+Генератор синтетических данных для замеров
+
+Создает базу SQLite со схемой приложения и правдоподобными данными:
+пользователи, настройки, сессии устройств, записи показателей за несколько
+лет и журнал действий администраторов. Данные детерминированы seed, поэтому
+замеры разных коммитов выполняются на одинаковой базе.
+"""
+
+import json
+import math
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from database import create_schema, init_users_search, init_sync_tables, migrate_admin_actions, \
+    init_record_trends, init_indicator_stats, insert_admin_actions
+
+# Масштабы: число записей показателей
+SCALES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '10m': 10_000_000,
+}
+
+# В среднем записей на пользователя (около двух лет ежедневных измерений)
+RECORDS_PER_USER = 700
+
+# Доля администраторов среди пользователей
+ADMIN_SHARE = 0.01
+
+# Действий администраторов на одну запись показателей
+ADMIN_ACTIONS_PER_RECORD = 0.05
+
+# Последний день данных; записи уходят в прошлое от него
+END_DATE = datetime(2024, 6, 30)
+
+# Размер пачки executemany при загрузке
+BATCH_SIZE = 20_000
+
+FIRST_NAMES = ("Анна", "Борис", "Виктор", "Галина", "Дмитрий", "Елена", "Иван", "Ксения",
+               "Мария", "Николай", "Ольга", "Павел", "Светлана", "Татьяна", "Юрий")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов",
+              "Новиков", "Морозов", "Волков")
+NOTES = ("", "", "", "", "После тренировки", "Плохо спал", "Головная боль", "Утром натощак",
+         "Принял лекарство", "Самочувствие хорошее")
+ACTION_TYPES = ("view_records", "view_user", "make_admin", "remove_admin", "export", "search")
+MOODS = ("хорошее", "нормальное", "плохое")
+
+BENCH_META_SQL = """
+    CREATE TABLE IF NOT EXISTS bench_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+"""
+
+
+def scale_records(scale):
+    """
+    Число записей для масштаба
+
+    Args:
+        scale: ключ SCALES или число
+
+    Returns:
+        int: число записей
+    """
+    if isinstance(scale, int):
+        return scale
+    if scale in SCALES:
+        return SCALES[scale]
+    return int(scale)
+
+
+def user_email(user_index):
+    """Email синтетического пользователя по его номеру (с 1)"""
+    return f"user{user_index}@bench.local"
+
+
+def generate_database(conn, records, seed=42, records_per_user=RECORDS_PER_USER):
+    """
+    Заполняет пустую базу синтетическими данными
+
+    Схема создается так же, как в init_db(); записи загружаются пачками до
+    создания триггеров синхронизации, а дневные итоги и статистика
+    показателей заполняются по уже загруженным записям.
+
+    Args:
+        conn: соединение с пустой базой SQLite
+        records: число записей показателей
+        seed: начальное значение генератора случайных чисел
+        records_per_user: среднее число записей на пользователя
+
+    Returns:
+        dict: параметры и количество созданных строк
+    """
+    rng = random.Random(seed)
+    users = max(10, math.ceil(records / records_per_user))
+    admins = max(1, int(users * ADMIN_SHARE))
+
+    create_schema(conn)
+    conn.execute(BENCH_META_SQL)
+
+    _load_users(conn, rng, users, admins)
+    _load_settings(conn, rng, users)
+    sessions = _load_sessions(conn, rng, users)
+    _load_records(conn, rng, users, records)
+
+    init_users_search(conn)
+    init_sync_tables(conn)
+    migrate_admin_actions(conn)
+    init_record_trends(conn)
+    init_indicator_stats(conn)
+
+    actions = _load_admin_actions(conn, rng, users, admins, int(records * ADMIN_ACTIONS_PER_RECORD))
+
+    summary = {
+        'seed': seed,
+        'users': users,
+        'admins': admins,
+        'records': records,
+        'sessions': sessions,
+        'admin_actions': actions,
+    }
+    conn.executemany("INSERT OR REPLACE INTO bench_meta (key, value) VALUES (?, ?)",
+                     [(key, str(value)) for key, value in summary.items()])
+    conn.commit()
+    return summary
+
+
+def read_summary(conn):
+    """
+    Параметры базы, созданной generate_database()
+
+    Returns:
+        dict: как у generate_database() или None, если база не генерировалась
+    """
+    try:
+        rows = conn.execute("SELECT key, value FROM bench_meta").fetchall()
+    except sqlite3.Error:
+        return None
+    return {key: int(value) for key, value in rows} or None
+
+
+def open_database(path, records, seed=42):
+    """
+    Открывает базу для замеров, генерируя ее только при необходимости
+
+    Большие базы создаются минуты, поэтому файл с теми же параметрами
+    используется повторно.
+
+    Args:
+        path: путь к файлу базы
+        records: число записей показателей
+        seed: начальное значение генератора
+
+    Returns:
+        tuple: (соединение, параметры базы)
+    """
+    conn = sqlite3.connect(path)
+    summary = read_summary(conn)
+    if summary and summary.get('records') == records and summary.get('seed') == seed:
+        return conn, summary
+    conn.close()
+
+    # Файл с другими параметрами пересоздается
+    conn = sqlite3.connect(path)
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+    conn.execute("VACUUM")
+    return conn, generate_database(conn, records, seed)
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load_users(conn, rng, users, admins):
+    def rows():
+        for index in range(1, users + 1):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            created = END_DATE - timedelta(days=rng.randint(30, 5 * 365))
+            # Настоящий хеш PBKDF2 не нужен: замеряется поиск, а не проверка пароля
+            password_hash = f"{rng.getrandbits(128):032x}{rng.getrandbits(256):064x}"
+            yield (index, user_email(index), password_hash, name,
+                   created.strftime("%Y-%m-%d %H:%M:%S"), 1 if index <= admins else 0)
+
+    for batch in _batched(rows()):
+        conn.executemany("INSERT INTO users (id, email, password_hash, name, created_at, is_admin) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def _load_settings(conn, rng, users):
+    def rows():
+        for user_id in range(1, users + 1):
+            if rng.random() < 0.3:
+                continue  # настройки по умолчанию не сохраняются
+            settings = {
+                'theme': rng.choice(("Light", "Dark")),
+                'primary_palette': rng.choice(("Blue", "Green", "Teal", "Purple")),
+                'date_format': rng.choice(("%d.%m.%Y", "%Y-%m-%d")),
+                'daily_reminders': rng.random() < 0.4,
+                'reminder_time': f"{rng.randint(6, 22):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+            }
+            yield user_id, json.dumps(settings, ensure_ascii=False)
+
+    for batch in _batched(rows()):
+        conn.executemany("INSERT INTO user_settings (user_id, settings) VALUES (?, ?)", batch)
+    conn.commit()
+
+
+def _load_sessions(conn, rng, users):
+    count = 0
+
+    def rows():
+        nonlocal count
+        for user_id in range(1, users + 1):
+            for device in range(rng.choice((0, 1, 1, 2))):
+                count += 1
+                expires = END_DATE + timedelta(days=rng.randint(-30, 30))
+                yield (user_id, f"device-{user_id}-{device}", f"{rng.getrandbits(128):032x}",
+                       expires.strftime("%Y-%m-%d %H:%M:%S"))
+
+    for batch in _batched(rows()):
+        conn.executemany("INSERT INTO user_sessions (user_id, device_id, session_token, expires_at) "
+                         "VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    return count
+
+
+def _load_records(conn, rng, users, records):
+    def rows():
+        # Записи распределены между пользователями неравномерно: у активных
+        # пользователей история длиннее
+        weights = [rng.paretovariate(1.5) for _ in range(users)]
+        total_weight = sum(weights)
+        counts = [max(1, int(records * weight / total_weight)) for weight in weights]
+        # Округление выравнивается на первом пользователе, чтобы записей было ровно records
+        counts[0] = max(1, counts[0] + records - sum(counts))
+        produced = 0
+
+        for user_index, count in enumerate(counts):
+            if produced >= records:
+                break
+            count = min(count, records - produced)
+            produced += count
+            user_id = user_index + 1
+
+            base_weight = rng.uniform(50, 110)
+            base_systolic = rng.randint(105, 150)
+            base_pulse = rng.randint(58, 85)
+            # Примерно одно-два измерения в день, от последнего дня в прошлое
+            moment = END_DATE - timedelta(days=rng.randint(0, 30))
+            for _ in range(count):
+                moment -= timedelta(minutes=rng.randint(8 * 60, 36 * 60))
+                base_weight += rng.gauss(0, 0.1)
+                systolic = int(rng.gauss(base_systolic, 8))
+                yield (
+                    user_id,
+                    moment.strftime("%Y-%m-%d %H:%M:%S"),
+                    round(base_weight + rng.gauss(0, 0.4), 1),
+                    systolic,
+                    int(systolic * rng.uniform(0.6, 0.7)),
+                    int(rng.gauss(base_pulse, 6)),
+                    round(rng.uniform(6, 9), 1) if rng.random() < 0.5 else None,
+                    round(rng.gauss(36.6, 0.2), 1),
+                    rng.choice(MOODS) if rng.random() < 0.3 else None,
+                    rng.choice(NOTES),
+                    f"{rng.getrandbits(128):032x}",
+                )
+
+    for batch in _batched(rows()):
+        conn.executemany("""
+            INSERT INTO records (user_id, record_date, weight, pressure_systolic, pressure_diastolic, pulse,
+                                 sleep_hours, temperature, mood, notes, sync_uid, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?2, ?2)
+        """, batch)
+    conn.commit()
+
+
+def _load_admin_actions(conn, rng, users, admins, count):
+    start = END_DATE - timedelta(days=365)
+    span = int((END_DATE - start).total_seconds())
+    actions = []
+    for _ in range(count):
+        created = start + timedelta(seconds=rng.randrange(span))
+        affected = rng.randint(1, users)
+        action_type = rng.choice(ACTION_TYPES)
+        actions.append((rng.randint(1, admins), action_type, f"{action_type}: user {affected}",
+                        affected, f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                        created.strftime("%Y-%m-%d %H:%M:%S")))
+    actions.sort(key=lambda action: action[5])
+    for batch in _batched(actions):
+        insert_admin_actions(conn, batch)
+    return count
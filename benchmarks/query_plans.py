@@ -0,0 +1,460 @@
+"""
+Проверка планов запросов database.py
+
+Функции database.py выполняются на синтетической базе через соединение,
+которое запоминает каждый выполненный запрос с параметрами. Для каждого
+запроса выполняется EXPLAIN QUERY PLAN, и в плане отмечаются проблемы:
+полный просмотр большой таблицы (SCAN без индекса) и сортировка во
+временном B-дереве (USE TEMP B-TREE). Планы сравниваются с сохраненными в
+benchmarks/query_plans.json; новая проблема в плане считается регрессией.
+
+Запуск:
+    python -m benchmarks.query_plans            # сравнение с сохраненными планами
+    python -m benchmarks.query_plans --update   # сохранить текущие планы
+"""
+
+import argparse
+import inspect
+import json
+import os
+import re
+import sqlite3
+import sys
+
+import database
+from services.query_monitor import normalize_sql
+from benchmarks.datagen import scale_records, generate_database
+from benchmarks.bench_ui import largest_history_user
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans.json")
+
+# Таблицы, полный просмотр которых растет с числом пользователей или записей
+LARGE_TABLES = frozenset((
+    'users', 'records', 'exports', 'user_settings', 'reminders', 'user_sessions', 'admin_actions',
+    'indicator_stats', 'sync_log', 'record_daily_stats',
+))
+
+# Функции database.py с соединением, планы которых не проверяются
+NOT_CHECKED = {
+    'insert_user_session': "INSERT ... VALUES без чтения таблиц",
+    'insert_user': "INSERT ... VALUES без чтения таблиц",
+    'insert_record': "INSERT ... VALUES без чтения таблиц",
+    'insert_user_settings': "INSERT ... VALUES без чтения таблиц",
+    'insert_admin_action': "INSERT ... VALUES без чтения таблиц",
+    'insert_admin_actions': "INSERT ... VALUES без чтения таблиц",
+    'ensure_audit_bucket': "DDL",
+    'drop_audit_bucket': "DDL",
+    'execute_script': "DDL",
+    'create_schema': "DDL",
+    'init_sync_tables': "DDL",
+    'init_users_search': "DDL и однократное заполнение",
+    'refresh_users_search': "UPDATE по первичному ключу или однократное заполнение",
+    'init_record_trends': "DDL и однократное заполнение",
+    'init_indicator_stats': "DDL и однократное заполнение",
+    'migrate_admin_actions': "однократный перенос при обновлении",
+}
+
+# Команды без плана выполнения
+_NO_PLAN = ('CREATE', 'DROP', 'ALTER', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE',
+            'ANALYZE', 'VACUUM')
+
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?",
+                        re.IGNORECASE)
+_KEYWORDS = frozenset((
+    'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'OUTER', 'ON', 'USING', 'ORDER', 'GROUP', 'LIMIT', 'SET',
+    'VALUES', 'SELECT', 'HAVING', 'WINDOW', 'UNION', 'NATURAL', 'DEFAULT', 'AS',
+))
+_OLD_TABLE_PREFIX = re.compile(r"^(SCAN|SEARCH) TABLE ")
+_BUCKET_NAME = re.compile(r"admin_actions_\d{6}")
+
+
+class PlanCursor(sqlite3.Cursor):
+    """Курсор, запоминающий выполненные запросы в соединении"""
+
+    def execute(self, sql, parameters=()):
+        self.connection.statements.append((sql, tuple(parameters)))
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        if seq_of_parameters:
+            self.connection.statements.append((sql, tuple(seq_of_parameters[0])))
+        return super().executemany(sql, seq_of_parameters)
+
+
+class PlanConnection(sqlite3.Connection):
+    """
+    Соединение SQLite, запоминающее запросы функций database.py
+
+    Connection.execute() в C создает курсор в обход cursor(), поэтому
+    execute и executemany переопределены отдельно.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []  # (sql, параметры)
+
+    def cursor(self, factory=PlanCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def build_cases(conn):
+    """
+    Вызовы функций database.py с аргументами из базы
+
+    Каждая функция вызывается во всех вариантах, которые строят разный
+    SQL (фильтры, сортировки, следующие страницы).
+
+    Args:
+        conn: соединение с синтетической базой
+
+    Returns:
+        dict: {название: (функция database.py, функция без аргументов)}
+    """
+    user_id, _ = largest_history_user(conn)
+    admin_id = conn.execute("SELECT id FROM users WHERE is_admin = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    email = conn.execute("SELECT email FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+    device_id = conn.execute("SELECT device_id FROM user_sessions ORDER BY id LIMIT 1").fetchone()[0]
+    record_id = conn.execute("SELECT MAX(id) FROM records WHERE user_id = ?", (user_id,)).fetchone()[0]
+    name_prefix = conn.execute("SELECT substr(name, 1, 3) FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+
+    def directory_next(sort):
+        _, after = database.select_users_directory(conn, sort=sort, limit=2)
+        database.select_users_directory(conn, sort=sort, after=after, limit=2)
+
+    def audit_next():
+        _, after = database.select_admin_actions_page(conn, limit=5)
+        database.select_admin_actions_page(conn, after=after, limit=5)
+
+    d = database
+    return {
+        'select_user_by_email': (d.select_user_by_email, lambda: d.select_user_by_email(conn, email)),
+        'select_user_by_email_hash': (d.select_user_by_email,
+                                      lambda: d.select_user_by_email(conn, email, pass_hash=True)),
+        'select_user_by_id': (d.select_user_by_id, lambda: d.select_user_by_id(conn, user_id)),
+        'select_user_by_id_detailed': (d.select_user_by_id,
+                                       lambda: d.select_user_by_id(conn, user_id, detailed=True)),
+        'select_user_count_by_email': (d.select_user_count_by_email,
+                                       lambda: d.select_user_count_by_email(conn, email)),
+        'select_all_users': (d.select_all_users, lambda: d.select_all_users(conn)),
+        'select_users_directory': (d.select_users_directory, lambda: d.select_users_directory(conn)),
+        'select_users_directory_name': (d.select_users_directory,
+                                        lambda: d.select_users_directory(conn, sort='name')),
+        'select_users_directory_next': (d.select_users_directory, lambda: directory_next('created_at')),
+        'select_users_directory_name_next': (d.select_users_directory, lambda: directory_next('name')),
+        'select_users_directory_id': (d.select_users_directory,
+                                      lambda: d.select_users_directory(conn, search=str(user_id))),
+        'select_users_directory_prefix': (d.select_users_directory,
+                                          lambda: d.select_users_directory(conn, search=name_prefix)),
+        'select_users_directory_substring': (
+            d.select_users_directory,
+            lambda: d.select_users_directory(conn, search=name_prefix, match='substring')),
+        'select_all_records': (d.select_all_records, lambda: d.select_all_records(conn)),
+        'select_user_records_by_admin': (d.select_user_records_by_admin,
+                                         lambda: d.select_user_records_by_admin(conn, user_id)),
+        'select_user_records_by_admin_all': (d.select_user_records_by_admin,
+                                             lambda: d.select_user_records_by_admin(conn)),
+        'select_settings_by_user': (d.select_settings_by_user, lambda: d.select_settings_by_user(conn, user_id)),
+        'select_settings_by_user_check': (d.select_settings_by_user,
+                                          lambda: d.select_settings_by_user(conn, user_id, check=True)),
+        'select_user_session_by_device': (d.select_user_session_by_device,
+                                          lambda: d.select_user_session_by_device(conn, device_id)),
+        'select_records_by_user': (d.select_records_by_user, lambda: d.select_records_by_user(conn, user_id)),
+        'select_record_by_id': (d.select_record_by_id, lambda: d.select_record_by_id(conn, record_id)),
+        'iter_records_by_user': (d.iter_records_by_user, lambda: list(d.iter_records_by_user(conn, user_id))),
+        'select_records_version': (d.select_records_version, lambda: d.select_records_version(conn, user_id)),
+        'select_record_trends_day': (
+            d.select_record_trends,
+            lambda: d.select_record_trends(conn, user_id, date_from="2024-05-01", date_to="2024-06-30")),
+        'select_record_trends_month': (d.select_record_trends,
+                                       lambda: d.select_record_trends(conn, user_id, 'pulse', 'month')),
+        'select_indicator_stats': (d.select_indicator_stats,
+                                   lambda: d.select_indicator_stats(conn, [user_id, admin_id])),
+        'select_active_reminders': (d.select_active_reminders, lambda: d.select_active_reminders(conn, user_id)),
+        'select_admin_actions': (d.select_admin_actions, lambda: d.select_admin_actions(conn)),
+        'select_admin_actions_by_admin': (d.select_admin_actions,
+                                          lambda: d.select_admin_actions(conn, admin_id)),
+        'select_admin_actions_page': (d.select_admin_actions_page, lambda: d.select_admin_actions_page(conn)),
+        'select_admin_actions_page_next': (d.select_admin_actions_page, audit_next),
+        'select_admin_actions_page_filtered': (
+            d.select_admin_actions_page,
+            lambda: d.select_admin_actions_page(conn, action_type="export", admin_id=admin_id,
+                                                date_from="2024-01-01", date_to="2024-06-30")),
+        'select_admin_actions_page_type': (d.select_admin_actions_page,
+                                           lambda: d.select_admin_actions_page(conn, action_type="search")),
+        'select_user_names': (d.select_user_names, lambda: d.select_user_names(conn, [user_id, admin_id])),
+        'get_user_statistics': (d.get_user_statistics, lambda: d.get_user_statistics(conn)),
+        'get_user_statistics_user': (d.get_user_statistics, lambda: d.get_user_statistics(conn, user_id)),
+        'list_audit_buckets': (d.list_audit_buckets, lambda: d.list_audit_buckets(conn)),
+        'update_user_settings': (d.update_user_settings,
+                                 lambda: d.update_user_settings(conn, user_id, '{"theme": "Light"}')),
+        'upsert_user_settings': (d.upsert_user_settings,
+                                 lambda: d.upsert_user_settings(conn, user_id, '{"theme": "Dark"}')),
+        'update_record': (d.update_record,
+                          lambda: d.update_record(conn, record_id, 70.5, 120, 80, 65, 36.6, "plan")),
+        'update_user_photo': (d.update_user_photo, lambda: d.update_user_photo(conn, user_id, b"")),
+        'update_user': (d.update_user, lambda: d.update_user(conn, user_id, "Plan", email)),
+        'update_user_admin_status': (d.update_user_admin_status,
+                                     lambda: d.update_user_admin_status(conn, admin_id, True)),
+        'upsert_indicator_stats': (d.upsert_indicator_stats,
+                                   lambda: d.upsert_indicator_stats(conn, user_id, {'weight': (3, 70.0, 1.0)})),
+        'rebuild_indicator_stats': (d.rebuild_indicator_stats,
+                                    lambda: d.rebuild_indicator_stats(conn, [user_id])),
+        'save_reminder': (d.save_reminder, lambda: d.save_reminder(conn, user_id, 'daily', "09:00", "plan")),
+        'delete_user_session_db': (d.delete_user_session_db,
+                                   lambda: d.delete_user_session_db(conn, device_id, user_id)),
+        'delete_user_session_db_device': (d.delete_user_session_db,
+                                          lambda: d.delete_user_session_db(conn, device_id)),
+        'sweep_expired_sessions': (d.sweep_expired_sessions, lambda: d.sweep_expired_sessions(conn)),
+        'delete_record': (d.delete_record, lambda: d.delete_record(conn, record_id)),
+    }
+
+
+def unchecked_functions(cases):
+    """
+    Функции database.py с соединением, не вошедшие ни в проверки, ни в NOT_CHECKED
+
+    Args:
+        cases: результат build_cases()
+
+    Returns:
+        list: имена функций
+    """
+    covered = {function.__name__ for function, _ in cases.values()}
+    missing = []
+    for name, function in inspect.getmembers(database, inspect.isfunction):
+        if name.startswith('_') or function.__module__ != database.__name__:
+            continue
+        parameters = list(inspect.signature(function).parameters)
+        if parameters[:1] == ['conn'] and name not in covered and name not in NOT_CHECKED:
+            missing.append(name)
+    return missing
+
+
+def table_aliases(sql):
+    """Имена и псевдонимы таблиц запроса: {псевдоним или имя: таблица}"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases.setdefault(table, table)
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def is_large_table(table):
+    return table in LARGE_TABLES or database.is_audit_bucket(table)
+
+
+def analyze_plan(sql, rows):
+    """
+    Разбирает результат EXPLAIN QUERY PLAN
+
+    SCAN без индекса отмечается только для больших таблиц; просмотр
+    подзапроса (CO-ROUTINE, MATERIALIZE) таблицей не считается. Сортировка
+    во временном B-дереве отмечается, если запрос читает большую таблицу.
+
+    Args:
+        sql: текст запроса
+        rows: строки плана (id, parent, notused, detail)
+
+    Returns:
+        tuple: (строки плана с отступами по вложенности, список проблем)
+    """
+    aliases = table_aliases(sql)
+    nodes = {}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        detail = _OLD_TABLE_PREFIX.sub(r"\1 ", detail)
+        depth = nodes[parent][1] + 1 if parent in nodes else 0
+        nodes[node_id] = (parent, depth, detail)
+        plan.append("  " * depth + _BUCKET_NAME.sub("admin_actions_YYYYMM", detail))
+
+    def inside_subquery(node_id, name):
+        parent = nodes[node_id][0]
+        while parent in nodes:
+            if nodes[parent][2] in (f"CO-ROUTINE {name}", f"MATERIALIZE {name}"):
+                return True
+            parent = nodes[parent][0]
+        return False
+
+    subqueries = {detail.split(" ", 1)[1] for _, _, detail in nodes.values()
+                  if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+
+    issues = []
+    reads_large = False
+    for node_id, (_, _, detail) in nodes.items():
+        words = detail.split()
+        if words[0] not in ('SCAN', 'SEARCH') or len(words) < 2:
+            continue
+        name = words[1]
+        if name in subqueries and not inside_subquery(node_id, name):
+            continue
+        table = aliases.get(name, name)
+        if not is_large_table(table):
+            continue
+        reads_large = True
+        if words[0] == 'SCAN' and 'USING' not in words:
+            issues.append(f"SCAN {_BUCKET_NAME.sub('admin_actions_YYYYMM', table)}")
+
+    if reads_large:
+        issues.extend(detail.replace("USE ", "", 1) for _, _, detail in nodes.values()
+                      if detail.startswith("USE TEMP B-TREE"))
+    return plan, sorted(set(issues))
+
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN запроса в обход учета запросов соединения"""
+    return sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+
+
+def collect_plans(conn, cases=None):
+    """
+    Выполняет функции database.py и собирает планы их запросов
+
+    Args:
+        conn: PlanConnection с синтетической базой
+        cases: результат build_cases() (по умолчанию строится заново)
+
+    Returns:
+        dict: {'вызов: форма запроса': {'sql', 'plan', 'issues'}}
+    """
+    cases = cases if cases is not None else build_cases(conn)
+    plans = {}
+    for name, (_, call) in cases.items():
+        conn.statements.clear()
+        call()
+        for sql, parameters in list(conn.statements):
+            if sql.lstrip().split(None, 1)[0].upper() in _NO_PLAN:
+                continue
+            rows = explain(conn, sql, parameters)
+            if not rows:
+                continue
+            plan, issues = analyze_plan(sql, rows)
+            shape = _BUCKET_NAME.sub("admin_actions_YYYYMM", normalize_sql(sql))
+            key = f"{name}: {shape}"
+            # Одна форма в разных месячных таблицах журнала: сохраняется худший план
+            if key not in plans or len(issues) > len(plans[key]['issues']):
+                plans[key] = {'sql': shape, 'plan': plan, 'issues': issues}
+    return plans
+
+
+def open_plan_database(records, seed=42, path=":memory:"):
+    """
+    Создает синтетическую базу с соединением PlanConnection
+
+    Без ANALYZE планы SQLite зависят от схемы и индексов, а не от объема
+    данных, поэтому для проверки достаточно небольшой базы.
+
+    Returns:
+        PlanConnection
+    """
+    conn = sqlite3.connect(path, factory=PlanConnection)
+    generate_database(conn, records, seed)
+    return conn
+
+
+def load_baseline(path=BASELINE_PATH):
+    """Сохраненные планы: {'вызов: форма запроса': {...}}"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['queries']
+
+
+def write_baseline(plans, path=BASELINE_PATH):
+    document = {'sqlite': sqlite3.sqlite_version, 'queries': dict(sorted(plans.items()))}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def compare_plans(baseline, current):
+    """
+    Сравнивает планы с сохраненными
+
+    Регрессия - проблема, которой не было в сохраненном плане запроса.
+    Новый запрос с проблемами тоже считается регрессией: его план нужно
+    сохранить явно (--update).
+
+    Returns:
+        tuple: (регрессии [(ключ, новые проблемы, план)],
+        изменившиеся планы без новых проблем [ключ])
+    """
+    regressions = []
+    changed = []
+    for key, entry in current.items():
+        previous = baseline.get(key)
+        known = set(previous['issues']) if previous else set()
+        added = [issue for issue in entry['issues'] if issue not in known]
+        if added:
+            regressions.append((key, added, entry['plan']))
+        elif previous is not None and previous['plan'] != entry['plan']:
+            changed.append(key)
+    return regressions, changed
+
+
+def format_regressions(regressions):
+    lines = []
+    for key, added, plan in regressions:
+        lines.append(f"{key}\n  новые проблемы: {', '.join(added)}")
+        lines.extend(f"    {line}" for line in plan)
+    return "\n".join(lines)
+
+
+def print_plans(plans, show_all=False):
+    """Печатает запросы с проблемами в плане (show_all - все запросы)"""
+    for key, entry in plans.items():
+        if entry['issues'] or show_all:
+            print(key)
+            if entry['issues']:
+                print(f"  проблемы: {', '.join(entry['issues'])}")
+            for line in entry['plan']:
+                print(f"    {line}")
+    flagged = sum(1 for entry in plans.values() if entry['issues'])
+    print(f"\nЗапросов: {len(plans)}, с проблемами в плане: {flagged}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка планов запросов database.py")
+    parser.add_argument("--scale", default="1k", help="число записей синтетической базы")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="файл сохраненных планов")
+    parser.add_argument("--update", action="store_true", help="сохранить текущие планы")
+    parser.add_argument("--all", action="store_true", help="печатать планы всех запросов")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = open_plan_database(scale_records(args.scale), args.seed)
+    try:
+        cases = build_cases(conn)
+        missing = unchecked_functions(cases)
+        plans = collect_plans(conn, cases)
+    finally:
+        conn.close()
+
+    print_plans(plans, args.all)
+    if missing:
+        print(f"\nФункции database.py без проверки плана: {', '.join(missing)}")
+
+    if args.update:
+        write_baseline(plans, args.baseline)
+        print(f"\nПланы сохранены: {args.baseline}")
+        return 0
+
+    regressions, changed = compare_plans(load_baseline(args.baseline), plans)
+    for key in changed:
+        print(f"План изменился без новых проблем: {key}")
+    if regressions:
+        print(f"\nРегрессии планов:\n{format_regressions(regressions)}")
+        return 1
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
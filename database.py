@@ -1,7 +1,12 @@
 import hashlib
+import json
 import os
 import sys
 import sqlite3
+from datetime import datetime, timezone
+
+from services.health import CircuitBreaker, BackendHealthMonitor
+from services.query_monitor import InstrumentedConnection
 
 try:
     import pymysql  # type: ignore
@@ -9,9 +14,24 @@ except Exception:
     pymysql = None
 
 DB_FILENAME = "database.db"
-local = False
 force_local = False
 
+# Короткий таймаут подключения: недоступный сервер не должен задерживать экраны
+MYSQL_CONNECT_TIMEOUT = 2
+# Период фоновой проверки сервера в секундах
+HEALTH_PROBE_INTERVAL = 15
+
+# Параметры подключения к серверу MySQL
+MYSQL_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '',
+    'database': 'health_diary',
+    'charset': 'utf8mb4',
+    # Время сеанса в UTC, как CURRENT_TIMESTAMP в SQLite: updated_at сравнивается при синхронизации
+    'init_command': "SET time_zone = '+00:00'",
+}
+
 def get_default_db_path():
     """
     Возвращает путь для файла БД.
@@ -25,12 +45,25 @@ def get_default_db_path():
             return os.path.join(os.getcwd(), DB_FILENAME)
     return os.path.join(os.getcwd(), DB_FILENAME)
 
+def connect_sqlite(path, **kwargs):
+    """
+    Открывает базу SQLite с учетом запросов (services/query_monitor.py)
+
+    Args:
+        path: путь к файлу базы
+        **kwargs: аргументы sqlite3.connect (check_same_thread, timeout)
+
+    Returns:
+        sqlite3.Connection: соединение InstrumentedConnection
+    """
+    return sqlite3.connect(path, factory=InstrumentedConnection, **kwargs)
+
 def set_force_local(value=True):
     global force_local
     force_local = value
 
 def get_connection(database="sqlite", path=None):
-    global local, force_local
+    global force_local
 
     if sys.platform == "android":
         database = "sqlite"
@@ -38,29 +71,87 @@ def get_connection(database="sqlite", path=None):
     db_path = path or get_default_db_path()
 
     if database == "sqlite" or force_local or pymysql is None:
-        return sqlite3.connect(db_path)
-    else:
-        try:
-            if not local:
-                if pymysql is None:
-                    raise ImportError("pymysql is not available")
-                conn = pymysql.connect(
-                    host='localhost',
-                    user='root',
-                    password='',
-                    database='health_diary',
-                    charset='utf8mb4',
-                )
-            else:
-                return sqlite3.connect(db_path)
-        except Exception as e:
-            print(f"Ошибка подключения: {e}")
-            print(f"Переход на локальную базу данных...")
-            local = True
-            return sqlite3.connect(db_path)
+        return connect_sqlite(db_path)
 
-        else:
-            return conn
+    # Пока сервер помечен недоступным, сразу работаем с локальной базой
+    if not mysql_breaker.allow_request():
+        return connect_sqlite(db_path)
+
+    try:
+        conn = pymysql.connect(connect_timeout=MYSQL_CONNECT_TIMEOUT, **MYSQL_CONFIG)
+    except Exception as e:
+        print(f"Ошибка подключения: {e}")
+        print(f"Переход на локальную базу данных...")
+        mysql_breaker.record_failure()
+        return connect_sqlite(db_path)
+
+    mysql_breaker.record_success()
+    return conn
+
+def get_remote_connection(connect_timeout=MYSQL_CONNECT_TIMEOUT):
+    """
+    Открывает соединение с сервером MySQL без перехода на локальную базу
+
+    Используется движком синхронизации: ошибка подключения пробрасывается
+    вызывающему коду, а не маскируется локальным SQLite.
+
+    Args:
+        connect_timeout: таймаут подключения в секундах
+
+    Returns:
+        Соединение pymysql
+    """
+    if pymysql is None:
+        raise ImportError("pymysql is not available")
+    if not mysql_breaker.allow_request():
+        raise ConnectionError("Сервер базы данных недоступен (цепь разомкнута)")
+
+    try:
+        conn = pymysql.connect(connect_timeout=connect_timeout, **MYSQL_CONFIG)
+    except Exception:
+        mysql_breaker.record_failure()
+        raise
+
+    mysql_breaker.record_success()
+    return conn
+
+def _probe_mysql():
+    """Проверка сервера для монитора: подключение с коротким таймаутом и ping"""
+    if pymysql is None:
+        raise ImportError("pymysql is not available")
+    conn = pymysql.connect(connect_timeout=MYSQL_CONNECT_TIMEOUT, **MYSQL_CONFIG)
+    try:
+        conn.ping(reconnect=False)
+    finally:
+        conn.close()
+
+# Состояние сервера MySQL общее для всего процесса
+mysql_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+health_monitor = BackendHealthMonitor(_probe_mysql, mysql_breaker, interval=HEALTH_PROBE_INTERVAL)
+
+def start_health_monitor(interval=None):
+    """
+    Запускает фоновую проверку сервера MySQL
+
+    Args:
+        interval: период проверки в секундах (по умолчанию HEALTH_PROBE_INTERVAL)
+    """
+    if pymysql is None or sys.platform == "android":
+        return
+    health_monitor.start(interval)
+
+def get_backend_health():
+    """
+    Возвращает снимок состояния сервера базы данных
+
+    Returns:
+        dict: см. BackendHealthMonitor.snapshot()
+    """
+    snapshot = health_monitor.snapshot()
+    if pymysql is None or force_local:
+        snapshot['backend'] = 'sqlite'
+    snapshot['mysql_available'] = pymysql is not None
+    return snapshot
 
 
 def insert_user_session(conn, user_id, device_id, session_token, expires_at):
@@ -95,6 +186,7 @@ def insert_user(conn, email, password_hash, name, is_admin=False):
         cursor.execute(
             f"INSERT INTO users (email, password_hash, name, is_admin) VALUES ('{email}', '{password_hash}', '{name}', {1 if is_admin else 0})"
         )
+        refresh_users_search(conn, [cursor.lastrowid])
         conn.commit()
 
     except Exception as e:
@@ -108,9 +200,11 @@ def insert_record(conn, user_id, weight, pressure_systolic, pressure_diastolic,
                         VALUES ({user_id}, {weight}, {pressure_systolic}, {pressure_diastolic}, {pulse}, {temperature}, '{notes}', '{record_date}')"""
         )
         conn.commit()
+        return cursor.lastrowid
 
     except Exception as e:
         print(f"Ошибка базы данных при INSERT: {e}")
+        return None
 
 def insert_user_settings(conn, user_id, settings):
     try:
@@ -135,16 +229,271 @@ def insert_admin_action(conn, admin_id, action_type, action_details, affected_us
         affected_user_id: ID затронутого пользователя
         ip_address: IP адрес
     """
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    insert_admin_actions(conn, [(admin_id, action_type, action_details, affected_user_id,
+                                 ip_address or '', created_at)])
+
+def insert_admin_actions(conn, actions):
+    """
+    Записывает пачку действий администраторов одной транзакцией
+
+    В SQLite каждое действие попадает в таблицу своего месяца
+    (admin_actions_ГГГГММ), в MySQL - в таблицу admin_actions. id в
+    месячных таблицах выдаются общим счетчиком и не повторяются.
+    Пачка записывается целиком или не записывается вовсе: месячные
+    таблицы, выделение id и вставка выполняются в одной транзакции
+    BEGIN IMMEDIATE.
+
+    Args:
+        conn: соединение с базой данных
+        actions: список кортежей (admin_id, action_type, action_details,
+            affected_user_id, ip_address, created_at)
+
+    Returns:
+        bool: True если все действия записаны
+    """
+    try:
+        cursor = conn.cursor()
+
+        is_sqlite = hasattr(conn, 'isolation_level')
+
+        if is_sqlite:
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            actions = [tuple(action[:5]) + (action[5] or now,) for action in actions]
+            tables = [audit_bucket_for(action[5]) for action in actions]
+
+            # Блокировка записи на всю пачку: счетчик id читается и
+            # обновляется без гонки с другими соединениями
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            for table in sorted(set(tables)):
+                ensure_audit_bucket(conn, table, commit=False)
+            first_id = _reserve_audit_ids(cursor, len(actions))
+            buckets = {}
+            for offset, (table, action) in enumerate(zip(tables, actions)):
+                buckets.setdefault(table, []).append((first_id + offset,) + action)
+            columns = "id, admin_id, action_type, action_details, affected_user_id, ip_address, created_at"
+        else:
+            buckets = {'admin_actions': actions}
+            columns = "admin_id, action_type, action_details, affected_user_id, ip_address, created_at"
+
+        ph = '?' if is_sqlite else '%s'
+        for table, rows in buckets.items():
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({', '.join([ph] * len(rows[0]))})",
+                rows
+            )
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Ошибка базы данных при INSERT admin_actions: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return False
+
+# ----------------------------------------------------------------------
+# Помесячное хранение журнала администраторов (SQLite)
+# ----------------------------------------------------------------------
+
+AUDIT_BUCKET_PREFIX = "admin_actions_"
+
+# Таблица одного месяца журнала: имя вида admin_actions_202401.
+# id выдает общий счетчик (AUTOINCREMENT таблицы admin_actions), см. _reserve_audit_ids
+AUDIT_BUCKET_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        admin_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL,
+        action_details TEXT,
+        affected_user_id INTEGER,
+        ip_address TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (admin_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+"""
+
+AUDIT_BUCKET_SQL = AUDIT_BUCKET_TABLE_SQL + """;
+
+    CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table} (created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_{table}_admin ON {table} (admin_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_{table}_type ON {table} (action_type, created_at)
+"""
+
+def audit_bucket_for(created_at):
+    """
+    Возвращает имя месячной таблицы журнала для момента времени
+
+    Args:
+        created_at: строка 'ГГГГ-ММ-ДД ...' или datetime
+
+    Returns:
+        str: имя таблицы, например admin_actions_202401
+    """
+    if isinstance(created_at, datetime):
+        return f"{AUDIT_BUCKET_PREFIX}{created_at.year:04d}{created_at.month:02d}"
+    value = str(created_at)
+    if len(value) < 7 or not (value[:4] + value[5:7]).isdigit():
+        raise ValueError(f"Некорректная дата действия: {created_at}")
+    return f"{AUDIT_BUCKET_PREFIX}{value[:4]}{value[5:7]}"
+
+def _reserve_audit_ids(cursor, count):
+    """
+    Выделяет count подряд идущих id журнала администраторов
+
+    Счетчик - строка admin_actions в sqlite_sequence, поэтому id не
+    повторяются ни между месячными таблицами, ни со старыми записями admin_actions.
+
+    Returns:
+        int: первый выделенный id
+    """
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'admin_actions'")
+    row = cursor.fetchone()
+    last = row[0] if row else 0
+    if row:
+        cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'admin_actions'", (last + count,))
+    else:
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('admin_actions', ?)", (last + count,))
+    return last + 1
+
+def _rebuild_audit_bucket(conn, table):
+    """
+    Пересоздает месячную таблицу предыдущих версий (без внешнего ключа
+    и с собственным AUTOINCREMENT); записи получают id из общего счетчика
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table}_new")
+    cursor.execute(AUDIT_BUCKET_TABLE_SQL.format(table=f"{table}_new"))
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    first_id = _reserve_audit_ids(cursor, cursor.fetchone()[0])
+    cursor.execute(f"""
+        INSERT INTO {table}_new
+            (id, admin_id, action_type, action_details, affected_user_id, ip_address, created_at)
+        SELECT {first_id - 1} + ROW_NUMBER() OVER (ORDER BY created_at, id),
+               admin_id, action_type, action_details, affected_user_id, ip_address, created_at
+        FROM {table}
+    """)
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    conn.commit()
+
+def is_audit_bucket(name):
+    """Проверяет, что имя таблицы - месячная таблица журнала"""
+    suffix = name[len(AUDIT_BUCKET_PREFIX):]
+    return name.startswith(AUDIT_BUCKET_PREFIX) and len(suffix) == 6 and suffix.isdigit()
+
+def ensure_audit_bucket(conn, table, commit=True):
+    """
+    Создает месячную таблицу журнала, если ее еще нет
+
+    Args:
+        conn: соединение SQLite
+        table: имя таблицы (см. audit_bucket_for)
+        commit: зафиксировать ли транзакцию (False - таблица создается в
+            транзакции вызывающего кода)
+    """
+    if not is_audit_bucket(table):
+        raise ValueError(f"Некорректное имя таблицы журнала: {table}")
+    execute_script(conn, AUDIT_BUCKET_SQL.format(table=table), commit)
+
+def list_audit_buckets(conn):
+    """
+    Возвращает месячные таблицы журнала, начиная с самой новой
+
+    Args:
+        conn: соединение SQLite
+
+    Returns:
+        list: имена таблиц
+    """
     try:
         cursor = conn.cursor()
         cursor.execute(
-            f"""INSERT INTO admin_actions (admin_id, action_type, action_details, affected_user_id, ip_address)
-                VALUES ({admin_id}, '{action_type}', '{action_details}', {affected_user_id if affected_user_id else 'NULL'}, '{ip_address if ip_address else ''}')"""
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (AUDIT_BUCKET_PREFIX + "%",)
         )
+        return sorted((row[0] for row in cursor.fetchall() if is_audit_bucket(row[0])), reverse=True)
+
+    except Exception as e:
+        print(f"Ошибка базы данных при получении таблиц журнала: {e}")
+        return []
+
+def drop_audit_bucket(conn, table):
+    """
+    Удаляет месячную таблицу журнала (после архивации)
+
+    Args:
+        conn: соединение SQLite
+        table: имя таблицы
+    """
+    if not is_audit_bucket(table):
+        raise ValueError(f"Некорректное имя таблицы журнала: {table}")
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+def migrate_admin_actions(conn):
+    """
+    Переносит записи из общей таблицы admin_actions в месячные таблицы
+
+    Записи сохраняют свои id. Записи без даты (или с нераспознанной датой)
+    попадают в самую раннюю месячную таблицу. Таблицы, созданные
+    предыдущими версиями, пересоздаются с внешним ключом и id из общего
+    счетчика и получают недостающие индексы.
+
+    Returns:
+        int: число перенесенных записей
+    """
+    try:
+        cursor = conn.cursor()
+
+        for table in list_audit_buckets(conn):
+            cursor.execute(f"PRAGMA foreign_key_list({table})")
+            if not cursor.fetchall():
+                _rebuild_audit_bucket(conn, table)
+
+        cursor.execute("SELECT DISTINCT substr(created_at, 1, 7) FROM admin_actions")
+        months = {}
+        for (month,) in cursor.fetchall():
+            try:
+                months[month] = audit_bucket_for(month)
+            except ValueError:
+                continue
+
+        columns = "id, admin_id, action_type, action_details, affected_user_id, ip_address, created_at"
+        moved = 0
+        for month, table in months.items():
+            ensure_audit_bucket(conn, table)
+            cursor.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM admin_actions WHERE substr(created_at, 1, 7) = ?
+            """, (month,))
+            moved += cursor.rowcount
+            cursor.execute("DELETE FROM admin_actions WHERE substr(created_at, 1, 7) = ?", (month,))
+
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM admin_actions)")
+        if cursor.fetchone()[0]:
+            # Без даты месяц не определить: такие записи хранятся в самой ранней таблице
+            buckets = list_audit_buckets(conn)
+            table = buckets[-1] if buckets else audit_bucket_for(datetime.now(timezone.utc))
+            ensure_audit_bucket(conn, table)
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM admin_actions")
+            moved += cursor.rowcount
+            cursor.execute("DELETE FROM admin_actions")
+
         conn.commit()
 
+        for table in list_audit_buckets(conn):
+            ensure_audit_bucket(conn, table)
+
+        return moved
+
     except Exception as e:
-        print(f"Ошибка базы данных при INSERT admin_action: {e}")
+        print(f"Ошибка переноса журнала администраторов: {e}")
+        conn.rollback()
+        return 0
 
 def update_user_settings(conn, user_id, settings):
     try:
@@ -157,6 +506,56 @@ def update_user_settings(conn, user_id, settings):
     except Exception as e:
         print(f"Ошибка базы данных при UPDATE: {e}")
 
+def upsert_user_settings(conn, user_id, settings_patch):
+    """
+    Сохраняет изменившиеся настройки пользователя одним запросом
+
+    Переданный JSON объединяется с уже сохраненным (json_patch / JSON_MERGE_PATCH),
+    поэтому достаточно передать только измененные ключи. Слияние удаляет
+    ключи со значением null, поэтому такие ключи записываются отдельно
+    через json_set / JSON_SET.
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+        settings_patch: JSON-строка с измененными ключами
+
+    Returns:
+        bool: True если настройки сохранены
+    """
+    try:
+        cursor = conn.cursor()
+
+        is_sqlite = hasattr(conn, 'isolation_level')
+        null_paths = [f'$."{key}"' for key, value in json.loads(settings_patch).items() if value is None]
+
+        if is_sqlite:
+            merged = "json_patch(user_settings.settings, excluded.settings)"
+            if null_paths:
+                merged = f"json_set({merged}" + ", ?, json('null')" * len(null_paths) + ")"
+            cursor.execute(f"""
+                INSERT INTO user_settings (user_id, settings) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                settings = {merged}
+            """, [user_id, settings_patch] + null_paths)
+        else:
+            merged = "JSON_MERGE_PATCH(settings, VALUES(settings))"
+            if null_paths:
+                merged = f"JSON_SET({merged}" + ", %s, CAST('null' AS JSON)" * len(null_paths) + ")"
+            cursor.execute(f"""
+                INSERT INTO user_settings (user_id, settings) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                settings = {merged},
+                updated_at = CURRENT_TIMESTAMP
+            """, [user_id, settings_patch] + null_paths)
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Ошибка базы данных при UPSERT настроек: {e}")
+        return False
+
 def update_record(conn, record_id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes):
     try:
         cursor = conn.cursor()
@@ -188,6 +587,7 @@ def update_user(conn, user_id, name, email):
         cursor.execute(
             f"UPDATE users SET name = '{name}', email = '{email}' WHERE id = {user_id}",
         )
+        refresh_users_search(conn, [user_id])
         conn.commit()
 
     except Exception as e:
@@ -229,6 +629,53 @@ def delete_user_session_db(conn, device_id, user_id=None):
     except Exception as e:
         print(f"Ошибка базы данных при DELETE: {e}")
 
+def sweep_expired_sessions(conn, batch_size=500, max_batches=None):
+    """
+    Удаляет истекшие сессии порциями
+
+    Каждая порция удаляется отдельной транзакцией, чтобы не блокировать
+    таблицу надолго при большом числе накопившихся сессий.
+
+    Args:
+        conn: соединение с базой данных
+        batch_size: максимальное число строк, удаляемых за одну транзакцию
+        max_batches: ограничение числа порций за один вызов (None - без ограничения)
+
+    Returns:
+        int: число удаленных сессий
+    """
+    reclaimed = 0
+    batches = 0
+    try:
+        cursor = conn.cursor()
+
+        is_sqlite = hasattr(conn, 'isolation_level')
+
+        while max_batches is None or batches < max_batches:
+            if is_sqlite:
+                cursor.execute("""
+                    DELETE FROM user_sessions WHERE id IN (
+                        SELECT id FROM user_sessions WHERE expires_at <= CURRENT_TIMESTAMP LIMIT ?
+                    )
+                """, (batch_size,))
+            else:
+                cursor.execute(
+                    "DELETE FROM user_sessions WHERE expires_at <= CURRENT_TIMESTAMP LIMIT %s",
+                    (batch_size,)
+                )
+            conn.commit()
+
+            deleted = cursor.rowcount
+            reclaimed += deleted
+            batches += 1
+            if deleted < batch_size:
+                break
+
+    except Exception as e:
+        print(f"Ошибка базы данных при удалении истекших сессий: {e}")
+
+    return reclaimed
+
 def delete_record(conn, record_id):
     try:
         cursor = conn.cursor()
@@ -240,6 +687,92 @@ def delete_record(conn, record_id):
         print(f"Ошибка базы данных при DELETE записи: {e}")
         return False
 
+def upsert_indicator_stats(conn, user_id, stats):
+    """
+    Сохраняет статистику показателей пользователя
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+        stats: {показатель: (samples, mean, m2)}
+
+    Returns:
+        bool: True если статистика сохранена
+    """
+    if not stats:
+        return True
+    try:
+        cursor = conn.cursor()
+        rows = [(user_id, metric, samples, mean, m2) for metric, (samples, mean, m2) in stats.items()]
+
+        if hasattr(conn, 'isolation_level'):
+            cursor.executemany("""
+                INSERT INTO indicator_stats (user_id, metric, samples, mean, m2) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, metric) DO UPDATE SET
+                samples = excluded.samples, mean = excluded.mean, m2 = excluded.m2,
+                updated_at = CURRENT_TIMESTAMP
+            """, rows)
+        else:
+            cursor.executemany("""
+                INSERT INTO indicator_stats (user_id, metric, samples, mean, m2) VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                samples = VALUES(samples), mean = VALUES(mean), m2 = VALUES(m2),
+                updated_at = CURRENT_TIMESTAMP
+            """, rows)
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Ошибка базы данных при UPSERT статистики показателей: {e}")
+        return False
+
+def save_reminder(conn, user_id, reminder_type, reminder_time, message, is_active=True):
+    """
+    Создает или изменяет напоминание пользователя указанного типа
+
+    У пользователя хранится не больше одного напоминания каждого типа
+    (например, 'daily' - ежедневное напоминание из настроек).
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+        reminder_type: тип напоминания
+        reminder_time: время 'ЧЧ:ММ'
+        message: текст напоминания
+        is_active: включено ли напоминание
+
+    Returns:
+        int: ID напоминания или None при ошибке
+    """
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(
+            f"SELECT id FROM reminders WHERE user_id = {ph} AND reminder_type = {ph} ORDER BY id LIMIT 1",
+            (user_id, reminder_type)
+        )
+        row = cursor.fetchone()
+        if row:
+            reminder_id = row[0]
+            cursor.execute(
+                f"UPDATE reminders SET reminder_time = {ph}, message = {ph}, is_active = {ph} WHERE id = {ph}",
+                (reminder_time, message, 1 if is_active else 0, reminder_id)
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO reminders (user_id, reminder_time, reminder_type, message, is_active) "
+                f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph})",
+                (user_id, reminder_time, reminder_type, message, 1 if is_active else 0)
+            )
+            reminder_id = cursor.lastrowid
+        conn.commit()
+        return reminder_id
+
+    except Exception as e:
+        print(f"Ошибка базы данных при сохранении напоминания: {e}")
+        return None
+
 def select_user_by_email(conn, email, pass_hash=False):
     try:
         cursor = conn.cursor()
@@ -324,6 +857,139 @@ def select_all_users(conn, limit=100):
         print(f"Ошибка базы данных при SELECT всех пользователей: {e}")
         return None
 
+# Поля сортировки справочника пользователей: (выражение ORDER BY, направление)
+USER_DIRECTORY_SORTS = {
+    'created_at': ('created_at', 'DESC'),
+    'name': ('name', 'ASC'),
+}
+
+def _escape_like(value):
+    """Экранирует спецсимволы LIKE (экранирующий символ - '!')"""
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+def search_key(value):
+    """
+    Приводит строку к виду для поиска без учета регистра
+
+    LIKE и COLLATE NOCASE в SQLite не различают регистр только у латиницы,
+    поэтому имя и email пользователя хранятся еще и в столбцах
+    name_search/email_search, приведенных через str.casefold.
+    """
+    return (value or "").casefold()
+
+def refresh_users_search(conn, user_ids=None):
+    """
+    Заполняет столбцы поиска name_search/email_search
+
+    В MySQL столбцов поиска нет: без учета регистра там сравнивает collation.
+
+    Args:
+        conn: соединение с базой данных
+        user_ids: ID пользователей (None - все, у кого столбцы не заполнены)
+    """
+    if not hasattr(conn, 'isolation_level'):
+        return
+    cursor = conn.cursor()
+    if user_ids is None:
+        cursor.execute("SELECT id, name, email FROM users WHERE name_search IS NULL OR email_search IS NULL")
+    else:
+        marks = ", ".join("?" * len(user_ids))
+        cursor.execute(f"SELECT id, name, email FROM users WHERE id IN ({marks})", list(user_ids))
+    cursor.executemany(
+        "UPDATE users SET name_search = ?, email_search = ? WHERE id = ?",
+        [(search_key(name), search_key(email), user_id) for user_id, name, email in cursor.fetchall()]
+    )
+
+def select_users_directory(conn, search=None, match='prefix', sort='created_at', after=None, limit=50):
+    """
+    Выбирает страницу справочника пользователей
+
+    Фильтрация, сортировка и постраничный вывод выполняются в базе данных.
+    Страницы выбираются по ключу (keyset): вместо OFFSET передается ключ
+    последней строки предыдущей страницы, поэтому время выборки не растет
+    с номером страницы.
+
+    Args:
+        conn: соединение с базой данных
+        search: строка поиска по имени и email без учета регистра (число - поиск по ID)
+        match: 'prefix' - совпадение с начала (использует индексы),
+            'substring' - совпадение в любом месте строки (например, по фамилии)
+        sort: 'created_at' (сначала новые) или 'name' (по алфавиту)
+        after: ключ продолжения из предыдущего вызова или None для первой страницы
+        limit: размер страницы
+
+    Returns:
+        tuple: (список строк (id, name, email, created_at, is_admin),
+        ключ следующей страницы или None)
+    """
+    if sort not in USER_DIRECTORY_SORTS:
+        raise ValueError(f"Неизвестная сортировка: {sort}")
+    column, direction = USER_DIRECTORY_SORTS[sort]
+
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        # Регистронезависимое сравнение только для имени: индекс idx_users_name построен с NOCASE,
+        # а idx_users_created - без него, и COLLATE у created_at привел бы к полному просмотру
+        collate = " COLLATE NOCASE" if ph == '?' and sort == 'name' else ""
+
+        conditions = []
+        params = []
+
+        search = (search or "").strip()
+        if search.isdigit():
+            conditions.append(f"id = {ph}")
+            params.append(int(search))
+        elif search and ph == '?':
+            term = search_key(search)
+            if match == 'substring':
+                pattern = '%' + _escape_like(term) + '%'
+                conditions.append("(name_search LIKE ? ESCAPE '!' OR email_search LIKE ? ESCAPE '!')")
+                params.extend([pattern, pattern])
+            else:
+                # Начало строки - диапазон [term, term + максимальный символ), он ищется по индексу
+                upper = term + '\U0010ffff'
+                conditions.append(
+                    "((name_search >= ? AND name_search < ?) OR (email_search >= ? AND email_search < ?))"
+                )
+                params.extend([term, upper, term, upper])
+        elif search:
+            pattern = _escape_like(search) + '%'
+            if match == 'substring':
+                pattern = '%' + pattern
+            conditions.append(f"(name LIKE {ph} ESCAPE '!' OR email LIKE {ph} ESCAPE '!')")
+            params.extend([pattern, pattern])
+
+        if after is not None:
+            last_value, last_id = after
+            op = '<' if direction == 'DESC' else '>'
+            conditions.append(
+                f"({column}{collate} {op} {ph} OR ({column}{collate} = {ph} AND id {op} {ph}))"
+            )
+            params.extend([last_value, last_value, last_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
+            SELECT id, name, email, created_at, is_admin
+            FROM users
+            {where}
+            ORDER BY {column}{collate} {direction}, id {direction}
+            LIMIT {ph}
+        """, params + [limit + 1])
+
+        rows = cursor.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = (last[3] if sort == 'created_at' else last[1], last[0])
+
+        return rows, next_cursor
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT справочника пользователей: {e}")
+        return [], None
+
 
 def select_all_records(conn, limit=500):
     """
@@ -463,6 +1129,8 @@ def select_user_session_by_device(conn, device_id):
                         FROM user_sessions us
                         JOIN users u ON us.user_id = u.id
                         WHERE us.device_id = '{device_id}' AND (us.expires_at IS NULL OR us.expires_at > CURRENT_TIMESTAMP)
+                        ORDER BY us.expires_at DESC
+                        LIMIT 1
                     """)
 
         entry = cursor.fetchone()
@@ -492,11 +1160,253 @@ def select_records_by_user(conn, user_id):
         print(f"Ошибка базы данных при SELECT: {e}")
         return None
 
+def select_record_by_id(conn, record_id):
+    """
+    Выбирает одну запись в том же виде, что и select_records_by_user
+
+    Args:
+        conn: соединение с базой данных
+        record_id: ID записи
+
+    Returns:
+        tuple: (id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes, record_date)
+        или None
+    """
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(f"""SELECT id, weight, pressure_systolic, pressure_diastolic,
+                                  pulse, temperature, notes, record_date
+                                  FROM records WHERE id = {ph}""", (record_id,))
+        return cursor.fetchone()
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT: {e}")
+        return None
+
+def iter_records_by_user(conn, user_id, batch_size=500):
+    """
+    Перебирает записи пользователя частями, не загружая их все в память
+
+    Строки в том же виде и порядке, что и у select_records_by_user.
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+        batch_size: число строк, читаемых из курсора за раз
+
+    Yields:
+        list: очередная часть строк (id, weight, pressure_systolic, pressure_diastolic,
+        pulse, temperature, notes, record_date)
+
+    Raises:
+        Exception: ошибка базы данных пробрасывается - часть строк уже могла быть отдана
+    """
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(f"""SELECT id, weight, pressure_systolic, pressure_diastolic,
+                                  pulse, temperature, notes, record_date
+                                  FROM records WHERE user_id = {ph} ORDER BY record_date DESC""", (user_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+
+    except Exception as e:
+        print(f"Ошибка базы данных при чтении записей пользователя: {e}")
+        raise
+
+def select_records_version(conn, user_id):
+    """
+    Признаки изменения записей пользователя для кэширования ответов
+
+    Добавление и удаление меняют число записей и наибольший ID, изменение
+    записи - updated_at (его выставляют триггеры журнала синхронизации).
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+
+    Returns:
+        tuple: (число записей, наибольший ID, последнее изменение) или None
+    """
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(f"""SELECT COUNT(*), MAX(id), MAX(COALESCE(updated_at, created_at))
+                           FROM records WHERE user_id = {ph}""", (user_id,))
+        return cursor.fetchone()
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT версии записей: {e}")
+        return None
+
+
+def select_record_trends(conn, user_id, metric='weight', resolution='day', date_from=None, date_to=None,
+                         window=None):
+    """
+    Строит тренд показателя пользователя за период
+
+    Все вычисления выполняются в базе оконными функциями: среднее, минимум
+    и максимум за период, скользящее среднее по window периодам, изменение
+    среднего относительно предыдущего периода и границы минимума/максимума
+    в окне. В SQLite данные берутся из дневных итогов record_daily_stats,
+    в MySQL (8.0+) - из таблицы records.
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+        metric: показатель из TREND_METRICS
+        resolution: 'day', 'week' или 'month'
+        date_from: начало периода 'ГГГГ-ММ-ДД' (включительно)
+        date_to: конец периода 'ГГГГ-ММ-ДД' (включительно)
+        window: размер окна скользящего среднего (по умолчанию TREND_WINDOWS)
+
+    Returns:
+        list: кортежи (period, readings, avg_value, min_value, max_value,
+              moving_avg, delta, band_min, band_max) по возрастанию периода
+              или None при ошибке
+    """
+    if metric not in TREND_METRICS:
+        print(f"Неизвестный показатель тренда: {metric}")
+        return None
+    if resolution not in TREND_PERIODS:
+        print(f"Неизвестный период тренда: {resolution}")
+        return None
+    window = max(1, int(window or TREND_WINDOWS[resolution]))
+
+    try:
+        cursor = conn.cursor()
+        is_sqlite = hasattr(conn, 'isolation_level')
+        ph = '?' if is_sqlite else '%s'
+        params = [user_id]
+        conditions = [f"user_id = {ph}"]
+
+        if is_sqlite:
+            period = TREND_PERIODS[resolution][0]
+            if date_from:
+                conditions.append(f"day >= {ph}")
+                params.append(str(date_from)[:10])
+            if date_to:
+                conditions.append(f"day <= {ph}")
+                params.append(str(date_to)[:10])
+            conditions.append(f"{metric}_count > 0")
+            source = f"""
+                SELECT {period} AS period,
+                       SUM({metric}_count) AS readings,
+                       SUM({metric}_sum) / SUM({metric}_count) AS avg_value,
+                       MIN({metric}_min) AS min_value,
+                       MAX({metric}_max) AS max_value
+                FROM record_daily_stats
+                WHERE {' AND '.join(conditions)}
+                GROUP BY period"""
+        else:
+            period = TREND_PERIODS[resolution][1]
+            if date_from:
+                conditions.append(f"record_date >= {ph}")
+                params.append(str(date_from)[:10])
+            if date_to:
+                conditions.append(f"record_date < DATE_ADD({ph}, INTERVAL 1 DAY)")
+                params.append(str(date_to)[:10])
+            conditions.append(f"{metric} IS NOT NULL")
+            source = f"""
+                SELECT {period} AS period,
+                       COUNT({metric}) AS readings,
+                       AVG({metric}) AS avg_value,
+                       MIN({metric}) AS min_value,
+                       MAX({metric}) AS max_value
+                FROM records
+                WHERE {' AND '.join(conditions)}
+                GROUP BY period"""
+
+        cursor.execute(f"""
+            WITH periods AS ({source}
+            )
+            SELECT period, readings, avg_value, min_value, max_value,
+                   AVG(avg_value) OVER w AS moving_avg,
+                   avg_value - LAG(avg_value) OVER (ORDER BY period) AS delta,
+                   MIN(min_value) OVER w AS band_min,
+                   MAX(max_value) OVER w AS band_max
+            FROM periods
+            WINDOW w AS (ORDER BY period ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+            ORDER BY period
+        """, params)
+        return cursor.fetchall()
+
+    except Exception as e:
+        print(f"Ошибка базы данных при расчете тренда: {e}")
+        return None
+
+
+def select_indicator_stats(conn, user_ids):
+    """
+    Выбирает накопленную статистику показателей пользователей
+
+    Args:
+        conn: соединение с базой данных
+        user_ids: ID пользователей
+
+    Returns:
+        dict: ID пользователя -> {показатель: (samples, mean, m2)} или None при ошибке
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(
+            f"SELECT user_id, metric, samples, mean, m2 FROM indicator_stats "
+            f"WHERE user_id IN ({', '.join([ph] * len(user_ids))})",
+            user_ids
+        )
+        result = {}
+        for user_id, metric, samples, mean, m2 in cursor.fetchall():
+            result.setdefault(user_id, {})[metric] = (samples, mean, m2)
+        return result
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT статистики показателей: {e}")
+        return None
+
+
+def select_active_reminders(conn, user_id):
+    """
+    Выбирает включенные напоминания пользователя
+
+    Args:
+        conn: соединение с базой данных
+        user_id: ID пользователя
+
+    Returns:
+        list: кортежи (id, user_id, reminder_time, reminder_type, message)
+    """
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(
+            f"SELECT id, user_id, reminder_time, reminder_type, message FROM reminders "
+            f"WHERE user_id = {ph} AND is_active = 1",
+            (user_id,)
+        )
+        return cursor.fetchall()
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT напоминаний: {e}")
+        return []
+
 
 def select_admin_actions(conn, admin_id=None, limit=100):
     """
     Выбирает действия администраторов из журнала
 
+    В SQLite месячные таблицы читаются от новой к старой, пока не наберется
+    limit записей, поэтому старые месяцы при просмотре последних действий
+    не затрагиваются.
+
     Args:
         conn: соединение с базой данных
         admin_id: ID администратора (None для всех)
@@ -508,26 +1418,19 @@ def select_admin_actions(conn, admin_id=None, limit=100):
 
     try:
         cursor = conn.cursor()
-        if admin_id:
-            cursor.execute(f"""
-                SELECT 
-                    aa.id, 
-                    aa.admin_id, 
-                    a.name as admin_name,
-                    aa.action_type, 
-                    aa.action_details, 
-                    aa.affected_user_id,
-                    u.name as affected_user_name,
-                    aa.ip_address,
-                    aa.created_at
-                FROM admin_actions aa
-                LEFT JOIN users a ON aa.admin_id = a.id
-                LEFT JOIN users u ON aa.affected_user_id = u.id
-                WHERE aa.admin_id = {admin_id}
-                ORDER BY aa.created_at DESC
-                LIMIT {limit}
-            """)
-        else:
+
+        is_sqlite = hasattr(conn, 'isolation_level')
+        ph = '?' if is_sqlite else '%s'
+        tables = list_audit_buckets(conn) if is_sqlite else ['admin_actions']
+
+        entry = []
+        for table in tables:
+            remaining = limit - len(entry)
+            if remaining <= 0:
+                break
+
+            where = f"WHERE aa.admin_id = {ph}" if admin_id else ""
+            params = [admin_id] if admin_id else []
             cursor.execute(f"""
                 SELECT 
                     aa.id, 
@@ -539,14 +1442,18 @@ def select_admin_actions(conn, admin_id=None, limit=100):
                     u.name as affected_user_name,
                     aa.ip_address,
                     aa.created_at
-                FROM admin_actions aa
+                FROM (
+                    SELECT * FROM {table} aa
+                    {where}
+                    ORDER BY aa.created_at DESC, aa.id DESC
+                    LIMIT {ph}
+                ) aa
                 LEFT JOIN users a ON aa.admin_id = a.id
                 LEFT JOIN users u ON aa.affected_user_id = u.id
-                ORDER BY aa.created_at DESC
-                LIMIT {limit}
-            """)
+                ORDER BY aa.created_at DESC, aa.id DESC
+            """, params + [remaining])
+            entry.extend(cursor.fetchall())
 
-        entry = cursor.fetchall()
         if entry:
             return entry
         else:
@@ -556,6 +1463,123 @@ def select_admin_actions(conn, admin_id=None, limit=100):
         print(f"Ошибка базы данных при SELECT действий администратора: {e}")
         return None
 
+def select_admin_actions_page(conn, after=None, limit=50, action_type=None, admin_id=None,
+                              date_from=None, date_to=None):
+    """
+    Выбирает страницу журнала действий администраторов
+
+    Страницы выбираются по ключу (created_at, id) последней показанной записи,
+    поэтому можно листать весь журнал без OFFSET. Фильтры применяются к
+    индексированным колонкам, а в SQLite читаются только месячные таблицы,
+    попадающие в диапазон дат. Имена пользователей не подтягиваются JOIN'ом -
+    их разрешает кэш services/user_names.py.
+
+    Args:
+        conn: соединение с базой данных
+        after: ключ продолжения из предыдущего вызова или None для первой страницы
+        limit: размер страницы
+        action_type: тип действия (None - все)
+        admin_id: ID администратора (None - все)
+        date_from: начальная дата 'ГГГГ-ММ-ДД' включительно
+        date_to: конечная дата 'ГГГГ-ММ-ДД' включительно
+
+    Returns:
+        tuple: (список строк (id, admin_id, action_type, action_details,
+        affected_user_id, ip_address, created_at), ключ следующей страницы или None)
+    """
+    try:
+        cursor = conn.cursor()
+
+        is_sqlite = hasattr(conn, 'isolation_level')
+        ph = '?' if is_sqlite else '%s'
+
+        conditions = []
+        params = []
+        if action_type:
+            conditions.append(f"action_type = {ph}")
+            params.append(action_type)
+        if admin_id:
+            conditions.append(f"admin_id = {ph}")
+            params.append(admin_id)
+        if date_from:
+            conditions.append(f"created_at >= {ph}")
+            params.append(f"{date_from} 00:00:00")
+        if date_to:
+            conditions.append(f"created_at <= {ph}")
+            params.append(f"{date_to} 23:59:59")
+
+        if is_sqlite:
+            # Только месяцы, попадающие в диапазон дат и не новее ключа продолжения
+            newest = audit_bucket_for(after[0]) if after else None
+            if date_to and (newest is None or audit_bucket_for(date_to) < newest):
+                newest = audit_bucket_for(date_to)
+            oldest = audit_bucket_for(date_from) if date_from else None
+            tables = [table for table in list_audit_buckets(conn)
+                      if (newest is None or table <= newest) and (oldest is None or table >= oldest)]
+        else:
+            tables = ['admin_actions']
+
+        rows = []
+        for table in tables:
+            remaining = limit + 1 - len(rows)
+            if remaining <= 0:
+                break
+
+            table_conditions = list(conditions)
+            table_params = list(params)
+            if after:
+                table_conditions.append(f"(created_at < {ph} OR (created_at = {ph} AND id < {ph}))")
+                table_params.extend([after[0], after[0], after[1]])
+
+            where = f"WHERE {' AND '.join(table_conditions)}" if table_conditions else ""
+            cursor.execute(f"""
+                SELECT id, admin_id, action_type, action_details, affected_user_id, ip_address, created_at
+                FROM {table}
+                {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT {ph}
+            """, table_params + [remaining])
+            rows.extend(cursor.fetchall())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (str(rows[-1][6]), rows[-1][0])
+
+        return rows, next_cursor
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT страницы журнала: {e}")
+        return [], None
+
+def select_user_names(conn, user_ids):
+    """
+    Выбирает имена пользователей по списку ID
+
+    Args:
+        conn: соединение с базой данных
+        user_ids: список ID пользователей
+
+    Returns:
+        dict: ID пользователя -> имя или None при ошибке базы данных
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    try:
+        cursor = conn.cursor()
+        ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+        cursor.execute(
+            f"SELECT id, name FROM users WHERE id IN ({', '.join([ph] * len(user_ids))})",
+            user_ids
+        )
+        return {user_id: name for user_id, name in cursor.fetchall()}
+
+    except Exception as e:
+        print(f"Ошибка базы данных при SELECT имен пользователей: {e}")
+        return None
+
 
 def get_user_statistics(conn, user_id=None):
     """
@@ -672,116 +1696,496 @@ def create_admin_user():
         print(f"Ошибка при создании администратора: {e}")
 
 
-def init_db():
-    conn = sqlite3.connect(get_default_db_path())
-    sql_code = """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                name TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                profile_photo TEXT,
-                is_admin INTEGER DEFAULT 0,
-                idx_email TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                record_date DATE NOT NULL,
-                weight REAL,
-                pressure_systolic INTEGER,
-                pressure_diastolic INTEGER,
-                pulse INTEGER,
-                sleep_hours REAL,
-                temperature REAL,
-                mood TEXT,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_user_date ON records (user_id, record_date);
-            CREATE INDEX IF NOT EXISTS idx_date ON records (record_date);
-
-            CREATE TABLE IF NOT EXISTS exports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                export_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                export_format TEXT NOT NULL CHECK (export_format IN ('PDF', 'Excel')),
-                file_path TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_user_export ON exports (user_id, export_date);
-
-            CREATE TABLE IF NOT EXISTS user_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL UNIQUE,
-                settings TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_user ON user_settings (user_id);
-
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                reminder_time TIME NOT NULL,
-                reminder_type TEXT NOT NULL,
-                message TEXT NOT NULL,
-                is_active INTEGER DEFAULT 1,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_user_active ON reminders (user_id, is_active);
-            CREATE INDEX IF NOT EXISTS idx_time ON reminders (reminder_time);
-
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                device_id TEXT,
-                session_token TEXT NOT NULL UNIQUE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                expires_at DATETIME NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_token ON user_sessions (session_token);
-            CREATE INDEX IF NOT EXISTS idx_user_device ON user_sessions (user_id, device_id);
-            CREATE INDEX IF NOT EXISTS idx_expires ON user_sessions (expires_at);
-            
-            CREATE TABLE IF NOT EXISTS admin_actions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                admin_id INTEGER NOT NULL,
-                action_type TEXT NOT NULL,
-                action_details TEXT,
-                affected_user_id INTEGER,
-                ip_address TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (admin_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_admin_actions ON admin_actions (admin_id, created_at);
+# Схема локальной базы данных SQLite
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        name TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        profile_photo TEXT,
+        is_admin INTEGER DEFAULT 0,
+        idx_email TEXT,
+        name_search TEXT,
+        email_search TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_users_name ON users (name COLLATE NOCASE, id);
+    CREATE INDEX IF NOT EXISTS idx_users_email ON users (email COLLATE NOCASE);
+
+    CREATE TABLE IF NOT EXISTS records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        record_date DATE NOT NULL,
+        weight REAL,
+        pressure_systolic INTEGER,
+        pressure_diastolic INTEGER,
+        pulse INTEGER,
+        sleep_hours REAL,
+        temperature REAL,
+        mood TEXT,
+        notes TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        sync_uid TEXT,
+        updated_at DATETIME,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user_date ON records (user_id, record_date);
+    CREATE INDEX IF NOT EXISTS idx_date ON records (record_date);
+
+    CREATE TABLE IF NOT EXISTS exports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        export_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        export_format TEXT NOT NULL CHECK (export_format IN ('PDF', 'Excel')),
+        file_path TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user_export ON exports (user_id, export_date);
+
+    CREATE TABLE IF NOT EXISTS user_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE,
+        settings TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user ON user_settings (user_id);
+
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        reminder_time TIME NOT NULL,
+        reminder_type TEXT NOT NULL,
+        message TEXT NOT NULL,
+        is_active INTEGER DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user_active ON reminders (user_id, is_active);
+    CREATE INDEX IF NOT EXISTS idx_time ON reminders (reminder_time);
+
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        device_id TEXT,
+        session_token TEXT NOT NULL UNIQUE,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        expires_at DATETIME NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_token ON user_sessions (session_token);
+    CREATE INDEX IF NOT EXISTS idx_user_device ON user_sessions (user_id, device_id);
+    CREATE INDEX IF NOT EXISTS idx_expires ON user_sessions (expires_at);
+    CREATE INDEX IF NOT EXISTS idx_device_expires ON user_sessions (device_id, expires_at);
+
+    CREATE TABLE IF NOT EXISTS admin_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL,
+        action_details TEXT,
+        affected_user_id INTEGER,
+        ip_address TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (admin_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_admin_actions ON admin_actions (admin_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_admin_actions_created ON admin_actions (created_at, id);
+
+    CREATE TABLE IF NOT EXISTS indicator_stats (
+        user_id INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        samples INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        m2 REAL NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, metric)
+    ) WITHOUT ROWID
+"""
+
+# Индексы столбцов поиска пользователей (см. search_key)
+USERS_SEARCH_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_users_name_search ON users (name_search);
+    CREATE INDEX IF NOT EXISTS idx_users_email_search ON users (email_search)
+"""
+
+# Служебные таблицы движка синхронизации (services/sync.py)
+SYNC_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS sync_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+        origin TEXT,
+        changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        synced INTEGER DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_sync_pending ON sync_log (synced, id);
+
+    CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_records_sync_uid ON records (sync_uid)
+"""
+
+# Триггеры журнала изменений. Срабатывают только на локальные изменения:
+# при применении изменений с сервера в sync_state выставляется applying_remote = 1
+SYNC_TRIGGERS_SQL = """
+    CREATE TRIGGER IF NOT EXISTS trg_records_sync_insert AFTER INSERT ON records
+    WHEN COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        UPDATE records
+        SET sync_uid = COALESCE(NEW.sync_uid, lower(hex(randomblob(16)))),
+            updated_at = COALESCE(NEW.updated_at, CURRENT_TIMESTAMP)
+        WHERE id = NEW.id;
+        INSERT INTO sync_log (table_name, row_key, op)
+        SELECT 'records', sync_uid, 'upsert' FROM records WHERE id = NEW.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_sync_update
+    AFTER UPDATE OF user_id, record_date, weight, pressure_systolic, pressure_diastolic,
+                    pulse, temperature, notes ON records
+    WHEN COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        UPDATE records SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        INSERT INTO sync_log (table_name, row_key, op) VALUES ('records', NEW.sync_uid, 'upsert');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_sync_delete AFTER DELETE ON records
+    WHEN OLD.sync_uid IS NOT NULL
+        AND COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        INSERT INTO sync_log (table_name, row_key, op) VALUES ('records', OLD.sync_uid, 'delete');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_settings_sync_insert AFTER INSERT ON user_settings
+    WHEN COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        INSERT INTO sync_log (table_name, row_key, op) VALUES ('user_settings', CAST(NEW.user_id AS TEXT), 'upsert');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_settings_sync_update AFTER UPDATE OF settings ON user_settings
+    WHEN COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        UPDATE user_settings SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        INSERT INTO sync_log (table_name, row_key, op) VALUES ('user_settings', CAST(NEW.user_id AS TEXT), 'upsert');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_settings_sync_delete AFTER DELETE ON user_settings
+    WHEN COALESCE((SELECT value FROM sync_state WHERE key = 'applying_remote'), '0') != '1'
+    BEGIN
+        INSERT INTO sync_log (table_name, row_key, op) VALUES ('user_settings', CAST(OLD.user_id AS TEXT), 'delete');
+    END
+"""
+
+# Показатели, для которых строятся тренды
+TREND_METRICS = ('weight', 'pressure_systolic', 'pressure_diastolic', 'pulse', 'temperature')
+
+# Группировка дневных итогов по периоду (SQLite, MySQL); неделя начинается с понедельника
+TREND_PERIODS = {
+    'day': ("day", "DATE(record_date)"),
+    'week': ("date(day, 'weekday 0', '-6 days')", "DATE_SUB(DATE(record_date), INTERVAL WEEKDAY(record_date) DAY)"),
+    'month': ("strftime('%Y-%m-01', day)", "DATE_FORMAT(record_date, '%Y-%m-01')"),
+}
+
+# Окно скользящего среднего по умолчанию (в периодах)
+TREND_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+
+_TREND_COLUMNS = ",\n        ".join(
+    f"{metric}_sum REAL, {metric}_count INTEGER, {metric}_min REAL, {metric}_max REAL"
+    for metric in TREND_METRICS
+)
+_TREND_AGGREGATES = ", ".join(
+    f"SUM({metric}), COUNT({metric}), MIN({metric}), MAX({metric})" for metric in TREND_METRICS
+)
+_TREND_TARGETS = ", ".join(
+    f"{metric}_sum, {metric}_count, {metric}_min, {metric}_max" for metric in TREND_METRICS
+)
+
+
+def _trend_refresh_sql(row):
+    """
+    Пересчет дневного итога пользователя по записи NEW/OLD внутри триггера
+
+    Запись с нераспознаваемой датой в итоги не попадает: агрегат без GROUP BY
+    вернул бы строку с day = NULL, и ошибка NOT NULL отменила бы саму запись.
     """
+    return f"""
+        INSERT OR REPLACE INTO record_daily_stats (user_id, day, readings, {_TREND_TARGETS})
+        SELECT {row}.user_id, date({row}.record_date), COUNT(*), {_TREND_AGGREGATES}
+        FROM records
+        WHERE user_id = {row}.user_id
+            AND record_date >= date({row}.record_date)
+            AND record_date < date({row}.record_date, '+1 day')
+        HAVING date({row}.record_date) IS NOT NULL;
+        DELETE FROM record_daily_stats
+        WHERE user_id = {row}.user_id AND day = date({row}.record_date) AND readings = 0;"""
+
+
+# Дневные итоги записей для трендов. Триггеры пересчитывают только день
+# измененной записи, поэтому тренд за любой период читает не больше одной
+# строки на день независимо от числа измерений
+TREND_SCHEMA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS record_daily_stats (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        readings INTEGER NOT NULL,
+        {_TREND_COLUMNS},
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_trend_insert AFTER INSERT ON records
+    BEGIN{_trend_refresh_sql('NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_trend_update
+    AFTER UPDATE OF user_id, record_date, {', '.join(TREND_METRICS)} ON records
+    BEGIN{_trend_refresh_sql('OLD')}{_trend_refresh_sql('NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_trend_delete AFTER DELETE ON records
+    BEGIN{_trend_refresh_sql('OLD')}
+    END
+"""
+
+# DDL для сервера MySQL (выполняется администратором сервера один раз)
+MYSQL_SYNC_SQL = """
+    ALTER TABLE records ADD COLUMN sync_uid VARCHAR(32) NULL, ADD COLUMN updated_at DATETIME NULL;
+    CREATE UNIQUE INDEX idx_records_sync_uid ON records (sync_uid);
+    CREATE TABLE IF NOT EXISTS sync_log (
+        id BIGINT PRIMARY KEY AUTO_INCREMENT,
+        table_name VARCHAR(64) NOT NULL,
+        row_key VARCHAR(64) NOT NULL,
+        op VARCHAR(8) NOT NULL,
+        origin VARCHAR(128),
+        changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        synced TINYINT DEFAULT 0
+    )
+"""
+
+
+def execute_script(conn, sql_code, commit=True):
+    """
+    Выполняет набор SQL-команд, разделенных ';'
+
+    Тела триггеров (BEGIN ... END) не разбиваются на части.
 
+    Args:
+        conn: соединение с базой данных
+        sql_code: текст SQL-команд
+        commit: зафиксировать ли транзакцию после выполнения
+    """
     cursor = conn.cursor()
 
     # Разделяем SQL на отдельные команды и выполняем их
-    commands = sql_code.split(';')
-    for command in commands:
-        command = command.strip()
-        if command:
-            cursor.execute(command)
+    command = ""
+    for part in sql_code.split(';'):
+        command += part
+        stripped = command.strip()
+        if not stripped:
+            command = ""
+            continue
+        # Внутри тела триггера ';' не завершает команду
+        if stripped.upper().startswith('CREATE TRIGGER') and not stripped.upper().endswith('END'):
+            command += ';'
+            continue
+        cursor.execute(stripped)
+        command = ""
+
+    if commit:
+        conn.commit()
 
+
+def _add_column_if_missing(conn, table, column, definition):
+    """
+    Добавляет столбец в существующую таблицу (миграция старых файлов БД)
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def create_schema(conn):
+    """
+    Создает таблицы и индексы приложения в базе SQLite
+
+    Args:
+        conn: соединение с базой данных SQLite
+    """
+    execute_script(conn, SCHEMA_SQL)
+
+
+def init_users_search(conn):
+    """
+    Подготавливает столбцы поиска пользователей
+
+    Добавляет столбцы name_search/email_search в старые файлы БД, создает
+    их индексы и заполняет столбцы у пользователей, у которых они пусты.
+
+    Args:
+        conn: соединение с базой данных SQLite
+    """
+    _add_column_if_missing(conn, 'users', 'name_search', 'TEXT')
+    _add_column_if_missing(conn, 'users', 'email_search', 'TEXT')
+    execute_script(conn, USERS_SEARCH_SQL)
+    refresh_users_search(conn)
     conn.commit()
 
+
+def init_sync_tables(conn, track_changes=True):
+    """
+    Подготавливает базу SQLite к синхронизации с сервером
+
+    Добавляет столбцы sync_uid/updated_at в старые файлы БД, создает журнал
+    изменений и (для локальной базы) триггеры, которые его заполняют.
+
+    Args:
+        conn: соединение с базой данных SQLite
+        track_changes: создавать ли триггеры журнала изменений
+            (False для SQLite-файла, выступающего в роли сервера)
+    """
+    _add_column_if_missing(conn, 'records', 'sync_uid', 'TEXT')
+    _add_column_if_missing(conn, 'records', 'updated_at', 'DATETIME')
+    _add_column_if_missing(conn, 'user_settings', 'updated_at', 'DATETIME')
+    execute_script(conn, SYNC_SCHEMA_SQL)
+
+    if track_changes:
+        execute_script(conn, SYNC_TRIGGERS_SQL)
+
+        # Присваиваем идентификаторы записям, созданным до включения синхронизации
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE records
+            SET sync_uid = lower(hex(randomblob(16))),
+                updated_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+            WHERE sync_uid IS NULL
+        """)
+        conn.commit()
+
+
+def init_record_trends(conn):
+    """
+    Создает дневные итоги записей и триггеры, которые их поддерживают
+
+    При первом запуске итоги заполняются по уже существующим записям.
+    Триггеры пересоздаются, чтобы старые файлы БД получили их текущую версию.
+
+    Args:
+        conn: соединение с базой данных SQLite
+    """
+    cursor = conn.cursor()
+    for trigger in ('trg_records_trend_insert', 'trg_records_trend_update', 'trg_records_trend_delete'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    execute_script(conn, TREND_SCHEMA_SQL)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM record_daily_stats)")
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"""
+            INSERT INTO record_daily_stats (user_id, day, readings, {_TREND_TARGETS})
+            SELECT user_id, date(record_date), COUNT(*), {_TREND_AGGREGATES}
+            FROM records
+            WHERE date(record_date) IS NOT NULL
+            GROUP BY user_id, date(record_date)
+        """)
+        conn.commit()
+
+
+def _indicator_stats_sql(is_sqlite=True, condition=""):
+    """INSERT ... SELECT статистики показателей по записям (condition - фильтр записей)"""
+    greatest = "MAX" if is_sqlite else "GREATEST"
+    condition = f" AND {condition}" if condition else ""
+    # m2 - сумма квадратов отклонений от среднего (как в алгоритме Уэлфорда)
+    selects = " UNION ALL ".join(
+        f"""SELECT user_id, '{metric}', COUNT({metric}), AVG({metric}),
+                   {greatest}(0.0, SUM({metric} * {metric}) - 1.0 * SUM({metric}) * SUM({metric}) / COUNT({metric}))
+            FROM records WHERE {metric} IS NOT NULL{condition} GROUP BY user_id"""
+        for metric in TREND_METRICS
+    )
+    return f"INSERT INTO indicator_stats (user_id, metric, samples, mean, m2) {selects}"
+
+
+def rebuild_indicator_stats(conn, user_ids=None):
+    """
+    Пересчитывает статистику показателей по записям
+
+    Накопленная статистика только добавляет новые измерения; после изменения
+    или удаления записей и применения изменений с сервера ее пересчитывают.
+
+    Args:
+        conn: соединение с базой данных
+        user_ids: ID пользователей (None - все)
+
+    Returns:
+        bool: True если статистика пересчитана
+    """
+    try:
+        cursor = conn.cursor()
+        is_sqlite = hasattr(conn, 'isolation_level')
+        ph = '?' if is_sqlite else '%s'
+
+        condition, params = "", []
+        if user_ids is not None:
+            params = list(user_ids)
+            if not params:
+                return True
+            condition = f"user_id IN ({', '.join([ph] * len(params))})"
+
+        cursor.execute(f"DELETE FROM indicator_stats {'WHERE ' + condition if condition else ''}", params)
+        cursor.execute(_indicator_stats_sql(is_sqlite, condition), params * len(TREND_METRICS))
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Ошибка базы данных при пересчете статистики показателей: {e}")
+        conn.rollback()
+        return False
+
+
+def init_indicator_stats(conn):
+    """
+    Заполняет статистику показателей по уже существующим записям
+
+    Выполняется один раз, пока таблица indicator_stats пуста; дальше
+    статистика обновляется при каждой новой записи (services/anomalies.py).
+
+    Args:
+        conn: соединение с базой данных SQLite
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM indicator_stats)")
+    if cursor.fetchone()[0]:
+        return
+
+    cursor.execute(_indicator_stats_sql())
+    conn.commit()
+
+
+def init_db():
+    conn = connect_sqlite(get_default_db_path())
+    create_schema(conn)
+    init_users_search(conn)
+    init_sync_tables(conn)
+    migrate_admin_actions(conn)
+    init_record_trends(conn)
+    init_indicator_stats(conn)
+    conn.close()
+
     try:
         create_admin_user()
     except:
         print("Unable to insert Admin")
-
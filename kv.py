@@ -263,6 +263,34 @@ SETTINGS_KV = '''
                         active: False
                         on_active: root.on_auto_logout_change
 
+                # Диагностика
+                MDLabel:
+                    text: "Диагностика"
+                    theme_text_color: "Primary"
+                    font_style: "H6"
+                    size_hint_y: None
+                    height: dp(40)
+
+                MDBoxLayout:
+                    orientation: "horizontal"
+                    spacing: "10dp"
+                    size_hint_y: None
+                    height: dp(50)
+
+                    MDLabel:
+                        text: "Монитор производительности"
+                        size_hint_x: 0.8
+
+                    MDSwitch:
+                        id: perf_monitor_switch
+                        size_hint_x: 0.2
+                        active: False
+                        on_active: root.on_perf_monitor_change(*args)
+
+                OneLineListItem:
+                    text: "Экспорт отчета о зависаниях"
+                    on_release: root.export_perf_report()
+
                 # Кнопки действий
                 BoxLayout:
                     orientation: "vertical"
@@ -518,6 +546,13 @@ STORY_KV = '''
                 tooltip_text: "Экспорт в Excel с графиками"
                 size: (dp(32), dp(32)) if app.is_android else (dp(48), dp(48))
     
+            MDFloatingActionButton:
+                icon: "chart-timeline-variant"
+                md_bg_color: 0.5, 0.3, 0.7, 1
+                on_release: root.show_trend_dialog()
+                tooltip_text: "Тренды показателей"
+                size: (dp(32), dp(32)) if app.is_android else (dp(48), dp(48))
+    
             MDFloatingActionButton:
                 icon: "delete"
                 md_bg_color: 1, 0.2, 0.2, 1
@@ -667,6 +702,20 @@ ADMIN_KV = '''
                 on_release: root.go_back()
                 tooltip_text: "Назад"
             
+            MDFloatingActionButton:
+                id: sort_button
+                icon: "sort-calendar-descending"
+                md_bg_color: app.theme_cls.primary_color
+                on_release: root.toggle_users_sort()
+                tooltip_text: "Сортировка"
+            
+            MDRaisedButton:
+                id: load_more_button
+                text: "Показать еще"
+                disabled: True
+                pos_hint: {"center_y": 0.5}
+                on_release: root.load_more_users()
+            
 <AdminRecordsScreen>:
     name: 'admin_records'
     
@@ -741,7 +790,67 @@ ADMIN_KV = '''
             size_hint_y: None
             height: dp(40)
         
+        MDBoxLayout:
+            orientation: "horizontal"
+            spacing: "10dp"
+            size_hint_y: None
+            height: dp(45)
+            
+            MDRaisedButton:
+                id: action_type_button
+                text: "Все действия"
+                pos_hint: {"center_y": 0.5}
+                on_release: root.open_action_type_menu(self)
+            
+            MDTextField:
+                id: admin_filter
+                hint_text: "ID админа"
+                mode: "rectangle"
+                input_filter: "int"
+                on_text_validate: root.apply_filters()
+        
+        MDBoxLayout:
+            orientation: "horizontal"
+            spacing: "10dp"
+            size_hint_y: None
+            height: dp(45)
+            
+            MDTextField:
+                id: date_from_field
+                hint_text: "С (ГГГГ-ММ-ДД)"
+                mode: "rectangle"
+                on_text_validate: root.apply_filters()
+            
+            MDTextField:
+                id: date_to_field
+                hint_text: "По (ГГГГ-ММ-ДД)"
+                mode: "rectangle"
+                on_text_validate: root.apply_filters()
+            
+            MDFloatingActionButton:
+                icon: "filter"
+                size_hint_x: None
+                width: dp(48)
+                on_release: root.apply_filters()
+            
+            MDFloatingActionButton:
+                icon: "filter-remove"
+                size_hint_x: None
+                width: dp(48)
+                on_release: root.reset_filters()
+        
+        MDLabel:
+            id: audit_status
+            text: ""
+            halign: "center"
+            theme_text_color: "Secondary"
+            font_style: "Caption"
+            size_hint_y: None
+            height: dp(20)
+        
         ScrollView:
+            on_scroll_y: root.on_audit_scroll(self, self.scroll_y)
+            
             MDList:
                 id: audit_list
         
@@ -1,5 +1,9 @@
-import json
+# Трассировка запуска импортируется первой, чтобы учесть время импорта остальных модулей
+from services.startup_trace import startup_trace, load_budget, print_report, write_report, \
+    BUDGET_FILENAME, REPORT_FILENAME
+
 import os
+import threading
 import uuid
 from datetime import datetime, timedelta
 import platform
@@ -8,15 +12,29 @@ import platform
 from kivy.uix.screenmanager import ScreenManager
 from kivy.clock import Clock
 from kivy.storage.jsonstore import JsonStore
-from kivy.lang import Builder
 
 # Импорт компонентов KivyMD (Material Design)
 from kivymd.app import MDApp
 
+startup_trace.mark("imports_kivy")
+
 # Импорт пользовательских модулей
 from database import get_connection, init_db, insert_user_session, delete_user_session_db, \
-    select_settings_by_user, insert_user_settings, update_user_settings, \
-    select_user_session_by_device  # Подключение к базе данных
+    get_default_db_path, get_remote_connection, \
+    start_health_monitor, health_monitor  # Подключение к базе данных
+from services.sync import SyncEngine  # Синхронизация с сервером
+from services.settings_store import settings_store, DEFAULT_SETTINGS  # Кэш настроек
+from services.sessions import session_cache, session_sweeper  # Сессии автоматического входа
+from services.audit import audit_logger  # Журнал действий администраторов
+from services.audit_archive import apply_audit_retention  # Архивация старых месяцев журнала
+from services.records_view import record_view_cache  # Строки истории записей
+from services.anomalies import anomaly_detector  # Личные нормы показателей
+from services.reminders import reminder_scheduler  # Напоминания
+from services.query_monitor import query_monitor, SLOW_LOG_FILENAME, QUERY_STATS_FILENAME  # Учет запросов к базе
+from services.kv_cache import kv_cache  # Кэш разобранных KV-разметок
+from utils.dates import set_date_format  # Формат отображения дат
+from services.frame_monitor import frame_monitor, PERF_MONITOR_ENV, STALL_LOG_FILENAME, \
+    FRAME_REPORT_FILENAME  # Монитор кадров и зависаний
 from windows.story import StoryWindow  # Окно истории записей
 from windows.profile import ProfileScreen  # Окно профиля пользователя
 from windows.settings import SettingsScreen  # Окно настроек
@@ -32,6 +50,8 @@ import sys
 import sys
 from kivy.app import App
 
+startup_trace.mark("imports_app")
+
 class HealthDiaryApp(MDApp):
     """
     Главный класс приложения "Дневник здоровья"
@@ -52,6 +72,8 @@ class HealthDiaryApp(MDApp):
     is_admin = False  # Флаг административных прав
     selected_user_id = None  # ID выбранного пользователя (для администратора)
     admin_dashboard = None  # Ссылка на панель администратора
+    sync_engine = None  # Движок синхронизации с сервером
+    settings_user_id = None  # Пользователь, для которого настройки уже загружены при текущем входе
 
     def __init__(self, **kwargs):
         """
@@ -75,28 +97,32 @@ class HealthDiaryApp(MDApp):
         Returns:
             ScreenManager: Менеджер экранов приложения
         """
+        # Подготовка MDApp.run() до вызова build()
+        startup_trace.mark("app_start")
+
         # Сбрасываем тему к значениям по умолчанию
         self.reset_theme_to_default()
 
         self.is_android = (platform == 'android')
 
-        # Создаем менеджер экранов
-        sm = ScreenManager()
-
-        # Добавляем все экраны приложения
-        sm.add_widget(RegistrationWindow(name="registration"))
-        sm.add_widget(OptionsWindow(name="options"))
-        sm.add_widget(StoryWindow(name="story"))
-        sm.add_widget(ProfileScreen(name="profile"))
-        sm.add_widget(SettingsScreen(name="settings"))
-
-        # Добавляем административные экраны
-        from windows.admin import AdminDashboard, AdminUsersScreen, AdminRecordsScreen, AdminAuditScreen
-        admin_dashboard = AdminDashboard(name="admin_dashboard")
-        sm.add_widget(admin_dashboard)
-        sm.add_widget(AdminUsersScreen(name="admin_users"))
-        sm.add_widget(AdminRecordsScreen(name="admin_records"))
-        sm.add_widget(AdminAuditScreen(name="admin_audit"))
+        with startup_trace.phase("screens"):
+            # Создаем менеджер экранов
+            sm = ScreenManager()
+
+            # Добавляем все экраны приложения
+            sm.add_widget(RegistrationWindow(name="registration"))
+            sm.add_widget(OptionsWindow(name="options"))
+            sm.add_widget(StoryWindow(name="story"))
+            sm.add_widget(ProfileScreen(name="profile"))
+            sm.add_widget(SettingsScreen(name="settings"))
+
+            # Добавляем административные экраны
+            from windows.admin import AdminDashboard, AdminUsersScreen, AdminRecordsScreen, AdminAuditScreen
+            admin_dashboard = AdminDashboard(name="admin_dashboard")
+            sm.add_widget(admin_dashboard)
+            sm.add_widget(AdminUsersScreen(name="admin_users"))
+            sm.add_widget(AdminRecordsScreen(name="admin_records"))
+            sm.add_widget(AdminAuditScreen(name="admin_audit"))
 
         # Сохраняем ссылку на панель администратора
         self.admin_dashboard = admin_dashboard
@@ -104,8 +130,181 @@ class HealthDiaryApp(MDApp):
         # Планируем попытку автоматического входа
         Clock.schedule_once(lambda dt: self.try_auto_login(sm), 0.1)
 
+        # Отложенная запись настроек выполняется в главном потоке
+        settings_store.scheduler = lambda callback, delay: Clock.schedule_once(callback, delay)
+        # Загруженные и измененные настройки приходят в приложение через подписку
+        settings_store.subscribe(self.on_user_settings)
+        # Напоминания срабатывают по одному событию Clock на ближайшее время
+        reminder_scheduler.scheduler = lambda callback, delay: Clock.schedule_once(callback, delay)
+
+        # Журнал медленных запросов хранится рядом с файлом базы
+        query_monitor.configure(log_path=os.path.join(self.get_data_directory(), SLOW_LOG_FILENAME))
+
+        # Монитор кадров работает только если включен на устройстве
+        if self.perf_monitor_enabled():
+            self.start_perf_monitor()
+
+        with startup_trace.phase("services"):
+            # Запускаем фоновую проверку сервера и синхронизацию
+            start_health_monitor()
+            self.start_sync()
+
+            # Периодически удаляем истекшие сессии
+            session_sweeper.start()
+
+            # Архивируем месяцы журнала администраторов старше срока хранения
+            threading.Thread(target=apply_audit_retention, daemon=True).start()
+
         return sm
 
+    def start_sync(self):
+        """
+        Запускает фоновую синхронизацию локальной базы с сервером MySQL
+
+        Локальная база остается основным хранилищем: при недоступном сервере
+        изменения накапливаются в журнале и отправляются после переподключения
+        """
+        try:
+            from database import pymysql
+            if pymysql is None:
+                print("pymysql не установлен - синхронизация с сервером отключена")
+                return
+
+            self.sync_engine = SyncEngine(
+                local_path=get_default_db_path(),
+                remote_connect=get_remote_connection,
+                origin=self.get_device_id(),
+                on_remote_change=self.on_remote_change
+            )
+            self.sync_engine.start(interval=60)
+        except Exception as e:
+            print(f"Ошибка запуска синхронизации: {e}")
+
+    def on_remote_change(self, table, keys, user_ids):
+        """
+        Сбрасывает кэши настроек и истории записей, если данные изменились
+        на другом устройстве
+
+        Вызывается в потоке синхронизации.
+
+        Args:
+            table: имя синхронизированной таблицы
+            keys: ключи измененных строк
+            user_ids: локальные ID пользователей, чьи строки изменились
+        """
+        if table == 'records':
+            if not user_ids:
+                return
+            for user_id in user_ids:
+                record_view_cache.invalidate(user_id)
+            anomaly_detector.recompute(user_ids)
+            if self.user_id in user_ids and not self.is_guest:
+                # Открытая история перечитывается в главном потоке
+                Clock.schedule_once(lambda dt: self.refresh_story(), 0)
+            return
+        if table != 'user_settings':
+            return
+        for key in keys:
+            user_id = int(key)
+            settings_store.invalidate(user_id)
+            if user_id == self.user_id and not self.is_guest:
+                # Подписчики получают новые настройки в главном потоке
+                Clock.schedule_once(lambda dt, uid=user_id: settings_store.hydrate(uid), 0)
+
+    def refresh_story(self):
+        """Перечитывает историю записей, если она открыта"""
+        if self.root is None or self.root.current != "story":
+            return
+        screen = self.root.current_screen
+        screen.load_story(search_query=getattr(screen, 'search_query', None))
+
+    def on_stop(self):
+        """
+        Вызывается при закрытии приложения
+
+        Сохраняет отложенные изменения настроек, останавливает
+        фоновую синхронизацию и проверку сервера
+        """
+        settings_store.flush()
+        if self.sync_engine:
+            self.sync_engine.stop()
+        health_monitor.stop()
+        session_sweeper.stop()
+        audit_logger.stop()  # Дописываем очередь журнала администратора
+        reminder_scheduler.stop()
+        # Счетчики запросов за сеанс сохраняются для анализа
+        query_monitor.export_json(os.path.join(self.get_data_directory(), QUERY_STATS_FILENAME))
+        query_monitor.close()
+        if frame_monitor.running:
+            frame_monitor.export_json(os.path.join(self.get_data_directory(), FRAME_REPORT_FILENAME))
+            frame_monitor.stop()
+
+    def perf_monitor_enabled(self):
+        """
+        Включен ли монитор кадров на этом устройстве
+
+        Returns:
+            bool: True если монитор включен в настройках или переменной окружения
+        """
+        if os.environ.get(PERF_MONITOR_ENV) == "1":
+            return True
+        try:
+            return bool(self.store.exists('perf_monitor') and self.store.get('perf_monitor')['enabled'])
+        except Exception as e:
+            print(f"Ошибка чтения настройки монитора кадров: {e}")
+            return False
+
+    def start_perf_monitor(self):
+        """
+        Запускает учет кадров и журнал зависаний главного потока
+
+        Журнал зависаний хранится рядом с файлом базы
+        """
+        frame_monitor.configure(log_path=os.path.join(self.get_data_directory(), STALL_LOG_FILENAME))
+        frame_monitor.screen_provider = lambda: self.root.current if self.root else None
+        frame_monitor.start(lambda callback: Clock.schedule_interval(callback, 0))
+
+    def set_perf_monitor(self, enabled):
+        """
+        Включает или выключает монитор кадров на устройстве
+
+        Args:
+            enabled: новое значение настройки
+        """
+        self.store.put('perf_monitor', enabled=bool(enabled))
+        if enabled:
+            self.start_perf_monitor()
+        else:
+            frame_monitor.stop()
+
+    def export_perf_report(self, directory):
+        """
+        Сохраняет статистику кадров и последние зависания в JSON
+
+        Args:
+            directory: каталог для файла отчета
+
+        Returns:
+            str: путь к файлу или None при ошибке
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except Exception as e:
+            print(f"Ошибка создания каталога отчета: {e}")
+            return None
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(directory, f"frame_report_{stamp}.json")
+        return path if frame_monitor.export_json(path) else None
+
+    def get_data_directory(self):
+        """
+        Каталог файла базы данных
+
+        Returns:
+            str: путь к каталогу
+        """
+        return os.path.dirname(os.path.abspath(get_default_db_path()))
+
     def reset_theme_to_default(self):
         """
         Сбрасывает тему приложения к значениям по умолчанию
@@ -166,13 +365,37 @@ class HealthDiaryApp(MDApp):
         Args:
             sm (ScreenManager): Менеджер экранов приложения
         """
-        if self.check_auto_login():
-            print("Автоматический вход выполнен успешно")
-            self.apply_user_settings_immediately()
-            sm.current = "options"  # Переходим на главный экран
-        else:
-            sm.current = "registration"  # Переходим на экран авторизации
-            print("Автоматический вход не выполнен")
+        # Окно, первый кадр и задержка перед автоматическим входом
+        startup_trace.mark("first_frame")
+
+        with startup_trace.phase("auto_login"):
+            if self.check_auto_login():
+                print("Автоматический вход выполнен успешно")
+                self.apply_user_settings_immediately()
+                sm.current = "options"  # Переходим на главный экран
+            else:
+                sm.current = "registration"  # Переходим на экран авторизации
+                print("Автоматический вход не выполнен")
+
+        self.finish_startup_trace()
+
+    def finish_startup_trace(self):
+        """
+        Завершает трассировку запуска и сохраняет отчет рядом с файлом базы
+
+        Бюджет берется из startup_budget.json в том же каталоге
+        (или из файла в переменной окружения HEALTH_DIARY_STARTUP_BUDGET)
+        """
+        if not startup_trace.active:
+            return
+        startup_trace.finish()
+        data_directory = self.get_data_directory()
+        budget_path = os.path.join(data_directory, BUDGET_FILENAME)
+        report = startup_trace.report(load_budget(budget_path if os.path.exists(budget_path) else None))
+        report['kv_cache'] = kv_cache.report()
+        print_report(report)
+        kv_cache.print_report()
+        write_report(report, os.path.join(data_directory, REPORT_FILENAME))
 
     def get_device_id(self):
         """
@@ -235,12 +458,13 @@ class HealthDiaryApp(MDApp):
             return False
 
         try:
-            device_id = self.get_device_id()
+            with startup_trace.phase("device_id"):
+                device_id = self.get_device_id()
             print(f"Проверяем автоматический вход для device_id: {device_id}")
 
-            # Поиск активной сессии в базе данных
-            conn = get_connection()
-            result = select_user_session_by_device(conn, device_id)
+            # Поиск активной сессии (повторные проверки обслуживаются из кэша)
+            with startup_trace.phase("session_lookup"):
+                result = session_cache.lookup(device_id)
 
             if result:
                 # Найдена активная сессия
@@ -283,6 +507,7 @@ class HealthDiaryApp(MDApp):
             # Сохранение сессии в базу данных
             conn = get_connection()
             insert_user_session(conn, user_id, device_id, session_token, expires_at)
+            session_cache.invalidate(device_id)
 
             print(f"Сессия пользователя {user_id} сохранена для device_id: {device_id}")
 
@@ -305,6 +530,7 @@ class HealthDiaryApp(MDApp):
 
             conn = get_connection()
             delete_user_session_db(conn, device_id)
+            session_cache.invalidate(device_id)
 
             print("Сессия пользователя удалена")
 
@@ -315,7 +541,9 @@ class HealthDiaryApp(MDApp):
         """
         Загружает настройки пользователя из базы данных
 
-        Если настроек нет - создает настройки по умолчанию
+        Если настроек нет - создает настройки по умолчанию. При одном входе
+        настройки загружаются один раз; экраны получают их через подписку
+        settings_store (on_user_settings и подписчики экранов)
         """
         # Для гостя не загружаем настройки
         if self.is_guest:
@@ -328,24 +556,45 @@ class HealthDiaryApp(MDApp):
                 print("Пользователь не авторизован, используются настройки по умолчанию")
                 return
 
-            # Получение настроек из базы данных
-            conn = get_connection()
-            result = select_settings_by_user(conn, self.user_id)
+            if self.settings_user_id == self.user_id:
+                # Настройки этого входа уже загружены и разосланы подписчикам
+                return
 
-            if result and result[0]:
-                # Настройки найдены - загружаем их
-                self.user_settings = json.loads(result[0])
+            with startup_trace.phase("settings"):
+                # Настройки читаются из базы только при первом обращении
+                settings = settings_store.hydrate(self.user_id)
+                if settings is None:
+                    # Загрузка повторится при следующем обращении
+                    print("Не удалось загрузить настройки, используются настройки по умолчанию")
+                    self.user_settings = self.get_default_settings()
+                    return
+                self.settings_user_id = self.user_id
+                self.user_settings = settings
                 print(f"Настройки пользователя загружены: {self.user_settings}")
-            else:
-                # Настроек нет - создаем по умолчанию
-                self.user_settings = self.get_default_settings()
-                print("Созданы настройки по умолчанию")
-                self.save_user_settings()  # Сохраняем настройки по умолчанию
 
         except Exception as e:
             print(f"Ошибка загрузки настроек: {e}")
             self.user_settings = self.get_default_settings()
 
+    def on_user_settings(self, user_id, settings, changed):
+        """
+        Получает настройки текущего пользователя из settings_store
+
+        Args:
+            user_id: ID пользователя
+            settings: настройки пользователя
+            changed: None при загрузке настроек или множество измененных ключей
+        """
+        if user_id != self.user_id or self.is_guest:
+            return
+        self.user_settings = settings
+        set_date_format(settings.get('date_format'))
+        if changed is None or changed & {'theme_color', 'dark_mode'}:
+            self.apply_user_settings_immediately()
+        if changed is None:
+            # Планируем напоминания пользователя с учетом настроек
+            reminder_scheduler.activate_user(user_id, settings)
+
     def get_default_settings(self):
         """
         Возвращает настройки по умолчанию
@@ -353,22 +602,13 @@ class HealthDiaryApp(MDApp):
         Returns:
             dict: Словарь с настройками по умолчанию
         """
-        return {
-            'theme_color': 'blue',  # Цветовая тема
-            'dark_mode': False,  # Темный режим
-            'daily_reminders': False,  # Ежедневные напоминания
-            'reminder_time': '20:00',  # Время напоминаний
-            'notification_sound': True,  # Звук уведомлений
-            'date_format': 'dd-mm-yyyy',  # Формат даты
-            'auto_export': False,  # Автоматический экспорт
-            'auto_login': True,  # Автоматический вход
-            'biometric_auth': False,  # Биометрическая аутентификация
-            'auto_logout': False  # Автоматический выход
-        }
+        return dict(DEFAULT_SETTINGS)
 
     def save_user_settings(self):
         """
         Сохраняет настройки пользователя в базу данных
+
+        Несколько изменений подряд объединяются в одну запись
         """
         # Для гостя не сохраняем настройки
         if self.is_guest:
@@ -380,16 +620,8 @@ class HealthDiaryApp(MDApp):
                 print("Не удалось сохранить настройки: пользователь не авторизован")
                 return
 
-            conn = get_connection()
-            # Проверяем, есть ли уже настройки
-            exists = select_settings_by_user(conn, self.user_id, check=True)
-
-            if exists:
-                # Обновляем существующие настройки
-                update_user_settings(conn, self.user_id, json.dumps(self.user_settings))
-            else:
-                # Создаем новые настройки
-                insert_user_settings(conn, self.user_id, json.dumps(self.user_settings))
+            # В базу попадут только изменившиеся ключи, запись выполняется с задержкой
+            settings_store.update(self.user_id, self.user_settings)
 
             print("Настройки пользователя сохранены в базу данных")
 
@@ -414,14 +646,16 @@ class HealthDiaryApp(MDApp):
         """
         old_user_id = self.user_id
         self.user_id = user_id
+        if user_id != old_user_id:
+            self.settings_user_id = None
 
-        if user_id and user_id >= 0:
-            # Пользователь авторизован - загружаем настройки
-            Clock.schedule_once(lambda dt: self.load_user_settings(), 0.1)
-        else:
+        # Настройки авторизованного пользователя загружает load_user_settings,
+        # который вызывается после установки флагов входа (is_guest, is_admin)
+        if not (user_id and user_id >= 0):
             # Пользователь вышел или гость - сбрасываем тему
             self.reset_theme_to_default()
             self.is_admin = False  # Сбрасываем флаг администратора
+            reminder_scheduler.clear()  # Напоминания вышедшего пользователя не показываются
 
             # Очищаем данные профиля на экране
             if old_user_id and hasattr(self, 'root'):
@@ -461,13 +695,16 @@ if __name__ == "__main__":
     Создает экземпляр главного класса и запускает приложение
     """
 
-    init_db()
+    with startup_trace.phase("db_init"):
+        init_db()
 
     # Загрузка всех KV-разметок
-    Builder.load_string(REG_KV)
-    Builder.load_string(SETTINGS_KV)
-    Builder.load_string(PROFILE_KV)
-    Builder.load_string(STORY_KV)
-    Builder.load_string(ADMIN_KV)
-
-    HealthDiaryApp().run()
+    with startup_trace.phase("kv"):
+        for name, kv in (("kv_registration", REG_KV), ("kv_settings", SETTINGS_KV), ("kv_profile", PROFILE_KV),
+                         ("kv_story", STORY_KV), ("kv_admin", ADMIN_KV)):
+            with startup_trace.phase(name):
+                kv_cache.load_string(name, kv)
+
+    with startup_trace.phase("app_init"):
+        app = HealthDiaryApp()
+    app.run()
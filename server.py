@@ -0,0 +1,786 @@
+"""
+Серверный режим дневника здоровья: HTTP API без графического интерфейса
+
+Отдает пользователей, записи, тренды, статистику и выгрузку записей в CSV
+для панелей клиники и пакетных задач. Работает только на чтение и по
+умолчанию слушает localhost. Kivy не импортируется, поэтому сервер
+запускается на Linux без дисплея.
+
+HTTP/1.1 реализован на asyncio из стандартной библиотеки:
+- соединения keep-alive с таймаутом простоя;
+- большие списки записей отдаются потоком (chunked) частями по мере
+  чтения курсора, без загрузки всего результата в память; поток читает
+  записи в одной транзакции с вычислением ETag, одновременных потоков
+  меньше, чем соединений в пуле, а клиент, который не читает ответ
+  дольше STREAM_WRITE_TIMEOUT, отключается;
+- списки отдаются с ETag (и Last-Modified для записей) и отвечают 304 на
+  If-None-Match / If-Modified-Since;
+- запросы к базе выполняются через async_database: соединения берутся из
+  пула, ожидание свободного соединения не занимает поток.
+
+Запуск:
+    python server.py --db database.db --port 8080 [--log-dir logs]
+
+Медленные запросы и ошибки базы пишутся в slow_queries.log в каталоге
+--log-dir (по умолчанию - каталог файла базы).
+
+Маршруты (GET):
+    /health                          состояние сервера и пула соединений
+    /statistics                      общая статистика
+    /users?search=&match=&sort=&after=&limit=
+                                     страница справочника пользователей
+    /users/<id>                      пользователь
+    /users/<id>/records              все записи пользователя (поток JSON)
+    /users/<id>/trends?metric=&resolution=&from=&to=&window=
+                                     тренд показателя
+    /users/<id>/export.csv           записи пользователя в CSV (поток)
+"""
+
+import argparse
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import signal
+import sys
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+import async_database
+import database
+from services.query_monitor import query_monitor, SLOW_LOG_FILENAME
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_POOL_SIZE = 4
+
+# Сколько секунд держать простаивающее соединение keep-alive
+KEEPALIVE_TIMEOUT = 15
+# Запросов в одном соединении, после которых оно закрывается
+MAX_KEEPALIVE_REQUESTS = 1000
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# Строк в одной части потокового ответа
+STREAM_BATCH_SIZE = 500
+# Сколько секунд ждать, пока клиент примет часть потокового ответа
+STREAM_WRITE_TIMEOUT = 30
+# Наибольший размер страницы справочника пользователей
+MAX_PAGE_SIZE = 500
+
+SERVER_NAME = "HealthDiary"
+
+RECORD_FIELDS = ('id', 'weight', 'pressure_systolic', 'pressure_diastolic', 'pulse', 'temperature', 'notes',
+                 'record_date')
+USER_FIELDS = ('id', 'name', 'email', 'created_at', 'is_admin')
+TREND_FIELDS = ('period', 'readings', 'avg_value', 'min_value', 'max_value', 'moving_avg', 'delta', 'band_min',
+                'band_max')
+
+
+class HttpError(Exception):
+    """
+    Ошибка запроса, возвращаемая клиенту
+
+    Args:
+        status: код ответа
+        message: текст ошибки
+    """
+
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+
+
+class Request:
+    """Разобранный HTTP-запрос"""
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'version', 'body')
+
+    def __init__(self, method, target, version, headers, body=b""):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.version = version
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == "HTTP/1.0":
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def param(self, name, default=None, convert=str):
+        """
+        Параметр строки запроса
+
+        Args:
+            name: имя параметра
+            default: значение, если параметр не передан
+            convert: функция преобразования значения
+
+        Raises:
+            HttpError: 400, если значение не преобразуется
+        """
+        if name not in self.query or self.query[name] == "":
+            return default
+        try:
+            return convert(self.query[name])
+        except (TypeError, ValueError):
+            raise HttpError(400, f"Неверное значение параметра {name}") from None
+
+
+class Response:
+    """
+    Ответ с телом в памяти
+
+    Args:
+        status: код ответа
+        body: тело ответа
+        content_type: тип содержимого
+        headers: дополнительные заголовки
+    """
+
+    def __init__(self, status=200, body=b"", content_type="application/json; charset=utf-8", headers=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = dict(headers or {})
+
+    @classmethod
+    def json(cls, data, status=200, headers=None):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        return cls(status, body, headers=headers)
+
+
+class StreamResponse:
+    """
+    Потоковый ответ: тело отправляется частями (Transfer-Encoding: chunked)
+
+    Args:
+        open_chunks: функция без аргументов, возвращающая асинхронный
+            итератор частей тела (bytes); вызывается, только если тело
+            действительно отправляется
+        content_type: тип содержимого
+        headers: дополнительные заголовки
+        close: асинхронная функция без аргументов, освобождающая ресурсы
+            ответа; вызывается один раз, когда ответ отправлен, оборван или
+            заменен ответом 304
+    """
+
+    status = 200
+
+    def __init__(self, open_chunks, content_type="application/json; charset=utf-8", headers=None, close=None):
+        self.open_chunks = open_chunks
+        self.content_type = content_type
+        self.headers = dict(headers or {})
+        self._close = close
+
+    async def close(self):
+        close, self._close = self._close, None
+        if close is not None:
+            await close()
+
+
+def error_response(error):
+    return Response.json({'error': error.message}, error.status)
+
+
+def body_etag(body):
+    """ETag по содержимому тела"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def http_date(value):
+    """
+    Дата SQLite ('ГГГГ-ММ-ДД ЧЧ:ММ:СС', UTC) в формате заголовка Last-Modified
+
+    Returns:
+        str: дата HTTP или None, если значение не разобрано
+    """
+    if value is None:
+        return None
+    try:
+        moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        return format_datetime(moment.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+    except ValueError:
+        return None
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Проверяет условные заголовки запроса
+
+    If-None-Match проверяется в первую очередь; If-Modified-Since - только
+    если If-None-Match не передан.
+
+    Returns:
+        bool: True если у клиента актуальная версия
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def encode_cursor(after):
+    """Ключ продолжения справочника в непрозрачную строку для параметра after"""
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(after), default=str).encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Строка параметра after в ключ продолжения select_users_directory
+
+    Raises:
+        ValueError: строка не является ключом продолжения
+    """
+    try:
+        after = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError(token) from None
+    if not isinstance(after, list) or len(after) != 2:
+        raise ValueError(token)
+    return tuple(after)
+
+
+async def drain_stream(writer, timeout):
+    """
+    Ждет, пока клиент примет отправленную часть потокового ответа
+
+    Raises:
+        ConnectionAbortedError: клиент не читает ответ дольше timeout;
+            соединение оборвано
+    """
+    try:
+        await asyncio.wait_for(writer.drain(), timeout)
+    except asyncio.TimeoutError:
+        writer.transport.abort()
+        raise ConnectionAbortedError(f"Клиент не принимает ответ дольше {timeout} с") from None
+
+
+async def read_request(reader):
+    """
+    Читает очередной запрос из соединения
+
+    Returns:
+        Request или None, если клиент закрыл соединение
+
+    Raises:
+        HttpError: запрос не разобран; соединение после ответа закрывается
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "Неполный запрос") from None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431) from None
+
+    lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Неверная строка запроса") from None
+    if version not in ("HTTP/1.0", "HTTP/1.1"):
+        raise HttpError(505)
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            raise HttpError(400, "Неверный заголовок")
+        headers[name.strip().lower()] = value.strip()
+
+    if 'transfer-encoding' in headers:
+        raise HttpError(501, "Тело запроса частями не поддерживается")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, "Неверный Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, version, headers, body)
+
+
+async def write_response(writer, request, response, keep_alive):
+    """
+    Отправляет ответ
+
+    Args:
+        writer: поток записи соединения
+        request: запрос (None, если запрос не разобран)
+        response: Response или StreamResponse
+        keep_alive: оставить ли соединение открытым
+
+    Returns:
+        bool: можно ли читать из соединения следующий запрос
+    """
+    head_only = request is not None and request.method == "HEAD"
+    stream = isinstance(response, StreamResponse)
+    # HTTP/1.0 не знает chunked: поток отправляется до закрытия соединения
+    chunked = stream and (request is None or request.version == "HTTP/1.1")
+    if stream and not chunked:
+        keep_alive = False
+
+    headers = {
+        'Server': SERVER_NAME,
+        'Date': format_datetime(datetime.now(timezone.utc), usegmt=True),
+        'Content-Type': response.content_type,
+    }
+    headers.update(response.headers)
+    if not stream:
+        headers['Content-Length'] = str(len(response.body))
+    elif chunked:
+        headers['Transfer-Encoding'] = 'chunked'
+    if keep_alive:
+        headers['Connection'] = 'keep-alive'
+        headers['Keep-Alive'] = f"timeout={KEEPALIVE_TIMEOUT}, max={MAX_KEEPALIVE_REQUESTS}"
+    else:
+        headers['Connection'] = 'close'
+
+    version = request.version if request is not None else "HTTP/1.1"
+    lines = [f"{version} {response.status} {HTTPStatus(response.status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+
+    if head_only or response.status in (204, 304):
+        await writer.drain()
+        return keep_alive
+    if not stream:
+        writer.write(response.body)
+        await writer.drain()
+        return keep_alive
+
+    chunks = response.open_chunks()
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            writer.write(b"%X\r\n%s\r\n" % (len(chunk), chunk) if chunked else chunk)
+            await drain_stream(writer, STREAM_WRITE_TIMEOUT)
+    except (ConnectionError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        # Заголовки уже отправлены: обрываем соединение без завершающей части,
+        # чтобы клиент не принял неполный ответ за полный
+        print(f"Ошибка потокового ответа {request.path if request else ''}: {e}")
+        return False
+    finally:
+        await chunks.aclose()
+    if chunked:
+        writer.write(b"0\r\n\r\n")
+    await drain_stream(writer, STREAM_WRITE_TIMEOUT)
+    return keep_alive
+
+
+def _begin_read(conn):
+    """Открывает транзакцию: следующие запросы читают один снимок базы"""
+    conn.execute("BEGIN")
+
+
+class HealthDiaryServer:
+    """
+    HTTP-сервер данных дневника здоровья
+
+    Args:
+        db_path: файл базы SQLite
+        host: адрес прослушивания
+        port: порт (0 - любой свободный)
+        pool_size: число соединений с базой
+        stream_batch_size: строк в одной части потокового ответа
+        max_streams: наибольшее число одновременных потоковых ответов
+            (по умолчанию на одно меньше pool_size, чтобы медленные
+            клиенты не заняли все соединения)
+    """
+
+    def __init__(self, db_path, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=DEFAULT_POOL_SIZE,
+                 stream_batch_size=STREAM_BATCH_SIZE, max_streams=None):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.stream_batch_size = stream_batch_size
+        self.pool = async_database.sqlite_pool(db_path, pool_size)
+        self.max_streams = max_streams or max(1, pool_size - 1)
+        self.streams = 0
+        self.requests = 0
+        self._server = None
+        self._connections = set()
+        self._closing = False
+        self.routes = [
+            (re.compile(r"/health"), self.get_health),
+            (re.compile(r"/statistics"), self.get_statistics),
+            (re.compile(r"/users"), self.get_users),
+            (re.compile(r"/users/(\d+)"), self.get_user),
+            (re.compile(r"/users/(\d+)/records"), self.get_records),
+            (re.compile(r"/users/(\d+)/trends"), self.get_trends),
+            (re.compile(r"/users/(\d+)/export\.csv"), self.export_csv),
+        ]
+
+    async def start(self):
+        """Начинает принимать соединения; self.port - фактический порт"""
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Сервер дневника здоровья: http://{self.host}:{self.port} (база {self.db_path})")
+
+    async def close(self):
+        """Останавливает сервер, закрывает соединения клиентов и пул"""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+        await self.pool.close()
+
+    async def stream_records(self, conn, user_id, encode):
+        """
+        Записи пользователя частями по мере чтения курсора
+
+        Части кодируются в потоке, чтобы не задерживать цикл событий.
+
+        Args:
+            conn: соединение из open_records (AsyncConnection)
+            user_id: ID пользователя
+            encode: функция (строки, первая ли часть) -> bytes
+
+        Yields:
+            bytes: закодированные части
+        """
+        loop = asyncio.get_running_loop()
+        batches = async_database.iter_records_by_user(conn, user_id, self.stream_batch_size)
+        first = True
+        try:
+            async for rows in batches:
+                yield await loop.run_in_executor(None, encode, rows, first)
+                first = False
+        finally:
+            await batches.aclose()
+
+    async def handle_connection(self, reader, writer):
+        """Обслуживает соединение клиента, пока оно остается keep-alive"""
+        self._connections.add(writer)
+        response = None
+        try:
+            for served in range(1, MAX_KEEPALIVE_REQUESTS + 1):
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    await write_response(writer, None, error_response(e), keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                self.requests += 1
+                response = await self.dispatch(request)
+                keep_alive = request.keep_alive and served < MAX_KEEPALIVE_REQUESTS and not self._closing
+                if not await write_response(writer, request, response, keep_alive):
+                    break
+                if isinstance(response, StreamResponse):
+                    await response.close()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if isinstance(response, StreamResponse):
+                await response.close()
+            self._connections.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def dispatch(self, request):
+        """
+        Находит обработчик и применяет условные заголовки
+
+        Returns:
+            Response или StreamResponse
+        """
+        try:
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(request.path)
+                if match is None:
+                    continue
+                if request.method not in ("GET", "HEAD"):
+                    raise HttpError(405)
+                response = await handler(request, *(int(value) for value in match.groups()))
+                break
+            else:
+                raise HttpError(404, f"Нет ресурса {request.path}")
+        except HttpError as e:
+            response = error_response(e)
+        except TimeoutError:
+            response = error_response(HttpError(503, "Все соединения с базой заняты"))
+        except Exception as e:
+            print(f"Ошибка обработки {request.method} {request.path}: {e}")
+            response = error_response(HttpError(500))
+
+        if response.status == 405:
+            response.headers['Allow'] = "GET, HEAD"
+        if response.status != 200:
+            return response
+
+        if isinstance(response, Response) and 'ETag' not in response.headers:
+            response.headers['ETag'] = body_etag(response.body)
+        response.headers.setdefault('Cache-Control', "no-cache")
+        etag = response.headers.get('ETag')
+        if not_modified(request, etag, response.headers.get('Last-Modified')):
+            if isinstance(response, StreamResponse):
+                await response.close()
+            headers = {name: value for name, value in response.headers.items()
+                       if name in ('ETag', 'Last-Modified', 'Cache-Control')}
+            return Response(304, content_type=response.content_type, headers=headers)
+        return response
+
+    async def get_health(self, request):
+        return Response.json({'status': "ok", 'requests': self.requests, 'pool': self.pool.snapshot(),
+                              'streams': {'active': self.streams, 'max': self.max_streams}},
+                             headers={'Cache-Control': "no-store"})
+
+    async def get_statistics(self, request):
+        return Response.json(await async_database.get_user_statistics(self.pool))
+
+    async def get_users(self, request):
+        search = request.param('search')
+        match = request.param('match', 'prefix')
+        sort = request.param('sort', 'created_at')
+        after = request.param('after', convert=decode_cursor)
+        limit = request.param('limit', 50, int)
+        if match not in ('prefix', 'substring'):
+            raise HttpError(400, "match: prefix или substring")
+        if sort not in database.USER_DIRECTORY_SORTS:
+            raise HttpError(400, f"sort: {', '.join(database.USER_DIRECTORY_SORTS)}")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HttpError(400, f"limit: от 1 до {MAX_PAGE_SIZE}")
+
+        rows, next_cursor = await async_database.select_users_directory(self.pool, search, match, sort, after,
+                                                                        limit)
+        return Response.json({
+            'users': [dict(zip(USER_FIELDS, row)) for row in rows],
+            'next': encode_cursor(next_cursor),
+        })
+
+    async def get_user(self, request, user_id):
+        row = await async_database.select_user_by_id(self.pool, user_id, True)
+        if row is None:
+            raise HttpError(404, "Пользователь не найден")
+        name, email, created_at, profile_photo, is_admin = row
+        return Response.json({'id': user_id, 'name': name, 'email': email, 'created_at': created_at,
+                              'is_admin': is_admin, 'has_photo': bool(profile_photo)})
+
+    async def get_trends(self, request, user_id):
+        metric = request.param('metric', 'weight')
+        resolution = request.param('resolution', 'day')
+        window = request.param('window', None, int)
+        if metric not in database.TREND_METRICS:
+            raise HttpError(400, f"metric: {', '.join(database.TREND_METRICS)}")
+        if resolution not in database.TREND_PERIODS:
+            raise HttpError(400, f"resolution: {', '.join(database.TREND_PERIODS)}")
+
+        rows = await async_database.select_record_trends(self.pool, user_id, metric, resolution,
+                                 request.param('from'), request.param('to'), window)
+        if rows is None:
+            raise HttpError(500, "Ошибка расчета тренда")
+        return Response.json([dict(zip(TREND_FIELDS, row)) for row in rows])
+
+    async def get_records(self, request, user_id):
+        conn, headers, close = await self.open_records(request, user_id)
+
+        def encode(rows, first):
+            body = ",".join(json.dumps(dict(zip(RECORD_FIELDS, row)), ensure_ascii=False, default=str)
+                            for row in rows)
+            return (b"[" if first else b",") + body.encode('utf-8')
+
+        async def chunks():
+            empty = True
+            parts = self.stream_records(conn, user_id, encode)
+            try:
+                async for part in parts:
+                    empty = False
+                    yield part
+            finally:
+                await parts.aclose()
+            yield b"[]" if empty else b"]"
+
+        return StreamResponse(chunks, headers=headers, close=close)
+
+    async def export_csv(self, request, user_id):
+        conn, headers, close = await self.open_records(request, user_id)
+        headers['Content-Disposition'] = f'attachment; filename="records_{user_id}.csv"'
+
+        def encode(rows, first):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if first:
+                writer.writerow(RECORD_FIELDS)
+            writer.writerows(rows)
+            return buffer.getvalue().encode('utf-8')
+
+        async def chunks():
+            empty = True
+            parts = self.stream_records(conn, user_id, encode)
+            try:
+                async for part in parts:
+                    empty = False
+                    yield part
+            finally:
+                await parts.aclose()
+            if empty:
+                yield encode([], True)
+
+        return StreamResponse(chunks, "text/csv; charset=utf-8", headers, close)
+
+    async def open_records(self, request, user_id):
+        """
+        Начинает потоковое чтение записей пользователя
+
+        Занимает слот потока и соединение из пула и открывает транзакцию
+        чтения: ETag и Last-Modified вычисляются в той же транзакции, что и
+        отдаваемые затем записи, поэтому заголовки соответствуют телу. На
+        актуальный кэш клиента сервер отвечает 304 без выгрузки.
+
+        Returns:
+            tuple: (AsyncConnection, заголовки, асинхронная функция,
+            освобождающая соединение и слот)
+
+        Raises:
+            HttpError: 503, если заняты все слоты потоков; 404, если
+                пользователя нет
+        """
+        if self.streams >= self.max_streams:
+            raise HttpError(503, "Слишком много одновременных выгрузок")
+        self.streams += 1
+        raw = None
+        try:
+            raw = await self.pool.acquire()
+            conn = async_database.AsyncConnection(self.pool, raw)
+            await conn.call(_begin_read)
+            headers = await self._records_validators(conn, request, user_id)
+        except BaseException:
+            if raw is not None:
+                await self.pool.release(raw)
+            self.streams -= 1
+            raise
+
+        async def close():
+            try:
+                await self.pool.release(raw)
+            finally:
+                self.streams -= 1
+
+        return conn, headers, close
+
+    async def _records_validators(self, conn, request, user_id):
+        """
+        ETag и Last-Modified записей пользователя
+
+        Raises:
+            HttpError: 404, если пользователя нет
+        """
+        user = await async_database.select_user_by_id(conn, user_id)
+        if user is None:
+            raise HttpError(404, "Пользователь не найден")
+        version = await async_database.select_records_version(conn, user_id)
+        if version is None:
+            raise HttpError(500, "Ошибка чтения записей")
+        count, max_id, last_change = version
+        tag = hashlib.blake2b(f"{request.path}|{user_id}|{count}|{max_id}|{last_change}".encode('utf-8'),
+                              digest_size=16).hexdigest()
+        headers = {'ETag': f'"{tag}"'}
+        last_modified = http_date(last_change)
+        if last_modified:
+            headers['Last-Modified'] = last_modified
+        return headers
+
+
+def slow_log_path(db_path, log_dir=None):
+    """
+    Файл журнала медленных запросов сервера
+
+    Args:
+        db_path: файл базы SQLite
+        log_dir: каталог журналов (None - каталог файла базы)
+
+    Returns:
+        str: путь к slow_queries.log
+    """
+    return os.path.join(log_dir or os.path.dirname(os.path.abspath(db_path)), SLOW_LOG_FILENAME)
+
+
+async def serve(db_path, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=DEFAULT_POOL_SIZE, log_dir=None):
+    """Запускает сервер и работает до SIGINT/SIGTERM"""
+    query_monitor.configure(log_path=slow_log_path(db_path, log_dir))
+    server = HealthDiaryServer(db_path, host, port, pool_size)
+    await server.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+        query_monitor.close()
+        print("Сервер остановлен")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API дневника здоровья без интерфейса")
+    parser.add_argument("--db", default=database.get_default_db_path(), help="файл базы SQLite")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="адрес прослушивания")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="порт")
+    parser.add_argument("--pool", type=int, default=DEFAULT_POOL_SIZE, help="соединений с базой")
+    parser.add_argument("--log-dir", default=None,
+                        help="каталог журнала медленных запросов (по умолчанию - каталог базы)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Файл базы не найден: {args.db}")
+        return 1
+    if args.log_dir:
+        try:
+            os.makedirs(args.log_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Не удалось создать каталог журналов {args.log_dir}: {e}")
+            return 1
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.pool, args.log_dir))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
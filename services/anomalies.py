@@ -0,0 +1,302 @@
+"""
+Поиск необычных показателей здоровья
+
+Правила utils/rules.py проверяют только допустимые диапазоны (например,
+пульс 30-220). AnomalyDetector дополнительно сравнивает новое измерение
+с личной нормой пользователя: для каждого показателя хранится число
+измерений, среднее и сумма квадратов отклонений (алгоритм Уэлфорда) в
+таблице indicator_stats. Новое измерение обновляет статистику за O(1),
+история записей не перечитывается. Изменение и удаление записей так
+учесть нельзя: после них (и после применения изменений с сервера)
+статистика пересчитывается по записям (recompute).
+"""
+
+import math
+import threading
+import time
+
+from database import get_connection, select_indicator_stats, upsert_indicator_stats, rebuild_indicator_stats, \
+    TREND_METRICS
+
+# Отклонение от среднего (в стандартных отклонениях), после которого измерение считается необычным
+ANOMALY_THRESHOLD = 4.0
+
+# Сколько измерений нужно, прежде чем сравнивать с личной нормой
+MIN_SAMPLES = 10
+
+# Через сколько секунд повторять загрузку статистики после ошибки
+RETRY_DELAY = 30.0
+
+# Минимальное стандартное отклонение: при очень стабильных показателях
+# разница в 0.1 кг или 1 удар пульса не должна считаться аномалией
+MIN_STD = {
+    'weight': 0.5,
+    'pressure_systolic': 3.0,
+    'pressure_diastolic': 2.0,
+    'pulse': 3.0,
+    'temperature': 0.15,
+}
+
+METRIC_NAMES = {
+    'weight': "Вес",
+    'pressure_systolic': "Систолическое давление",
+    'pressure_diastolic': "Диастолическое давление",
+    'pulse': "Пульс",
+    'temperature': "Температура",
+}
+
+
+class RunningStats:
+    """
+    Накопленная статистика показателя (алгоритм Уэлфорда)
+
+    Args:
+        samples: число измерений
+        mean: среднее
+        m2: сумма квадратов отклонений от среднего
+    """
+
+    __slots__ = ('samples', 'mean', 'm2')
+
+    def __init__(self, samples=0, mean=0.0, m2=0.0):
+        self.samples = samples
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value):
+        """Добавляет измерение"""
+        self.samples += 1
+        delta = value - self.mean
+        self.mean += delta / self.samples
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        """Выборочное стандартное отклонение"""
+        return math.sqrt(self.m2 / (self.samples - 1)) if self.samples > 1 else 0.0
+
+    def as_tuple(self):
+        return self.samples, self.mean, self.m2
+
+
+class Anomaly:
+    """
+    Необычное измерение
+
+    Args:
+        metric: показатель
+        value: значение
+        mean: среднее пользователя
+        std: стандартное отклонение пользователя
+    """
+
+    __slots__ = ('metric', 'value', 'mean', 'std')
+
+    def __init__(self, metric, value, mean, std):
+        self.metric = metric
+        self.value = value
+        self.mean = mean
+        self.std = std
+
+    @property
+    def score(self):
+        """Отклонение в стандартных отклонениях (со знаком)"""
+        return (self.value - self.mean) / self.std
+
+    def describe(self):
+        """Текст для пользователя"""
+        direction = "выше" if self.value > self.mean else "ниже"
+        return (f"{METRIC_NAMES.get(self.metric, self.metric)}: {self.value:g} - заметно {direction} "
+                f"обычного ({self.mean:.1f} ± {self.std:.1f})")
+
+
+class AnomalyDetector:
+    """
+    Сравнение измерений с личной нормой пользователя
+
+    Статистика пользователя загружается из базы один раз и дальше
+    поддерживается в памяти.
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        threshold: порог отклонения в стандартных отклонениях
+        min_samples: минимальное число измерений для сравнения
+    """
+
+    def __init__(self, connect=get_connection, threshold=ANOMALY_THRESHOLD, min_samples=MIN_SAMPLES):
+        self.connect = connect
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self._stats = {}  # user_id -> {показатель: RunningStats}
+        self._failed_at = {}  # user_id -> время неудачной загрузки (time.monotonic)
+        self._lock = threading.Lock()
+
+    def preload(self, user_ids, conn=None):
+        """
+        Загружает статистику пользователей, которых еще нет в памяти, одним запросом
+
+        После ошибки загрузка этих пользователей повторяется не раньше чем
+        через RETRY_DELAY секунд, чтобы проверка каждой строки списка не
+        открывала новое соединение.
+
+        Args:
+            user_ids: ID пользователей
+            conn: открытое соединение (None - открыть новое)
+        """
+        now = time.monotonic()
+        with self._lock:
+            missing = {user_id for user_id in user_ids
+                       if user_id is not None and user_id not in self._stats
+                       and now - self._failed_at.get(user_id, -RETRY_DELAY) >= RETRY_DELAY}
+        if not missing:
+            return
+
+        own_connection = conn is None
+        loaded = None
+        try:
+            if own_connection:
+                conn = self.connect()
+            loaded = select_indicator_stats(conn, sorted(missing))
+        except Exception as e:
+            print(f"Ошибка загрузки статистики показателей: {e}")
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+        with self._lock:
+            if loaded is None:
+                for user_id in missing:
+                    self._failed_at[user_id] = now
+                return
+            for user_id in missing:
+                self._failed_at.pop(user_id, None)
+                stats = loaded.get(user_id, {})
+                self._stats.setdefault(user_id, {
+                    metric: RunningStats(*stats[metric]) for metric in stats
+                })
+
+    def check(self, user_id, values, conn=None):
+        """
+        Проверяет измерения, не изменяя статистику
+
+        Args:
+            user_id: ID пользователя
+            values: {показатель: значение} (None пропускаются)
+            conn: открытое соединение для первой загрузки статистики
+
+        Returns:
+            list: Anomaly для необычных значений
+        """
+        self.preload([user_id], conn)
+        anomalies = []
+        with self._lock:
+            user_stats = self._stats.get(user_id, {})
+            for metric, value in values.items():
+                stats = user_stats.get(metric)
+                anomaly = self._evaluate(metric, value, stats)
+                if anomaly:
+                    anomalies.append(anomaly)
+        return anomalies
+
+    def observe(self, user_id, values, conn=None):
+        """
+        Проверяет новое измерение и добавляет его в статистику пользователя
+
+        Args:
+            user_id: ID пользователя
+            values: {показатель: значение} (None пропускаются)
+            conn: открытое соединение (None - открыть новое)
+
+        Returns:
+            list: Anomaly для необычных значений
+        """
+        self.preload([user_id], conn)
+        anomalies = []
+        changed = {}
+        with self._lock:
+            user_stats = self._stats.get(user_id)
+            if user_stats is None:
+                # Без сохраненной статистики новая перезаписала бы ее одним измерением
+                print(f"Статистика показателей пользователя {user_id} не загружена, измерение не учтено")
+                return anomalies
+            for metric, value in values.items():
+                if metric not in TREND_METRICS or value is None:
+                    continue
+                value = float(value)
+                stats = user_stats.setdefault(metric, RunningStats())
+                anomaly = self._evaluate(metric, value, stats)
+                if anomaly:
+                    anomalies.append(anomaly)
+                stats.update(value)
+                changed[metric] = stats.as_tuple()
+
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.connect()
+            upsert_indicator_stats(conn, user_id, changed)
+        except Exception as e:
+            print(f"Ошибка сохранения статистики показателей: {e}")
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+        return anomalies
+
+    def recompute(self, user_ids=None, conn=None):
+        """
+        Пересчитывает статистику по записям после их изменения или удаления
+
+        Args:
+            user_ids: ID пользователей (None - все)
+            conn: открытое соединение (None - открыть новое)
+
+        Returns:
+            bool: True если статистика пересчитана
+        """
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.connect()
+            rebuilt = rebuild_indicator_stats(conn, None if user_ids is None else sorted(set(user_ids)))
+        except Exception as e:
+            print(f"Ошибка пересчета статистики показателей: {e}")
+            rebuilt = False
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+        # Статистика в памяти перечитывается при следующей проверке
+        if user_ids is None:
+            self.invalidate()
+        else:
+            for user_id in set(user_ids):
+                self.invalidate(user_id)
+        return rebuilt
+
+    def invalidate(self, user_id=None):
+        """
+        Сбрасывает статистику в памяти (None - всех пользователей)
+
+        Args:
+            user_id: ID пользователя
+        """
+        with self._lock:
+            if user_id is None:
+                self._stats.clear()
+                self._failed_at.clear()
+            else:
+                self._stats.pop(user_id, None)
+                self._failed_at.pop(user_id, None)
+
+    def _evaluate(self, metric, value, stats):
+        if value is None or stats is None or stats.samples < self.min_samples:
+            return None
+        std = max(stats.std, MIN_STD.get(metric, 0.0))
+        if std <= 0:
+            return None
+        anomaly = Anomaly(metric, float(value), stats.mean, std)
+        return anomaly if abs(anomaly.score) >= self.threshold else None
+
+
+# Общий детектор приложения
+anomaly_detector = AnomalyDetector()
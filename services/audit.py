@@ -0,0 +1,199 @@
+"""
+Журнал действий администраторов
+
+AuditLogger принимает события в ограниченную очередь в памяти и записывает
+их в таблицу admin_actions пачками из фонового потока. Экран, на котором
+выполнено действие, не ждет записи в базу. При остановке приложения очередь
+дописывается до конца; события, не поместившиеся в очередь, подсчитываются.
+"""
+
+import queue
+import socket
+import threading
+from datetime import datetime, timezone
+
+from database import get_connection, insert_admin_actions
+
+_local_ip = None
+
+
+def get_local_ip():
+    """
+    Возвращает IP адрес устройства
+
+    Адрес определяется один раз: разрешение имени хоста может занимать
+    заметное время и не должно выполняться на каждое событие
+    """
+    global _local_ip
+    if _local_ip is None:
+        try:
+            _local_ip = socket.gethostbyname(socket.gethostname())
+        except Exception:
+            _local_ip = "unknown"
+    return _local_ip
+
+
+class AuditLogger:
+    """
+    Буферизованная запись действий администраторов
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        max_queue: максимальное число событий, ожидающих записи
+        batch_size: максимальное число событий в одной транзакции
+        flush_interval: максимальная задержка записи события в секундах
+    """
+
+    def __init__(self, connect=get_connection, max_queue=1000, batch_size=100, flush_interval=2.0):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()  # набралась полная пачка или остановка
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def log(self, admin_id, action_type, details, affected_user_id=None, ip_address=None):
+        """
+        Ставит действие администратора в очередь на запись
+
+        Args:
+            admin_id: ID администратора
+            action_type: тип действия (view_records, toggle_admin, ...)
+            details: детали действия
+            affected_user_id: ID затронутого пользователя
+            ip_address: IP адрес (по умолчанию - адрес устройства)
+
+        Returns:
+            bool: False если очередь переполнена и событие отброшено
+        """
+        # Время фиксируется в момент действия, а не в момент записи (UTC, как CURRENT_TIMESTAMP)
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        event = (admin_id, action_type, details, affected_user_id,
+                 ip_address or get_local_ip(), created_at)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wake_event.set()
+        self._ensure_started()
+        return True
+
+    def flush(self):
+        """
+        Синхронно записывает все события из очереди
+
+        Returns:
+            int: число записанных событий
+        """
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            if self._write(batch):
+                written += len(batch)
+            else:
+                return written
+
+    def stop(self, timeout=5.0):
+        """
+        Останавливает фоновую запись и дописывает очередь
+
+        Returns:
+            dict: статистика (см. stats())
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout)
+        self.flush()
+
+        stats = self.stats()
+        if stats['dropped'] or stats['pending']:
+            print(f"Журнал администратора: потеряно событий - {stats['dropped']}, "
+                  f"не записано - {stats['pending']}")
+        return stats
+
+    def stats(self):
+        """
+        Возвращает статистику журнала
+
+        Returns:
+            dict: written, dropped, pending, failed_batches
+        """
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': self._queue.qsize(),
+            'failed_batches': self.failed_batches,
+        }
+
+    def _ensure_started(self):
+        if self._stop_event.is_set():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            # Копим события до полной пачки, но не дольше flush_interval
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+
+            while not self._stop_event.is_set():
+                batch = self._take_batch()
+                if not batch:
+                    break
+                if not self._write(batch):
+                    # База недоступна - повторяем не раньше чем через flush_interval
+                    break
+
+    def _take_batch(self, limit=None):
+        batch = []
+        limit = self.batch_size if limit is None else limit
+        try:
+            while len(batch) < limit:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        with self._write_lock:
+            conn = None
+            try:
+                conn = self.connect()
+                if insert_admin_actions(conn, batch):
+                    self.written += len(batch)
+                    return True
+            except Exception as e:
+                print(f"Ошибка записи журнала администратора: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+
+            # Неудачная пачка возвращается в очередь; что не помещается - теряется
+            self.failed_batches += 1
+            for event in batch:
+                try:
+                    self._queue.put_nowait(event)
+                except queue.Full:
+                    self.dropped += 1
+            return False
+
+
+# Общий журнал приложения
+audit_logger = AuditLogger()
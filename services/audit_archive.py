@@ -0,0 +1,144 @@
+"""
+Хранение и архивация журнала действий администраторов
+
+Журнал в SQLite хранится помесячно (таблицы admin_actions_ГГГГММ, см. database.py).
+Месяцы старше срока хранения выгружаются в сжатые файлы JSONL
+(admin_actions_ГГГГММ.jsonl.gz) и удаляются из базы, поэтому объем базы
+и время работы экрана журнала не растут с годами.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+
+from database import get_connection, get_default_db_path, list_audit_buckets, drop_audit_bucket, \
+    AUDIT_BUCKET_PREFIX
+
+# Сколько месяцев журнала хранится в базе (включая текущий)
+AUDIT_RETENTION_MONTHS = 12
+
+# Колонки месячной таблицы в порядке выгрузки
+AUDIT_COLUMNS = ('id', 'admin_id', 'action_type', 'action_details', 'affected_user_id',
+                 'ip_address', 'created_at')
+
+
+def get_archive_dir():
+    """Каталог архивов журнала (рядом с файлом базы данных)"""
+    return os.path.join(os.path.dirname(os.path.abspath(get_default_db_path())), "audit_archive")
+
+
+def _month_index(bucket):
+    suffix = bucket[len(AUDIT_BUCKET_PREFIX):]
+    return int(suffix[:4]) * 12 + int(suffix[4:]) - 1
+
+
+def expired_buckets(buckets, retention_months=AUDIT_RETENTION_MONTHS, today=None):
+    """
+    Отбирает месячные таблицы старше срока хранения
+
+    Args:
+        buckets: имена месячных таблиц
+        retention_months: сколько последних месяцев оставить
+        today: текущая дата (для тестов)
+
+    Returns:
+        list: имена таблиц для архивации, от старых к новым
+    """
+    today = today or datetime.now()
+    oldest_kept = today.year * 12 + today.month - 1 - (retention_months - 1)
+    return sorted(bucket for bucket in buckets if _month_index(bucket) < oldest_kept)
+
+
+def archive_audit_bucket(conn, bucket, archive_dir=None):
+    """
+    Выгружает месячную таблицу журнала в файл JSONL.gz и удаляет ее из базы
+
+    Файл сначала пишется во временный, затем переименовывается; таблица
+    удаляется только после успешной записи всех строк.
+
+    Args:
+        conn: соединение SQLite
+        bucket: имя месячной таблицы
+        archive_dir: каталог архивов
+
+    Returns:
+        int: число выгруженных записей
+    """
+    archive_dir = archive_dir or get_archive_dir()
+    os.makedirs(archive_dir, exist_ok=True)
+
+    path = os.path.join(archive_dir, f"{bucket}.jsonl.gz")
+    if os.path.exists(path):
+        # Месяц уже архивировался ранее - дописываем в отдельный файл
+        path = os.path.join(archive_dir, f"{bucket}.{datetime.now():%Y%m%d%H%M%S}.jsonl.gz")
+    temp_path = path + ".tmp"
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(AUDIT_COLUMNS)} FROM {bucket} ORDER BY created_at, id")
+
+    count = 0
+    with gzip.open(temp_path, "wt", encoding="utf-8") as archive:
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                archive.write(json.dumps(dict(zip(AUDIT_COLUMNS, row)), ensure_ascii=False, default=str))
+                archive.write("\n")
+            count += len(rows)
+
+    os.replace(temp_path, path)
+    drop_audit_bucket(conn, bucket)
+    return count
+
+
+def read_audit_archive(path):
+    """
+    Читает записи из архива журнала
+
+    Args:
+        path: путь к файлу .jsonl.gz
+
+    Yields:
+        dict: запись журнала
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def apply_audit_retention(conn=None, retention_months=AUDIT_RETENTION_MONTHS, archive_dir=None, today=None):
+    """
+    Архивирует месяцы журнала старше срока хранения
+
+    Args:
+        conn: соединение SQLite (None - открыть соединение по умолчанию)
+        retention_months: сколько последних месяцев оставить в базе
+        archive_dir: каталог архивов
+        today: текущая дата (для тестов)
+
+    Returns:
+        dict: имя таблицы -> число выгруженных записей
+    """
+    own_connection = conn is None
+    archived = {}
+    try:
+        if own_connection:
+            conn = get_connection()
+        if not hasattr(conn, 'isolation_level'):
+            # В MySQL журнал хранится одной таблицей, архивация выполняется на сервере
+            return archived
+
+        for bucket in expired_buckets(list_audit_buckets(conn), retention_months, today):
+            archived[bucket] = archive_audit_bucket(conn, bucket, archive_dir)
+            print(f"Журнал администраторов {bucket} архивирован: {archived[bucket]} записей")
+
+    except Exception as e:
+        print(f"Ошибка архивации журнала администраторов: {e}")
+    finally:
+        if own_connection and conn is not None:
+            conn.close()
+
+    return archived
@@ -0,0 +1,280 @@
+"""
+Монитор кадров и зависаний главного потока
+
+Включается на устройстве явно (переключатель в настройках или переменная
+окружения HEALTH_DIARY_PERF_MONITOR=1). Каждый кадр Clock вызывает tick(),
+который ведет статистику интервалов между кадрами. Пока очередной кадр
+запаздывает, фоновый поток снимает стек главного потока и запоминает
+метод экрана, который выполняется (StoryWindow.load_story,
+RegistrationWindow.login и т.д.). Интервал дольше порога считается
+зависанием: оно записывается в журнал с ротацией вместе с методами,
+попавшими в выборки, и может быть выгружено в JSON.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from services.json_log import JsonLog
+from services.query_monitor import find_caller
+
+# Переменная окружения, включающая монитор без настройки
+PERF_MONITOR_ENV = "HEALTH_DIARY_PERF_MONITOR"
+
+# Интервал между кадрами дольше порога (мс) считается зависанием
+STALL_THRESHOLD_MS = 250.0
+# Бюджет кадра при 60 FPS; интервал дольше двух бюджетов - пропущенный кадр
+FRAME_BUDGET_MS = 1000.0 / 60
+# Период выборки стека главного потока, пока кадр запаздывает
+SAMPLE_INTERVAL = 0.02
+# Глубина стека, просматриваемая при выборке (обработчик экрана вызывается из глубины Kivy)
+SAMPLE_STACK_DEPTH = 200
+
+STALL_LOG_FILENAME = "stalls.log"
+FRAME_REPORT_FILENAME = "frame_report.json"
+# Интервалов для перцентилей и зависаний в выгрузке
+RECENT_FRAMES = 3600
+RECENT_STALLS = 100
+# Границы гистограммы интервалов, мс
+HISTOGRAM_BOUNDS = (FRAME_BUDGET_MS, 2 * FRAME_BUDGET_MS, 50.0, 100.0, STALL_THRESHOLD_MS, 1000.0)
+
+
+class FrameMonitor:
+    """
+    Статистика кадров и журнал зависаний главного потока
+
+    Args:
+        threshold_ms: порог зависания в миллисекундах
+        sample_interval: период выборки стека в секундах
+        log_path: файл журнала зависаний (None - stalls.log в текущем каталоге)
+        clock: источник времени в секундах
+    """
+
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS, sample_interval=SAMPLE_INTERVAL, log_path=None,
+                 clock=time.perf_counter):
+        self.threshold_ms = threshold_ms
+        self.sample_interval = sample_interval
+        self.clock = clock
+        # Возвращает имя текущего экрана; задается приложением
+        self.screen_provider = None
+        self._log = JsonLog(STALL_LOG_FILENAME, log_path)
+        self._lock = threading.Lock()
+        self._event = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._main_thread = None
+        self._last_tick = None
+        self._samples = Counter()
+        self._functions = Counter()
+        self.reset()
+
+    @property
+    def running(self):
+        return self._event is not None
+
+    def configure(self, threshold_ms=None, log_path=None):
+        """
+        Меняет порог зависания и файл журнала
+
+        Args:
+            threshold_ms: порог зависания в миллисекундах
+            log_path: файл журнала зависаний
+        """
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        if log_path is not None:
+            self._log.set_path(log_path)
+
+    def start(self, schedule):
+        """
+        Начинает учет кадров
+
+        Вызывается из главного потока: его стек снимается при выборках.
+
+        Args:
+            schedule: функция, вызывающая callback каждый кадр и возвращающая
+                событие с методом cancel() (Clock.schedule_interval(callback, 0))
+        """
+        if self.running:
+            return
+        self._main_thread = threading.get_ident()
+        self._last_tick = None
+        self._event = schedule(self.tick)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="frame-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает учет кадров и закрывает журнал"""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self._log.close()
+
+    def tick(self, dt=None):
+        """
+        Учитывает очередной кадр; вызывается Clock в главном потоке
+
+        Returns:
+            dict: запись о зависании, если интервал превысил порог, иначе None
+        """
+        now = self.clock()
+        with self._lock:
+            last, self._last_tick = self._last_tick, now
+            samples, self._samples = self._samples, Counter()
+            functions, self._functions = self._functions, Counter()
+            if last is None:
+                return None
+            interval_ms = (now - last) * 1000
+            self._add_interval(interval_ms)
+            if interval_ms < self.threshold_ms:
+                return None
+            self.stalls += 1
+
+        stall = {
+            'at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            'ms': round(interval_ms, 1),
+            'screen': self._current_screen(),
+            'handler': samples.most_common(1)[0][0] if samples else None,
+            'samples': dict(samples.most_common()),
+            'functions': dict(functions.most_common(5)),
+        }
+        with self._lock:
+            self._recent_stalls.append(stall)
+        self._log.write(stall, "Ошибка записи журнала зависаний")
+        return stall
+
+    def sample(self):
+        """
+        Снимает стек главного потока, если текущий кадр запаздывает
+
+        Returns:
+            bool: True если выборка сделана
+        """
+        with self._lock:
+            last = self._last_tick
+        if last is None or (self.clock() - last) * 1000 < self.threshold_ms / 2:
+            return False
+        frame = sys._current_frames().get(self._main_thread)
+        if frame is None:
+            return False
+        screen, function = find_caller(SAMPLE_STACK_DEPTH, frame)
+        with self._lock:
+            # Выборка могла прийти после того, как кадр уже завершился
+            if self._last_tick != last:
+                return False
+            self._samples[screen or function or "unknown"] += 1
+            if function:
+                self._functions[function] += 1
+        return True
+
+    def snapshot(self):
+        """
+        Статистика кадров
+
+        Returns:
+            dict: число кадров, средний и максимальный интервал, перцентили
+            последних RECENT_FRAMES интервалов, пропущенные кадры, зависания
+            и гистограмма интервалов
+        """
+        with self._lock:
+            recent = sorted(self._recent_frames)
+            histogram = dict(zip(self._histogram_labels, self._histogram))
+            frames, total_ms, max_ms = self.frames, self.total_ms, self.max_ms
+            dropped, stalls = self.dropped, self.stalls
+
+        def percentile(share):
+            return round(recent[min(len(recent) - 1, int(len(recent) * share))], 2) if recent else None
+
+        return {
+            'frames': frames,
+            'mean_ms': round(total_ms / frames, 2) if frames else None,
+            'max_ms': round(max_ms, 2),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'dropped': dropped,
+            'stalls': stalls,
+            'histogram': histogram,
+        }
+
+    def recent_stalls(self):
+        """Последние зависания, начиная со старого"""
+        with self._lock:
+            return list(self._recent_stalls)
+
+    def export_json(self, path):
+        """
+        Сохраняет статистику кадров и последние зависания в JSON
+
+        Args:
+            path: путь к файлу
+
+        Returns:
+            bool: True если файл записан
+        """
+        try:
+            document = {
+                'exported_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                'threshold_ms': self.threshold_ms,
+                'frames': self.snapshot(),
+                'stalls': self.recent_stalls(),
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"Ошибка сохранения отчета о кадрах: {e}")
+            return False
+
+    def reset(self):
+        """Обнуляет статистику"""
+        with self._lock:
+            self.frames = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+            self.dropped = 0
+            self.stalls = 0
+            self._recent_frames = deque(maxlen=RECENT_FRAMES)
+            self._recent_stalls = deque(maxlen=RECENT_STALLS)
+            self._histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+            self._histogram_labels = [f"<={bound:.0f}" for bound in HISTOGRAM_BOUNDS] + \
+                [f">{HISTOGRAM_BOUNDS[-1]:.0f}"]
+
+    def _add_interval(self, interval_ms):
+        self.frames += 1
+        self.total_ms += interval_ms
+        self.max_ms = max(self.max_ms, interval_ms)
+        if interval_ms > 2 * FRAME_BUDGET_MS:
+            self.dropped += 1
+        self._recent_frames.append(interval_ms)
+        for index, bound in enumerate(HISTOGRAM_BOUNDS):
+            if interval_ms <= bound:
+                self._histogram[index] += 1
+                break
+        else:
+            self._histogram[-1] += 1
+
+    def _current_screen(self):
+        try:
+            return self.screen_provider() if self.screen_provider else None
+        except Exception:
+            return None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Ошибка выборки стека главного потока: {e}")
+
+
+# Общий монитор приложения
+frame_monitor = FrameMonitor()
@@ -0,0 +1,176 @@
+"""
+Мониторинг доступности сервера базы данных
+
+Содержит:
+1. CircuitBreaker - автомат состояний closed/open/half-open, который
+   не дает экранам ждать таймаут подключения к недоступному серверу
+2. BackendHealthMonitor - фоновую проверку сервера с заданным интервалом
+   и снимок состояния для административной панели
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для подключений к серверу
+
+    closed    - сервер доступен, подключения разрешены
+    open      - сервер недоступен, подключения сразу отклоняются
+    half_open - прошло reset_timeout секунд, разрешена одна пробная попытка
+
+    Args:
+        failure_threshold: число неудач подряд, после которого цепь размыкается
+        reset_timeout: время в секундах до пробной попытки в состоянии open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=1, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def allow_request(self, now=None):
+        """
+        Проверяет, можно ли сейчас подключаться к серверу
+
+        Returns:
+            bool: True если подключение разрешено
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_progress = False
+
+            # half_open: пропускаем только одну пробную попытку
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        """Фиксирует успешное подключение и замыкает цепь"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self, now=None):
+        """Фиксирует неудачное подключение"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_progress = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = now
+
+
+class BackendHealthMonitor:
+    """
+    Фоновая проверка доступности сервера
+
+    Args:
+        probe: функция без аргументов, выполняющая короткую проверку сервера
+            (исключение означает недоступность)
+        breaker: CircuitBreaker, состояние которого обновляется по результатам проверки
+        interval: период проверки в секундах
+    """
+
+    def __init__(self, probe, breaker, interval=15.0):
+        self.probe = probe
+        self.breaker = breaker
+        self.interval = interval
+        self.last_probe_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.last_latency_ms = None
+        self.probe_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, interval=None):
+        """Запускает фоновую проверку"""
+        if interval is not None:
+            self.interval = interval
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Останавливает фоновую проверку"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.probe_once()
+            self._stop_event.wait(self.interval)
+
+    def probe_once(self):
+        """
+        Выполняет одну проверку сервера
+
+        Returns:
+            bool: True если сервер ответил
+        """
+        started = time.perf_counter()
+        self.last_probe_at = datetime.now()
+        self.probe_count += 1
+        try:
+            self.probe()
+        except Exception as e:
+            self.last_error = str(e)
+            self.last_latency_ms = None
+            self.breaker.record_failure()
+            return False
+
+        self.last_latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.last_success_at = self.last_probe_at
+        self.last_error = None
+        self.breaker.record_success()
+        return True
+
+    def snapshot(self):
+        """
+        Возвращает снимок состояния сервера
+
+        Returns:
+            dict: состояние цепи, активное хранилище, время последних проверок,
+            последняя ошибка и задержка ответа
+        """
+        def fmt(value):
+            return value.strftime("%Y-%m-%d %H:%M:%S") if value else None
+
+        return {
+            'state': self.breaker.state,
+            'backend': 'mysql' if self.breaker.state == CircuitBreaker.CLOSED else 'sqlite',
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'last_probe_at': fmt(self.last_probe_at),
+            'last_success_at': fmt(self.last_success_at),
+            'last_error': self.last_error,
+            'latency_ms': self.last_latency_ms,
+            'probe_interval': self.interval,
+            'probe_count': self.probe_count,
+            'monitoring': bool(self._thread and self._thread.is_alive()),
+        }
@@ -0,0 +1,79 @@
+"""
+Журнал JSON-строк с ротацией файлов
+
+Общий для мониторов производительности (медленные запросы, задержки
+кадров): каждая запись - одна строка JSON, файл ротируется по размеру.
+Файл открывается при первой записи.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+
+
+class JsonLog:
+    """
+    Журнал JSON-строк
+
+    Args:
+        filename: имя файла в текущем каталоге, если путь не задан
+        path: путь к файлу журнала
+        max_bytes: размер файла, после которого он ротируется
+        backups: число хранимых старых файлов
+    """
+
+    def __init__(self, filename, path=None, max_bytes=1024 * 1024, backups=3):
+        self.filename = filename
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def set_path(self, path):
+        """Меняет файл журнала; открытый файл закрывается"""
+        with self._lock:
+            if path != self.path:
+                self.path = path
+                self._close_logger()
+
+    def write(self, entry, error_message="Ошибка записи журнала"):
+        """
+        Дописывает запись в журнал
+
+        Args:
+            entry: словарь, сериализуемый в JSON
+            error_message: префикс сообщения при ошибке записи
+        """
+        try:
+            with self._lock:
+                self._get_logger().warning(json.dumps(entry, ensure_ascii=False))
+        except Exception as e:
+            print(f"{error_message}: {e}")
+
+    def close(self):
+        """Закрывает файл журнала"""
+        with self._lock:
+            self._close_logger()
+
+    def _get_logger(self):
+        if self._logger is None:
+            path = self.path or os.path.join(os.getcwd(), self.filename)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"{__name__}.{id(self)}")
+            logger.propagate = False
+            logger.setLevel(logging.WARNING)
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def _close_logger(self):
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                self._logger.removeHandler(handler)
+                handler.close()
+            self._logger = None
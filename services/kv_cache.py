@@ -0,0 +1,255 @@
+"""
+Кэш разобранных KV-разметок
+
+Builder.load_string при каждом запуске разбирает строки kv.py и
+компилирует выражения правил. Кэш сохраняет объект Parser с уже
+скомпилированными правилами (байт-код выражений - через marshal) в файл
+рядом с базой данных. Ключ кэша - хэш строки KV вместе с версиями Kivy
+и Python, поэтому измененная разметка или обновление Kivy приводят к
+обычному разбору и перезаписи файла. Правила применяет сам Builder:
+на время вызова load_string он получает готовый Parser вместо нового.
+
+Общий кэш приложения включается переменной окружения
+HEALTH_DIARY_KV_CACHE=1: пока сохранение Parser не проверено на всех
+поддерживаемых версиях Kivy, по умолчанию разметка разбирается как обычно.
+
+Файлы кэша читаются через pickle и создаются только самим приложением
+в его каталоге данных. Если файл кэша не читается или Builder не может
+применить сохраненный Parser, файл удаляется, разметка разбирается
+заново, а кэш отключается до конца работы приложения.
+"""
+
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+
+from database import get_default_db_path
+
+KV_CACHE_DIRNAME = "kv_cache"
+# Переменная окружения, включающая общий кэш разметок ("1")
+KV_CACHE_ENV = "HEALTH_DIARY_KV_CACHE"
+# Меняется при изменении формата файлов кэша
+CACHE_FORMAT = 1
+
+
+class _KVPickler(pickle.Pickler):
+    """Pickler, сохраняющий байт-код выражений KV через marshal"""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.CodeType):
+            return marshal.loads, (marshal.dumps(obj),)
+        return NotImplemented
+
+
+def cache_key(string, kivy_version=""):
+    """
+    Ключ кэша строки KV
+
+    Args:
+        string: текст разметки
+        kivy_version: версия Kivy
+
+    Returns:
+        str: sha256 разметки, версий Kivy и Python и формата кэша
+    """
+    digest = hashlib.sha256(f"{CACHE_FORMAT}|{kivy_version}|{sys.version}|".encode('utf-8'))
+    digest.update(string.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class KVCache:
+    """
+    Кэш разобранных KV-разметок
+
+    Args:
+        directory: каталог файлов кэша (None - kv_cache рядом с базой данных)
+        enabled: использовать ли кэш
+    """
+
+    def __init__(self, directory=None, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.entries = []  # {'name', 'hit', 'ms', 'parse_ms', 'saved_ms'}
+        self._lock = threading.Lock()
+
+    def load_string(self, name, string, **kwargs):
+        """
+        Загружает разметку через Builder.load_string, используя кэш
+
+        Args:
+            name: имя разметки (имя файла кэша)
+            string: текст разметки
+            **kwargs: аргументы Builder.load_string
+
+        Returns:
+            корневой виджет разметки или None
+        """
+        from kivy.lang import builder as builder_module
+        return self.load_with(builder_module, name, string, **kwargs)
+
+    def load_with(self, builder_module, name, string, **kwargs):
+        """
+        Загружает разметку Builder'ом указанного модуля
+
+        Args:
+            builder_module: модуль с Builder и Parser (kivy.lang.builder)
+            name: имя разметки
+            string: текст разметки
+            **kwargs: аргументы Builder.load_string
+
+        Returns:
+            корневой виджет разметки или None
+        """
+        key = cache_key(string, getattr(sys.modules.get('kivy'), '__version__', ''))
+        parse = builder_module.Parser
+        entry = {'name': name, 'hit': False, 'ms': None, 'parse_ms': None, 'saved_ms': None}
+        from_cache = []  # Parser, взятый из кэша при текущей попытке
+
+        def get_parser(content, filename=None):
+            started = time.perf_counter()
+            cached = self._read(name, key) if self.enabled else None
+            if cached is not None:
+                parse_ms, parser = cached
+                from_cache.append(parser)
+                # Директивы #:import и #:set заполняют глобальные имена Builder
+                parser.execute_directives()
+                entry['hit'] = True
+                entry['parse_ms'] = parse_ms
+            else:
+                parser = parse(content=content, filename=filename)
+                entry['parse_ms'] = round((time.perf_counter() - started) * 1000, 3)
+                if self.enabled:
+                    self._write(name, key, entry['parse_ms'], parser)
+            entry['ms'] = round((time.perf_counter() - started) * 1000, 3)
+            if entry['hit']:
+                entry['saved_ms'] = round(entry['parse_ms'] - entry['ms'], 3)
+            return parser
+
+        builder = builder_module.Builder
+        with self._lock:
+            builder_module.Parser = get_parser
+            rules = getattr(builder, 'rules', None)
+            rules_count = len(rules) if rules is not None else 0
+            try:
+                try:
+                    return builder.load_string(string, **kwargs)
+                except Exception as e:
+                    if not from_cache:
+                        raise
+                    # Сохраненный Parser не применился: кэш больше не используется,
+                    # разметка разбирается заново
+                    print(f"Ошибка применения кэша KV {name}: {e}")
+                    self._disable(name)
+                    if rules is not None:
+                        del rules[rules_count:]
+                        clear_matches = getattr(builder, '_clear_matchcache', None)
+                        if clear_matches is not None:
+                            clear_matches()
+                    entry.update(hit=False, ms=None, parse_ms=None, saved_ms=None)
+                    return builder.load_string(string, **kwargs)
+            finally:
+                builder_module.Parser = parse
+                self.entries.append(entry)
+
+    def report(self):
+        """
+        Статистика загрузок
+
+        Returns:
+            dict: entries - по каждой разметке (попадание в кэш, время загрузки,
+            время разбора, сэкономленное время), hits и saved_ms - итог
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self.entries]
+        return {
+            'entries': entries,
+            'hits': sum(1 for entry in entries if entry['hit']),
+            'saved_ms': round(sum(entry['saved_ms'] or 0.0 for entry in entries), 3),
+        }
+
+    def print_report(self):
+        """Печатает время загрузки разметок и сэкономленное кэшем время"""
+        report = self.report()
+        if not report['entries']:
+            return
+        print(f"\nKV-разметки: из кэша {report['hits']} из {len(report['entries'])}, "
+              f"сэкономлено {report['saved_ms']:.1f} мс")
+        for entry in report['entries']:
+            if entry['hit']:
+                print(f"  {entry['name']:<20} кэш {entry['ms']:>8.1f} мс "
+                      f"(разбор {entry['parse_ms']:.1f} мс, сэкономлено {entry['saved_ms']:.1f} мс)")
+            else:
+                print(f"  {entry['name']:<20} разбор {entry['parse_ms'] or 0.0:>6.1f} мс")
+
+    def clear(self):
+        """Удаляет файлы кэша"""
+        directory = self._directory()
+        try:
+            for filename in os.listdir(directory):
+                if filename.endswith(".pickle"):
+                    os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ошибка очистки кэша KV: {e}")
+
+    def _disable(self, name):
+        """Отключает кэш и удаляет файл, который не удалось применить"""
+        self.enabled = False
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+    def _directory(self):
+        return self.directory or os.path.join(os.path.dirname(os.path.abspath(get_default_db_path())),
+                                              KV_CACHE_DIRNAME)
+
+    def _path(self, name):
+        return os.path.join(self._directory(), f"{name}.pickle")
+
+    def _read(self, name, key):
+        """Разобранная разметка из файла: (parse_ms, parser) или None, если ключ не совпал"""
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                # Заголовок читается отдельно, чтобы устаревший файл не разбирался целиком
+                header = pickle.load(f)
+                if header.get('key') != key:
+                    return None
+                return header['parse_ms'], pickle.load(f)
+        except Exception as e:
+            print(f"Ошибка чтения кэша KV {name}: {e}")
+            self._disable(name)
+            return None
+
+    def _write(self, name, key, parse_ms, parser):
+        path = self._path(name)
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                pickler = _KVPickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickler.dump({'key': key, 'parse_ms': parse_ms})
+                pickler.clear_memo()
+                pickler.dump(parser)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            print(f"Ошибка записи кэша KV {name}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+
+# Общий кэш разметок приложения (включается через KV_CACHE_ENV)
+kv_cache = KVCache(enabled=os.environ.get(KV_CACHE_ENV) == "1")
@@ -4,12 +4,12 @@ from io import BytesIO
 
 from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
-from kivy.lang import Builder
 from kivy.properties import StringProperty
 
 from kv import PHOTOEDITOR_KV
+from services.kv_cache import kv_cache
 
-Builder.load_string(PHOTOEDITOR_KV)
+kv_cache.load_string("kv_photoeditor", PHOTOEDITOR_KV)
 
 try:
     from plyer import filechooser
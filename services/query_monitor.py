@@ -0,0 +1,389 @@
+"""
+Учет запросов к базе данных
+
+Соединения SQLite приложения создаются с фабрикой InstrumentedConnection
+(database.connect_sqlite), курсоры которой передают каждый запрос в
+QueryMonitor. Для каждого запроса определяется его форма (SQL без
+литералов), длительность, число строк и экран, с которого он выполнен.
+Монитор ведет счетчики по формам запросов, а запросы дольше порога и
+ошибки записывает в журнал медленных запросов с ротацией файлов. Журнал
+пишется только после того, как задан его файл (приложение и сервер
+указывают каталог данных), поэтому тесты и утилиты не оставляют файлов в
+текущем каталоге.
+"""
+
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from services.json_log import JsonLog
+
+# Запросы дольше порога (мс) попадают в журнал медленных запросов
+SLOW_QUERY_THRESHOLD_MS = 100.0
+
+SLOW_LOG_FILENAME = "slow_queries.log"
+# Файл счетчиков, сохраняемый при закрытии приложения
+QUERY_STATS_FILENAME = "query_stats.json"
+# Размер файла журнала и число старых файлов при ротации
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+
+# Модули, кадры которых пропускаются при поиске вызывающего кода
+_INTERNAL_MODULES = ('database', __name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """
+    Форма запроса: литералы заменены на ?, списки значений свернуты
+
+    Запросы, которые отличаются только значениями (ID пользователя, email,
+    даты), получают одну форму и учитываются вместе.
+
+    Args:
+        sql: текст запроса
+
+    Returns:
+        str: нормализованный текст
+    """
+    shape = _STRING_LITERAL.sub("?", sql)
+    # %s (MySQL) и ? (SQLite) считаются одной формой
+    shape = shape.replace("%s", "?")
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _WHITESPACE.sub(" ", shape).strip()
+    return _PLACEHOLDER_LIST.sub("(?, ...)", shape)
+
+
+def find_caller(max_depth=30, frame=None):
+    """
+    Код, выполнивший запрос
+
+    Args:
+        max_depth: сколько кадров стека просматривать
+        frame: кадр, с которого начинается поиск (по умолчанию - вызывающий)
+
+    Returns:
+        tuple: (экран, функция). Экран - 'Класс.метод' первого кадра из
+        windows/ или None; функция - первая функция вне database.py
+        (например, services.sync._push)
+    """
+    frame = frame if frame is not None else sys._getframe(1)
+    function = None
+    depth = 0
+    while frame is not None and depth < max_depth:
+        module = frame.f_globals.get('__name__', '')
+        if module not in _INTERNAL_MODULES:
+            if function is None:
+                function = f"{module}.{frame.f_code.co_name}"
+            if module.startswith('windows.'):
+                owner = frame.f_locals.get('self')
+                name = type(owner).__name__ if owner is not None else module
+                return f"{name}.{frame.f_code.co_name}", function
+        frame = frame.f_back
+        depth += 1
+    return None, function
+
+
+class QueryStats:
+    """
+    Счетчики одной формы запроса
+
+    Args:
+        shape: нормализованный текст запроса
+    """
+
+    __slots__ = ('shape', 'count', 'errors', 'slow', 'total_ms', 'max_ms', 'rows', 'callers')
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.callers = {}
+
+    def as_dict(self):
+        return {
+            'sql': self.shape,
+            'count': self.count,
+            'errors': self.errors,
+            'slow': self.slow,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'callers': dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+        }
+
+
+class QueryMonitor:
+    """
+    Счетчики запросов и журнал медленных запросов
+
+    Args:
+        threshold_ms: порог медленного запроса в миллисекундах
+        log_path: файл журнала (None - журнал не пишется, пока файл не задан через configure)
+        enabled: учитывать ли запросы
+        max_bytes: размер файла журнала, после которого он ротируется
+        backups: число хранимых старых файлов журнала
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_THRESHOLD_MS, log_path=None, enabled=True,
+                 max_bytes=SLOW_LOG_MAX_BYTES, backups=SLOW_LOG_BACKUPS):
+        self.threshold_ms = threshold_ms
+        self.enabled = enabled
+        self._stats = {}  # форма запроса -> QueryStats
+        self._log = JsonLog(SLOW_LOG_FILENAME, log_path, max_bytes, backups)
+        # RLock: курсор может учитываться при удалении внутри блока с блокировкой
+        self._lock = threading.RLock()
+
+    @property
+    def log_path(self):
+        return self._log.path
+
+    def configure(self, threshold_ms=None, log_path=None, enabled=None):
+        """
+        Меняет настройки монитора
+
+        Args:
+            threshold_ms: порог медленного запроса в миллисекундах
+            log_path: файл журнала медленных запросов
+            enabled: учитывать ли запросы
+        """
+        with self._lock:
+            if threshold_ms is not None:
+                self.threshold_ms = threshold_ms
+            if enabled is not None:
+                self.enabled = enabled
+        if log_path is not None:
+            self._log.set_path(log_path)
+
+    def record(self, sql, duration, rows=0, error=None):
+        """
+        Учитывает выполненный запрос
+
+        Args:
+            sql: текст запроса
+            duration: длительность в секундах
+            rows: число строк (прочитанных или измененных)
+            error: исключение, если запрос завершился ошибкой
+        """
+        if not self.enabled:
+            return
+        shape = normalize_sql(sql)
+        duration_ms = duration * 1000
+        screen, function = find_caller()
+        caller = screen or function or "unknown"
+        slow = duration_ms >= self.threshold_ms
+
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = QueryStats(shape)
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.rows += rows
+            if duration_ms > stats.max_ms:
+                stats.max_ms = duration_ms
+            if error is not None:
+                stats.errors += 1
+            if slow:
+                stats.slow += 1
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+
+        if (slow or error is not None) and self._log.path is not None:
+            self._log.write({
+                'at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                'ms': round(duration_ms, 3),
+                'rows': rows,
+                'sql': shape,
+                'screen': screen,
+                'function': function,
+                'error': str(error) if error is not None else None,
+            }, "Ошибка записи журнала медленных запросов")
+
+    def snapshot(self, order_by='total_ms', limit=None):
+        """
+        Счетчики запросов
+
+        Args:
+            order_by: поле сортировки по убыванию (total_ms, count, max_ms, slow)
+            limit: ограничение числа форм
+
+        Returns:
+            list: словари QueryStats.as_dict()
+        """
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def export_json(self, path, order_by='total_ms'):
+        """
+        Сохраняет счетчики в JSON
+
+        Args:
+            path: путь к файлу
+            order_by: поле сортировки
+
+        Returns:
+            bool: True если файл записан
+        """
+        try:
+            document = {
+                'exported_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                'threshold_ms': self.threshold_ms,
+                'queries': self.snapshot(order_by),
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"Ошибка сохранения статистики запросов: {e}")
+            return False
+
+    def reset(self):
+        """Обнуляет счетчики"""
+        with self._lock:
+            self._stats.clear()
+
+    def close(self):
+        """Закрывает файл журнала"""
+        self._log.close()
+
+
+# Общий монитор приложения
+query_monitor = QueryMonitor()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Курсор SQLite, передающий запросы в монитор
+
+    SQLite выполняет SELECT по мере чтения строк, поэтому время чтения
+    (fetchone/fetchmany/fetchall и обход for row in cursor) прибавляется ко
+    времени execute, а запрос учитывается, когда результат прочитан до
+    конца, курсор закрыт или удален либо выполнен следующий запрос.
+    Запросы без результата (INSERT, UPDATE, DDL) учитываются сразу.
+    """
+
+    monitor = query_monitor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None  # [sql, длительность, строки]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = super().execute(sql, parameters)
+        except Exception as e:
+            self.monitor.record(sql, time.perf_counter() - started, 0, e)
+            raise
+        self._started(sql, time.perf_counter() - started)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = super().executemany(sql, seq_of_parameters)
+        except Exception as e:
+            self.monitor.record(sql, time.perf_counter() - started, 0, e)
+            raise
+        self.monitor.record(sql, time.perf_counter() - started, max(self.rowcount, 0))
+        return result
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - started, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(time.perf_counter() - started, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - started, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(time.perf_counter() - started, 0)
+            self._finish()
+            raise
+        self._fetched(time.perf_counter() - started, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Курсор, результат которого прочитан не до конца (например, один
+        # fetchone), учитывается при удалении
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _started(self, sql, duration):
+        if self.description is None:
+            self.monitor.record(sql, duration, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, duration, 0]
+
+    def _fetched(self, duration, rows):
+        if self._pending is not None:
+            self._pending[1] += duration
+            self._pending[2] += rows
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self.monitor.record(*pending)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Соединение SQLite, курсоры которого учитываются монитором
+
+    Connection.execute() и executemany() в C создают обычный курсор в обход
+    cursor(), поэтому переопределены отдельно.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,239 @@
+"""
+Модель отображения истории записей
+
+Записи из базы (кортежи select_records_by_user) один раз превращаются в
+компактные объекты RecordRow с готовыми строками для списка и строкой
+поиска в нижнем регистре. Строки хранятся в кэше по пользователю и
+обновляются точечно: добавление, редактирование и удаление записи
+пересчитывают только затронутые строки, а не всю историю.
+"""
+
+import threading
+
+from database import get_connection, select_records_by_user, select_record_by_id
+from utils.dates import format_date, DEFAULT_DATE_FORMAT
+
+# Разделитель полей в строке поиска (не встречается в поисковом запросе)
+SEARCH_SEPARATOR = "\x00"
+
+
+def _display_value(value):
+    return value if value else 'Н/Д'
+
+
+def _search_value(value):
+    return str(value).lower() if value else ""
+
+
+class RecordRow:
+    """
+    Строка истории записей
+
+    Args:
+        record: кортеж (id, weight, pressure_systolic, pressure_diastolic,
+                pulse, temperature, notes, record_date)
+        date_format: настройка date_format пользователя
+    """
+
+    __slots__ = ('record', 'date_text', 'primary_text', 'secondary_text', 'search_key')
+
+    def __init__(self, record, date_format=DEFAULT_DATE_FORMAT):
+        self.record = tuple(record)
+        self.secondary_text = (f"Вес: {_display_value(record[1])} кг, "
+                               f"Давление: {_display_value(record[2])}/{_display_value(record[3])}, "
+                               f"Пульс: {_display_value(record[4])}, "
+                               f"Темп.: {_display_value(record[5])}°C")
+        self.render_date(date_format)
+
+    @property
+    def id(self):
+        return self.record[0]
+
+    @property
+    def record_date(self):
+        return self.record[7]
+
+    def render_date(self, date_format):
+        """
+        Пересчитывает строки, зависящие от формата даты
+
+        Args:
+            date_format: настройка date_format пользователя
+        """
+        record = self.record
+        self.date_text = format_date(record[7], date_format)
+        self.primary_text = f"Дата: {self.date_text}"
+        self.search_key = SEARCH_SEPARATOR.join(
+            [_search_value(value) for value in record[1:7]] + [self.date_text.lower()]
+        )
+
+    def matches(self, query_lower):
+        """
+        Проверяет, содержит ли запись поисковый запрос
+
+        Args:
+            query_lower: запрос в нижнем регистре
+
+        Returns:
+            bool: True если запрос найден в одном из полей
+        """
+        return query_lower in self.search_key
+
+
+def _sort_key(record_date):
+    return "" if record_date is None else str(record_date)
+
+
+class RecordViewCache:
+    """
+    Кэш строк истории записей по пользователям
+
+    Строки пользователя хранятся в порядке select_records_by_user
+    (новые сверху) и загружаются из базы один раз.
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+    """
+
+    def __init__(self, connect=get_connection):
+        self.connect = connect
+        self._rows = {}  # user_id -> список RecordRow
+        self._formats = {}  # user_id -> date_format, с которым построены строки
+        self._lock = threading.Lock()
+
+    def get_rows(self, user_id, date_format=DEFAULT_DATE_FORMAT):
+        """
+        Возвращает строки истории пользователя
+
+        Args:
+            user_id: ID пользователя
+            date_format: настройка date_format пользователя
+
+        Returns:
+            list: RecordRow, новые записи сверху
+        """
+        with self._lock:
+            rows = self._rows.get(user_id)
+            if rows is not None:
+                if self._formats.get(user_id) != date_format:
+                    # Формат даты изменился - пересчитываем только строки с датой
+                    for row in rows:
+                        row.render_date(date_format)
+                    self._formats[user_id] = date_format
+                return list(rows)
+
+        conn = None
+        try:
+            conn = self.connect()
+            records = select_records_by_user(conn, user_id) or []
+        except Exception as e:
+            print(f"Ошибка загрузки истории записей: {e}")
+            return []
+        finally:
+            if conn is not None:
+                conn.close()
+
+        rows = [RecordRow(record, date_format) for record in records]
+        with self._lock:
+            self._rows[user_id] = rows
+            self._formats[user_id] = date_format
+        return list(rows)
+
+    def refresh_record(self, user_id, record_id, conn=None):
+        """
+        Перечитывает одну запись из базы после добавления или редактирования
+
+        Args:
+            user_id: ID пользователя
+            record_id: ID записи
+            conn: открытое соединение (None - открыть новое)
+
+        Returns:
+            RecordRow или None, если запись не найдена
+        """
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.connect()
+            record = select_record_by_id(conn, record_id)
+        except Exception as e:
+            print(f"Ошибка загрузки записи: {e}")
+            record = None
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+        if record is None:
+            self.remove(user_id, [record_id])
+            return None
+        return self.upsert(user_id, record)
+
+    def upsert(self, user_id, record):
+        """
+        Добавляет или заменяет строку записи
+
+        Если история пользователя еще не загружена, строка не создается:
+        она будет построена при первой загрузке.
+
+        Args:
+            user_id: ID пользователя
+            record: кортеж записи в формате select_records_by_user
+
+        Returns:
+            RecordRow или None
+        """
+        with self._lock:
+            rows = self._rows.get(user_id)
+            if rows is None:
+                return None
+
+            row = RecordRow(record, self._formats.get(user_id, DEFAULT_DATE_FORMAT))
+            for index, existing in enumerate(rows):
+                if existing.id == row.id:
+                    del rows[index]
+                    break
+
+            # Бинарный поиск позиции в списке, отсортированном по дате по убыванию
+            key = _sort_key(row.record_date)
+            low, high = 0, len(rows)
+            while low < high:
+                middle = (low + high) // 2
+                if _sort_key(rows[middle].record_date) >= key:
+                    low = middle + 1
+                else:
+                    high = middle
+            rows.insert(low, row)
+            return row
+
+    def remove(self, user_id, record_ids):
+        """
+        Удаляет строки записей
+
+        Args:
+            user_id: ID пользователя
+            record_ids: ID удаленных записей
+        """
+        record_ids = set(record_ids)
+        with self._lock:
+            rows = self._rows.get(user_id)
+            if rows is not None:
+                rows[:] = [row for row in rows if row.id not in record_ids]
+
+    def invalidate(self, user_id=None):
+        """
+        Сбрасывает кэш пользователя (None - весь кэш)
+
+        Args:
+            user_id: ID пользователя
+        """
+        with self._lock:
+            if user_id is None:
+                self._rows.clear()
+                self._formats.clear()
+            else:
+                self._rows.pop(user_id, None)
+                self._formats.pop(user_id, None)
+
+
+# Общий кэш истории записей приложения
+record_view_cache = RecordViewCache()
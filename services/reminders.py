@@ -0,0 +1,362 @@
+"""
+Планировщик напоминаний
+
+Включенные напоминания пользователя загружаются из таблицы reminders один
+раз при входе и хранятся в куче, упорядоченной по времени следующего
+срабатывания. Вместо периодического опроса планируется один отложенный
+вызов (в приложении - событие Kivy Clock) на время ближайшего напоминания;
+после срабатывания напоминание переносится на следующий день, а вызов -
+на новое ближайшее время. Изменение настроек меняет только свое
+напоминание, без повторного чтения таблицы.
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta, time as dt_time
+
+from database import get_connection, select_active_reminders, save_reminder
+
+# Тип напоминания, которым управляют настройки daily_reminders / reminder_time
+DAILY_REMINDER_TYPE = 'daily'
+DAILY_REMINDER_MESSAGE = "Пора заполнить дневник здоровья"
+
+
+def _thread_timer(callback, delay):
+    """Планировщик по умолчанию: отложенный вызов в отдельном потоке"""
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _default_notify(reminder):
+    """Показывает системное уведомление (plyer), при его отсутствии - пишет в консоль"""
+    try:
+        from plyer import notification
+        notification.notify(title="Дневник здоровья", message=reminder.message)
+    except Exception:
+        print(f"Напоминание: {reminder.message}")
+
+
+def parse_reminder_time(value):
+    """
+    Преобразует время напоминания в (часы, минуты)
+
+    Args:
+        value: строка 'ЧЧ:ММ[:СС]', datetime.time или timedelta (TIME в MySQL)
+
+    Returns:
+        tuple: (часы, минуты) или None, если значение не распознано
+    """
+    try:
+        if isinstance(value, dt_time):
+            return value.hour, value.minute
+        if isinstance(value, timedelta):
+            minutes = int(value.total_seconds()) // 60
+            return minutes // 60 % 24, minutes % 60
+        hours, minutes = str(value).split(':')[:2]
+        hours, minutes = int(hours), int(minutes)
+        if 0 <= hours < 24 and 0 <= minutes < 60:
+            return hours, minutes
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def next_fire_time(hours, minutes, now):
+    """Ближайший момент ЧЧ:ММ строго после now"""
+    candidate = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class Reminder:
+    """
+    Напоминание в планировщике
+
+    Args:
+        reminder_id: ID напоминания
+        user_id: ID пользователя
+        hours, minutes: время срабатывания
+        reminder_type: тип напоминания
+        message: текст
+    """
+
+    __slots__ = ('id', 'user_id', 'hours', 'minutes', 'reminder_type', 'message', 'fire_at')
+
+    def __init__(self, reminder_id, user_id, hours, minutes, reminder_type, message):
+        self.id = reminder_id
+        self.user_id = user_id
+        self.hours = hours
+        self.minutes = minutes
+        self.reminder_type = reminder_type
+        self.message = message
+        self.fire_at = None
+
+
+class ReminderScheduler:
+    """
+    Куча напоминаний с одним отложенным вызовом на ближайшее время
+
+    Удаленные и измененные напоминания не извлекаются из кучи сразу: их
+    старые элементы пропускаются, когда доходят до вершины.
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        scheduler: функция (callback, delay) -> объект с методом cancel()
+        notify: функция, вызываемая с Reminder при срабатывании
+        now: функция текущего времени (для тестов)
+    """
+
+    def __init__(self, connect=get_connection, scheduler=_thread_timer, notify=_default_notify, now=datetime.now):
+        self.connect = connect
+        self.scheduler = scheduler
+        self.notify = notify
+        self.now = now
+        self.fired = 0
+        self._reminders = {}  # ID -> Reminder
+        self._heap = []  # (fire_at, порядковый номер, ID)
+        self._counter = itertools.count()
+        self._event = None
+        self._event_at = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Загрузка и изменение напоминаний
+    # ------------------------------------------------------------------
+
+    def activate_user(self, user_id, settings=None, conn=None):
+        """
+        Загружает напоминания пользователя, вошедшего в приложение
+
+        Напоминания других пользователей удаляются из планировщика. Если
+        переданы настройки, ежедневное напоминание приводится в соответствие
+        с ними.
+
+        Args:
+            user_id: ID пользователя
+            settings: настройки пользователя (daily_reminders, reminder_time)
+            conn: открытое соединение (None - открыть новое)
+        """
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.connect()
+            rows = select_active_reminders(conn, user_id)
+
+            with self._lock:
+                self._reminders.clear()
+                self._heap = []
+                for reminder_id, row_user_id, reminder_time, reminder_type, message in rows:
+                    self._put(reminder_id, row_user_id, reminder_time, reminder_type, message)
+                self._reschedule()
+
+            if settings is not None:
+                self.apply_settings(user_id, settings, conn)
+
+        except Exception as e:
+            print(f"Ошибка загрузки напоминаний: {e}")
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+    def apply_settings(self, user_id, settings, conn=None):
+        """
+        Применяет настройки ежедневного напоминания
+
+        В базу пишется только изменившееся напоминание; если настройки
+        совпадают с уже запланированным напоминанием, ничего не происходит.
+
+        Args:
+            user_id: ID пользователя
+            settings: настройки пользователя
+            conn: открытое соединение (None - открыть новое)
+
+        Returns:
+            bool: True если напоминание изменилось
+        """
+        enabled = bool(settings.get('daily_reminders', False))
+        reminder_time = settings.get('reminder_time', '20:00')
+        parsed = parse_reminder_time(reminder_time)
+        if enabled and parsed is None:
+            print(f"Некорректное время напоминания: {reminder_time}")
+            return False
+
+        with self._lock:
+            current = self._find(user_id, DAILY_REMINDER_TYPE)
+            if current is None and not enabled:
+                return False
+            if current is not None and enabled and (current.hours, current.minutes) == parsed:
+                return False
+
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = self.connect()
+            reminder_id = save_reminder(conn, user_id, DAILY_REMINDER_TYPE, reminder_time,
+                                        DAILY_REMINDER_MESSAGE, enabled)
+        except Exception as e:
+            print(f"Ошибка сохранения напоминания: {e}")
+            return False
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+        if reminder_id is None:
+            return False
+        if enabled:
+            self.upsert(reminder_id, user_id, reminder_time, DAILY_REMINDER_TYPE, DAILY_REMINDER_MESSAGE)
+        else:
+            self.remove(reminder_id)
+        return True
+
+    def upsert(self, reminder_id, user_id, reminder_time, reminder_type, message):
+        """
+        Добавляет или изменяет напоминание
+
+        Args:
+            reminder_id: ID напоминания
+            user_id: ID пользователя
+            reminder_time: время 'ЧЧ:ММ'
+            reminder_type: тип напоминания
+            message: текст
+        """
+        with self._lock:
+            self._put(reminder_id, user_id, reminder_time, reminder_type, message)
+            self._reschedule()
+
+    def remove(self, reminder_id):
+        """
+        Удаляет напоминание из планировщика
+
+        Args:
+            reminder_id: ID напоминания
+        """
+        with self._lock:
+            if self._reminders.pop(reminder_id, None) is not None:
+                self._reschedule()
+
+    def clear(self):
+        """Удаляет все напоминания (выход пользователя)"""
+        with self._lock:
+            self._reminders.clear()
+            self._heap = []
+            self._reschedule()
+
+    def stop(self):
+        """Отменяет запланированный вызов"""
+        with self._lock:
+            self._cancel_event()
+
+    def pending(self):
+        """
+        Возвращает запланированные напоминания
+
+        Returns:
+            list: Reminder по возрастанию времени срабатывания
+        """
+        with self._lock:
+            return sorted(self._reminders.values(), key=lambda reminder: reminder.fire_at)
+
+    @property
+    def next_fire_at(self):
+        """Время запланированного вызова или None"""
+        return self._event_at
+
+    # ------------------------------------------------------------------
+    # Срабатывание
+    # ------------------------------------------------------------------
+
+    def run_due(self, *args):
+        """
+        Вызывает все наступившие напоминания и планирует следующий вызов
+
+        Returns:
+            int: число сработавших напоминаний
+        """
+        due = []
+        with self._lock:
+            self._event = None
+            self._event_at = None
+            now = self.now()
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, reminder_id = heapq.heappop(self._heap)
+                reminder = self._reminders.get(reminder_id)
+                if reminder is None or reminder.fire_at != fire_at:
+                    continue  # удаленное или перенесенное напоминание
+                due.append(reminder)
+                # Следующее срабатывание считается от текущего времени: после сна
+                # устройства пропущенные дни не вызываются повторно
+                self._push(reminder, next_fire_time(reminder.hours, reminder.minutes, now))
+            self._reschedule()
+
+        for reminder in due:
+            self.fired += 1
+            try:
+                self.notify(reminder)
+            except Exception as e:
+                print(f"Ошибка показа напоминания: {e}")
+        return len(due)
+
+    # ------------------------------------------------------------------
+    # Вспомогательные методы (вызываются под блокировкой)
+    # ------------------------------------------------------------------
+
+    def _put(self, reminder_id, user_id, reminder_time, reminder_type, message):
+        parsed = parse_reminder_time(reminder_time)
+        if parsed is None:
+            print(f"Напоминание {reminder_id} пропущено: некорректное время {reminder_time}")
+            self._reminders.pop(reminder_id, None)
+            return
+        reminder = Reminder(reminder_id, user_id, parsed[0], parsed[1], reminder_type, message)
+        self._reminders[reminder_id] = reminder
+        self._push(reminder, next_fire_time(parsed[0], parsed[1], self.now()))
+
+    def _push(self, reminder, fire_at):
+        reminder.fire_at = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._counter), reminder.id))
+
+    def _find(self, user_id, reminder_type):
+        for reminder in self._reminders.values():
+            if reminder.user_id == user_id and reminder.reminder_type == reminder_type:
+                return reminder
+        return None
+
+    def _reschedule(self):
+        # Убираем с вершины устаревшие элементы
+        while self._heap:
+            fire_at, _, reminder_id = self._heap[0]
+            reminder = self._reminders.get(reminder_id)
+            if reminder is not None and reminder.fire_at == fire_at:
+                break
+            heapq.heappop(self._heap)
+
+        # Куча разрастается устаревшими элементами только при частых изменениях
+        if len(self._heap) > 2 * len(self._reminders) + 16:
+            self._heap = [(reminder.fire_at, next(self._counter), reminder.id)
+                          for reminder in self._reminders.values()]
+            heapq.heapify(self._heap)
+
+        next_at = self._heap[0][0] if self._heap else None
+        if next_at == self._event_at and self._event is not None:
+            return
+        self._cancel_event()
+        if next_at is not None:
+            delay = max(0.0, (next_at - self.now()).total_seconds())
+            self._event = self.scheduler(self.run_due, delay)
+            self._event_at = next_at
+
+    def _cancel_event(self):
+        if self._event is not None:
+            try:
+                self._event.cancel()
+            except Exception:
+                pass
+        self._event = None
+        self._event_at = None
+
+
+# Общий планировщик приложения
+reminder_scheduler = ReminderScheduler()
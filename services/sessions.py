@@ -0,0 +1,164 @@
+"""
+Сессии автоматического входа
+
+Содержит:
+1. SessionValidationCache - кратковременный кэш результатов проверки
+   сессии устройства, чтобы повторные проверки не обращались к базе
+2. SessionSweeper - периодическое удаление истекших сессий порциями
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from database import get_connection, select_user_session_by_device, sweep_expired_sessions
+
+# Время жизни результата проверки сессии в кэше (секунды)
+SESSION_CACHE_TTL = 30
+
+# Период очистки истекших сессий (секунды) и размер одной порции удаления
+SESSION_SWEEP_INTERVAL = 6 * 60 * 60
+SESSION_SWEEP_BATCH = 500
+
+
+class SessionValidationCache:
+    """
+    Кэш результатов проверки сессий по device_id
+
+    Кэшируются и найденные сессии, и их отсутствие. Записи живут ttl секунд;
+    при сохранении или удалении сессии запись нужно сбросить через invalidate().
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        ttl: время жизни записи в секундах
+    """
+
+    def __init__(self, connect=get_connection, ttl=SESSION_CACHE_TTL):
+        self.connect = connect
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # device_id -> (время истечения записи, результат)
+        self._lock = threading.Lock()
+
+    def lookup(self, device_id, now=None):
+        """
+        Возвращает активную сессию устройства
+
+        Args:
+            device_id: ID устройства
+
+        Returns:
+            tuple (user_id, email, name, is_admin) или None
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = None
+        conn = None
+        try:
+            conn = self.connect()
+            result = select_user_session_by_device(conn, device_id)
+        except Exception as e:
+            # Ошибку подключения не кэшируем - следующая проверка повторит запрос
+            print(f"Ошибка проверки сессии: {e}")
+            return None
+        finally:
+            if conn is not None:
+                conn.close()
+
+        with self._lock:
+            self._entries[device_id] = (now + self.ttl, result)
+        return result
+
+    def invalidate(self, device_id=None):
+        """
+        Сбрасывает кэш устройства (None - весь кэш)
+
+        Args:
+            device_id: ID устройства
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
+
+
+class SessionSweeper:
+    """
+    Периодическая очистка истекших сессий
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        interval: период очистки в секундах
+        batch_size: число строк, удаляемых за одну транзакцию
+    """
+
+    def __init__(self, connect=get_connection, interval=SESSION_SWEEP_INTERVAL,
+                 batch_size=SESSION_SWEEP_BATCH):
+        self.connect = connect
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_sweep_at = None
+        self.last_reclaimed = 0
+        self.total_reclaimed = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, interval=None):
+        """Запускает фоновую очистку"""
+        if interval is not None:
+            self.interval = interval
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Останавливает фоновую очистку"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sweep_once()
+            self._stop_event.wait(self.interval)
+
+    def sweep_once(self):
+        """
+        Удаляет все истекшие сессии
+
+        Returns:
+            int: число удаленных сессий
+        """
+        conn = None
+        reclaimed = 0
+        try:
+            conn = self.connect()
+            reclaimed = sweep_expired_sessions(conn, self.batch_size)
+        except Exception as e:
+            print(f"Ошибка очистки сессий: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+        self.last_sweep_at = datetime.now()
+        self.last_reclaimed = reclaimed
+        self.total_reclaimed += reclaimed
+        if reclaimed:
+            print(f"Удалено истекших сессий: {reclaimed}")
+        return reclaimed
+
+
+# Общие объекты приложения
+session_cache = SessionValidationCache()
+session_sweeper = SessionSweeper()
@@ -0,0 +1,334 @@
+"""
+Хранилище настроек пользователей
+
+Настройки каждого пользователя загружаются из базы один раз и дальше
+хранятся в памяти. Изменения помечаются по ключам и через небольшую
+задержку записываются одним запросом upsert_user_settings, содержащим
+только измененные ключи. Несколько быстрых изменений подряд
+(например, переключатели на экране настроек) объединяются в одну запись.
+
+Одновременные загрузки настроек одного пользователя объединяются: запрос
+к базе выполняет первый вызов, остальные ждут его результата. Экраны и
+приложение подписываются на изменения (subscribe) и получают настройки
+при входе пользователя (hydrate) и после каждого изменения.
+
+Если настройки не удалось прочитать (ошибка базы, поврежденный JSON),
+они не кэшируются и не перезаписываются: get возвращает настройки по
+умолчанию, изменения не принимаются, следующий вызов повторяет чтение.
+"""
+
+import json
+import threading
+
+from database import get_connection, upsert_user_settings
+
+# Настройки по умолчанию для новых пользователей
+DEFAULT_SETTINGS = {
+    'theme_color': 'blue',  # Цветовая тема
+    'dark_mode': False,  # Темный режим
+    'daily_reminders': False,  # Ежедневные напоминания
+    'reminder_time': '20:00',  # Время напоминаний
+    'notification_sound': True,  # Звук уведомлений
+    'date_format': 'dd-mm-yyyy',  # Формат даты
+    'auto_export': False,  # Автоматический экспорт
+    'auto_login': True,  # Автоматический вход
+    'biometric_auth': False,  # Биометрическая аутентификация
+    'auto_logout': False  # Автоматический выход
+}
+
+
+def _thread_timer(callback, delay):
+    """Планировщик по умолчанию: отложенный вызов в отдельном потоке"""
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class SettingsStore:
+    """
+    Кэш настроек пользователей с объединением записей
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        flush_delay: задержка перед записью изменений в секундах
+        scheduler: функция (callback, delay) -> объект с методом cancel();
+            в приложении используется Kivy Clock, чтобы запись шла в главном потоке
+    """
+
+    def __init__(self, connect=get_connection, flush_delay=0.5, scheduler=_thread_timer):
+        self.connect = connect
+        self.flush_delay = flush_delay
+        self.scheduler = scheduler
+        self._settings = {}  # user_id -> dict настроек
+        self._dirty = {}  # user_id -> set измененных ключей
+        self._loading = {}  # user_id -> threading.Event выполняющейся загрузки
+        self._observers = []
+        self._pending_flush = None
+        self._lock = threading.RLock()
+        self.loads = 0  # число чтений настроек из базы
+
+    def get(self, user_id):
+        """
+        Возвращает копию настроек пользователя
+
+        При первом обращении настройки читаются из базы; если их там нет,
+        создаются настройки по умолчанию и планируется их сохранение.
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            dict: настройки пользователя (по умолчанию, если чтение не удалось)
+        """
+        if not self._ensure_loaded(user_id):
+            return dict(DEFAULT_SETTINGS)
+        with self._lock:
+            return dict(self._settings[user_id])
+
+    def hydrate(self, user_id):
+        """
+        Загружает настройки при входе пользователя и рассылает их подписчикам
+
+        Настройки читаются из базы не больше одного раза; подписчики
+        получают их с changed=None (полный набор настроек).
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            dict: настройки пользователя или None, если их не удалось прочитать
+        """
+        if not self._ensure_loaded(user_id):
+            return None
+        settings = self.get(user_id)
+        self._notify(user_id, settings, None)
+        return settings
+
+    def subscribe(self, callback):
+        """
+        Подписывает на настройки пользователей
+
+        Args:
+            callback: функция (user_id, settings, changed); changed - None при
+                загрузке настроек (hydrate) или множество измененных ключей
+
+        Returns:
+            функция без аргументов, отменяющая подписку
+        """
+        with self._lock:
+            self._observers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        """Отменяет подписку"""
+        with self._lock:
+            if callback in self._observers:
+                self._observers.remove(callback)
+
+    def peek(self, user_id):
+        """Возвращает настройки из памяти без обращения к базе (или None)"""
+        with self._lock:
+            settings = self._settings.get(user_id)
+            return dict(settings) if settings is not None else None
+
+    def set(self, user_id, key, value):
+        """
+        Изменяет одну настройку
+
+        Args:
+            user_id: ID пользователя
+            key: имя настройки
+            value: новое значение
+        """
+        self.update(user_id, {key: value})
+
+    def update(self, user_id, values):
+        """
+        Изменяет несколько настроек
+
+        В базу попадут только ключи, значения которых действительно изменились
+
+        Args:
+            user_id: ID пользователя
+            values: словарь новых значений
+
+        Returns:
+            set: имена изменившихся настроек (пустое множество, если
+            сохраненные настройки не удалось прочитать)
+        """
+        if not self._ensure_loaded(user_id):
+            print(f"Настройки пользователя {user_id} не загружены, изменения не сохранены")
+            return set()
+        with self._lock:
+            current = self._settings[user_id]
+            changed = {key for key, value in values.items() if current.get(key, _MISSING) != value}
+            if not changed:
+                return changed
+
+            for key in changed:
+                current[key] = values[key]
+            self._dirty.setdefault(user_id, set()).update(changed)
+            self._schedule_flush()
+            settings = dict(current)
+
+        self._notify(user_id, settings, changed)
+        return changed
+
+    def flush(self, user_id=None):
+        """
+        Немедленно записывает накопленные изменения
+
+        Args:
+            user_id: ID пользователя (None - все пользователи)
+
+        Returns:
+            int: число выполненных запросов к базе
+        """
+        with self._lock:
+            if user_id is None and self._pending_flush is not None:
+                self._pending_flush.cancel()
+                self._pending_flush = None
+
+            user_ids = [user_id] if user_id is not None else list(self._dirty)
+            patches = {}
+            for uid in user_ids:
+                keys = self._dirty.pop(uid, None)
+                if keys:
+                    settings = self._settings[uid]
+                    patches[uid] = {key: settings[key] for key in keys}
+
+        if not patches:
+            return 0
+
+        writes = 0
+        conn = None
+        try:
+            conn = self.connect()
+            for uid, patch in patches.items():
+                if upsert_user_settings(conn, uid, json.dumps(patch)):
+                    writes += 1
+                else:
+                    self._restore_dirty(uid, patch)
+        except Exception as e:
+            print(f"Ошибка записи настроек: {e}")
+            for uid, patch in patches.items():
+                self._restore_dirty(uid, patch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+        return writes
+
+    def invalidate(self, user_id):
+        """
+        Забывает настройки пользователя (например, после синхронизации с сервером)
+
+        Несохраненные изменения сначала записываются в базу
+        """
+        self.flush(user_id)
+        with self._lock:
+            self._settings.pop(user_id, None)
+
+    def has_pending_changes(self, user_id=None):
+        """Есть ли несохраненные изменения"""
+        with self._lock:
+            if user_id is None:
+                return any(self._dirty.values())
+            return bool(self._dirty.get(user_id))
+
+    def _ensure_loaded(self, user_id):
+        """
+        Загружает настройки, если их еще нет в памяти
+
+        Запрос к базе выполняется без блокировки хранилища: загрузки разных
+        пользователей не ждут друг друга, а повторные вызовы для того же
+        пользователя ждут уже выполняющуюся загрузку.
+
+        Returns:
+            bool: True, если настройки в памяти; False при ошибке чтения
+        """
+        while True:
+            with self._lock:
+                if user_id in self._settings:
+                    return True
+                loading = self._loading.get(user_id)
+                if loading is None:
+                    loading = self._loading[user_id] = threading.Event()
+                    break
+            loading.wait()
+
+        loaded = False
+        settings = None
+        try:
+            settings = self._read(user_id)
+            loaded = True
+        except Exception as e:
+            print(f"Ошибка загрузки настроек: {e}")
+        finally:
+            with self._lock:
+                if loaded:
+                    if settings is None:
+                        # Настроек нет - создаем по умолчанию и сохраняем их
+                        settings = dict(DEFAULT_SETTINGS)
+                        self._dirty.setdefault(user_id, set()).update(settings)
+                        self._schedule_flush()
+                    self._settings[user_id] = settings
+                del self._loading[user_id]
+            loading.set()
+        return loaded
+
+    def _read(self, user_id):
+        """
+        Читает настройки из базы
+
+        Returns:
+            dict настроек или None, если у пользователя их еще нет
+
+        Raises:
+            Exception: ошибка базы или поврежденный JSON - в отличие от
+            отсутствия настроек, такой результат нельзя заменять настройками по умолчанию
+        """
+        conn = self.connect()
+        try:
+            with self._lock:
+                self.loads += 1
+            ph = '?' if hasattr(conn, 'isolation_level') else '%s'
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT settings FROM user_settings WHERE user_id = {ph}", (user_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def _notify(self, user_id, settings, changed):
+        with self._lock:
+            observers = list(self._observers)
+        for callback in observers:
+            try:
+                callback(user_id, dict(settings), changed)
+            except Exception as e:
+                print(f"Ошибка обработки изменения настроек: {e}")
+
+    def _restore_dirty(self, user_id, patch):
+        with self._lock:
+            self._dirty.setdefault(user_id, set()).update(patch)
+
+    def _schedule_flush(self):
+        # Повторное изменение откладывает запись: серия изменений дает один запрос
+        if self._pending_flush is not None:
+            self._pending_flush.cancel()
+        self._pending_flush = self.scheduler(self._flush_scheduled, self.flush_delay)
+
+    def _flush_scheduled(self, *args):
+        with self._lock:
+            self._pending_flush = None
+        self.flush()
+
+
+_MISSING = object()
+
+# Общее хранилище настроек приложения
+settings_store = SettingsStore()
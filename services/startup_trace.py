@@ -0,0 +1,219 @@
+"""
+Трассировка холодного старта приложения
+
+main.py импортирует этот модуль первым и отмечает фазы запуска: импорт
+Kivy и модулей приложения, инициализацию базы, компиляцию KV-разметок,
+создание экранов, запуск фоновых служб, ожидание первого кадра и
+автоматический вход с загрузкой настроек. Фазы могут быть вложенными.
+После завершения запуска строится отчет: длительность каждой фазы,
+суммы по именам и сравнение с бюджетом времени.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Бюджет запуска по умолчанию, мс: 'total' - весь запуск, остальные - фазы по имени
+DEFAULT_BUDGET_MS = {
+    'total': 2000,
+    'imports_kivy': 600,
+    'imports_app': 300,
+    'db_init': 150,
+    'kv': 250,
+    'app_init': 50,
+    'app_start': 150,
+    'screens': 400,
+    'services': 100,
+    'first_frame': 250,
+    'auto_login': 200,
+}
+
+# Файл бюджета, переопределяющего значения по умолчанию
+BUDGET_ENV = "HEALTH_DIARY_STARTUP_BUDGET"
+BUDGET_FILENAME = "startup_budget.json"
+REPORT_FILENAME = "startup_report.json"
+
+
+def process_age():
+    """
+    Время с запуска процесса в секундах (Linux и Android)
+
+    Включает запуск интерпретатора до импорта main.py, который трассировка
+    сама не видит.
+
+    Returns:
+        float: секунды или None, если время запуска процесса недоступно
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Имя процесса может содержать пробелы, поля считаются после ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started)
+    except Exception:
+        return None
+
+
+def load_budget(path=None):
+    """
+    Бюджет запуска: значения по умолчанию, переопределенные файлом JSON
+
+    Args:
+        path: файл бюджета {"total": 2000, "kv": 200, ...}
+            (по умолчанию - из переменной окружения HEALTH_DIARY_STARTUP_BUDGET)
+
+    Returns:
+        dict: {фаза: мс}
+    """
+    budget = dict(DEFAULT_BUDGET_MS)
+    path = path or os.environ.get(BUDGET_ENV)
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                budget.update({name: float(ms) for name, ms in json.load(f).items()})
+        except Exception as e:
+            print(f"Ошибка чтения бюджета запуска {path}: {e}")
+    return budget
+
+
+class StartupTrace:
+    """
+    Фазы запуска приложения
+
+    Args:
+        clock: источник времени в секундах
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.before_trace = process_age()
+        self.finished = None
+        self.phases = []  # {'name', 'start_ms', 'ms', 'depth'}
+        self._stack = []
+        self._last_end = self.started
+
+    @property
+    def active(self):
+        return self.finished is None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Замеряет фазу запуска; вложенные фазы получают больший depth
+
+        После finish() фазы не записываются.
+        """
+        if not self.active:
+            yield
+            return
+        entry = {'name': name, 'start_ms': self._ms(self.clock()), 'ms': None, 'depth': len(self._stack)}
+        self.phases.append(entry)
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            now = self.clock()
+            self._stack.pop()
+            entry['ms'] = round(self._ms(now) - entry['start_ms'], 3)
+            if not self._stack:
+                self._last_end = now
+
+    def mark(self, name):
+        """
+        Записывает фазу от конца предыдущей фазы верхнего уровня до текущего момента
+
+        Используется там, где фазу нельзя обернуть в phase(): импорты модулей,
+        ожидание первого кадра.
+        """
+        if not self.active or self._stack:
+            return
+        now = self.clock()
+        start_ms = self._ms(self._last_end)
+        self.phases.append({'name': name, 'start_ms': start_ms, 'ms': round(self._ms(now) - start_ms, 3),
+                            'depth': 0})
+        self._last_end = now
+
+    def finish(self):
+        """Завершает трассировку; повторные вызовы ничего не меняют"""
+        if self.active:
+            self.finished = self.clock()
+
+    def totals(self):
+        """Суммарная длительность фаз по имени, мс"""
+        totals = {}
+        for entry in self.phases:
+            if entry['ms'] is not None:
+                totals[entry['name']] = round(totals.get(entry['name'], 0.0) + entry['ms'], 3)
+        return totals
+
+    def report(self, budget=None):
+        """
+        Отчет о запуске
+
+        Args:
+            budget: {фаза: мс}; 'total' - бюджет всего запуска
+
+        Returns:
+            dict: total_ms, before_trace_ms, phases, totals, budget,
+            over_budget [{'phase', 'ms', 'budget_ms'}] и within_budget
+        """
+        end = self.finished if self.finished is not None else self.clock()
+        total_ms = round(self._ms(end), 3)
+        totals = self.totals()
+        budget = budget or {}
+
+        over_budget = []
+        for name, limit in budget.items():
+            ms = total_ms if name == 'total' else totals.get(name)
+            if ms is not None and ms > limit:
+                over_budget.append({'phase': name, 'ms': ms, 'budget_ms': limit})
+
+        return {
+            'created_at': datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            'total_ms': total_ms,
+            'before_trace_ms': round(self.before_trace * 1000, 1) if self.before_trace is not None else None,
+            'phases': [dict(entry) for entry in self.phases],
+            'totals': totals,
+            'budget': dict(budget),
+            'over_budget': over_budget,
+            'within_budget': not over_budget,
+        }
+
+    def _ms(self, moment):
+        return (moment - self.started) * 1000
+
+
+def print_report(report):
+    """Печатает фазы запуска и превышения бюджета"""
+    print(f"\nЗапуск приложения: {report['total_ms']:.0f} мс"
+          + (f" (+{report['before_trace_ms']:.0f} мс до импорта main.py)" if report['before_trace_ms'] else ""))
+    for entry in report['phases']:
+        ms = f"{entry['ms']:.1f}" if entry['ms'] is not None else "-"
+        print(f"  {'  ' * entry['depth']}{entry['name']:<{30 - 2 * entry['depth']}}{ms:>10} мс")
+    for item in report['over_budget']:
+        print(f"  Превышен бюджет {item['phase']}: {item['ms']:.0f} мс при бюджете {item['budget_ms']:.0f} мс")
+
+
+def write_report(report, path):
+    """
+    Сохраняет отчет о запуске в JSON
+
+    Returns:
+        bool: True если файл записан
+    """
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        print(f"Ошибка сохранения отчета о запуске: {e}")
+        return False
+
+
+# Трассировка текущего запуска: время отсчитывается от импорта модуля
+startup_trace = StartupTrace()
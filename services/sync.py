@@ -0,0 +1,565 @@
+"""
+Движок синхронизации локальной базы SQLite с сервером MySQL
+
+Локальная база — основной источник данных приложения. Все изменения таблиц
+records и user_settings фиксируются триггерами в журнале sync_log
+(см. database.SYNC_TRIGGERS_SQL), а движок периодически:
+1. Отправляет накопленные изменения на сервер пакетами (push)
+2. Забирает изменения других устройств из серверного журнала (pull)
+3. Разрешает конфликты по правилу "побеждает последняя запись": версии
+   строк сравниваются по updated_at, удаление - по времени записи журнала
+   (changed_at)
+
+Сервером может выступать MySQL или второй файл SQLite с той же схемой.
+Записи гостей (user_id < 0) на сервер не отправляются.
+
+Идентификаторы пользователей на устройствах и на сервере независимы,
+поэтому user_id в передаваемых строках сопоставляется по email; если
+пользователя нет на принимающей стороне, он создается. Отправленные
+изменения удаляются из локального журнала.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+
+from database import get_connection, connect_sqlite, init_sync_tables, refresh_users_search
+
+# Синхронизируемые таблицы: ключ строки и переносимые столбцы
+SYNC_TABLES = {
+    'records': {
+        'key': 'sync_uid',
+        'columns': ['sync_uid', 'user_id', 'record_date', 'weight', 'pressure_systolic',
+                    'pressure_diastolic', 'pulse', 'temperature', 'notes', 'created_at', 'updated_at'],
+    },
+    'user_settings': {
+        'key': 'user_id',
+        'columns': ['user_id', 'settings', 'updated_at'],
+    },
+}
+
+# Столбцы users, переносимые при создании пользователя на другой стороне
+USER_COLUMNS = ['email', 'password_hash', 'name', 'is_admin', 'created_at']
+
+
+class Backoff:
+    """
+    Экспоненциальная задержка между попытками подключения к серверу
+
+    После каждой неудачи интервал удваивается (до max_delay),
+    успешное подключение сбрасывает его.
+    """
+
+    def __init__(self, base_delay=5.0, max_delay=600.0, factor=2.0, jitter=0.1):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.failures = 0
+        self.next_attempt_at = 0.0
+
+    def ready(self, now=None):
+        """Можно ли выполнять следующую попытку"""
+        now = time.monotonic() if now is None else now
+        return now >= self.next_attempt_at
+
+    def remaining(self, now=None):
+        """Сколько секунд осталось до следующей попытки"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.next_attempt_at - now)
+
+    def record_failure(self, now=None):
+        """Фиксирует неудачную попытку и возвращает новую задержку"""
+        now = time.monotonic() if now is None else now
+        delay = min(self.max_delay, self.base_delay * (self.factor ** self.failures))
+        delay += delay * self.jitter * random.random()
+        self.failures += 1
+        self.next_attempt_at = now + delay
+        return delay
+
+    def record_success(self):
+        """Сбрасывает задержку после успешной попытки"""
+        self.failures = 0
+        self.next_attempt_at = 0.0
+
+
+def _placeholder(conn):
+    """Возвращает маркер параметра для драйвера ('?' для SQLite, '%s' для pymysql)"""
+    return '?' if isinstance(conn, sqlite3.Connection) else '%s'
+
+
+def _timestamp(value):
+    """Приводит DATETIME к строке 'YYYY-MM-DD HH:MM:SS' для сравнения версий"""
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)[:19]
+
+
+class SyncEngine:
+    """
+    Инкрементальная синхронизация локальной базы с сервером
+
+    Args:
+        local_path: путь к локальному файлу SQLite
+        remote_connect: функция без аргументов, открывающая соединение с сервером
+        origin: идентификатор устройства (чтобы не забирать свои же изменения)
+        batch_size: максимальное число изменений за один обмен с сервером
+        on_remote_change: функция (table, keys, user_ids), вызываемая после
+            применения изменений с сервера (например, для сброса кэша
+            настроек); user_ids - локальные id пользователей, чьи строки
+            изменились или удалены
+    """
+
+    def __init__(self, local_path, remote_connect, origin, batch_size=200, backoff=None,
+                 on_remote_change=None):
+        self.local_path = local_path
+        self.remote_connect = remote_connect
+        self.origin = origin
+        self.batch_size = batch_size
+        self.backoff = backoff or Backoff()
+        self.on_remote_change = on_remote_change
+        self.last_result = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Запуск и остановка фоновой синхронизации
+    # ------------------------------------------------------------------
+
+    def start(self, interval=60.0):
+        """
+        Запускает синхронизацию в фоновом потоке
+
+        Args:
+            interval: период синхронизации в секундах при доступном сервере
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Останавливает фоновую синхронизацию"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            self.sync_once()
+            # При недоступном сервере ждем столько, сколько требует backoff
+            wait = max(interval, self.backoff.remaining())
+            self._stop_event.wait(wait)
+
+    # ------------------------------------------------------------------
+    # Один цикл синхронизации
+    # ------------------------------------------------------------------
+
+    def sync_once(self, force=False):
+        """
+        Выполняет один цикл push + pull
+
+        Args:
+            force: игнорировать задержку backoff
+
+        Returns:
+            dict со счетчиками pushed/pulled/conflicts или None,
+            если сервер недоступен или попытка отложена
+        """
+        if not force and not self.backoff.ready():
+            return None
+
+        with self._lock:
+            local = None
+            remote = None
+            try:
+                remote = self.remote_connect()
+            except Exception as e:
+                self.last_error = str(e)
+                delay = self.backoff.record_failure()
+                print(f"Сервер синхронизации недоступен: {e}. Повтор через {delay:.0f} c")
+                return None
+
+            try:
+                local = connect_sqlite(self.local_path)
+                init_sync_tables(local)
+
+                result = {'pushed': 0, 'pulled': 0, 'conflicts': 0}
+                self._push(local, remote, result)
+                self._pull(local, remote, result)
+
+                self.backoff.record_success()
+                self.last_error = None
+                self.last_result = result
+                return result
+
+            except Exception as e:
+                self.last_error = str(e)
+                self.backoff.record_failure()
+                print(f"Ошибка синхронизации: {e}")
+                return None
+            finally:
+                if local is not None:
+                    local.close()
+                try:
+                    remote.close()
+                except Exception:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Push: локальные изменения -> сервер
+    # ------------------------------------------------------------------
+
+    def _push(self, local, remote, result):
+        cursor = local.cursor()
+        while True:
+            cursor.execute(
+                "SELECT id, table_name, row_key, op, changed_at FROM sync_log WHERE synced = 0 ORDER BY id LIMIT ?",
+                (self.batch_size,)
+            )
+            changes = cursor.fetchall()
+            if not changes:
+                return
+
+            # Для каждой строки важна только последняя операция
+            latest = {}
+            changed_at = {}
+            for log_id, table, key, op, changed in changes:
+                latest[(table, key)] = op
+                changed_at[(table, key)] = _timestamp(changed)
+
+            remote_cursor = remote.cursor()
+            ph = _placeholder(remote)
+            remote_log = []
+
+            for table, spec in SYNC_TABLES.items():
+                upserts = [key for (t, key), op in latest.items() if t == table and op == 'upsert']
+                deletes = [key for (t, key), op in latest.items() if t == table and op == 'delete']
+
+                if upserts:
+                    rows = self._fetch_rows(local, '?', table, spec, upserts)
+                    # Записи гостей остаются только на устройстве
+                    if table == 'records':
+                        rows = {k: r for k, r in rows.items() if r['user_id'] is not None and r['user_id'] >= 0}
+                    rows = self._map_rows(local, '?', remote, ph, spec, rows)
+                    remote_versions = self._fetch_versions(remote, ph, table, spec, list(rows))
+
+                    to_update, to_insert = [], []
+                    for key, row in rows.items():
+                        remote_version = remote_versions.get(key)
+                        if remote_version is None:
+                            to_insert.append(row)
+                        elif remote_version > _timestamp(row['updated_at']):
+                            # На сервере более свежая версия - она придет при pull
+                            result['conflicts'] += 1
+                        else:
+                            to_update.append(row)
+
+                    self._write_rows(remote_cursor, ph, table, spec, to_update, to_insert)
+                    for row in to_update + to_insert:
+                        remote_log.append((table, str(row[spec['key']]), 'upsert', self.origin,
+                                           changed_at[(table, str(row[spec['key']]))] or None))
+                    result['pushed'] += len(to_update) + len(to_insert)
+
+                # Время удаления - время записи локального журнала
+                deleted_at = {key: changed_at[(table, key)] for key in deletes}
+                if deletes and spec['key'] == 'user_id':
+                    # Пользователь удален вместе с настройками - сопоставить его уже не с чем
+                    users = self._map_users(local, '?', remote, ph, deletes, create=False)
+                    deleted_at = {str(users[int(key)]): deleted_at[key] for key in deletes if int(key) in users}
+                    deletes = list(deleted_at)
+                if deletes:
+                    remote_versions = self._fetch_versions(remote, ph, table, spec, deletes)
+                    # Строка, измененная на сервере позже удаления, остается и придет при pull
+                    newer = {key for key in deletes if remote_versions.get(key, '') > deleted_at[key]}
+                    result['conflicts'] += len(newer)
+                    deletes = [key for key in deletes if key not in newer]
+                if deletes:
+                    marks = ", ".join([ph] * len(deletes))
+                    remote_cursor.execute(f"DELETE FROM {table} WHERE {spec['key']} IN ({marks})",
+                                          [self._key_value(spec, key) for key in deletes])
+                    for key in deletes:
+                        remote_log.append((table, key, 'delete', self.origin, deleted_at[key] or None))
+                    result['pushed'] += len(deletes)
+
+            if remote_log:
+                remote_cursor.executemany(
+                    f"INSERT INTO sync_log (table_name, row_key, op, origin, changed_at) "
+                    f"VALUES ({ph}, {ph}, {ph}, {ph}, COALESCE({ph}, CURRENT_TIMESTAMP))",
+                    remote_log
+                )
+            remote.commit()
+
+            # Удаляем отправленные изменения только после фиксации на сервере.
+            # Журнал читается по возрастанию id, новые строки получают больший id
+            cursor.execute("DELETE FROM sync_log WHERE id <= ?", (changes[-1][0],))
+            local.commit()
+
+            if len(changes) < self.batch_size:
+                return
+
+    # ------------------------------------------------------------------
+    # Pull: изменения других устройств -> локальная база
+    # ------------------------------------------------------------------
+
+    def _pull(self, local, remote, result):
+        cursor = local.cursor()
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'remote_log_id'")
+        row = cursor.fetchone()
+        last_id = int(row[0]) if row else 0
+
+        remote_cursor = remote.cursor()
+        ph = _placeholder(remote)
+
+        while True:
+            remote_cursor.execute(
+                f"SELECT id, table_name, row_key, op, changed_at FROM sync_log "
+                f"WHERE id > {ph} AND COALESCE(origin, '') != {ph} ORDER BY id LIMIT {ph}",
+                (last_id, self.origin, self.batch_size)
+            )
+            changes = remote_cursor.fetchall()
+            if not changes:
+                return
+
+            latest = {}
+            changed_at = {}
+            for log_id, table, key, op, changed in changes:
+                latest[(table, key)] = op
+                changed_at[(table, key)] = _timestamp(changed)
+                last_id = max(last_id, log_id)
+
+            # Ключи строк в локальной базе (для user_settings отличаются от серверных)
+            applied = set()
+            # Локальные id пользователей, чьи строки изменились
+            user_ids = {table: set() for table in SYNC_TABLES}
+
+            try:
+                cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('applying_remote', '1')")
+
+                for table, spec in SYNC_TABLES.items():
+                    upserts = [key for (t, key), op in latest.items() if t == table and op == 'upsert']
+                    deletes = [key for (t, key), op in latest.items() if t == table and op == 'delete']
+
+                    if upserts:
+                        rows = self._fetch_rows(remote, ph, table, spec, upserts)
+                        rows = self._map_rows(remote, ph, local, '?', spec, rows)
+                        local_versions = self._fetch_versions(local, '?', table, spec, list(rows))
+
+                        to_update, to_insert = [], []
+                        for key, row in rows.items():
+                            if local_versions.get(key, '') > _timestamp(row['updated_at']):
+                                # Локальная версия новее: неотправленная правка уйдет при следующем
+                                # push, отправленная уже записана на сервер поверх этой
+                                result['conflicts'] += 1
+                                continue
+                            if key in local_versions:
+                                to_update.append(row)
+                            else:
+                                to_insert.append(row)
+
+                        self._write_rows(cursor, '?', table, spec, to_update, to_insert)
+                        result['pulled'] += len(to_update) + len(to_insert)
+                        applied.update((table, key) for key in rows)
+                        user_ids[table].update(row['user_id'] for row in to_update + to_insert)
+
+                    deleted_at = {key: changed_at[(table, key)] for key in deletes}
+                    if deletes and spec['key'] == 'user_id':
+                        users = self._map_users(remote, ph, local, '?', deletes, create=False)
+                        deleted_at = {str(users[int(key)]): deleted_at[key] for key in deletes if int(key) in users}
+                        deletes = list(deleted_at)
+                    # Строка, измененная локально позже удаления, остается
+                    local_versions = self._fetch_versions(local, '?', table, spec, deletes)
+                    newer = {key for key in deletes if local_versions.get(key, '') > deleted_at[key]}
+                    result['conflicts'] += len(newer)
+                    deletes = [key for key in deletes if key not in newer]
+                    if deletes:
+                        marks = ", ".join("?" * len(deletes))
+                        values = [self._key_value(spec, key) for key in deletes]
+                        cursor.execute(f"SELECT DISTINCT user_id FROM {table} WHERE {spec['key']} IN ({marks})",
+                                       values)
+                        user_ids[table].update(row[0] for row in cursor.fetchall())
+                        cursor.execute(f"DELETE FROM {table} WHERE {spec['key']} IN ({marks})", values)
+                        result['pulled'] += len(deletes)
+                        applied.update((table, key) for key in deletes)
+
+                cursor.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('remote_log_id', ?)",
+                    (str(last_id),)
+                )
+            finally:
+                cursor.execute("DELETE FROM sync_state WHERE key = 'applying_remote'")
+                local.commit()
+
+            self._notify_remote_change(applied, user_ids)
+
+            if len(changes) < self.batch_size:
+                return
+
+    # ------------------------------------------------------------------
+    # Вспомогательные методы
+    # ------------------------------------------------------------------
+
+    def _notify_remote_change(self, applied, user_ids):
+        if not self.on_remote_change:
+            return
+        for table in SYNC_TABLES:
+            keys = sorted(key for (t, key) in applied if t == table)
+            if keys:
+                try:
+                    self.on_remote_change(table, keys, sorted(user_ids[table]))
+                except Exception as e:
+                    print(f"Ошибка обработки изменений с сервера: {e}")
+
+    def _fetch_rows(self, conn, ph, table, spec, keys):
+        """Загружает строки по ключам одним запросом"""
+        if not keys:
+            return {}
+        columns = spec['columns']
+        marks = ", ".join([ph] * len(keys))
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {spec['key']} IN ({marks})",
+            [self._key_value(spec, k) for k in keys]
+        )
+        rows = {}
+        for values in cursor.fetchall():
+            row = dict(zip(columns, values))
+            row['updated_at'] = _timestamp(row.get('updated_at'))
+            if 'created_at' in row:
+                row['created_at'] = _timestamp(row['created_at']) or None
+            rows[str(row[spec['key']])] = row
+        return rows
+
+    def _map_users(self, source, source_ph, target, target_ph, user_ids, create=True):
+        """
+        Сопоставляет id пользователей двух баз по email
+
+        Args:
+            source, source_ph: база, из которой переносятся строки, и ее маркер параметра
+            target, target_ph: принимающая база и ее маркер параметра
+            user_ids: id пользователей в source
+            create: создавать ли в target отсутствующих пользователей
+
+        Returns:
+            dict: {id в source: id в target}; пользователи, которых нет в
+            source (или в target при create=False), пропускаются
+        """
+        ids = sorted({int(user_id) for user_id in user_ids if user_id is not None})
+        if not ids:
+            return {}
+
+        cursor = source.cursor()
+        cursor.execute(
+            f"SELECT id, {', '.join(USER_COLUMNS)} FROM users WHERE id IN ({', '.join([source_ph] * len(ids))})",
+            ids
+        )
+        users = {row[0]: dict(zip(USER_COLUMNS, row[1:])) for row in cursor.fetchall()}
+        if not users:
+            return {}
+
+        emails = sorted({user['email'] for user in users.values()})
+        target_cursor = target.cursor()
+        target_cursor.execute(
+            f"SELECT id, email FROM users WHERE email IN ({', '.join([target_ph] * len(emails))})",
+            emails
+        )
+        target_ids = {email: user_id for user_id, email in target_cursor.fetchall()}
+
+        if create:
+            marks = ", ".join([target_ph] * len(USER_COLUMNS))
+            for user in users.values():
+                if user['email'] in target_ids:
+                    continue
+                user['created_at'] = _timestamp(user['created_at']) or None
+                target_cursor.execute(
+                    f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({marks})",
+                    [user[column] for column in USER_COLUMNS]
+                )
+                target_ids[user['email']] = target_cursor.lastrowid
+                refresh_users_search(target, [target_ids[user['email']]])
+
+        return {user_id: target_ids[user['email']] for user_id, user in users.items()
+                if user['email'] in target_ids}
+
+    def _map_rows(self, source, source_ph, target, target_ph, spec, rows):
+        """
+        Заменяет user_id в строках на id того же пользователя в принимающей базе
+
+        Returns:
+            dict строк с ключами принимающей базы; строки пользователей,
+            которых нет в source, отбрасываются
+        """
+        users = self._map_users(source, source_ph, target, target_ph, [row['user_id'] for row in rows.values()])
+        mapped = {}
+        for row in rows.values():
+            if row['user_id'] not in users:
+                continue
+            row['user_id'] = users[row['user_id']]
+            mapped[str(row[spec['key']])] = row
+        return mapped
+
+    def _fetch_versions(self, conn, ph, table, spec, keys):
+        """Возвращает {ключ: updated_at} для существующих строк"""
+        if not keys:
+            return {}
+        marks = ", ".join([ph] * len(keys))
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {spec['key']}, updated_at FROM {table} WHERE {spec['key']} IN ({marks})",
+            [self._key_value(spec, k) for k in keys]
+        )
+        return {str(key): _timestamp(updated_at) for key, updated_at in cursor.fetchall()}
+
+    def _write_rows(self, cursor, ph, table, spec, to_update, to_insert):
+        """Записывает строки пакетно: UPDATE для существующих, INSERT для новых"""
+        columns = spec['columns']
+        key = spec['key']
+
+        if to_update:
+            assignments = ", ".join(f"{c} = {ph}" for c in columns if c != key)
+            cursor.executemany(
+                f"UPDATE {table} SET {assignments} WHERE {key} = {ph}",
+                [[row[c] for c in columns if c != key] + [row[key]] for row in to_update]
+            )
+
+        if to_insert:
+            marks = ", ".join([ph] * len(columns))
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})",
+                [[row[c] for c in columns] for row in to_insert]
+            )
+
+    @staticmethod
+    def _key_value(spec, key):
+        return int(key) if spec['key'] == 'user_id' else key
+
+    def get_status(self):
+        """
+        Возвращает состояние синхронизации для отображения в интерфейсе
+
+        Returns:
+            dict: результат последнего цикла, ошибка и число неотправленных изменений
+        """
+        pending = 0
+        try:
+            conn = get_connection(path=self.local_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM sync_log WHERE synced = 0")
+            pending = cursor.fetchone()[0]
+            conn.close()
+        except Exception as e:
+            print(f"Ошибка получения состояния синхронизации: {e}")
+
+        return {
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'pending_changes': pending,
+            'retry_in': round(self.backoff.remaining(), 1),
+        }
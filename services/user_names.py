@@ -0,0 +1,97 @@
+"""
+Кэш имен пользователей
+
+Экраны администратора показывают имена администраторов и затронутых
+пользователей рядом с каждой записью журнала. Вместо JOIN с таблицей users
+на каждой странице имена берутся из небольшого кэша в памяти; отсутствующие
+в кэше ID запрашиваются одним запросом на страницу.
+"""
+
+import threading
+from collections import OrderedDict
+
+from database import get_connection, select_user_names
+
+
+class UserNameCache:
+    """
+    Кэш ID пользователя -> имя с вытеснением давно не использованных записей
+
+    Args:
+        connect: функция, открывающая соединение с базой данных
+        max_size: максимальное число имен в кэше
+    """
+
+    def __init__(self, connect=get_connection, max_size=1000):
+        self.connect = connect
+        self.max_size = max_size
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, user_ids):
+        """
+        Возвращает имена пользователей
+
+        Args:
+            user_ids: ID пользователей (None пропускаются)
+
+        Returns:
+            dict: ID -> имя (для удаленных пользователей имя отсутствует;
+            при ошибке базы отсутствуют и незакэшированные имена, они
+            запрашиваются снова при следующем вызове)
+        """
+        wanted = {user_id for user_id in user_ids if user_id is not None}
+        result = {}
+        with self._lock:
+            for user_id in wanted:
+                if user_id in self._names:
+                    self._names.move_to_end(user_id)
+                    result[user_id] = self._names[user_id]
+
+        missing = wanted - result.keys()
+        if missing:
+            conn = None
+            try:
+                conn = self.connect()
+                fetched = select_user_names(conn, sorted(missing))
+            except Exception as e:
+                print(f"Ошибка загрузки имен пользователей: {e}")
+                fetched = None
+            finally:
+                if conn is not None:
+                    conn.close()
+
+            if fetched is None:
+                # Ошибку не кэшируем: иначе имена не появятся до сброса кэша
+                return {user_id: name for user_id, name in result.items() if name is not None}
+
+            with self._lock:
+                for user_id in missing:
+                    # Удаленный пользователь тоже кэшируется, чтобы не запрашивать его снова
+                    self._names[user_id] = fetched.get(user_id)
+                    result[user_id] = fetched.get(user_id)
+                while len(self._names) > self.max_size:
+                    self._names.popitem(last=False)
+
+        return {user_id: name for user_id, name in result.items() if name is not None}
+
+    def get(self, user_id):
+        """Возвращает имя одного пользователя или None"""
+        return self.resolve([user_id]).get(user_id)
+
+    def invalidate(self, user_id=None):
+        """
+        Сбрасывает имя пользователя (None - весь кэш), например после смены имени
+
+        Args:
+            user_id: ID пользователя
+        """
+        with self._lock:
+            if user_id is None:
+                self._names.clear()
+            else:
+                self._names.pop(user_id, None)
+
+
+# Общий кэш имен приложения
+user_name_cache = UserNameCache()
@@ -25,7 +25,29 @@ def main():
         "tests/test_auth_logic.py",
         "tests/test_options_logic.py",
         "tests/test_story_logic.py",
-        "tests/test_integration.py"
+        "tests/test_integration.py",
+        "tests/test_sync.py",
+        "tests/test_health.py",
+        "tests/test_settings_store.py",
+        "tests/test_sessions.py",
+        "tests/test_user_directory.py",
+        "tests/test_audit.py",
+        "tests/test_audit_archive.py",
+        "tests/test_audit_browser.py",
+        "tests/test_dates.py",
+        "tests/test_records_view.py",
+        "tests/test_columnar.py",
+        "tests/test_trends.py",
+        "tests/test_anomalies.py",
+        "tests/test_reminders.py",
+        "tests/test_benchmarks.py",
+        "tests/test_query_monitor.py",
+        "tests/test_query_plans.py",
+        "tests/test_frame_monitor.py",
+        "tests/test_startup_trace.py",
+        "tests/test_kv_cache.py",
+        "tests/test_async_database.py",
+        "tests/test_server.py"
     ]
 
     # Запускаем тесты
@@ -71,6 +93,160 @@ def main():
         "--tb=short"
     ])
 
+    print("\nЗапуск тестов синхронизации...")
+    result |= pytest.main([
+        "tests/test_sync.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов мониторинга сервера...")
+    result |= pytest.main([
+        "tests/test_health.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов кэша настроек...")
+    result |= pytest.main([
+        "tests/test_settings_store.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов сессий...")
+    result |= pytest.main([
+        "tests/test_sessions.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов справочника пользователей...")
+    result |= pytest.main([
+        "tests/test_user_directory.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов журнала администратора...")
+    result |= pytest.main([
+        "tests/test_audit.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов архивации журнала администратора...")
+    result |= pytest.main([
+        "tests/test_audit_archive.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов просмотра журнала администратора...")
+    result |= pytest.main([
+        "tests/test_audit_browser.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов форматирования дат...")
+    result |= pytest.main([
+        "tests/test_dates.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов модели истории записей...")
+    result |= pytest.main([
+        "tests/test_records_view.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов колоночного хранилища записей...")
+    result |= pytest.main([
+        "tests/test_columnar.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов трендов показателей...")
+    result |= pytest.main([
+        "tests/test_trends.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов поиска необычных показателей...")
+    result |= pytest.main([
+        "tests/test_anomalies.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов планировщика напоминаний...")
+    result |= pytest.main([
+        "tests/test_reminders.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов замеров производительности...")
+    result |= pytest.main([
+        "tests/test_benchmarks.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов учета запросов...")
+    result |= pytest.main([
+        "tests/test_query_monitor.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов планов запросов")
+    result |= pytest.main([
+        "tests/test_query_plans.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов монитора кадров")
+    result |= pytest.main([
+        "tests/test_frame_monitor.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов трассировки запуска")
+    result |= pytest.main([
+        "tests/test_startup_trace.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов кэша KV-разметок")
+    result |= pytest.main([
+        "tests/test_kv_cache.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов асинхронного API базы данных")
+    result |= pytest.main([
+        "tests/test_async_database.py",
+        "-v",
+        "--tb=short"
+    ])
+
+    print("\nЗапуск тестов серверного режима")
+    result |= pytest.main([
+        "tests/test_server.py",
+        "-v",
+        "--tb=short"
+    ])
+
     print("\n" + "=" * 60)
     if result == 0:
         print("✅ Все тесты пройдены успешно!")
@@ -82,4 +258,4 @@ def main():
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Тесты поиска необычных показателей services/anomalies.py
+"""
+
+import sqlite3
+import statistics
+
+import pytest
+
+from database import create_schema, insert_record, init_indicator_stats, select_indicator_stats
+from services.anomalies import AnomalyDetector, RunningStats
+
+
+BASELINE_PULSE = [70, 72, 68, 71, 69, 73, 70, 72, 71, 69, 70, 68]
+
+
+@pytest.fixture
+def stats_db(tmp_path):
+    """Временная база и счетчик открытых соединений"""
+    path = str(tmp_path / "stats.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES (1, 'a@mail.com', 'hash', 'Анна')")
+    conn.commit()
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(1)
+        return sqlite3.connect(path)
+
+    return {'path': path, 'connect': connect, 'connects': connects}
+
+
+def observe_baseline(detector, user_id=1):
+    for pulse in BASELINE_PULSE:
+        assert detector.observe(user_id, {'pulse': pulse, 'weight': 70.0}) == []
+
+
+class TestRunningStats:
+    """Тесты накопленной статистики"""
+
+    def test_matches_statistics_module(self):
+        """Среднее и отклонение совпадают с расчетом по всей выборке"""
+        stats = RunningStats()
+        for value in BASELINE_PULSE:
+            stats.update(value)
+        assert stats.samples == len(BASELINE_PULSE)
+        assert stats.mean == pytest.approx(statistics.mean(BASELINE_PULSE))
+        assert stats.std == pytest.approx(statistics.stdev(BASELINE_PULSE))
+
+
+class TestAnomalyDetector:
+    """Тесты детектора"""
+
+    def test_spike_is_flagged(self, stats_db):
+        """Скачок пульса относительно личной нормы отмечается"""
+        detector = AnomalyDetector(connect=stats_db['connect'])
+        observe_baseline(detector)
+
+        anomalies = detector.observe(1, {'pulse': 120, 'weight': 70.2})
+        assert [anomaly.metric for anomaly in anomalies] == ['pulse']
+        assert anomalies[0].score > 4
+        assert "Пульс" in anomalies[0].describe()
+
+    def test_no_flags_without_baseline(self, stats_db):
+        """Пока измерений мало, сравнение не выполняется"""
+        detector = AnomalyDetector(connect=stats_db['connect'])
+        for pulse in (70, 71, 72):
+            detector.observe(1, {'pulse': pulse})
+        assert detector.observe(1, {'pulse': 150}) == []
+
+    def test_check_does_not_change_stats(self, stats_db):
+        """Проверка без добавления не меняет статистику"""
+        detector = AnomalyDetector(connect=stats_db['connect'])
+        observe_baseline(detector)
+        assert detector.check(1, {'pulse': 130})
+        assert detector.check(1, {'pulse': 130})
+
+        conn = sqlite3.connect(stats_db['path'])
+        assert select_indicator_stats(conn, [1])[1]['pulse'][0] == len(BASELINE_PULSE)
+        conn.close()
+
+    def test_state_survives_restart_without_history(self, stats_db):
+        """Новый детектор продолжает со статистикой из базы, не читая записи"""
+        observe_baseline(AnomalyDetector(connect=stats_db['connect']))
+
+        detector = AnomalyDetector(connect=stats_db['connect'])
+        stats_db['connects'].clear()
+        assert detector.check(1, {'pulse': 120})
+        assert detector.check(1, {'pulse': 71}) == []
+        assert len(stats_db['connects']) == 1
+
+    def test_seed_from_existing_records(self, stats_db):
+        """Начальная статистика по существующим записям совпадает с расчетом Уэлфорда"""
+        conn = sqlite3.connect(stats_db['path'])
+        for pulse in BASELINE_PULSE:
+            insert_record(conn, 1, 70, 120, 80, pulse, 36.6, '', '2024-01-01 08:00:00')
+        init_indicator_stats(conn)
+        samples, mean, m2 = select_indicator_stats(conn, [1])[1]['pulse']
+        conn.close()
+
+        expected = RunningStats()
+        for pulse in BASELINE_PULSE:
+            expected.update(pulse)
+        assert samples == expected.samples
+        assert mean == pytest.approx(expected.mean)
+        assert m2 == pytest.approx(expected.m2)
+
+    def test_recompute_after_edit_and_delete(self, stats_db):
+        """После изменения и удаления записей статистика пересчитывается по записям"""
+        conn = sqlite3.connect(stats_db['path'])
+        for pulse in BASELINE_PULSE + [150]:
+            insert_record(conn, 1, 70, 120, 80, pulse, 36.6, '', '2024-01-01 08:00:00')
+        init_indicator_stats(conn)
+        conn.execute("DELETE FROM records WHERE pulse = 150")
+        conn.execute("UPDATE records SET pulse = 71 WHERE pulse = 68")
+        conn.commit()
+        conn.close()
+
+        detector = AnomalyDetector(connect=stats_db['connect'])
+        assert detector.check(1, {'pulse': 120}) == []
+        assert detector.recompute([1])
+
+        expected = statistics.mean([71 if pulse == 68 else pulse for pulse in BASELINE_PULSE])
+        conn = sqlite3.connect(stats_db['path'])
+        samples, mean, _ = select_indicator_stats(conn, [1])[1]['pulse']
+        conn.close()
+        assert samples == len(BASELINE_PULSE)
+        assert mean == pytest.approx(expected)
+        assert detector.check(1, {'pulse': 120})
+
+    def test_failed_load_is_not_retried_per_row(self, stats_db):
+        """После ошибки загрузки проверки не открывают соединение на каждую строку"""
+        observe_baseline(AnomalyDetector(connect=stats_db['connect']))
+
+        attempts = []
+
+        def failing_connect():
+            attempts.append(1)
+            raise ConnectionError("database locked")
+
+        detector = AnomalyDetector(connect=failing_connect)
+        for _ in range(5):
+            assert detector.check(1, {'pulse': 120}) == []
+        assert len(attempts) == 1
+
+        # Измерение без загруженной статистики не перезаписывает сохраненную
+        detector.observe(1, {'pulse': 70})
+        conn = sqlite3.connect(stats_db['path'])
+        assert select_indicator_stats(conn, [1])[1]['pulse'][0] == len(BASELINE_PULSE)
+        conn.close()
+
+        detector.connect = stats_db['connect']
+        detector.invalidate(1)
+        assert detector.check(1, {'pulse': 120})
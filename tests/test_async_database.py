@@ -0,0 +1,157 @@
+"""
+Тесты асинхронного API базы данных async_database.py
+"""
+
+import asyncio
+import inspect
+import sqlite3
+import time
+
+import pytest
+
+import async_database
+import database
+from async_database import AsyncConnectionPool, sqlite_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "async.db")
+    conn = sqlite3.connect(path)
+    database.create_schema(conn)
+    database.insert_user(conn, "anna@example.com", "hash", "Анна")
+    conn.close()
+    return path
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+# Запрос, который выполняется несколько секунд, если его не прервать
+SLOW_QUERY = """
+    WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter)
+    SELECT COUNT(*) FROM (SELECT x FROM counter LIMIT 200000000)
+"""
+
+
+def slow_query(conn):
+    return conn.execute(SLOW_QUERY).fetchone()
+
+
+class TestAsyncDatabase:
+    """Тесты асинхронных вариантов функций database.py"""
+
+    def test_same_operations_as_database(self):
+        """Для каждой функции database.py с соединением есть асинхронный вариант"""
+        functions = async_database.database_functions()
+        assert {'insert_record', 'select_records_by_user', 'get_user_statistics'} <= set(functions)
+        for name, function in functions.items():
+            wrapper = getattr(async_database, name)
+            assert wrapper.__wrapped__ is function
+            assert inspect.iscoroutinefunction(wrapper) != inspect.isgeneratorfunction(function)
+
+    def test_insert_and_select(self, db_path):
+        """Запись, добавленная через пул, читается через пул"""
+        async def scenario():
+            pool = sqlite_pool(db_path, size=2)
+            record_id = await async_database.insert_record(pool, 1, 70.5, 120, 80, 60, 36.6, "утро", "2024-05-01")
+            records = await async_database.select_records_by_user(pool, 1)
+            stats = await async_database.get_user_statistics(pool)
+            snapshot = pool.snapshot()
+            await pool.close()
+            return record_id, records, stats, snapshot
+
+        record_id, records, stats, snapshot = run(scenario())
+        assert records[0][0] == record_id
+        assert records[0][6] == "утро"
+        assert stats['total_records'] == 1
+        assert snapshot['created'] == 1
+        assert snapshot['in_use'] == 0
+
+    def test_iteration(self, db_path):
+        """Большой результат читается частями; прерванная итерация освобождает соединение"""
+        conn = sqlite3.connect(db_path)
+        for day in range(1, 8):
+            database.insert_record(conn, 1, 70, 120, 80, 60, 36.6, "", f"2024-05-0{day}")
+        conn.close()
+
+        async def scenario():
+            pool = sqlite_pool(db_path, size=1)
+            batches = [len(rows) async for rows in async_database.iter_records_by_user(pool, 1, 3)]
+
+            partial = async_database.iter_records_by_user(pool, 1, 3)
+            async for rows in partial:
+                break
+            await partial.aclose()
+            in_use = pool.in_use
+            # Единственное соединение снова доступно
+            records = await async_database.select_records_by_user(pool, 1)
+            await pool.close()
+            return batches, in_use, len(records)
+
+        assert run(scenario()) == ([3, 3, 1], 0, 7)
+
+    def test_concurrent_coroutines_share_pool(self, db_path):
+        """Много корутин обслуживаются пулом из двух соединений"""
+        async def scenario():
+            pool = sqlite_pool(db_path, size=2)
+            results = await asyncio.gather(*(async_database.select_user_by_id(pool, 1) for _ in range(20)))
+            snapshot = pool.snapshot()
+            await pool.close()
+            return results, snapshot
+
+        results, snapshot = run(scenario())
+        assert all(row[0] == "Анна" for row in results)
+        assert snapshot['created'] <= 2
+        assert snapshot['waits'] > 0
+
+    def test_connection_transaction(self, db_path):
+        """Незафиксированные изменения откатываются при возврате соединения"""
+        async def scenario():
+            pool = sqlite_pool(db_path, size=1)
+            async with pool.connection() as conn:
+                await conn.call(lambda raw: raw.execute("UPDATE users SET name = 'Черновик' WHERE id = 1"))
+            first = await async_database.select_user_by_id(pool, 1)
+            async with pool.connection() as conn:
+                await conn.call(lambda raw: raw.execute("UPDATE users SET name = 'Анна К.' WHERE id = 1"))
+                await conn.commit()
+            second = await async_database.select_user_by_id(pool, 1)
+            await pool.close()
+            return first[0], second[0]
+
+        assert run(scenario()) == ("Анна", "Анна К.")
+
+    def test_cancellation_interrupts_query(self, db_path):
+        """Отмена прерывает запрос SQLite, соединение возвращается в пул"""
+        async def scenario():
+            # Обычное соединение sqlite3: прерванный запрос не попадает в журнал медленных запросов
+            pool = AsyncConnectionPool(lambda: sqlite3.connect(db_path, check_same_thread=False), size=1)
+            started = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(pool.call(slow_query), 0.2)
+            elapsed = time.perf_counter() - started
+            in_use = pool.in_use
+            row = await async_database.select_user_by_id(pool, 1)
+            await pool.close()
+            return elapsed, in_use, row
+
+        elapsed, in_use, row = run(scenario())
+        assert elapsed < 2
+        assert in_use == 0
+        assert row[0] == "Анна"
+
+    def test_acquire_timeout(self, db_path):
+        """Когда все соединения заняты дольше timeout, выбрасывается TimeoutError"""
+        async def scenario():
+            pool = AsyncConnectionPool(lambda: sqlite3.connect(db_path, check_same_thread=False), size=1,
+                                       timeout=0.1)
+            conn = await pool.acquire()
+            with pytest.raises(TimeoutError):
+                await pool.acquire()
+            await pool.release(conn)
+            await pool.close()
+            with pytest.raises(RuntimeError):
+                await pool.acquire()
+
+        run(scenario())
@@ -0,0 +1,97 @@
+"""
+Тесты журнала действий администраторов services/audit.py
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from database import create_schema, select_admin_actions
+from services.audit import AuditLogger
+
+
+@pytest.fixture
+def audit_db(tmp_path):
+    """Временная база и счетчик открытых соединений"""
+    path = str(tmp_path / "audit.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(1)
+        return sqlite3.connect(path)
+
+    return {'path': path, 'connect': connect, 'connects': connects}
+
+
+def count_actions(path):
+    conn = sqlite3.connect(path)
+    count = len(select_admin_actions(conn, limit=1000) or [])
+    conn.close()
+    return count
+
+
+class TestAuditLogger:
+    """Тесты буферизованного журнала"""
+
+    def test_log_does_not_touch_database(self, audit_db):
+        """Запись события только ставит его в очередь"""
+        logger = AuditLogger(connect=audit_db['connect'], flush_interval=60)
+        assert logger.log(1, "view_users", "Просмотр", ip_address="127.0.0.1")
+        assert audit_db['connects'] == []
+        assert logger.stats()['pending'] == 1
+
+        logger.stop()
+        assert count_actions(audit_db['path']) == 1
+
+    def test_events_are_written_in_batches(self, audit_db):
+        """События записываются пачками одной транзакцией"""
+        logger = AuditLogger(connect=audit_db['connect'], batch_size=10, flush_interval=60)
+        for i in range(25):
+            logger.log(1, "view_records", f"Событие {i}", affected_user_id=i, ip_address="127.0.0.1")
+
+        stats = logger.stop()
+        assert stats['written'] == 25
+        assert stats['pending'] == 0
+        assert count_actions(audit_db['path']) == 25
+        assert len(audit_db['connects']) <= 3
+
+    def test_background_flush(self, audit_db):
+        """Фоновый поток записывает события без явного вызова flush"""
+        logger = AuditLogger(connect=audit_db['connect'], flush_interval=0.05)
+        logger.log(1, "view_dashboard", "Просмотр", ip_address="127.0.0.1")
+
+        for _ in range(100):
+            if logger.stats()['written'] == 1:
+                break
+            time.sleep(0.02)
+        assert logger.stats()['written'] == 1
+        logger.stop()
+
+    def test_overflow_is_counted(self, audit_db):
+        """События сверх размера очереди отбрасываются и подсчитываются"""
+        logger = AuditLogger(connect=audit_db['connect'], max_queue=5, flush_interval=60)
+        results = [logger.log(1, "view_users", "Просмотр", ip_address="127.0.0.1") for _ in range(8)]
+        assert results.count(False) == 3
+
+        stats = logger.stop()
+        assert stats['dropped'] == 3
+        assert count_actions(audit_db['path']) == 5
+
+    def test_failed_write_keeps_events(self, audit_db):
+        """При ошибке базы события остаются в очереди до следующей попытки"""
+        logger = AuditLogger(connect=audit_db['connect'], flush_interval=60)
+        logger.log(1, "view_users", "Просмотр", ip_address="127.0.0.1")
+
+        logger.connect = lambda: (_ for _ in ()).throw(sqlite3.OperationalError("database is locked"))
+        assert logger.flush() == 0
+        assert logger.stats()['pending'] == 1
+        assert logger.stats()['failed_batches'] == 1
+
+        logger.connect = audit_db['connect']
+        assert logger.flush() == 1
+        assert count_actions(audit_db['path']) == 1
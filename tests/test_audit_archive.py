@@ -0,0 +1,176 @@
+"""
+Тесты помесячного хранения и архивации журнала администраторов
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database import create_schema, insert_admin_actions, select_admin_actions, list_audit_buckets, \
+    migrate_admin_actions, audit_bucket_for
+from services.audit_archive import apply_audit_retention, expired_buckets, read_audit_archive
+
+
+def action(created_at, admin_id=1, action_type="view_users"):
+    return (admin_id, action_type, f"Действие {created_at}", None, "127.0.0.1", created_at)
+
+
+@pytest.fixture
+def audit_conn():
+    """База с администратором и действиями за три месяца"""
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn)
+    conn.execute("INSERT INTO users (email, password_hash, name, is_admin) VALUES ('a@a.a', 'h', 'Админ', 1)")
+    conn.commit()
+    insert_admin_actions(conn, [
+        action("2024-01-15 10:00:00"),
+        action("2024-01-20 10:00:00"),
+        action("2024-02-01 09:00:00"),
+        action("2024-03-05 12:00:00"),
+        action("2024-03-06 12:00:00", admin_id=2),
+    ])
+    yield conn
+    conn.close()
+
+
+class TestAuditBuckets:
+    """Тесты месячных таблиц журнала"""
+
+    def test_actions_are_routed_by_month(self, audit_conn):
+        """Каждое действие попадает в таблицу своего месяца"""
+        assert list_audit_buckets(audit_conn) == [
+            "admin_actions_202403", "admin_actions_202402", "admin_actions_202401"
+        ]
+        assert audit_conn.execute("SELECT COUNT(*) FROM admin_actions_202401").fetchone()[0] == 2
+        assert audit_conn.execute("SELECT COUNT(*) FROM admin_actions").fetchone()[0] == 0
+
+    def test_select_reads_newest_buckets_first(self, audit_conn):
+        """Последние действия выбираются из новых месяцев по убыванию времени"""
+        actions = select_admin_actions(audit_conn, limit=3)
+        assert [row[8] for row in actions] == [
+            "2024-03-06 12:00:00", "2024-03-05 12:00:00", "2024-02-01 09:00:00"
+        ]
+        assert actions[1][2] == "Админ"
+
+        actions = select_admin_actions(audit_conn, admin_id=1, limit=10)
+        assert len(actions) == 4
+
+    def test_select_skips_old_buckets_when_limit_is_filled(self, audit_conn):
+        """Старые месяцы не читаются, если последних записей достаточно"""
+        statements = []
+        audit_conn.set_trace_callback(statements.append)
+        select_admin_actions(audit_conn, limit=2)
+        audit_conn.set_trace_callback(None)
+
+        queried = " ".join(statements)
+        assert "admin_actions_202403" in queried
+        assert "FROM admin_actions_202401" not in queried
+
+    def test_legacy_rows_are_migrated(self):
+        """Записи из общей таблицы переносятся в месячные"""
+        conn = sqlite3.connect(":memory:")
+        create_schema(conn)
+        conn.executemany(
+            "INSERT INTO admin_actions (admin_id, action_type, created_at) VALUES (1, 'view_users', ?)",
+            [("2023-11-01 10:00:00",), ("2023-12-01 10:00:00",), ("2023-12-02 10:00:00",)]
+        )
+        conn.commit()
+
+        assert migrate_admin_actions(conn) == 3
+        assert list_audit_buckets(conn) == ["admin_actions_202312", "admin_actions_202311"]
+        assert conn.execute("SELECT COUNT(*) FROM admin_actions").fetchone()[0] == 0
+        conn.close()
+
+    def test_migration_keeps_ids_and_undated_rows(self):
+        """Перенесенные записи сохраняют id, записи без даты попадают в самый ранний месяц"""
+        conn = sqlite3.connect(":memory:")
+        create_schema(conn)
+        conn.executemany(
+            "INSERT INTO admin_actions (id, admin_id, action_type, created_at) VALUES (?, 1, 'view_users', ?)",
+            [(10, "2023-11-01 10:00:00"), (11, "2023-12-01 10:00:00"), (12, None)]
+        )
+        conn.commit()
+
+        assert migrate_admin_actions(conn) == 3
+        assert conn.execute("SELECT id FROM admin_actions_202311 ORDER BY id").fetchall() == [(10,), (12,)]
+        assert conn.execute("SELECT id FROM admin_actions_202312").fetchall() == [(11,)]
+        assert len(select_admin_actions(conn, limit=10)) == 3
+
+        # Новые действия получают id, которых нет ни в одной таблице
+        insert_admin_actions(conn, [action("2023-11-02 10:00:00"), action("2024-01-01 10:00:00")])
+        ids = [row[0] for row in select_admin_actions(conn, limit=10)]
+        assert len(ids) == len(set(ids)) == 5
+        assert sorted(ids) == [10, 11, 12, 13, 14]
+        conn.close()
+
+    def test_failed_batch_is_not_partially_written(self, audit_conn):
+        """Пачка с ошибкой во втором месяце не оставляет записей и id, повтор не дублирует их"""
+        batch = [action("2024-04-10 10:00:00"), action("2024-05-10 10:00:00", admin_id=None)]
+        sequence = audit_conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'admin_actions'").fetchone()
+
+        for _ in range(2):
+            assert insert_admin_actions(audit_conn, batch) is False
+        assert not audit_conn.in_transaction
+        assert "admin_actions_202404" not in list_audit_buckets(audit_conn)
+        assert audit_conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'admin_actions'").fetchone() == sequence
+
+        assert insert_admin_actions(audit_conn, [batch[0], action("2024-05-10 10:00:00")]) is True
+        assert audit_conn.execute("SELECT COUNT(*) FROM admin_actions_202404").fetchone()[0] == 1
+        assert audit_conn.execute("SELECT COUNT(*) FROM admin_actions_202405").fetchone()[0] == 1
+
+    def test_buckets_keep_foreign_key(self, audit_conn):
+        """Месячные таблицы ссылаются на users, как и общая таблица"""
+        keys = audit_conn.execute("PRAGMA foreign_key_list(admin_actions_202401)").fetchall()
+        assert [(row[2], row[3], row[4]) for row in keys] == [("users", "admin_id", "id")]
+
+    def test_old_buckets_are_rebuilt(self):
+        """Таблицы предыдущих версий получают внешний ключ и неповторяющиеся id"""
+        conn = sqlite3.connect(":memory:")
+        create_schema(conn)
+        for table in ("admin_actions_202401", "admin_actions_202402"):
+            conn.execute(f"""CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, admin_id INTEGER NOT NULL, action_type TEXT NOT NULL,
+                action_details TEXT, affected_user_id INTEGER, ip_address TEXT, created_at DATETIME)""")
+            conn.execute(f"INSERT INTO {table} (admin_id, action_type, created_at) VALUES (1, 'view_users', ?)",
+                         (f"2024-{table[-2:]}-01 10:00:00",))
+        conn.commit()
+
+        migrate_admin_actions(conn)
+        ids = [row[0] for row in select_admin_actions(conn, limit=10)]
+        assert len(ids) == len(set(ids)) == 2
+        assert conn.execute("PRAGMA foreign_key_list(admin_actions_202401)").fetchall()
+        assert conn.execute("PRAGMA index_list(admin_actions_202401)").fetchall()
+        conn.close()
+
+    def test_bucket_name(self):
+        """Имя таблицы строится по году и месяцу"""
+        assert audit_bucket_for("2024-07-31 23:59:59") == "admin_actions_202407"
+        assert audit_bucket_for(datetime(2025, 1, 1)) == "admin_actions_202501"
+        with pytest.raises(ValueError):
+            audit_bucket_for("07/31/2024")
+
+
+class TestAuditRetention:
+    """Тесты архивации старых месяцев"""
+
+    def test_expired_buckets(self):
+        """Срок хранения считается в календарных месяцах"""
+        buckets = ["admin_actions_202401", "admin_actions_202402", "admin_actions_202403"]
+        assert expired_buckets(buckets, retention_months=2, today=datetime(2024, 3, 10)) == \
+            ["admin_actions_202401"]
+        assert expired_buckets(buckets, retention_months=12, today=datetime(2024, 3, 10)) == []
+
+    def test_old_buckets_are_archived(self, audit_conn, tmp_path):
+        """Старые месяцы выгружаются в JSONL.gz и удаляются из базы"""
+        archived = apply_audit_retention(audit_conn, retention_months=2, archive_dir=str(tmp_path),
+                                         today=datetime(2024, 3, 10))
+        assert archived == {"admin_actions_202401": 2}
+        assert list_audit_buckets(audit_conn) == ["admin_actions_202403", "admin_actions_202402"]
+
+        rows = list(read_audit_archive(os.path.join(str(tmp_path), "admin_actions_202401.jsonl.gz")))
+        assert [row["created_at"] for row in rows] == ["2024-01-15 10:00:00", "2024-01-20 10:00:00"]
+        assert rows[0]["action_details"] == "Действие 2024-01-15 10:00:00"
+        assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
@@ -0,0 +1,139 @@
+"""
+Тесты постраничного просмотра журнала администраторов и кэша имен
+"""
+
+import sqlite3
+
+import pytest
+
+from database import create_schema, insert_admin_actions, select_admin_actions_page
+from services.user_names import UserNameCache
+
+
+@pytest.fixture
+def audit_conn():
+    """Журнал за три месяца: 90 действий двух администраторов"""
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn)
+    conn.executemany(
+        "INSERT INTO users (email, password_hash, name, is_admin) VALUES (?, 'h', ?, ?)",
+        [("a1@a.a", "Админ 1", 1), ("a2@a.a", "Админ 2", 1), ("u@a.a", "Пользователь", 0)]
+    )
+    actions = []
+    for month, days in ((1, 30), (2, 28), (3, 30)):
+        for day in range(1, days + 1):
+            admin_id = 1 if day % 2 else 2
+            action_type = "toggle_admin" if day % 10 == 0 else "view_users"
+            actions.append((admin_id, action_type, f"Действие {month}-{day}", 3 if day % 10 == 0 else None,
+                            "127.0.0.1", f"2024-{month:02d}-{day:02d} 10:00:00"))
+    # Два действия в одну секунду - порядок по id
+    actions.append((1, "view_records", "Одновременно 1", None, "127.0.0.1", "2024-03-31 12:00:00"))
+    actions.append((1, "view_records", "Одновременно 2", None, "127.0.0.1", "2024-03-31 12:00:00"))
+    insert_admin_actions(conn, actions)
+    yield conn
+    conn.close()
+
+
+def read_all(conn, **filters):
+    rows, cursor = [], None
+    while True:
+        page, cursor = select_admin_actions_page(conn, after=cursor, limit=20, **filters)
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+
+class TestAuditPages:
+    """Тесты постраничного просмотра журнала"""
+
+    def test_pages_cover_whole_log(self, audit_conn):
+        """Страницы покрывают все месяцы без пропусков и повторов"""
+        rows = read_all(audit_conn)
+        assert len(rows) == 90
+        keys = [(row[6], row[0]) for row in rows]
+        assert keys == sorted(keys, reverse=True)
+        assert len(set((row[6], row[3]) for row in rows)) == 90
+        assert rows[0][3] == "Одновременно 2"
+
+    def test_filters(self, audit_conn):
+        """Фильтры по типу действия, администратору и датам"""
+        toggles = read_all(audit_conn, action_type="toggle_admin")
+        assert {row[2] for row in toggles} == {"toggle_admin"}
+        assert len(toggles) == 8
+
+        admin_rows = read_all(audit_conn, admin_id=2)
+        assert {row[1] for row in admin_rows} == {2}
+
+        february = read_all(audit_conn, date_from="2024-02-01", date_to="2024-02-29")
+        assert len(february) == 28
+        assert all(row[6].startswith("2024-02") for row in february)
+
+    def test_date_range_reads_only_needed_months(self, audit_conn):
+        """Для диапазона дат читаются только нужные месячные таблицы"""
+        statements = []
+        audit_conn.set_trace_callback(statements.append)
+        select_admin_actions_page(audit_conn, date_from="2024-02-10", date_to="2024-02-20")
+        audit_conn.set_trace_callback(None)
+
+        queried = " ".join(statements)
+        assert "FROM admin_actions_202402" in queried
+        assert "FROM admin_actions_202401" not in queried
+        assert "FROM admin_actions_202403" not in queried
+
+
+class SharedConnection:
+    """Общее соединение теста: кэш закрывает его после запроса, поэтому close игнорируется"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.isolation_level = conn.isolation_level
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def close(self):
+        pass
+
+
+class TestUserNameCache:
+    """Тесты кэша имен пользователей"""
+
+    def test_names_are_fetched_once(self, audit_conn):
+        """Повторное разрешение имен не обращается к базе"""
+        connects = []
+
+        def connect():
+            connects.append(1)
+            return SharedConnection(audit_conn)
+
+        cache = UserNameCache(connect=connect)
+        assert cache.resolve([1, 2, None]) == {1: "Админ 1", 2: "Админ 2"}
+        assert cache.resolve([2, 1]) == {1: "Админ 1", 2: "Админ 2"}
+        assert len(connects) == 1
+
+        # Несуществующий пользователь тоже кэшируется
+        assert cache.get(99) is None
+        assert cache.get(99) is None
+        assert len(connects) == 2
+
+        cache.invalidate(1)
+        assert cache.get(1) == "Админ 1"
+        assert len(connects) == 3
+
+    def test_failed_query_is_not_cached(self, audit_conn):
+        """После ошибки базы имена запрашиваются снова"""
+        def failing_connect():
+            raise ConnectionError("database locked")
+
+        cache = UserNameCache(connect=failing_connect)
+        assert cache.resolve([1, 2]) == {}
+        assert len(cache._names) == 0
+
+        cache.connect = lambda: SharedConnection(audit_conn)
+        assert cache.resolve([1, 2]) == {1: "Админ 1", 2: "Админ 2"}
+
+    def test_cache_is_bounded(self, audit_conn):
+        """Размер кэша ограничен"""
+        cache = UserNameCache(connect=lambda: SharedConnection(audit_conn), max_size=2)
+        cache.resolve([1, 2, 3])
+        assert len(cache._names) == 2
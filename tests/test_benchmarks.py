@@ -0,0 +1,188 @@
+"""
+Тесты замеров производительности benchmarks/
+"""
+
+import sqlite3
+
+import pytest
+
+from benchmarks.common import percentile, summarize, measure, compare_results, write_results, load_results, \
+    current_rss_bytes
+from benchmarks.datagen import generate_database, open_database, read_summary, user_email
+from benchmarks.bench_database import run, table_marks, restore_marks, main
+from benchmarks.bench_ui import settle, measure_ui, count_widgets
+from benchmarks.bench_export import load_export_records
+from database import select_user_by_email, select_records_by_user
+
+
+class TestCommon:
+    """Тесты расчета и сравнения результатов"""
+
+    def test_percentile(self):
+        """Перцентили с интерполяцией"""
+        values = [5, 1, 4, 2, 3]
+        assert percentile(values, 50) == 3
+        assert percentile(values, 0) == 1
+        assert percentile(values, 100) == 5
+        assert percentile(values, 95) == pytest.approx(4.8)
+        assert percentile([], 50) is None
+
+    def test_summarize_and_measure(self):
+        """Сводка содержит перцентили и строки в секунду, прогрев не учитывается"""
+        summary = summarize([0.001, 0.002, 0.003], rows=30)
+        assert summary['runs'] == 3
+        assert summary['p50_ms'] == pytest.approx(2.0)
+        assert summary['rows_per_s'] == pytest.approx(5000.0)
+
+        summary = measure(lambda count: [(i,) for i in range(count)], [(10,), (20,), (30,)])
+        assert summary['runs'] == 2
+        assert summary['rows'] == 50
+
+    def test_compare(self, tmp_path):
+        """Сравнение отмечает операции, ставшие медленнее порога"""
+        path = str(tmp_path / "out" / "old.json")
+        write_results(path, "database", {'fast': {'p95_ms': 1.0}, 'slow': {'p95_ms': 1.0}}, {'scale': '1k'})
+        baseline = load_results(path)
+        assert baseline['parameters'] == {'scale': '1k'}
+        assert 'python' in baseline['environment']
+
+        current = {'results': {'fast': {'p95_ms': 1.1}, 'slow': {'p95_ms': 2.0}, 'new': {'p95_ms': 1.0}}}
+        rows = {row[0]: row for row in compare_results(baseline, current)}
+        assert set(rows) == {'fast', 'slow'}
+        assert not rows['fast'][4]
+        assert rows['slow'][4]
+
+
+class TestDataGenerator:
+    """Тесты генератора синтетических данных"""
+
+    def test_counts_and_lookups(self):
+        """Создается ровно заданное число записей, пользователи находятся по email"""
+        conn = sqlite3.connect(":memory:")
+        summary = generate_database(conn, 500, seed=1)
+        assert conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 500
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == summary['users']
+        assert conn.execute("SELECT COUNT(*) FROM record_daily_stats").fetchone()[0] > 0
+        assert conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0] == 0
+        assert read_summary(conn) == summary
+        assert select_user_by_email(conn, user_email(summary['users']), pass_hash=True)[0] == summary['users']
+        assert select_records_by_user(conn, 1)
+        conn.close()
+
+    def test_deterministic(self):
+        """Одинаковый seed дает одинаковые данные"""
+        dumps = []
+        for _ in range(2):
+            conn = sqlite3.connect(":memory:")
+            generate_database(conn, 300, seed=7)
+            dumps.append(conn.execute("SELECT user_id, record_date, weight, pulse FROM records ORDER BY id").fetchall())
+            conn.close()
+        assert dumps[0] == dumps[1]
+
+    def test_open_database_reuses_file(self, tmp_path):
+        """Файл с теми же параметрами не генерируется заново"""
+        path = str(tmp_path / "bench.db")
+        conn, summary = open_database(path, 200)
+        conn.execute("INSERT INTO bench_meta (key, value) VALUES ('marker', '1')")
+        conn.commit()
+        conn.close()
+
+        conn, again = open_database(path, 200)
+        assert again['marker'] == 1
+        conn.close()
+
+        conn, other = open_database(path, 300)
+        assert 'marker' not in other
+        assert conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 300
+        conn.close()
+
+
+class TestDatabaseBenchmark:
+    """Тесты набора замеров database.py"""
+
+    def test_run_restores_database(self):
+        """Все операции замеряются, добавленные записи удаляются"""
+        conn = sqlite3.connect(":memory:")
+        summary = generate_database(conn, 300)
+        marks = table_marks(conn)
+        results = run(conn, summary, repeat=5)
+        restore_marks(conn, marks)
+
+        assert 'insert_record' in results and 'login_lookup' in results
+        assert all(result['runs'] > 0 for result in results.values())
+        assert conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 300
+        assert conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0] == 0
+        conn.close()
+
+    def test_main_writes_json(self, tmp_path):
+        """Запуск из командной строки сохраняет и сравнивает результаты"""
+        db_path = str(tmp_path / "bench.db")
+        output = str(tmp_path / "db.json")
+        args = ["--scale", "200", "--repeat", "4", "--db", db_path, "--only", "login_lookup"]
+        assert main(args + ["--output", output]) == 0
+        assert list(load_results(output)['results']) == ['login_lookup']
+        assert main(args + ["--compare", output]) in (0, 1)
+
+
+class FakeList:
+    """Список, строки которого добавляются по одной за кадр, как при отложенной разметке"""
+
+    def __init__(self):
+        self.children = []
+        self.size = (100, 0)
+        self.pending = 0
+
+    def load(self, rows):
+        self.children = []
+        self.pending = rows
+
+    def idle(self):
+        if self.pending:
+            self.pending -= 1
+            self.children.append(object())
+            self.size = (100, 48 * len(self.children))
+
+    def walk(self, restrict=False):
+        yield self
+        yield from self.children
+
+
+class TestUiBenchmark:
+    """Тесты вспомогательных функций замеров интерфейса"""
+
+    def test_settle_waits_for_layout(self):
+        """Кадры прокручиваются, пока список не перестанет меняться"""
+        widget = FakeList()
+        widget.load(3)
+        assert settle(widget, widget.idle) == 4
+        assert len(widget.children) == 3
+        assert settle(widget, lambda: widget.load(1), max_frames=4) == 2
+
+    def test_measure_ui(self):
+        """Сводка содержит кадры, виджеты и память процесса"""
+        widget = FakeList()
+        prepared = []
+        summary = measure_ui(lambda: widget.load(2), widget, widget.idle, repeat=3,
+                             prepare=lambda: prepared.append(1))
+        assert summary['runs'] == 3
+        assert len(prepared) == 4
+        assert summary['rows'] == 6
+        assert summary['frames_mean'] == 3
+        assert summary['widgets'] == count_widgets(widget) == 3
+        assert current_rss_bytes() > 0
+
+
+class TestExportBenchmark:
+    """Тесты подготовки данных для замеров экспорта"""
+
+    def test_records_in_story_format(self):
+        """Записи в формате истории, новые сверху"""
+        conn = sqlite3.connect(":memory:")
+        generate_database(conn, 300)
+        records = load_export_records(conn, 100)
+        conn.close()
+
+        assert len(records) == 100
+        assert all(len(record) == 8 for record in records)
+        dates = [record[7] for record in records]
+        assert dates == sorted(dates, reverse=True)
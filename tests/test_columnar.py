@@ -0,0 +1,180 @@
+"""
+Тесты колоночного хранилища записей utils/columnar.py
+"""
+
+import sqlite3
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from utils.columnar import RecordColumns, ADMIN_RECORD_COLUMNS, ID, INT, FLOAT, DATETIME
+
+
+def make_rows(count, users=50):
+    """Записи в формате select_user_records_by_admin, прочитанные из SQLite"""
+    rows = []
+    for i in range(count):
+        user_id = i % users
+        rows.append((
+            i + 1, user_id, f"Пользователь {user_id}", f"user{user_id}@mail.com",
+            60 + i % 400 / 10, 110 + i % 50, 70 + i % 30, None if i % 7 == 0 else 55 + i % 40,
+            36.0 + i % 20 / 10, ('', 'утро', None, 'после тренировки')[i % 4],
+            f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 08:{i % 60:02d}:00",
+            f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        ))
+
+    # Через SQLite, чтобы строки и числа были отдельными объектами, как в выборке
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a, b, c, d, e, f, g, h, i, j, k, l)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    rows = conn.execute("SELECT * FROM t").fetchall()
+    conn.close()
+    return rows
+
+
+def tuple_list_size(rows):
+    """Объем списка кортежей вместе с уникальными значениями"""
+    seen = set()
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        for value in row:
+            if value is not None and id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+@pytest.fixture
+def rows():
+    return make_rows(1000)
+
+
+class TestRecordColumns:
+    """Тесты колоночного контейнера"""
+
+    def test_round_trip(self, rows):
+        """Кортежи восстанавливаются без изменений"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        assert len(store) == len(rows)
+        assert list(store) == rows
+        assert store[-1] == rows[-1]
+
+    def test_values_of_other_types(self):
+        """Даты-объекты, NULL и нераспознанные даты сохраняются как есть"""
+        columns = (('id', ID), ('value', INT), ('at', DATETIME))
+        source = [
+            (1, None, datetime(2024, 5, 1, 10, 30)),
+            (2, 2 ** 40, "15.05.2024"),
+            (3, -5, None),
+            (4, 0, datetime(2024, 5, 1, 10, 30, 0, 1500)),
+        ]
+        store = RecordColumns.from_rows(columns, source)
+        assert list(store) == source
+        # Нераспознанная дата сохраняется и после выборки со сдвигом позиций
+        assert list(store.filter(bytearray([0, 1, 1, 1]))) == source[1:]
+        assert list(store.take([3, 1])) == [source[3], source[1]]
+
+    def test_values_that_do_not_fit_arrays(self):
+        """Целые другого типа приводятся, прочие значения переводят колонку в список"""
+        columns = (('id', ID), ('pulse', INT), ('pressure', INT), ('weight', FLOAT))
+        source = [
+            (1, 60, 120, 70.5),
+            (2.0, 61.0, 120.5, Decimal('71.5')),
+            (3, None, '130', None),
+            (4, Decimal('62'), None, 'нет данных'),
+        ]
+        store = RecordColumns.from_rows(columns, source)
+        assert list(store) == [
+            (1, 60, 120, 70.5),
+            (2, 61, 120.5, 71.5),
+            (3, None, '130', None),
+            (4, 62, None, 'нет данных'),
+        ]
+        assert store.column_view('pulse').format == 'i'
+        assert isinstance(store.column_view('pressure'), list)
+        assert store.by_id(2)[2] == 120.5
+        assert store.distinct_values('pressure') == {120, 120.5, '130'}
+        assert list(store.filter(store.search_mask("нет"))) == [(4, 62, None, 'нет данных')]
+
+    def test_index_by_id(self, rows):
+        """Поиск записи по ID"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        assert store.by_id(500) == rows[499]
+        assert store.by_id(10 ** 6) is None
+        assert 500 in store
+        assert store.distinct_values('user_id') == set(range(50))
+
+    def test_slice_and_filter(self, rows):
+        """Срез и маска возвращают новые контейнеры"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        assert list(store[10:20]) == rows[10:20]
+
+        mask = bytearray(1 if row[1] == 3 else 0 for row in rows)
+        filtered = store.filter(mask)
+        assert list(filtered) == [row for row in rows if row[1] == 3]
+        assert filtered.by_id(rows[3][0]) == rows[3]
+        # Словарь колонки содержит только оставшиеся значения
+        assert filtered.category_values('user_name') == ("Пользователь 3",)
+
+    def test_filter_does_not_build_rows(self, rows, monkeypatch):
+        """Выборка копирует колонки и не собирает кортежи записей"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        expected = rows[::3]
+
+        def fail(*args):
+            raise AssertionError("row() вызван при выборке")
+
+        monkeypatch.setattr(RecordColumns, 'row', fail)
+        mask = bytearray(1 if position % 3 == 0 else 0 for position in range(len(rows)))
+        filtered = store.filter(mask)
+        taken = store.take(range(0, len(rows), 3))
+        monkeypatch.undo()
+        assert list(filtered) == list(taken) == expected
+
+        with pytest.raises(ValueError):
+            store.filter(bytearray(3))
+
+    def test_search_mask_matches_string_search(self, rows):
+        """Маска поиска совпадает с поиском по строковым значениям полей"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        names = [name for name, _ in ADMIN_RECORD_COLUMNS if name != 'created_at']
+        for query in ("Пользователь 1", "USER7@", "тренир", "2024-03", "36.5", "12"):
+            expected = [row for row in rows
+                        if any(value and query.lower() in str(value).lower() for value in row[:11])]
+            assert list(store.filter(store.search_mask(query, names))) == expected
+
+    def test_column_views_share_memory(self, rows):
+        """Числовые колонки отдаются без копирования"""
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        weights = store.column_view('weight')
+        assert isinstance(weights, memoryview)
+        assert weights.format == 'd'
+        assert weights[0] == rows[0][4]
+
+        codes = store.column_view('user_name')
+        assert store.category_values('user_name')[codes[0]] == rows[0][2]
+        assert store.column_view('notes')[1] == rows[1][9]
+
+        # Пока представление существует, запись не добавляется ни в одну колонку
+        with pytest.raises(BufferError):
+            store.append((10 ** 5,) + rows[0][1:])
+        assert len(store.ids()) == len(rows)
+        assert store.by_id(10 ** 5) is None
+        weights.release()
+        codes.release()
+        store.append((10 ** 5,) + rows[0][1:])
+        assert store.by_id(10 ** 5)[1:] == rows[0][1:]
+
+    def test_memory_is_much_smaller(self):
+        """10 тысяч записей занимают больше чем в 8 раз меньше памяти, чем список кортежей (около 8,7)"""
+        rows = make_rows(10000)
+        store = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, rows)
+        assert store.memory_usage() * 8 < tuple_list_size(rows)
+
+    def test_unknown_column_kind(self):
+        """Неизвестный тип колонки отклоняется"""
+        with pytest.raises(ValueError):
+            RecordColumns((('id', ID), ('x', 'decimal')))
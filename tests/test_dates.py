@@ -0,0 +1,91 @@
+"""
+Тесты разбора и форматирования дат utils/dates.py
+"""
+
+from datetime import datetime, date
+
+import pytest
+
+from utils import dates
+from utils.dates import parse_datetime, format_date, set_date_format, clear_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_dates():
+    """Каждый тест начинается с формата по умолчанию и пустого кэша"""
+    set_date_format('dd-mm-yyyy')
+    clear_cache()
+    yield
+    set_date_format('dd-mm-yyyy')
+    clear_cache()
+
+
+class TestParseDatetime:
+    """Тесты разбора дат"""
+
+    def test_sqlite_formats(self):
+        """Форматы SQLite разбираются без strptime"""
+        assert parse_datetime("2024-03-15") == datetime(2024, 3, 15)
+        assert parse_datetime("2024-03-15 10:20:30") == datetime(2024, 3, 15, 10, 20, 30)
+        assert parse_datetime("2024-03-15 10:20:30.123456") == datetime(2024, 3, 15, 10, 20, 30, 123456)
+
+    def test_fallback_formats(self):
+        """Редкие форматы разбираются через strptime"""
+        assert parse_datetime("15-03-2024") == datetime(2024, 3, 15)
+        assert parse_datetime("15.03.2024 10:20:30") == datetime(2024, 3, 15, 10, 20, 30)
+
+    def test_objects_and_invalid_values(self):
+        """datetime и date принимаются как есть, мусор дает None"""
+        value = datetime(2024, 1, 2, 3, 4, 5)
+        assert parse_datetime(value) is value
+        assert parse_datetime(date(2024, 1, 2)) == datetime(2024, 1, 2)
+        assert parse_datetime("вчера") is None
+        assert parse_datetime(None) is None
+        assert parse_datetime("") is None
+
+
+class TestFormatDate:
+    """Тесты форматирования дат"""
+
+    def test_respects_date_format_setting(self):
+        """Порядок частей даты зависит от настройки пользователя"""
+        assert format_date("2024-03-15 10:20:30", 'dd-mm-yyyy') == "15-03-2024"
+        assert format_date("2024-03-15 10:20:30", 'mm-dd-yyyy') == "03-15-2024"
+        assert format_date("2024-03-15 10:20:30", 'yyyy-mm-dd') == "2024-03-15"
+        assert format_date("2024-03-15", 'dd-mm-yyyy', separator='.') == "15.03.2024"
+        assert format_date("2024-03-15 10:20:30", 'dd-mm-yyyy', separator='.', with_time=True) == \
+            "15.03.2024 10:20"
+        assert format_date("2024-03-15 10:20:30", 'dd-mm-yyyy', separator='.', with_time=True,
+                           seconds=True) == "15.03.2024 10:20:30"
+
+    def test_unparsable_value_is_returned_as_is(self):
+        """Нераспознанная дата отображается без изменений"""
+        assert format_date("неизвестно") == "неизвестно"
+        assert format_date(None) == ""
+
+    def test_results_are_cached(self, monkeypatch):
+        """Повторное форматирование не разбирает дату заново"""
+        calls = []
+        original = dates.parse_datetime
+
+        def counting_parse(value):
+            calls.append(value)
+            return original(value)
+
+        monkeypatch.setattr(dates, 'parse_datetime', counting_parse)
+        for _ in range(3):
+            assert format_date("2024-03-15", 'dd-mm-yyyy') == "15-03-2024"
+        assert calls == ["2024-03-15"]
+
+    def test_cache_is_invalidated_when_setting_changes(self):
+        """Смена настройки формата сбрасывает кэш"""
+        assert format_date("2024-03-15", 'dd-mm-yyyy') == "15-03-2024"
+        assert format_date("2024-03-15", 'yyyy-mm-dd') == "2024-03-15"
+        assert format_date("2024-03-15", 'dd-mm-yyyy') == "15-03-2024"
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """Размер кэша ограничен"""
+        monkeypatch.setattr(dates, 'DISPLAY_CACHE_SIZE', 10)
+        for day in range(1, 29):
+            format_date(f"2024-02-{day:02d}")
+        assert len(dates._display_cache) == 10
@@ -0,0 +1,125 @@
+"""
+Тесты монитора кадров services/frame_monitor.py
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from services.frame_monitor import FrameMonitor
+
+
+class ManualClock:
+    """Время, которое тест двигает вручную"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+class Event:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    monitor = FrameMonitor(threshold_ms=100.0, log_path=str(tmp_path / "stalls.log"), clock=ManualClock())
+    yield monitor
+    monitor.stop()
+
+
+def slow_handler_namespace():
+    """Класс экрана из модуля windows.*, метод которого выполняется долго"""
+    code = ("import time\n"
+            "class StoryWindow:\n"
+            "    def load_story(self, callback):\n"
+            "        return callback()\n")
+    namespace = {'__name__': 'windows.story'}
+    exec(code, namespace)
+    return namespace['StoryWindow']()
+
+
+class TestFrameStats:
+    """Тесты статистики кадров"""
+
+    def test_intervals(self, monitor):
+        """Интервалы учитываются начиная со второго кадра, пропуски и зависания считаются"""
+        assert monitor.tick() is None
+        for ms in (16, 16, 40, 16):
+            monitor.clock.advance(ms)
+            assert monitor.tick() is None
+        monitor.clock.advance(150)
+        stall = monitor.tick()
+
+        stats = monitor.snapshot()
+        assert stats['frames'] == 5
+        assert stats['dropped'] == 2
+        assert stats['stalls'] == 1
+        assert stats['max_ms'] == pytest.approx(150)
+        assert stats['histogram']['<=17'] == 3
+        assert stall['ms'] == pytest.approx(150)
+        assert stall['handler'] is None
+
+    def test_sampling_only_late_frames(self, monitor):
+        """Стек снимается только когда кадр запаздывает больше половины порога"""
+        monitor._main_thread = threading.get_ident()
+        monitor.tick()
+        handler = slow_handler_namespace()
+        monitor.clock.advance(10)
+        assert not handler.load_story(monitor.sample)
+        monitor.clock.advance(60)
+        assert handler.load_story(monitor.sample)
+        assert handler.load_story(monitor.sample)
+        monitor.screen_provider = lambda: "story"
+        monitor.clock.advance(60)
+
+        stall = monitor.tick()
+        assert stall['screen'] == "story"
+        assert stall['handler'] == "StoryWindow.load_story"
+        assert stall['samples'] == {"StoryWindow.load_story": 2}
+        # Выборки не переходят в следующий кадр
+        monitor.clock.advance(200)
+        assert monitor.tick()['samples'] == {}
+
+
+class TestStallLog:
+    """Тесты журнала и выгрузки зависаний"""
+
+    def test_background_sampler(self, tmp_path):
+        """Фоновый поток определяет метод экрана, выполнявшийся во время зависания"""
+        monitor = FrameMonitor(threshold_ms=60.0, sample_interval=0.005, log_path=str(tmp_path / "stalls.log"))
+        event = Event()
+        monitor.start(lambda callback: event)
+        try:
+            monitor.tick()
+            slow_handler_namespace().load_story(lambda: time.sleep(0.25))
+            stall = monitor.tick()
+        finally:
+            monitor.stop()
+
+        assert event.cancelled
+        assert stall['handler'] == "StoryWindow.load_story"
+        entries = [json.loads(line) for line in open(tmp_path / "stalls.log", encoding="utf-8")]
+        assert entries[0]['handler'] == "StoryWindow.load_story"
+
+    def test_export_json(self, monitor, tmp_path):
+        """Выгрузка содержит статистику и последние зависания"""
+        monitor.tick()
+        monitor.clock.advance(500)
+        monitor.tick()
+        path = str(tmp_path / "report.json")
+        assert monitor.export_json(path)
+        document = json.load(open(path, encoding="utf-8"))
+        assert document['frames']['stalls'] == 1
+        assert document['stalls'][0]['ms'] == pytest.approx(500)
@@ -0,0 +1,130 @@
+"""
+Тесты мониторинга сервера базы данных services/health.py
+"""
+
+import sqlite3
+
+import pytest
+
+import database
+from services.health import CircuitBreaker, BackendHealthMonitor
+
+
+class FakePyMySQL:
+    """Заглушка pymysql: управляемая доступность сервера"""
+
+    def __init__(self):
+        self.available = False
+        self.connect_calls = 0
+
+    def connect(self, **kwargs):
+        self.connect_calls += 1
+        if not self.available:
+            raise ConnectionError("connection refused")
+        return "mysql-connection"
+
+
+@pytest.fixture
+def fake_mysql(monkeypatch, tmp_path):
+    """Подменяет pymysql и сбрасывает общий предохранитель"""
+    fake = FakePyMySQL()
+    monkeypatch.setattr(database, 'pymysql', fake)
+    monkeypatch.setattr(database, 'mysql_breaker', CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    monkeypatch.setattr(database, 'get_default_db_path', lambda: str(tmp_path / "local.db"))
+    return fake
+
+
+class TestCircuitBreaker:
+    """Тесты предохранителя"""
+
+    def test_state_transitions(self):
+        """closed -> open -> half_open -> closed"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        assert breaker.allow_request(now=0)
+
+        breaker.record_failure(now=0)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure(now=0)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request(now=5)
+
+        # После таймаута разрешена только одна пробная попытка
+        assert breaker.allow_request(now=10)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow_request(now=10)
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request(now=11)
+
+    def test_failed_trial_reopens(self):
+        """Неудачная пробная попытка снова размыкает цепь"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+        for _ in range(3):
+            breaker.record_failure(now=0)
+        assert breaker.allow_request(now=10)
+        breaker.record_failure(now=10)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request(now=15)
+
+
+class TestBackendHealthMonitor:
+    """Тесты фоновой проверки сервера"""
+
+    def test_probe_updates_breaker_and_snapshot(self):
+        """Результат проверки отражается в предохранителе и снимке состояния"""
+        state = {'up': False}
+
+        def probe():
+            if not state['up']:
+                raise ConnectionError("down")
+
+        breaker = CircuitBreaker()
+        monitor = BackendHealthMonitor(probe, breaker, interval=1)
+
+        assert monitor.probe_once() is False
+        snapshot = monitor.snapshot()
+        assert snapshot['state'] == 'open'
+        assert snapshot['backend'] == 'sqlite'
+        assert snapshot['last_error'] == "down"
+
+        state['up'] = True
+        assert monitor.probe_once() is True
+        snapshot = monitor.snapshot()
+        assert snapshot['state'] == 'closed'
+        assert snapshot['backend'] == 'mysql'
+        assert snapshot['latency_ms'] is not None
+
+
+class TestConnectionFailover:
+    """Тесты переключения get_connection между MySQL и SQLite"""
+
+    def test_open_breaker_skips_connect_attempts(self, fake_mysql):
+        """После отказа сервера подключения к нему не выполняются"""
+        conn = database.get_connection(database="mysql")
+        assert isinstance(conn, sqlite3.Connection)
+        conn.close()
+        assert fake_mysql.connect_calls == 1
+
+        for _ in range(5):
+            database.get_connection(database="mysql").close()
+        assert fake_mysql.connect_calls == 1
+
+    def test_returns_to_mysql_after_recovery(self, fake_mysql):
+        """После восстановления сервера подключения снова идут в MySQL"""
+        database.get_connection(database="mysql").close()
+        assert database.mysql_breaker.state == CircuitBreaker.OPEN
+
+        fake_mysql.available = True
+        database.mysql_breaker.record_success()  # так делает фоновая проверка
+        assert database.get_connection(database="mysql") == "mysql-connection"
+
+    def test_remote_connection_fails_fast_when_open(self, fake_mysql):
+        """Движок синхронизации получает ошибку без ожидания таймаута"""
+        with pytest.raises(ConnectionError):
+            database.get_remote_connection()
+        calls = fake_mysql.connect_calls
+
+        with pytest.raises(ConnectionError):
+            database.get_remote_connection()
+        assert fake_mysql.connect_calls == calls
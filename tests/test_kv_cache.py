@@ -0,0 +1,253 @@
+"""
+Тесты кэша KV-разметок services/kv_cache.py
+"""
+
+import importlib
+import importlib.metadata
+import os
+import sys
+import types
+
+import pytest
+
+from services.kv_cache import KVCache, cache_key
+
+
+class FakeParser:
+    """Разбор разметки: каждая строка 'имя: выражение' компилируется как правило Kivy"""
+
+    created = 0
+    directives = 0
+
+    def __init__(self, content, filename=None):
+        FakeParser.created += 1
+        self.filename = filename
+        self.rules = []
+        for line in content.strip().splitlines():
+            name, value = line.split(':', 1)
+            self.rules.append((name.strip(), compile(value.strip(), '<kv>', 'eval')))
+        self.execute_directives()
+
+    def execute_directives(self):
+        FakeParser.directives += 1
+
+
+class FakeBuilder:
+    """Builder, создающий Parser через модуль, как kivy.lang.builder"""
+
+    def __init__(self, module):
+        self.module = module
+        self.rules = []
+
+    def load_string(self, string, **kwargs):
+        parser = self.module.Parser(content=string, filename=kwargs.get('filename'))
+        self.rules.extend(parser.rules)
+        if getattr(parser, 'broken', False):
+            raise RuntimeError("rule cannot be applied")
+        return parser
+
+
+@pytest.fixture
+def builder_module():
+    FakeParser.created = 0
+    FakeParser.directives = 0
+    module = types.SimpleNamespace(Parser=FakeParser)
+    module.Builder = FakeBuilder(module)
+    return module
+
+
+KV = "width: 10 * 2\nheight: max(1, 3)\n"
+
+
+class TestKVCache:
+    """Тесты кэша разобранных разметок"""
+
+    def test_second_launch_uses_cache(self, builder_module, tmp_path):
+        """Повторный запуск загружает правила из файла без разбора"""
+        KVCache(str(tmp_path)).load_with(builder_module, "kv_story", KV)
+        assert FakeParser.created == 1
+        assert os.path.exists(tmp_path / "kv_story.pickle")
+
+        builder_module.Builder.rules.clear()
+        cache = KVCache(str(tmp_path))
+        cache.load_with(builder_module, "kv_story", KV)
+
+        assert FakeParser.created == 1
+        assert FakeParser.directives == 2
+        assert [(name, eval(code)) for name, code in builder_module.Builder.rules] == [('width', 20), ('height', 3)]
+        assert builder_module.Parser is FakeParser
+
+        report = cache.report()
+        entry = report['entries'][0]
+        assert report['hits'] == 1
+        assert entry['hit'] is True
+        assert entry['saved_ms'] == pytest.approx(entry['parse_ms'] - entry['ms'])
+
+    def test_changed_string_is_parsed(self, builder_module, tmp_path):
+        """Измененная разметка разбирается заново и перезаписывает кэш"""
+        cache = KVCache(str(tmp_path))
+        cache.load_with(builder_module, "kv_admin", KV)
+        cache.load_with(builder_module, "kv_admin", KV + "spacing: 4\n")
+        cache.load_with(builder_module, "kv_admin", KV + "spacing: 4\n")
+
+        assert FakeParser.created == 2
+        assert [entry['hit'] for entry in cache.report()['entries']] == [False, False, True]
+        assert builder_module.Builder.rules[-1][0] == 'spacing'
+
+    def test_corrupt_file_falls_back(self, builder_module, tmp_path):
+        """Поврежденный файл кэша не мешает загрузке разметки"""
+        (tmp_path / "kv_profile.pickle").write_bytes(b"not a pickle")
+        cache = KVCache(str(tmp_path))
+        cache.load_with(builder_module, "kv_profile", KV)
+
+        assert FakeParser.created == 1
+        assert cache.report()['entries'][0]['hit'] is False
+        # После ошибки кэш отключен до перезапуска и поврежденный файл удален
+        assert cache.enabled is False
+        assert os.listdir(tmp_path) == []
+        KVCache(str(tmp_path)).load_with(builder_module, "kv_profile", KV)
+        KVCache(str(tmp_path)).load_with(builder_module, "kv_profile", KV)
+        assert FakeParser.created == 2
+
+    def test_cached_parser_that_fails_is_reparsed(self, builder_module, tmp_path):
+        """Если Builder не применил Parser из кэша, разметка разбирается заново и кэш отключается"""
+        cache = KVCache(str(tmp_path))
+        parser = cache.load_with(builder_module, "kv_story", KV)
+        parser.broken = True
+        assert cache._write("kv_story", cache_key(KV, ""), 1.0, parser)
+        builder_module.Builder.rules.clear()
+
+        cache = KVCache(str(tmp_path))
+        assert not getattr(cache.load_with(builder_module, "kv_story", KV), 'broken', False)
+
+        assert FakeParser.created == 2
+        assert cache.enabled is False
+        assert [name for name, _ in builder_module.Builder.rules] == ['width', 'height']
+        assert cache.report()['entries'][0]['hit'] is False
+        assert os.listdir(tmp_path) == []
+
+        cache.load_with(builder_module, "kv_story", KV)
+        assert FakeParser.created == 3
+
+    def test_disabled_cache(self, builder_module, tmp_path):
+        """Отключенный кэш не читает и не пишет файлы"""
+        cache = KVCache(str(tmp_path), enabled=False)
+        cache.load_with(builder_module, "kv_settings", KV)
+        cache.load_with(builder_module, "kv_settings", KV)
+        assert FakeParser.created == 2
+        assert os.listdir(tmp_path) == []
+
+    def test_parser_restored_after_error(self, builder_module, tmp_path):
+        """Ошибка разбора пробрасывается, Parser модуля восстанавливается"""
+        with pytest.raises(ValueError):
+            KVCache(str(tmp_path)).load_with(builder_module, "kv_bad", "no separator")
+        assert builder_module.Parser is FakeParser
+
+    def test_shared_cache_is_opt_in(self, monkeypatch):
+        """Общий кэш приложения включается только переменной окружения"""
+        import services.kv_cache as kv_cache_module
+        try:
+            monkeypatch.delenv(kv_cache_module.KV_CACHE_ENV, raising=False)
+            assert importlib.reload(kv_cache_module).kv_cache.enabled is False
+            monkeypatch.setenv(kv_cache_module.KV_CACHE_ENV, "1")
+            assert importlib.reload(kv_cache_module).kv_cache.enabled is True
+        finally:
+            monkeypatch.undo()
+            importlib.reload(kv_cache_module)
+
+    def test_key_depends_on_versions(self):
+        """Ключ меняется вместе с текстом и версией Kivy"""
+        assert cache_key(KV, "2.3.0") == cache_key(KV, "2.3.0")
+        assert cache_key(KV, "2.3.0") != cache_key(KV, "2.3.1")
+        assert cache_key(KV, "2.3.0") != cache_key(KV + " ", "2.3.0")
+
+    def test_clear(self, builder_module, tmp_path):
+        """clear удаляет файлы кэша"""
+        cache = KVCache(str(tmp_path))
+        cache.load_with(builder_module, "kv_story", KV)
+        cache.clear()
+        assert os.listdir(tmp_path) == []
+
+
+REAL_KV = """
+#:import math math
+#:set cached_base 10
+
+<CachedBox@BoxLayout>:
+    spacing: cached_base * 2
+    padding: math.floor(self.spacing / 4)
+    Label:
+        id: caption
+        text: str(root.spacing)
+        on_text: root.padding = 1
+"""
+
+
+@pytest.fixture
+def real_builder(monkeypatch):
+    """Настоящий kivy.lang.builder вместо заглушек conftest.py"""
+    try:
+        importlib.metadata.version("kivy")
+    except importlib.metadata.PackageNotFoundError:
+        pytest.skip("Kivy не установлен")
+    monkeypatch.setenv("KIVY_NO_ARGS", "1")
+    monkeypatch.setenv("KIVY_NO_CONSOLELOG", "1")
+    mocked = {name: module for name, module in sys.modules.items()
+              if name == 'kivy' or name.startswith('kivy.')}
+    for name in mocked:
+        del sys.modules[name]
+    try:
+        yield pytest.importorskip("kivy.lang.builder")
+    finally:
+        for name in [name for name in sys.modules if name == 'kivy' or name.startswith('kivy.')]:
+            del sys.modules[name]
+        sys.modules.update(mocked)
+
+
+class TestRealKivy:
+    """Кэш с настоящим Parser и Builder Kivy"""
+
+    def test_parser_round_trip(self, real_builder, tmp_path):
+        """Parser Kivy сохраняется и восстанавливается, Builder берет его через Parser модуля"""
+        builder = real_builder.Builder
+        parse = real_builder.Parser
+        KVCache(str(tmp_path)).load_with(real_builder, "kv_real", REAL_KV, filename="kv_real.kv")
+        builder.unload_file("kv_real.kv")
+        real_builder.global_idmap.pop('cached_base', None)
+        real_builder.global_idmap.pop('math', None)
+
+        created = []
+
+        def counting_parser(**kwargs):
+            created.append(kwargs)
+            return parse(**kwargs)
+
+        real_builder.Parser = counting_parser
+        try:
+            cache = KVCache(str(tmp_path))
+            cache.load_with(real_builder, "kv_real", REAL_KV, filename="kv_real.kv")
+        finally:
+            real_builder.Parser = parse
+
+        # Builder.load_string получил Parser из кэша через глобальное имя модуля
+        assert created == []
+        assert cache.report()['entries'][0]['hit'] is True
+        assert cache.enabled is True
+
+        # Директивы выполнены заново
+        assert real_builder.global_idmap['cached_base'] == 10
+        assert real_builder.global_idmap['math'].floor(2.5) == 2
+
+        rules = [rule for selector, rule in builder.rules if rule.ctx.filename == "kv_real.kv"]
+        assert len(rules) == 1
+        rule = rules[0]
+        assert rule.name == "<CachedBox@BoxLayout>"
+        assert [selector.key for selector, item in builder.rules if item is rule] == ['cachedbox']
+        # Обратные ссылки правил и свойств на разобранный Parser сохранены
+        assert rule.properties['spacing'].ctx is rule.ctx
+        assert eval(rule.properties['spacing'].co_value, dict(real_builder.global_idmap)) == 20
+        child = rule.children[0]
+        assert child.name == "Label" and child.id == "caption" and child.ctx is rule.ctx
+        assert ['root', 'spacing'] in child.properties['text'].watched_keys
+        assert 'on_text' in [handler.name for handler in child.handlers]
+        builder.unload_file("kv_real.kv")
@@ -0,0 +1,163 @@
+"""
+Тесты учета запросов services/query_monitor.py
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from database import get_connection, create_schema, select_user_by_email
+from services.query_monitor import QueryMonitor, InstrumentedConnection, InstrumentedCursor, normalize_sql
+
+
+@pytest.fixture
+def monitor(monkeypatch, tmp_path):
+    """Отдельный монитор вместо общего, журнал во временном каталоге"""
+    monitor = QueryMonitor(threshold_ms=1000.0, log_path=str(tmp_path / "slow.log"))
+    monkeypatch.setattr(InstrumentedCursor, 'monitor', monitor)
+    yield monitor
+    monitor.close()
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO t (name) VALUES (?)", [("a",), ("b",), ("c",)])
+    yield conn
+    conn.close()
+
+
+def by_shape(monitor):
+    return {row['sql']: row for row in monitor.snapshot()}
+
+
+class TestNormalizeSql:
+    """Тесты нормализации запросов"""
+
+    def test_literals_are_stripped(self):
+        """Запросы с разными значениями получают одну форму"""
+        first = normalize_sql("SELECT id FROM users WHERE email='a@mail.com' AND id = 5")
+        second = normalize_sql("SELECT id FROM users\n   WHERE email='o''neil@mail.com' AND id = 12")
+        assert first == second == "SELECT id FROM users WHERE email=? AND id = ?"
+
+    def test_lists_and_placeholders(self):
+        """Списки значений сворачиваются, %s и ? совпадают"""
+        assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3)") == "SELECT * FROM t WHERE id IN (?, ...)"
+        assert normalize_sql("SELECT * FROM t WHERE id IN (%s, %s)") == "SELECT * FROM t WHERE id IN (?, ...)"
+        assert normalize_sql("SELECT * FROM admin_actions_202401 LIMIT 50") == \
+            "SELECT * FROM admin_actions_202401 LIMIT ?"
+
+
+class TestInstrumentedConnection:
+    """Тесты учета запросов соединением"""
+
+    def test_counts_rows_and_calls(self, monitor, conn):
+        """Учитываются число выполнений и прочитанные строки"""
+        monitor.reset()
+        for _ in range(2):
+            conn.execute("SELECT id, name FROM t WHERE id > 0").fetchall()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM t WHERE id = 2")
+        assert cursor.fetchone() == ("b",)
+        cursor.close()
+        conn.execute("UPDATE t SET name = 'x' WHERE id <= 2")
+
+        stats = by_shape(monitor)
+        assert stats["SELECT id, name FROM t WHERE id > ?"]['count'] == 2
+        assert stats["SELECT id, name FROM t WHERE id > ?"]['rows'] == 6
+        assert stats["SELECT name FROM t WHERE id = ?"]['rows'] == 1
+        assert stats["UPDATE t SET name = ? WHERE id <= ?"]['rows'] == 2
+
+    def test_row_by_row_reads(self, monitor, conn):
+        """Чтение по одной строке и обход курсора учитываются один раз со всеми строками"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM t WHERE id >= 1")
+        names = []
+        while (row := cursor.fetchone()) is not None:
+            names.append(row[0])
+        assert names == ["a", "b", "c"]
+
+        cursor.execute("SELECT id FROM t WHERE id >= 2")
+        assert [row[0] for row in cursor] == [2, 3]
+
+        cursor.execute("SELECT id FROM t")
+        assert len(cursor.fetchmany()) == 1
+        assert "SELECT id FROM t" not in by_shape(monitor)
+        cursor.close()
+
+        counts = {row['sql']: (row['count'], row['rows']) for row in monitor.snapshot()}
+        assert counts["SELECT name FROM t WHERE id >= ?"] == (1, 3)
+        assert counts["SELECT id FROM t WHERE id >= ?"] == (1, 2)
+        assert counts["SELECT id FROM t"] == (1, 1)
+
+    def test_errors_and_slow_queries_are_logged(self, monitor, conn, tmp_path):
+        """Ошибки и запросы дольше порога пишутся в журнал"""
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("SELECT missing FROM t")
+        monitor.configure(threshold_ms=0.0)
+        conn.execute("SELECT COUNT(*) FROM t").fetchone()
+        monitor.close()
+
+        entries = [json.loads(line) for line in open(tmp_path / "slow.log", encoding="utf-8")]
+        assert entries[0]['error'] == "no such column: missing"
+        assert entries[1]['sql'] == "SELECT COUNT(*) FROM t"
+        assert entries[1]['rows'] == 1
+        assert by_shape(monitor)["SELECT missing FROM t"]['errors'] == 1
+
+    def test_log_is_off_until_configured(self, tmp_path, monkeypatch, conn):
+        """Без файла журнала медленные запросы только считаются, файл в текущем каталоге не создается"""
+        monkeypatch.chdir(tmp_path)
+        monitor = QueryMonitor(threshold_ms=0.0)
+        monkeypatch.setattr(InstrumentedCursor, 'monitor', monitor)
+        conn.execute("SELECT name FROM t").fetchall()
+        assert by_shape(monitor)["SELECT name FROM t"]['slow'] == 1
+        assert os.listdir(tmp_path) == []
+
+        monitor.configure(log_path=str(tmp_path / "slow.log"))
+        conn.execute("SELECT name FROM t").fetchall()
+        monitor.close()
+        assert os.listdir(tmp_path) == ["slow.log"]
+
+    def test_log_rotation(self, tmp_path, monkeypatch, conn):
+        """Журнал ротируется по размеру"""
+        monitor = QueryMonitor(threshold_ms=0.0, log_path=str(tmp_path / "slow.log"), max_bytes=400, backups=2)
+        monkeypatch.setattr(InstrumentedCursor, 'monitor', monitor)
+        for _ in range(20):
+            conn.execute("SELECT name FROM t").fetchall()
+        monitor.close()
+        assert sorted(os.listdir(tmp_path)) == ["slow.log", "slow.log.1", "slow.log.2"]
+
+    def test_caller_screen(self, monitor, conn):
+        """Для запроса с экрана записывается экран и метод"""
+        code = ("class StoryWindow:\n"
+                "    def load_story(self, conn):\n"
+                "        return conn.execute('SELECT name FROM t').fetchall()\n")
+        namespace = {'__name__': 'windows.story'}
+        exec(code, namespace)
+        namespace['StoryWindow']().load_story(conn)
+        assert by_shape(monitor)["SELECT name FROM t"]['callers'] == {"StoryWindow.load_story": 1}
+
+    def test_database_helpers_are_instrumented(self, monitor, tmp_path):
+        """Соединения database.get_connection учитываются, вызывающий код определяется"""
+        conn = get_connection(path=str(tmp_path / "app.db"))
+        create_schema(conn)
+        monitor.reset()
+        select_user_by_email(conn, "a@mail.com")
+        conn.close()
+
+        stats = by_shape(monitor)["SELECT id, is_admin FROM users WHERE email=?"]
+        assert stats['count'] == 1
+        assert list(stats['callers']) == [f"{__name__}.test_database_helpers_are_instrumented"]
+
+    def test_export_json(self, monitor, conn, tmp_path):
+        """Счетчики сохраняются в JSON, отсортированные по суммарному времени"""
+        conn.execute("SELECT name FROM t").fetchall()
+        path = str(tmp_path / "stats.json")
+        assert monitor.export_json(path)
+        document = json.load(open(path, encoding="utf-8"))
+        assert document['threshold_ms'] == 1000.0
+        totals = [query['total_ms'] for query in document['queries']]
+        assert totals == sorted(totals, reverse=True)
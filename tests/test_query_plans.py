@@ -0,0 +1,83 @@
+"""
+Тесты планов запросов benchmarks/query_plans.py
+"""
+
+import pytest
+
+from benchmarks.query_plans import open_plan_database, build_cases, collect_plans, compare_plans, \
+    load_baseline, unchecked_functions, analyze_plan, format_regressions
+
+
+@pytest.fixture(scope="module")
+def plan_conn():
+    conn = open_plan_database(1000)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def cases(plan_conn):
+    # Вызовы изменяют базу (удаляют сессию, запись), поэтому строятся один раз
+    return build_cases(plan_conn)
+
+
+@pytest.fixture(scope="module")
+def plans(plan_conn, cases):
+    return collect_plans(plan_conn, cases)
+
+
+class TestQueryPlans:
+    """Планы запросов database.py не хуже сохраненных"""
+
+    def test_no_regressions(self, plans):
+        """Ни в одном запросе не появилось полного просмотра или временной сортировки"""
+        regressions, _ = compare_plans(load_baseline(), plans)
+        assert not regressions, "Планы запросов стали хуже:\n" + format_regressions(regressions)
+
+    def test_every_function_is_checked(self, cases):
+        """Каждая функция database.py с соединением проверяется или явно исключена"""
+        assert unchecked_functions(cases) == []
+
+    def test_known_fixes(self, plans):
+        """Сортировка пользователей по дате и журнал без admin_id используют индексы"""
+        for key, entry in plans.items():
+            if key.startswith(("select_all_users:", "select_users_directory:", "select_admin_actions:")):
+                assert not any(issue.startswith("SCAN") for issue in entry['issues']), key
+
+    def test_dropped_index_is_regression(self):
+        """Удаление индекса обнаруживается как регрессия"""
+        conn = open_plan_database(1000)
+        try:
+            conn.execute("DROP INDEX idx_users_created")
+            current = collect_plans(conn)
+        finally:
+            conn.close()
+        regressions, _ = compare_plans(load_baseline(), current)
+        keys = [key for key, _, _ in regressions]
+        assert any(key.startswith("select_all_users:") for key in keys)
+        assert all("SCAN users" in added or "TEMP B-TREE FOR ORDER BY" in added
+                   for _, added, _ in regressions)
+
+
+class TestAnalyzePlan:
+    """Тесты разбора EXPLAIN QUERY PLAN"""
+
+    def test_large_and_small_tables(self):
+        """Полный просмотр отмечается только для больших таблиц, псевдонимы разрешаются"""
+        sql = "SELECT * FROM records r JOIN sync_state s ON s.key = r.notes ORDER BY r.pulse"
+        rows = [(2, 0, 0, "SCAN r"), (5, 0, 0, "SCAN s"), (9, 0, 0, "USE TEMP B-TREE FOR ORDER BY")]
+        plan, issues = analyze_plan(sql, rows)
+        assert plan == ["SCAN r", "SCAN s", "USE TEMP B-TREE FOR ORDER BY"]
+        assert issues == ["SCAN records", "TEMP B-TREE FOR ORDER BY"]
+
+    def test_subquery_scan(self):
+        """Просмотр результата подзапроса не считается просмотром таблицы"""
+        sql = "SELECT * FROM (SELECT * FROM admin_actions_202401 aa LIMIT 5) aa"
+        rows = [(2, 0, 0, "CO-ROUTINE aa"), (9, 2, 0, "SCAN aa USING INDEX idx_admin_actions_202401_created"),
+                (25, 0, 0, "SCAN aa")]
+        plan, issues = analyze_plan(sql, rows)
+        assert plan[1] == "  SCAN aa USING INDEX idx_admin_actions_YYYYMM_created"
+        assert issues == []
+
+        rows[1] = (9, 2, 0, "SCAN TABLE aa")
+        assert analyze_plan(sql, rows)[1] == ["SCAN admin_actions_YYYYMM"]
@@ -0,0 +1,118 @@
+"""
+Тесты модели отображения истории записей services/records_view.py
+"""
+
+import sqlite3
+
+import pytest
+
+from database import create_schema, insert_record, update_record, delete_record
+from services.records_view import RecordRow, RecordViewCache
+
+
+@pytest.fixture
+def records_db(tmp_path):
+    """Временная база с тремя записями пользователя и счетчик соединений"""
+    path = str(tmp_path / "records.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES (1, 'a@mail.com', 'hash', 'Анна')")
+    conn.commit()
+    insert_record(conn, 1, 70.5, 120, 80, 60, 36.6, 'утро', '2024-01-10 08:00:00')
+    insert_record(conn, 1, 71.0, 130, 85, 72, 36.8, 'Головная боль', '2024-01-12 08:00:00')
+    insert_record(conn, 1, 'NULL', 110, 70, 65, 36.5, '', '2024-01-11 08:00:00')
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(1)
+        return sqlite3.connect(path)
+
+    return {'path': path, 'connect': connect, 'connects': connects}
+
+
+class TestRecordRow:
+    """Тесты строки истории"""
+
+    def test_display_texts(self):
+        """Тексты списка готовятся при создании строки"""
+        row = RecordRow((5, 70.5, 120, 80, None, 36.6, 'заметка', '2024-01-15 10:30:00'))
+        assert row.id == 5
+        assert row.primary_text == "Дата: 15-01-2024"
+        assert row.secondary_text == "Вес: 70.5 кг, Давление: 120/80, Пульс: Н/Д, Темп.: 36.6°C"
+
+    def test_search_key(self):
+        """Поиск без учета регистра по значениям и отформатированной дате"""
+        row = RecordRow((5, 70.5, 120, 80, 60, 36.6, 'Головная Боль', '2024-01-15'), 'yyyy-mm-dd')
+        assert row.matches("головная")
+        assert row.matches("2024-01-15")
+        assert row.matches("120")
+        assert not row.matches("15-01-2024")
+        # Запрос не должен совпадать на стыке двух полей
+        assert not row.matches("12080")
+
+    def test_compact(self):
+        """Строка не имеет __dict__"""
+        row = RecordRow((1, None, None, None, None, None, None, '2024-01-15'))
+        assert not hasattr(row, '__dict__')
+
+
+class TestRecordViewCache:
+    """Тесты кэша строк истории"""
+
+    def test_rows_loaded_once(self, records_db):
+        """История читается из базы один раз и отсортирована по дате"""
+        cache = RecordViewCache(connect=records_db['connect'])
+        rows = cache.get_rows(1)
+        assert [row.record_date[:10] for row in rows] == ['2024-01-12', '2024-01-11', '2024-01-10']
+
+        cache.get_rows(1)
+        assert len(records_db['connects']) == 1
+
+    def test_date_format_change(self, records_db):
+        """Смена формата даты пересчитывает даты без обращения к базе"""
+        cache = RecordViewCache(connect=records_db['connect'])
+        cache.get_rows(1)
+        rows = cache.get_rows(1, 'yyyy-mm-dd')
+        assert rows[0].primary_text == "Дата: 2024-01-12"
+        assert len(records_db['connects']) == 1
+
+    def test_add_edit_delete_touch_single_rows(self, records_db):
+        """Добавление, изменение и удаление пересчитывают только свою строку"""
+        cache = RecordViewCache(connect=records_db['connect'])
+        before = {row.id: row for row in cache.get_rows(1)}
+
+        conn = sqlite3.connect(records_db['path'])
+        new_id = insert_record(conn, 1, 69.0, 118, 79, 58, 36.4, 'вечер', '2024-01-11 20:00:00')
+        cache.refresh_record(1, new_id, conn)
+        rows = cache.get_rows(1)
+        assert [row.id for row in rows][:2] == [list(before)[0], new_id]
+        assert all(rows_row is before[rows_row.id] for rows_row in rows if rows_row.id != new_id)
+
+        edited_id = rows[-1].id
+        update_record(conn, edited_id, 68.0, 120, 80, 60, 36.6, 'изменено')
+        cache.refresh_record(1, edited_id, conn)
+        rows = cache.get_rows(1)
+        assert rows[-1].id == edited_id
+        assert rows[-1].matches("изменено")
+
+        delete_record(conn, new_id)
+        cache.remove(1, [new_id])
+        conn.close()
+        assert new_id not in [row.id for row in cache.get_rows(1)]
+        assert len(records_db['connects']) == 1
+
+    def test_upsert_before_load_is_ignored(self, records_db):
+        """Незагруженная история не создается частично"""
+        cache = RecordViewCache(connect=records_db['connect'])
+        assert cache.upsert(1, (99, 70, 120, 80, 60, 36.6, '', '2024-02-01')) is None
+        assert len(cache.get_rows(1)) == 3
+
+    def test_invalidate(self, records_db):
+        """После сброса история перечитывается из базы"""
+        cache = RecordViewCache(connect=records_db['connect'])
+        cache.get_rows(1)
+        cache.invalidate(1)
+        cache.get_rows(1)
+        assert len(records_db['connects']) == 2
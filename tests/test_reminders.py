@@ -0,0 +1,185 @@
+"""
+Тесты планировщика напоминаний services/reminders.py
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import create_schema, save_reminder, select_active_reminders
+from services.reminders import ReminderScheduler, parse_reminder_time, next_fire_time, DAILY_REMINDER_TYPE
+
+
+class FakeClock:
+    """Текущее время, которое двигается вручную"""
+
+    def __init__(self, now):
+        self.current = now
+
+    def __call__(self):
+        return self.current
+
+
+class RecordingScheduler:
+    """Запоминает отложенные вызовы вместо их выполнения"""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, callback, delay):
+        event = RecordedEvent(callback, delay)
+        self.events.append(event)
+        return event
+
+    @property
+    def active(self):
+        return [event for event in self.events if not event.cancelled and not event.done]
+
+    def fire(self):
+        """Выполняет единственный активный вызов, как это сделал бы Clock"""
+        (event,) = self.active
+        event.done = True
+        event.callback(0)
+
+
+class RecordedEvent:
+    def __init__(self, callback, delay):
+        self.callback = callback
+        self.delay = delay
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def reminders_db(tmp_path):
+    """Временная база с пользователем и тремя напоминаниями"""
+    path = str(tmp_path / "reminders.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES (1, 'a@mail.com', 'hash', 'Анна')")
+    conn.commit()
+    save_reminder(conn, 1, 'pressure', '08:00', "Измерьте давление")
+    save_reminder(conn, 1, 'pills', '13:30', "Примите лекарство")
+    save_reminder(conn, 1, 'weight', '07:00', "Взвесьтесь", is_active=False)
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(1)
+        return sqlite3.connect(path)
+
+    return {'path': path, 'connect': connect, 'connects': connects}
+
+
+@pytest.fixture
+def scheduler_parts():
+    clock = FakeClock(datetime(2024, 5, 1, 7, 30))
+    events = RecordingScheduler()
+    fired = []
+    return clock, events, fired
+
+
+def make_scheduler(reminders_db, scheduler_parts):
+    clock, events, fired = scheduler_parts
+    return ReminderScheduler(connect=reminders_db['connect'], scheduler=events,
+                             notify=fired.append, now=clock)
+
+
+class TestReminderTime:
+    """Тесты разбора времени"""
+
+    def test_parse(self):
+        """Поддерживаются строки, time и timedelta (TIME в MySQL)"""
+        assert parse_reminder_time('20:05') == (20, 5)
+        assert parse_reminder_time('08:00:00') == (8, 0)
+        assert parse_reminder_time(timedelta(hours=21, minutes=15)) == (21, 15)
+        assert parse_reminder_time('25:00') is None
+        assert parse_reminder_time(None) is None
+
+    def test_next_fire_time(self):
+        """Прошедшее сегодня время переносится на завтра"""
+        now = datetime(2024, 5, 1, 20, 0)
+        assert next_fire_time(21, 0, now) == datetime(2024, 5, 1, 21, 0)
+        assert next_fire_time(20, 0, now) == datetime(2024, 5, 2, 20, 0)
+
+
+class TestReminderScheduler:
+    """Тесты планировщика"""
+
+    def test_single_event_for_earliest_reminder(self, reminders_db, scheduler_parts):
+        """Планируется один вызов на ближайшее включенное напоминание"""
+        clock, events, fired = scheduler_parts
+        scheduler = make_scheduler(reminders_db, scheduler_parts)
+        scheduler.activate_user(1)
+
+        assert [reminder.message for reminder in scheduler.pending()] == ["Измерьте давление", "Примите лекарство"]
+        assert len(events.active) == 1
+        assert events.active[0].delay == 30 * 60
+        assert scheduler.next_fire_at == datetime(2024, 5, 1, 8, 0)
+
+    def test_fire_and_reschedule(self, reminders_db, scheduler_parts):
+        """Сработавшее напоминание переносится на следующий день"""
+        clock, events, fired = scheduler_parts
+        scheduler = make_scheduler(reminders_db, scheduler_parts)
+        scheduler.activate_user(1)
+
+        clock.current = datetime(2024, 5, 1, 8, 0)
+        events.fire()
+        assert [reminder.message for reminder in fired] == ["Измерьте давление"]
+        assert scheduler.next_fire_at == datetime(2024, 5, 1, 13, 30)
+
+        # После долгого сна устройства каждое напоминание срабатывает один раз
+        clock.current = datetime(2024, 5, 4, 9, 0)
+        events.fire()
+        assert len(fired) == 3
+        assert scheduler.next_fire_at == datetime(2024, 5, 4, 13, 30)
+        assert len(events.active) == 1
+
+    def test_settings_change_is_incremental(self, reminders_db, scheduler_parts):
+        """Изменение настроек меняет только ежедневное напоминание"""
+        clock, events, fired = scheduler_parts
+        scheduler = make_scheduler(reminders_db, scheduler_parts)
+        scheduler.activate_user(1, {'daily_reminders': False, 'reminder_time': '20:00'})
+        reminders_db['connects'].clear()
+
+        assert scheduler.apply_settings(1, {'daily_reminders': True, 'reminder_time': '07:45'})
+        assert scheduler.next_fire_at == datetime(2024, 5, 1, 7, 45)
+        assert len(events.active) == 1
+
+        # Те же настройки повторно не записываются
+        assert not scheduler.apply_settings(1, {'daily_reminders': True, 'reminder_time': '07:45'})
+        assert len(reminders_db['connects']) == 1
+
+        assert scheduler.apply_settings(1, {'daily_reminders': False, 'reminder_time': '07:45'})
+        assert scheduler.next_fire_at == datetime(2024, 5, 1, 8, 0)
+        assert DAILY_REMINDER_TYPE not in [reminder.reminder_type for reminder in scheduler.pending()]
+
+        conn = sqlite3.connect(reminders_db['path'])
+        assert [row[3] for row in select_active_reminders(conn, 1)] == ['pressure', 'pills']
+        assert conn.execute("SELECT COUNT(*) FROM reminders WHERE reminder_type = 'daily'").fetchone()[0] == 1
+        conn.close()
+
+    def test_enabled_setting_creates_reminder_on_login(self, reminders_db, scheduler_parts):
+        """Включенная в настройках ежедневная рассылка появляется при входе"""
+        scheduler = make_scheduler(reminders_db, scheduler_parts)
+        scheduler.activate_user(1, {'daily_reminders': True, 'reminder_time': '20:00'})
+        assert [reminder.reminder_type for reminder in scheduler.pending()] == ['pressure', 'pills', 'daily']
+
+        # Повторный вход находит напоминание в базе и ничего не записывает
+        other = make_scheduler(reminders_db, scheduler_parts)
+        other.activate_user(1, {'daily_reminders': True, 'reminder_time': '20:00'})
+        assert len(other.pending()) == 3
+
+    def test_clear_cancels_event(self, reminders_db, scheduler_parts):
+        """После выхода пользователя вызовов не остается"""
+        clock, events, fired = scheduler_parts
+        scheduler = make_scheduler(reminders_db, scheduler_parts)
+        scheduler.activate_user(1)
+        scheduler.clear()
+        assert events.active == []
+        assert scheduler.next_fire_at is None
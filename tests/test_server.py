@@ -0,0 +1,244 @@
+"""
+Тесты серверного режима server.py
+"""
+
+import asyncio
+import csv
+import http.client
+import io
+import json
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import database
+import server as server_module
+from server import HealthDiaryServer, slow_log_path
+
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    database.create_schema(conn)
+    database.init_sync_tables(conn)
+    database.init_record_trends(conn)
+    database.insert_user(conn, "anna@example.com", "hash", "Анна")
+    database.insert_user(conn, "boris@example.com", "hash", "Борис")
+    database.insert_user(conn, "vera@example.com", "hash", "Вера")
+    for day in range(1, 8):
+        database.insert_record(conn, 1, 70 + day / 10, 120, 80, 60 + day, 36.6, f"день {day}", f"2024-05-0{day}")
+    conn.close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Сервер в отдельном потоке со своим циклом событий"""
+    path = str(tmp_path / "server.db")
+    create_database(path)
+    server = HealthDiaryServer(path, port=0, pool_size=2, stream_batch_size=3)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    server.path = path
+    yield server
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+@pytest.fixture
+def client(server):
+    client = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    yield client
+    client.close()
+
+
+def get(client, path, headers=None):
+    client.request("GET", path, headers=headers or {})
+    response = client.getresponse()
+    return response, response.read()
+
+
+def wait_for_streams(client, active):
+    """Ждет, пока число активных потоков в /health станет равным active"""
+    deadline = time.monotonic() + 5
+    while True:
+        health = json.loads(get(client, "/health")[1])
+        if health['streams']['active'] == active or time.monotonic() > deadline:
+            return health
+        time.sleep(0.05)
+
+
+class TestServer:
+    """Тесты HTTP API"""
+
+    def test_keep_alive(self, server, client):
+        """Несколько запросов обслуживаются одним соединением"""
+        response, body = get(client, "/health")
+        sock = client.sock
+        assert response.status == 200
+        assert response.getheader("Connection") == "keep-alive"
+        assert json.loads(body)['status'] == "ok"
+
+        response, body = get(client, "/statistics")
+        assert response.status == 200
+        assert json.loads(body)['total_records'] == 7
+        assert client.sock is sock
+        assert server.pool.snapshot()['created'] == 1
+
+    def test_users_pages(self, client):
+        """Справочник пользователей отдается страницами с ключом продолжения"""
+        response, body = get(client, "/users?sort=name&limit=2")
+        page = json.loads(body)
+        assert [user['name'] for user in page['users']] == ["Анна", "Борис"]
+
+        response, body = get(client, f"/users?sort=name&limit=2&after={page['next']}")
+        page = json.loads(body)
+        assert [user['name'] for user in page['users']] == ["Вера"]
+        assert page['next'] is None
+
+    def test_records_stream(self, client):
+        """Записи пользователя отдаются потоком в виде одного массива JSON"""
+        response, body = get(client, "/users/1/records")
+        assert response.status == 200
+        assert response.getheader("Transfer-Encoding") == "chunked"
+        records = json.loads(body)
+        assert [record['record_date'] for record in records] == [f"2024-05-0{day}" for day in range(7, 0, -1)]
+        assert records[0]['notes'] == "день 7"
+
+        response, body = get(client, "/users/2/records")
+        assert json.loads(body) == []
+
+    def test_records_etag(self, server, client):
+        """Неизменные записи отвечают 304, после изменения - новые данные"""
+        response, _ = get(client, "/users/1/records")
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+        assert etag and last_modified
+
+        response, body = get(client, "/users/1/records", {"If-None-Match": etag})
+        assert response.status == 304
+        assert body == b""
+        response, _ = get(client, "/users/1/records", {"If-Modified-Since": last_modified})
+        assert response.status == 304
+
+        conn = sqlite3.connect(server.path)
+        database.insert_record(conn, 1, 71, 121, 81, 70, 36.7, "новая", "2024-05-09")
+        conn.close()
+        response, body = get(client, "/users/1/records", {"If-None-Match": etag})
+        assert response.status == 200
+        assert len(json.loads(body)) == 8
+        assert response.getheader("ETag") != etag
+
+    def test_list_etag(self, client):
+        """Ответы без потока получают ETag по содержимому"""
+        response, _ = get(client, "/users")
+        response, body = get(client, "/users", {"If-None-Match": response.getheader("ETag")})
+        assert response.status == 304
+
+    def test_export_csv(self, client):
+        """Выгрузка CSV содержит заголовок и все записи"""
+        response, body = get(client, "/users/1/export.csv")
+        assert response.status == 200
+        assert response.getheader("Content-Type").startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+        assert rows[0][0] == "id"
+        assert len(rows) == 8
+
+    def test_trends(self, client):
+        """Тренд показателя строится по дневным итогам"""
+        response, body = get(client, "/users/1/trends?metric=pulse&resolution=day&from=2024-05-02")
+        assert response.status == 200
+        trend = json.loads(body)
+        assert [point['period'] for point in trend][:2] == ["2024-05-02", "2024-05-03"]
+        assert trend[0]['avg_value'] == 62
+        response, body = get(client, "/users/1/trends?metric=height")
+        assert response.status == 400
+
+    def test_errors(self, client):
+        """Ошибки запроса возвращаются в JSON с кодом ответа"""
+        response, body = get(client, "/users/99")
+        assert response.status == 404
+        response, body = get(client, "/users/99/records")
+        assert response.status == 404
+        response, body = get(client, "/nothing")
+        assert response.status == 404
+        response, body = get(client, "/users?limit=abc")
+        assert response.status == 400
+        assert 'limit' in json.loads(body)['error']
+        response, body = get(client, "/users?after=garbage")
+        assert response.status == 400
+
+        client.request("POST", "/users", body=b"{}")
+        response = client.getresponse()
+        response.read()
+        assert response.status == 405
+        assert response.getheader("Allow") == "GET, HEAD"
+
+    def test_connection_close(self, client):
+        """Connection: close закрывает соединение после ответа"""
+        response, _ = get(client, "/health", {"Connection": "close"})
+        assert response.getheader("Connection") == "close"
+        assert response.will_close
+
+    def test_stream_slots_released(self, client):
+        """Поток, замененный ответом 304 или HEAD, освобождает слот и соединение"""
+        response, _ = get(client, "/users/1/records")
+        get(client, "/users/1/records", {"If-None-Match": response.getheader("ETag")})
+        client.request("HEAD", "/users/1/export.csv")
+        client.getresponse().read()
+
+        health = wait_for_streams(client, 0)
+        assert health['streams'] == {'active': 0, 'max': 1}
+        assert health['pool']['in_use'] == 0
+
+    def test_stalled_stream_is_aborted(self, server, client, monkeypatch):
+        """Клиент, который не читает поток, отключается и не держит соединение с базой"""
+        monkeypatch.setattr(server_module, 'STREAM_WRITE_TIMEOUT', 0.3)
+        conn = sqlite3.connect(server.path)
+        conn.executemany("""INSERT INTO records (user_id, weight, pressure_systolic, pressure_diastolic, pulse,
+                                                 temperature, notes, record_date)
+                            VALUES (3, 60, 120, 80, 70, 36.6, ?, '2024-05-01')""",
+                         [("x" * 20000,) for _ in range(500)])
+        conn.commit()
+        conn.close()
+
+        stalled = socket.socket()
+        stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        stalled.connect(("127.0.0.1", server.port))
+        try:
+            stalled.sendall(b"GET /users/3/records HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            assert wait_for_streams(client, 1)['streams']['active'] == 1
+
+            # Пока медленный клиент занимает поток, остальные запросы обслуживаются
+            response, body = get(client, "/users/1/export.csv")
+            assert response.status == 503
+            response, body = get(client, "/users/1")
+            assert response.status == 200
+
+            health = wait_for_streams(client, 0)
+            assert health['streams']['active'] == 0
+            assert health['pool']['in_use'] == 0
+            response, body = get(client, "/users/1/records")
+            assert response.status == 200
+            assert len(json.loads(body)) == 7
+        finally:
+            stalled.close()
+
+    def test_slow_log_path(self, tmp_path):
+        """Журнал медленных запросов пишется в каталог базы или в --log-dir"""
+        db_path = str(tmp_path / "data" / "server.db")
+        assert slow_log_path(db_path) == str(tmp_path / "data" / "slow_queries.log")
+        assert slow_log_path(db_path, str(tmp_path / "logs")) == str(tmp_path / "logs" / "slow_queries.log")
@@ -0,0 +1,113 @@
+"""
+Тесты сессий автоматического входа services/sessions.py
+"""
+
+import sqlite3
+
+import pytest
+
+from database import create_schema, insert_user, insert_user_session, delete_user_session_db, \
+    sweep_expired_sessions
+from services.sessions import SessionValidationCache, SessionSweeper
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Временная база с одним пользователем"""
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    insert_user(conn, "user@test.com", "hash", "Пользователь")
+    conn.close()
+    return path
+
+
+def add_expired_sessions(path, count):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO user_sessions (user_id, device_id, session_token, expires_at) "
+        "VALUES (1, ?, ?, '2000-01-01 00:00:00')",
+        [(f"old-device-{i}", f"token-{i}") for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestSessionQueries:
+    """Тесты запросов к таблице сессий"""
+
+    def test_device_lookup_uses_device_index(self, db_path):
+        """Поиск сессии по устройству идет по индексу с device_id в начале"""
+        conn = sqlite3.connect(db_path)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_id FROM user_sessions "
+            "WHERE device_id = 'device' AND expires_at > CURRENT_TIMESTAMP"
+        ).fetchall()
+        conn.close()
+        assert any('idx_device_expires' in row[-1] for row in plan)
+
+    def test_sweep_deletes_in_batches(self, db_path):
+        """Истекшие сессии удаляются порциями, активные остаются"""
+        add_expired_sessions(db_path, 25)
+        conn = sqlite3.connect(db_path)
+        insert_user_session(conn, 1, "device", "active-token", "2999-01-01 00:00:00")
+
+        assert sweep_expired_sessions(conn, batch_size=10, max_batches=2) == 20
+        assert sweep_expired_sessions(conn, batch_size=10) == 5
+        assert conn.execute("SELECT session_token FROM user_sessions").fetchall() == [("active-token",)]
+        conn.close()
+
+
+class TestSessionValidationCache:
+    """Тесты кэша проверки сессий"""
+
+    def test_repeated_checks_hit_cache(self, db_path):
+        """Повторная проверка в пределах ttl не обращается к базе"""
+        conn = sqlite3.connect(db_path)
+        insert_user_session(conn, 1, "device", "token", "2999-01-01 00:00:00")
+        conn.close()
+
+        connects = []
+
+        def connect():
+            connects.append(1)
+            return sqlite3.connect(db_path)
+
+        cache = SessionValidationCache(connect=connect, ttl=30)
+        assert cache.lookup("device", now=0)[1] == "user@test.com"
+        assert cache.lookup("device", now=10)[1] == "user@test.com"
+        assert len(connects) == 1
+        assert cache.hits == 1
+
+        # По истечении ttl проверка снова идет в базу
+        cache.lookup("device", now=31)
+        assert len(connects) == 2
+
+    def test_invalidate_after_logout(self, db_path):
+        """После удаления сессии кэш сбрасывается"""
+        conn = sqlite3.connect(db_path)
+        insert_user_session(conn, 1, "device", "token", "2999-01-01 00:00:00")
+
+        cache = SessionValidationCache(connect=lambda: sqlite3.connect(db_path))
+        assert cache.lookup("device", now=0) is not None
+
+        delete_user_session_db(conn, "device")
+        conn.close()
+        assert cache.lookup("device", now=1) is not None  # результат еще в кэше
+
+        cache.invalidate("device")
+        assert cache.lookup("device", now=2) is None
+
+
+class TestSessionSweeper:
+    """Тесты фоновой очистки сессий"""
+
+    def test_sweep_once_reports_reclaimed(self, db_path):
+        """Очистка сообщает число удаленных сессий"""
+        add_expired_sessions(db_path, 7)
+        sweeper = SessionSweeper(connect=lambda: sqlite3.connect(db_path), batch_size=3)
+
+        assert sweeper.sweep_once() == 7
+        assert sweeper.sweep_once() == 0
+        assert sweeper.total_reclaimed == 7
+        assert sweeper.last_sweep_at is not None
@@ -0,0 +1,264 @@
+"""
+Тесты кэша настроек services/settings_store.py
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from database import create_schema, insert_user_settings
+from services.settings_store import SettingsStore, DEFAULT_SETTINGS
+
+
+class ManualScheduler:
+    """Планировщик, который выполняет отложенные вызовы только по команде"""
+
+    def __init__(self):
+        self.pending = []
+
+    def __call__(self, callback, delay):
+        event = ManualEvent(callback)
+        self.pending.append(event)
+        return event
+
+    def run(self):
+        events, self.pending = self.pending, []
+        for event in events:
+            if not event.cancelled:
+                event.callback()
+
+
+class ManualEvent:
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class CountingConnection:
+    """Соединение SQLite, считающее выполненные запросы"""
+
+    def __init__(self, path, counter):
+        self._conn = sqlite3.connect(path)
+        self._counter = counter
+        self.isolation_level = self._conn.isolation_level
+
+    def cursor(self):
+        counter = self._counter
+        cursor = self._conn.cursor()
+
+        class CountingCursor:
+            def execute(self, sql, params=()):
+                counter.append(sql.strip().split()[0].upper())
+                return cursor.execute(sql, params)
+
+            def __getattr__(self, name):
+                return getattr(cursor, name)
+
+        return CountingCursor()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@pytest.fixture
+def store_env(tmp_path):
+    """Хранилище настроек поверх временной базы SQLite"""
+    path = str(tmp_path / "settings.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    conn.close()
+
+    queries = []
+    scheduler = ManualScheduler()
+    store = SettingsStore(connect=lambda: CountingConnection(path, queries), scheduler=scheduler)
+    return {'path': path, 'queries': queries, 'scheduler': scheduler, 'store': store}
+
+
+def stored_settings(path, user_id):
+    conn = sqlite3.connect(path)
+    row = conn.execute("SELECT settings FROM user_settings WHERE user_id = ?", (user_id,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+class TestSettingsStore:
+    """Тесты кэша настроек"""
+
+    def test_repeated_reads_use_cache(self, store_env):
+        """Настройки читаются из базы только один раз"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 1, json.dumps({'theme_color': 'green'}))
+
+        store = store_env['store']
+        assert store.get(1)['theme_color'] == 'green'
+        assert store.get(1)['theme_color'] == 'green'
+        assert store_env['queries'].count('SELECT') == 1
+
+    def test_defaults_are_saved_on_first_load(self, store_env):
+        """Для нового пользователя сохраняются настройки по умолчанию"""
+        store = store_env['store']
+        assert store.get(2) == DEFAULT_SETTINGS
+
+        store_env['scheduler'].run()
+        assert stored_settings(store_env['path'], 2) == DEFAULT_SETTINGS
+
+    def test_rapid_changes_are_coalesced(self, store_env):
+        """Серия изменений записывается в базу одним запросом"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 3, json.dumps(DEFAULT_SETTINGS))
+
+        store = store_env['store']
+        store.set(3, 'dark_mode', True)
+        store.set(3, 'theme_color', 'red')
+        store.set(3, 'auto_export', True)
+        assert store.has_pending_changes(3)
+
+        store_env['scheduler'].run()
+        assert store_env['queries'].count('INSERT') == 1
+        assert not store.has_pending_changes(3)
+
+        saved = stored_settings(store_env['path'], 3)
+        assert saved['dark_mode'] is True
+        assert saved['theme_color'] == 'red'
+        assert saved['auto_export'] is True
+
+    def test_only_changed_keys_are_written(self, store_env):
+        """Запись содержит только измененные ключи и не затирает остальные"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 4, json.dumps({'theme_color': 'blue', 'date_format': 'yyyy-mm-dd'}))
+
+        store = store_env['store']
+        store.get(4)
+
+        # Другое устройство успело изменить формат даты
+        conn = sqlite3.connect(store_env['path'])
+        conn.execute("UPDATE user_settings SET settings = ? WHERE user_id = 4",
+                     (json.dumps({'theme_color': 'blue', 'date_format': 'dd.mm.yyyy'}),))
+        conn.commit()
+        conn.close()
+
+        assert store.update(4, {'theme_color': 'purple', 'date_format': 'yyyy-mm-dd'}) == {'theme_color'}
+        assert store.flush(4) == 1
+        assert stored_settings(store_env['path'], 4) == {'theme_color': 'purple', 'date_format': 'dd.mm.yyyy'}
+
+    def test_unchanged_values_do_not_write(self, store_env):
+        """Сохранение без изменений не обращается к базе"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 5, json.dumps(DEFAULT_SETTINGS))
+
+        store = store_env['store']
+        settings = store.get(5)
+        assert store.update(5, settings) == set()
+        assert store.flush() == 0
+        assert store_env['queries'] == ['SELECT']
+
+    def test_failed_write_keeps_changes(self, store_env):
+        """При ошибке записи изменения остаются в очереди"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 6, json.dumps(DEFAULT_SETTINGS))
+
+        store = store_env['store']
+        store.get(6)
+        store.set(6, 'dark_mode', True)
+
+        connect = store.connect
+        store.connect = lambda: (_ for _ in ()).throw(ConnectionError("database locked"))
+        assert store.flush(6) == 0
+        assert store.has_pending_changes(6)
+
+        store.connect = connect
+        assert store.flush(6) == 1
+        assert stored_settings(store_env['path'], 6)['dark_mode'] is True
+
+    def test_failed_read_does_not_overwrite_settings(self, store_env):
+        """Ошибка чтения не заменяет сохраненные настройки настройками по умолчанию"""
+        saved = dict(DEFAULT_SETTINGS, theme_color='green', dark_mode=True)
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 10, json.dumps(saved))
+
+        store = store_env['store']
+        connect = store.connect
+        store.connect = lambda: (_ for _ in ()).throw(ConnectionError("database locked"))
+        assert store.get(10) == DEFAULT_SETTINGS
+        assert store.hydrate(10) is None
+        assert store.update(10, {'theme_color': 'red'}) == set()
+        assert not store.has_pending_changes()
+        assert store_env['scheduler'].pending == []
+
+        # Следующее обращение повторяет чтение
+        store.connect = connect
+        assert store.get(10) == saved
+        assert stored_settings(store_env['path'], 10) == saved
+
+    def test_null_values_are_kept(self, store_env):
+        """Значение None сохраняется, а не удаляет ключ"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 11, json.dumps(DEFAULT_SETTINGS))
+
+        store = store_env['store']
+        store.update(11, {'reminder_time': None, 'theme_color': 'red'})
+        assert store.flush(11) == 1
+        assert stored_settings(store_env['path'], 11) == dict(DEFAULT_SETTINGS, reminder_time=None,
+                                                              theme_color='red')
+
+
+class TestSettingsHydration:
+    """Тесты однократной загрузки и рассылки настроек"""
+
+    def test_concurrent_loads_share_one_query(self, store_env):
+        """Одновременные загрузки одного пользователя выполняют один запрос"""
+        conn = sqlite3.connect(store_env['path'])
+        insert_user_settings(conn, 7, json.dumps(DEFAULT_SETTINGS))
+        conn.commit()
+
+        store = store_env['store']
+        connect = store.connect
+
+        def slow_connect():
+            time.sleep(0.05)
+            return connect()
+
+        store.connect = slow_connect
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.get(7))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.loads == 1
+        assert store_env['queries'] == ['SELECT']
+        assert results == [DEFAULT_SETTINGS] * 5
+
+    def test_subscribers_receive_settings(self, store_env):
+        """Подписчики получают настройки при входе и измененные ключи"""
+        store = store_env['store']
+        received = []
+        unsubscribe = store.subscribe(lambda user_id, settings, changed: received.append(
+            (user_id, settings['theme_color'], changed)))
+
+        settings = store.hydrate(8)
+        store.hydrate(8)
+        store.set(8, 'theme_color', 'green')
+        store.set(8, 'theme_color', 'green')
+        unsubscribe()
+        store.set(8, 'theme_color', 'red')
+
+        assert settings == DEFAULT_SETTINGS
+        assert store.loads == 1
+        assert received == [(8, 'blue', None), (8, 'blue', None), (8, 'green', {'theme_color'})]
+
+    def test_failing_subscriber(self, store_env):
+        """Ошибка одного подписчика не мешает остальным"""
+        store = store_env['store']
+        received = []
+        store.subscribe(lambda *args: 1 / 0)
+        store.subscribe(lambda user_id, settings, changed: received.append(user_id))
+        store.hydrate(9)
+        assert received == [9]
@@ -0,0 +1,103 @@
+"""
+Тесты трассировки запуска services/startup_trace.py
+"""
+
+import json
+
+import pytest
+
+from services.startup_trace import StartupTrace, load_budget, write_report, process_age, DEFAULT_BUDGET_MS
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+@pytest.fixture
+def trace():
+    return StartupTrace(clock=ManualClock())
+
+
+class TestStartupTrace:
+    """Тесты фаз запуска"""
+
+    def test_marks_and_nested_phases(self, trace):
+        """Отметки считаются от конца предыдущей фазы, вложенные фазы получают depth"""
+        trace.clock.advance(300)
+        trace.mark("imports")
+        with trace.phase("kv"):
+            for name in ("kv_story", "kv_admin"):
+                with trace.phase(name):
+                    trace.clock.advance(40)
+        trace.clock.advance(100)
+        trace.mark("first_frame")
+        with trace.phase("auto_login"):
+            with trace.phase("settings"):
+                trace.clock.advance(20)
+        trace.finish()
+
+        phases = [(entry['name'], entry['ms'], entry['depth']) for entry in trace.phases]
+        assert phases == [("imports", 300, 0), ("kv", 80, 0), ("kv_story", 40, 1), ("kv_admin", 40, 1),
+                          ("first_frame", 100, 0), ("auto_login", 20, 0), ("settings", 20, 1)]
+        assert trace.phases[2]['start_ms'] == pytest.approx(300)
+
+    def test_nothing_recorded_after_finish(self, trace):
+        """Загрузки после завершения запуска в отчет не попадают"""
+        with trace.phase("settings"):
+            trace.clock.advance(5)
+        trace.finish()
+        with trace.phase("settings"):
+            trace.clock.advance(50)
+        trace.mark("late")
+        assert trace.totals() == {"settings": 5}
+
+    def test_budget(self, trace):
+        """Фазы и весь запуск сравниваются с бюджетом, повторные фазы суммируются"""
+        for _ in range(2):
+            with trace.phase("settings"):
+                trace.clock.advance(60)
+        trace.clock.advance(2000)
+        trace.finish()
+
+        report = trace.report({'total': 2000, 'settings': 100, 'kv': 10})
+        assert report['totals'] == {"settings": 120}
+        assert [item['phase'] for item in report['over_budget']] == ['total', 'settings']
+        assert not report['within_budget']
+        assert trace.report({'total': 5000})['within_budget']
+
+
+class TestReport:
+    """Тесты бюджета и файла отчета"""
+
+    def test_load_budget(self, tmp_path, monkeypatch):
+        """Файл бюджета переопределяет значения по умолчанию"""
+        path = tmp_path / "budget.json"
+        path.write_text(json.dumps({'total': 1500, 'kv': 100}), encoding="utf-8")
+        budget = load_budget(str(path))
+        assert budget['total'] == 1500
+        assert budget['screens'] == DEFAULT_BUDGET_MS['screens']
+
+        monkeypatch.setenv("HEALTH_DIARY_STARTUP_BUDGET", str(path))
+        assert load_budget()['kv'] == 100
+
+    def test_write_report(self, trace, tmp_path):
+        """Отчет сохраняется в JSON"""
+        trace.mark("imports")
+        trace.finish()
+        path = str(tmp_path / "startup.json")
+        assert write_report(trace.report(load_budget()), path)
+        document = json.load(open(path, encoding="utf-8"))
+        assert document['phases'][0]['name'] == "imports"
+        assert document['budget']['total'] == 2000
+
+    def test_process_age(self):
+        """Время с запуска процесса неотрицательно или недоступно"""
+        age = process_age()
+        assert age is None or age >= 0
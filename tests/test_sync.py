@@ -0,0 +1,265 @@
+"""
+Тесты движка синхронизации services/sync.py
+
+Роль сервера выполняет второй файл SQLite с той же схемой
+"""
+
+import sqlite3
+import tempfile
+import os
+
+import pytest
+
+from database import create_schema, init_sync_tables, insert_record, update_record, delete_record, \
+    insert_user, insert_user_settings, update_user_settings
+from services.sync import SyncEngine, Backoff
+
+
+def make_db(track_changes=True, emails=()):
+    """Создает временный файл SQLite со схемой приложения и пользователями emails"""
+    handle = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    handle.close()
+    conn = sqlite3.connect(handle.name)
+    create_schema(conn)
+    init_sync_tables(conn, track_changes=track_changes)
+    for email in emails:
+        insert_user(conn, email, "hash", email.split('@')[0])
+    conn.close()
+    return handle.name
+
+
+@pytest.fixture
+def sync_env():
+    """Два устройства и общий сервер; на устройстве B у пользователя anna другой id (2)"""
+    server = make_db(track_changes=False)
+    device_a = make_db(emails=["anna@example.com"])
+    device_b = make_db(emails=["boris@example.com", "anna@example.com"])
+
+    engines = {
+        'a': SyncEngine(device_a, lambda: sqlite3.connect(server), origin='device-a'),
+        'b': SyncEngine(device_b, lambda: sqlite3.connect(server), origin='device-b'),
+    }
+    yield {'server': server, 'a': device_a, 'b': device_b, 'engines': engines}
+
+    for path in (server, device_a, device_b):
+        os.unlink(path)
+
+
+def fetch(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+class TestSyncEngine:
+    """Тесты синхронизации"""
+
+    def test_push_and_pull_between_devices(self, sync_env):
+        """Запись, созданная офлайн на одном устройстве, доходит до другого"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.5, 120, 80, 75, 36.6, "Запись A", "2024-01-01 10:00:00")
+        conn.close()
+
+        result = sync_env['engines']['a'].sync_once()
+        assert result['pushed'] == 1
+        assert fetch(sync_env['server'], "SELECT weight, notes FROM records") == [(70.5, "Запись A")]
+
+        result = sync_env['engines']['b'].sync_once()
+        assert result['pulled'] == 1
+        assert fetch(sync_env['b'], "SELECT weight, notes FROM records") == [(70.5, "Запись A")]
+
+        # Примененные с сервера строки не попадают в журнал локальных изменений
+        assert fetch(sync_env['b'], "SELECT COUNT(*) FROM sync_log WHERE synced = 0") == [(0,)]
+
+    def test_updates_and_deletes_are_incremental(self, sync_env):
+        """Изменения и удаления передаются только один раз"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "v1", "2024-01-01")
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        sync_env['engines']['b'].sync_once()
+
+        conn = sqlite3.connect(sync_env['a'])
+        update_record(conn, 1, 72.0, 120, 80, 75, 36.6, "v2")
+        conn.close()
+        assert sync_env['engines']['a'].sync_once()['pushed'] == 1
+        assert sync_env['engines']['a'].sync_once()['pushed'] == 0
+
+        sync_env['engines']['b'].sync_once()
+        assert fetch(sync_env['b'], "SELECT weight, notes FROM records") == [(72.0, "v2")]
+
+        conn = sqlite3.connect(sync_env['a'])
+        delete_record(conn, 1)
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        sync_env['engines']['b'].sync_once()
+        assert fetch(sync_env['server'], "SELECT COUNT(*) FROM records") == [(0,)]
+        assert fetch(sync_env['b'], "SELECT COUNT(*) FROM records") == [(0,)]
+
+    def test_conflict_last_writer_wins(self, sync_env):
+        """При конфликте сохраняется версия с более поздним updated_at"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "base", "2024-01-01")
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        sync_env['engines']['b'].sync_once()
+
+        # Устройство B правит запись позже, чем устройство A
+        for path, notes, stamp in ((sync_env['a'], "from A", "2030-01-01 10:00:00"),
+                                   (sync_env['b'], "from B", "2030-01-01 11:00:00")):
+            conn = sqlite3.connect(path)
+            conn.execute("UPDATE records SET notes = ?", (notes,))
+            conn.execute("UPDATE records SET updated_at = ?", (stamp,))
+            conn.commit()
+            conn.close()
+
+        sync_env['engines']['b'].sync_once()
+        result = sync_env['engines']['a'].sync_once()
+        assert result['conflicts'] >= 1
+
+        assert fetch(sync_env['server'], "SELECT notes FROM records") == [("from B",)]
+        assert fetch(sync_env['a'], "SELECT notes FROM records") == [("from B",)]
+
+    def test_remote_delete_loses_to_newer_local_edit(self, sync_env):
+        """Удаление на другом устройстве не удаляет запись, измененную позже него"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "base", "2024-01-01")
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        sync_env['engines']['b'].sync_once()
+
+        conn = sqlite3.connect(sync_env['a'])
+        delete_record(conn, 1)
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+
+        conn = sqlite3.connect(sync_env['b'])
+        conn.execute("UPDATE records SET notes = 'edited on B'")
+        conn.execute("UPDATE records SET updated_at = '2099-01-01 10:00:00'")
+        conn.commit()
+        conn.close()
+
+        result = sync_env['engines']['b'].sync_once()
+        assert result['conflicts'] == 1
+        assert fetch(sync_env['b'], "SELECT notes FROM records") == [("edited on B",)]
+        assert fetch(sync_env['server'], "SELECT notes FROM records") == [("edited on B",)]
+
+        sync_env['engines']['a'].sync_once()
+        assert fetch(sync_env['a'], "SELECT notes FROM records") == [("edited on B",)]
+
+    def test_local_delete_loses_to_newer_remote_edit(self, sync_env):
+        """Локальное удаление не отправляется, если на сервере запись изменена позже"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "base", "2024-01-01")
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+
+        conn = sqlite3.connect(sync_env['server'])
+        conn.execute("UPDATE records SET notes = 'edited on server', updated_at = '2099-01-01 10:00:00'")
+        conn.execute("INSERT INTO sync_log (table_name, row_key, op, origin) "
+                     "SELECT 'records', sync_uid, 'upsert', 'device-b' FROM records")
+        conn.commit()
+        conn.close()
+        conn = sqlite3.connect(sync_env['a'])
+        delete_record(conn, 1)
+        conn.close()
+
+        result = sync_env['engines']['a'].sync_once()
+        assert result['conflicts'] == 1
+        assert fetch(sync_env['server'], "SELECT notes FROM records") == [("edited on server",)]
+        assert fetch(sync_env['a'], "SELECT notes FROM records") == [("edited on server",)]
+
+    def test_remote_change_reports_local_user_ids(self, sync_env):
+        """Обработчик изменений получает локальные id пользователей измененных записей"""
+        changes = []
+        engine_b = sync_env['engines']['b']
+        engine_b.on_remote_change = lambda table, keys, user_ids: changes.append((table, len(keys), user_ids))
+
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "base", "2024-01-01")
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        engine_b.sync_once()
+
+        conn = sqlite3.connect(sync_env['a'])
+        delete_record(conn, 1)
+        conn.close()
+        sync_env['engines']['a'].sync_once()
+        engine_b.sync_once()
+
+        # У anna на устройстве B id 2
+        assert changes == [('records', 1, [2]), ('records', 1, [2])]
+
+    def test_settings_are_synced_by_user(self, sync_env):
+        """Настройки пользователя синхронизируются по user_id"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_user_settings(conn, 1, '{"theme_color": "green"}')
+        update_user_settings(conn, 1, '{"theme_color": "red"}')
+        conn.close()
+
+        sync_env['engines']['a'].sync_once()
+        sync_env['engines']['b'].sync_once()
+        assert fetch(sync_env['b'], "SELECT settings FROM user_settings WHERE user_id = 2") == \
+            [('{"theme_color": "red"}',)]
+
+    def test_users_are_matched_by_email(self, sync_env):
+        """user_id сопоставляется по email, отсутствующий пользователь создается"""
+        conn = sqlite3.connect(sync_env['b'])
+        insert_record(conn, 2, 70.0, 120, 80, 75, 36.6, "anna", "2024-01-01")
+        insert_record(conn, 1, 90.0, 130, 85, 70, 36.6, "boris", "2024-01-01")
+        conn.close()
+
+        sync_env['engines']['b'].sync_once()
+        assert fetch(sync_env['server'], "SELECT u.email, r.notes FROM records r "
+                                         "JOIN users u ON u.id = r.user_id ORDER BY u.email") == \
+            [("anna@example.com", "anna"), ("boris@example.com", "boris")]
+
+        sync_env['engines']['a'].sync_once()
+        assert fetch(sync_env['a'], "SELECT u.id, u.email, r.notes FROM records r "
+                                    "JOIN users u ON u.id = r.user_id ORDER BY u.id") == \
+            [(1, "anna@example.com", "anna"), (2, "boris@example.com", "boris")]
+
+    def test_pushed_changes_are_removed_from_log(self, sync_env):
+        """Отправленные изменения удаляются из локального журнала"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, 1, 70.0, 120, 80, 75, 36.6, "v1", "2024-01-01")
+        update_record(conn, 1, 71.0, 120, 80, 75, 36.6, "v2")
+        conn.close()
+
+        assert fetch(sync_env['a'], "SELECT COUNT(*) FROM sync_log") == [(2,)]
+        sync_env['engines']['a'].sync_once()
+        assert fetch(sync_env['a'], "SELECT COUNT(*) FROM sync_log") == [(0,)]
+
+    def test_guest_records_stay_local(self, sync_env):
+        """Записи гостя не отправляются на сервер"""
+        conn = sqlite3.connect(sync_env['a'])
+        insert_record(conn, -1, 70.0, 120, 80, 75, 36.6, "guest", "2024-01-01")
+        conn.close()
+
+        sync_env['engines']['a'].sync_once()
+        assert fetch(sync_env['server'], "SELECT COUNT(*) FROM records") == [(0,)]
+        assert fetch(sync_env['a'], "SELECT COUNT(*) FROM sync_log WHERE synced = 0") == [(0,)]
+
+    def test_unreachable_server_uses_backoff(self, sync_env):
+        """Недоступный сервер не опрашивается до истечения задержки"""
+        attempts = []
+
+        def failing_connect():
+            attempts.append(1)
+            raise ConnectionError("server down")
+
+        engine = SyncEngine(sync_env['a'], failing_connect, origin='device-a')
+        assert engine.sync_once() is None
+        assert engine.sync_once() is None
+        assert len(attempts) == 1
+        assert engine.get_status()['last_error'] == "server down"
+
+    def test_backoff_grows_and_resets(self):
+        """Задержка растет экспоненциально и сбрасывается после успеха"""
+        backoff = Backoff(base_delay=1, max_delay=8, jitter=0)
+        delays = [backoff.record_failure(now=0) for _ in range(5)]
+        assert delays == [1, 2, 4, 8, 8]
+        assert not backoff.ready(now=1)
+        backoff.record_success()
+        assert backoff.ready(now=0)
@@ -0,0 +1,128 @@
+"""
+Тесты трендов показателей select_record_trends и дневных итогов record_daily_stats
+"""
+
+import sqlite3
+
+import pytest
+
+from database import create_schema, init_sync_tables, init_record_trends, insert_record, update_record, \
+    delete_record, select_record_trends
+
+
+def daily_stats(conn):
+    return conn.execute(
+        "SELECT day, readings, weight_sum, weight_min, weight_max FROM record_daily_stats "
+        "WHERE user_id = 1 ORDER BY day"
+    ).fetchall()
+
+
+@pytest.fixture
+def trend_db():
+    """База с записями пользователя за январь и февраль 2024"""
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn)
+    init_sync_tables(conn)
+    init_record_trends(conn)
+    conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES (1, 'a@mail.com', 'hash', 'Анна')")
+    conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES (2, 'b@mail.com', 'hash', 'Борис')")
+    conn.commit()
+    for record_date, weight in [('2024-01-01 08:00:00', 70), ('2024-01-01 20:00:00', 72),
+                                ('2024-01-02 08:00:00', 71), ('2024-01-09 08:00:00', 69),
+                                ('2024-02-01', 68)]:
+        insert_record(conn, 1, weight, 120, 80, 60, 36.6, '', record_date)
+    insert_record(conn, 2, 100, 140, 90, 80, 37.0, '', '2024-01-01 08:00:00')
+    yield conn
+    conn.close()
+
+
+class TestDailyStats:
+    """Тесты дневных итогов"""
+
+    def test_insert_updates_single_day(self, trend_db):
+        """Новая запись пересчитывает итог своего дня"""
+        assert daily_stats(trend_db) == [
+            ('2024-01-01', 2, 142.0, 70.0, 72.0),
+            ('2024-01-02', 1, 71.0, 71.0, 71.0),
+            ('2024-01-09', 1, 69.0, 69.0, 69.0),
+            ('2024-02-01', 1, 68.0, 68.0, 68.0),
+        ]
+
+    def test_update_and_delete(self, trend_db):
+        """Изменение и удаление записи пересчитывают день, пустой день удаляется"""
+        update_record(trend_db, 1, 80, 120, 80, 60, 36.6, '')
+        delete_record(trend_db, 5)
+        assert daily_stats(trend_db) == [
+            ('2024-01-01', 2, 152.0, 72.0, 80.0),
+            ('2024-01-02', 1, 71.0, 71.0, 71.0),
+            ('2024-01-09', 1, 69.0, 69.0, 69.0),
+        ]
+
+    def test_unparseable_dates_are_skipped(self, trend_db):
+        """Запись с нераспознаваемой датой сохраняется, но в итоги не попадает"""
+        trend_db.execute("INSERT INTO records (user_id, weight, record_date) VALUES (1, 75, 'вчера')")
+        trend_db.execute("UPDATE records SET weight = 76 WHERE record_date = 'вчера'")
+        trend_db.execute("UPDATE records SET record_date = 'неизвестно' WHERE id = 1")
+        trend_db.commit()
+        assert trend_db.execute("SELECT COUNT(*) FROM records WHERE user_id = 1").fetchone()[0] == 6
+        assert daily_stats(trend_db) == [
+            ('2024-01-01', 1, 72.0, 72.0, 72.0),
+            ('2024-01-02', 1, 71.0, 71.0, 71.0),
+            ('2024-01-09', 1, 69.0, 69.0, 69.0),
+            ('2024-02-01', 1, 68.0, 68.0, 68.0),
+        ]
+
+        trend_db.execute("DELETE FROM record_daily_stats")
+        init_record_trends(trend_db)
+        assert len(daily_stats(trend_db)) == 4
+
+    def test_backfill_existing_records(self, trend_db):
+        """Итоги заполняются по записям, созданным до появления таблицы"""
+        expected = daily_stats(trend_db)
+        trend_db.executescript("DROP TABLE record_daily_stats; DROP TRIGGER trg_records_trend_insert;"
+                               "DROP TRIGGER trg_records_trend_update; DROP TRIGGER trg_records_trend_delete;")
+        init_record_trends(trend_db)
+        assert daily_stats(trend_db) == expected
+
+
+class TestRecordTrends:
+    """Тесты расчета трендов"""
+
+    def test_daily_trend(self, trend_db):
+        """Скользящее среднее, изменение и границы по дням"""
+        rows = select_record_trends(trend_db, 1, 'weight', 'day', window=2)
+        assert [row[0] for row in rows] == ['2024-01-01', '2024-01-02', '2024-01-09', '2024-02-01']
+        assert rows[0][1:5] == (2, 71.0, 70.0, 72.0)
+        assert rows[0][6] is None
+        assert rows[2][5] == pytest.approx(70.0)
+        assert rows[2][6] == pytest.approx(-2.0)
+        assert rows[2][7:] == (69.0, 71.0)
+
+    def test_weekly_and_monthly_trend(self, trend_db):
+        """Недели начинаются с понедельника, месяцы - с первого числа"""
+        weeks = select_record_trends(trend_db, 1, 'weight', 'week')
+        assert [(row[0], row[1]) for row in weeks] == [('2024-01-01', 3), ('2024-01-08', 1), ('2024-01-29', 1)]
+
+        months = select_record_trends(trend_db, 1, 'weight', 'month')
+        assert [(row[0], row[1], row[2]) for row in months] == [('2024-01-01', 4, 70.5), ('2024-02-01', 1, 68.0)]
+
+    def test_date_range_and_user(self, trend_db):
+        """Учитываются только дни периода и записи пользователя"""
+        rows = select_record_trends(trend_db, 1, 'weight', 'day', date_from='2024-01-02', date_to='2024-01-09')
+        assert [row[0] for row in rows] == ['2024-01-02', '2024-01-09']
+
+        rows = select_record_trends(trend_db, 2, 'pulse', 'month')
+        assert rows == [('2024-01-01', 1, 80.0, 80.0, 80.0, 80.0, None, 80.0, 80.0)]
+
+    def test_reads_daily_stats_only(self, trend_db):
+        """Тренд строится по дневным итогам, а не по записям"""
+        trend_db.execute("DELETE FROM records")
+        trend_db.execute("INSERT INTO record_daily_stats (user_id, day, readings, weight_sum, weight_count, "
+                         "weight_min, weight_max) VALUES (1, '2024-03-01', 1000, 70000, 1000, 60, 80)")
+        rows = select_record_trends(trend_db, 1, 'weight', 'month')
+        assert rows == [('2024-03-01', 1000, 70.0, 60.0, 80.0, 70.0, None, 60.0, 80.0)]
+
+    def test_invalid_arguments(self, trend_db):
+        """Неизвестный показатель или период возвращает None"""
+        assert select_record_trends(trend_db, 1, 'notes') is None
+        assert select_record_trends(trend_db, 1, 'weight', 'year') is None
@@ -0,0 +1,127 @@
+"""
+Тесты справочника пользователей select_users_directory
+"""
+
+import sqlite3
+
+import pytest
+
+from database import create_schema, init_users_search, insert_user, update_user, select_users_directory
+
+
+@pytest.fixture
+def directory_db():
+    """База с 120 пользователями, зарегистрированными в разные дни"""
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn)
+    conn.executemany(
+        "INSERT INTO users (email, password_hash, name, created_at) VALUES (?, 'hash', ?, ?)",
+        [(f"user{i:03d}@mail.com", f"Name{i:03d}", f"2024-01-{1 + i % 28:02d} 10:00:00")
+         for i in range(120)]
+    )
+    conn.execute(
+        "INSERT INTO users (email, password_hash, name, created_at) "
+        "VALUES ('ivan_100%@mail.com', 'hash', 'Иван', '2023-12-31 10:00:00')"
+    )
+    conn.commit()
+    init_users_search(conn)
+    yield conn
+    conn.close()
+
+
+def collect_pages(conn, **kwargs):
+    pages = []
+    cursor = None
+    while True:
+        rows, cursor = select_users_directory(conn, after=cursor, **kwargs)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+class TestUserDirectory:
+    """Тесты поиска и постраничного вывода пользователей"""
+
+    def test_keyset_pages_cover_all_users(self, directory_db):
+        """Страницы без пропусков и повторов покрывают всех пользователей"""
+        pages = collect_pages(directory_db, limit=50)
+        assert [len(page) for page in pages] == [50, 50, 21]
+
+        ids = [row[0] for page in pages for row in page]
+        assert len(set(ids)) == 121
+
+        dates = [row[3] for page in pages for row in page]
+        assert dates == sorted(dates, reverse=True)
+
+    def test_sort_by_name(self, directory_db):
+        """Сортировка по имени без учета регистра"""
+        pages = collect_pages(directory_db, sort='name', limit=40)
+        names = [row[1] for page in pages for row in page]
+        assert names == sorted(names, key=str.lower)
+
+    def test_prefix_and_substring_search(self, directory_db):
+        """Поиск по началу и по вхождению в имя или email"""
+        rows, cursor = select_users_directory(directory_db, search="name11")
+        assert sorted(row[1] for row in rows) == [f"Name{i}" for i in range(110, 120)]
+        assert cursor is None
+
+        rows, _ = select_users_directory(directory_db, search="USER005")
+        assert [row[2] for row in rows] == ["user005@mail.com"]
+
+        rows, _ = select_users_directory(directory_db, search="e11", match='substring')
+        assert len(rows) == 10
+
+        rows, _ = select_users_directory(directory_db, search="e11")
+        assert rows == []
+
+    def test_search_beyond_first_hundred(self, directory_db):
+        """Находятся и пользователи за пределами первых 100"""
+        rows, _ = select_users_directory(directory_db, search="Иван")
+        assert [row[1] for row in rows] == ["Иван"]
+
+    def test_like_wildcards_are_literal(self, directory_db):
+        """Символы % и _ в запросе ищутся буквально"""
+        rows, _ = select_users_directory(directory_db, search="ivan_100%")
+        assert [row[1] for row in rows] == ["Иван"]
+
+        rows, _ = select_users_directory(directory_db, search="%")
+        assert rows == []
+
+    def test_cyrillic_search_ignores_case(self, directory_db):
+        """Поиск без учета регистра работает и для кириллицы"""
+        rows, _ = select_users_directory(directory_db, search="иван")
+        assert [row[1] for row in rows] == ["Иван"]
+
+        rows, _ = select_users_directory(directory_db, search="ИВАН", match='substring')
+        assert [row[1] for row in rows] == ["Иван"]
+
+    def test_substring_search_by_surname(self, directory_db):
+        """По вхождению находятся фамилия и часть email, в том числе после изменения"""
+        insert_user(directory_db, "petrov.ivan@corp.ru", "hash", "Иван Петров")
+        rows, _ = select_users_directory(directory_db, search="петров", match='substring')
+        assert [row[1] for row in rows] == ["Иван Петров"]
+
+        rows, _ = select_users_directory(directory_db, search="CORP", match='substring')
+        assert [row[2] for row in rows] == ["petrov.ivan@corp.ru"]
+
+        user_id = rows[0][0]
+        update_user(directory_db, user_id, "Иван Сидоров", "sidorov.ivan@corp.ru")
+        rows, _ = select_users_directory(directory_db, search="сидоров", match='substring')
+        assert [row[0] for row in rows] == [user_id]
+        rows, _ = select_users_directory(directory_db, search="петров", match='substring')
+        assert rows == []
+
+    def test_numeric_search_by_id(self, directory_db):
+        """Числовой запрос ищет пользователя по ID"""
+        rows, _ = select_users_directory(directory_db, search="7")
+        assert [row[0] for row in rows] == [7]
+
+    def test_queries_use_indexes(self, directory_db):
+        """Сортировка по дате и поиск по префиксу используют индексы"""
+        def plan(sql):
+            return " ".join(row[-1] for row in directory_db.execute("EXPLAIN QUERY PLAN " + sql))
+
+        assert "idx_users_created" in plan("SELECT id FROM users ORDER BY created_at DESC, id DESC LIMIT 51")
+        prefix = plan("SELECT id FROM users WHERE (name_search >= 'ab' AND name_search < 'ac') "
+                      "OR (email_search >= 'ab' AND email_search < 'ac')")
+        assert "idx_users_name_search" in prefix and "idx_users_email_search" in prefix
@@ -0,0 +1,513 @@
+"""
+Колоночное хранилище записей в памяти
+
+Список кортежей хранит для каждой записи отдельный объект на каждое поле:
+число с плавающей точкой занимает 24 байта плюс 8 байт ссылки, а имя и email
+пользователя повторяются в каждой строке выборки администратора.
+RecordColumns хранит каждую колонку отдельно:
+
+- числа - в массивах array: 'q' для ID, 'i' для целых (NULL - INT_NULL),
+  'd' для дробных (NULL - NaN);
+- повторяющиеся строки (имя, email) - словарным кодированием: массив кодов
+  'H' (при росте словаря - 'I') и список уникальных значений;
+- даты - секундами от 1970-01-01 в массиве 'I' и видом исходного значения
+  в массиве 'B' (нераспознанные значения хранятся как есть);
+- прочие строки (заметки) - списком интернированных строк.
+
+Значение, которое не представимо в массиве колонки без потерь (120.5 или
+строка в целочисленной колонке), не приводит к ошибке: колонка переводится
+в обычный список. Целые значения другого типа (120.0, Decimal) приводятся к int.
+
+Кортежи собираются только для записей, которые нужны экрану; выборка
+подмножества (take, filter) копирует колонки, не собирая кортежи. Индекс
+по ID строится при первом обращении по ID.
+"""
+
+import sys
+from array import array
+from datetime import datetime, date
+from itertools import compress
+
+# Типы колонок
+ID = 'id'  # целое без NULL (первичный ключ)
+INT = 'int'  # целое, допускает NULL
+FLOAT = 'float'  # число с плавающей точкой, допускает NULL
+CATEGORY = 'category'  # повторяющаяся строка (словарное кодирование)
+TEXT = 'text'  # произвольная строка
+DATETIME = 'datetime'  # дата или дата и время
+
+COLUMN_KINDS = (ID, INT, FLOAT, CATEGORY, TEXT, DATETIME)
+
+NAN = float('nan')
+INT_NULL = -2 ** 31  # NULL в целочисленной колонке
+
+# Как была представлена дата в исходной строке
+_DT_NONE, _DT_DATE_STR, _DT_DATETIME_STR, _DT_DATETIME, _DT_DATE, _DT_RAW = range(6)
+
+_SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MAX_SECONDS = 2 ** 32 - 1  # предел массива 'I' (2106 год)
+
+# Колонки выборки select_user_records_by_admin / select_all_records
+ADMIN_RECORD_COLUMNS = (
+    ('id', ID),
+    ('user_id', INT),
+    ('user_name', CATEGORY),
+    ('user_email', CATEGORY),
+    ('weight', FLOAT),
+    ('pressure_systolic', INT),
+    ('pressure_diastolic', INT),
+    ('pulse', INT),
+    ('temperature', FLOAT),
+    ('notes', TEXT),
+    ('record_date', DATETIME),
+    ('created_at', DATETIME),
+)
+
+
+def _to_seconds(value):
+    """datetime -> целые секунды от 1970-01-01 (без учета часового пояса)"""
+    return ((value.toordinal() - _EPOCH_ORDINAL) * _SECONDS_PER_DAY
+            + value.hour * 3600 + value.minute * 60 + value.second)
+
+
+def _exact_int(value):
+    """Целое, равное value (120.0 -> 120), или None, если такого нет (120.5, '120')"""
+    if isinstance(value, int):
+        return value
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if number == value else None
+
+
+def _from_seconds(seconds):
+    days, rest = divmod(seconds, _SECONDS_PER_DAY)
+    day = date.fromordinal(days + _EPOCH_ORDINAL)
+    return datetime(day.year, day.month, day.day, rest // 3600, rest % 3600 // 60, rest % 60)
+
+
+class RecordColumns:
+    """
+    Колоночный контейнер записей
+
+    Args:
+        columns: последовательность пар (имя колонки, тип колонки)
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.names = tuple(name for name, _ in self.columns)
+        self._kinds = {}
+        self._data = {}
+        self._categories = {}  # имя колонки -> (список значений, значение -> код)
+        self._dt_kinds = {}  # имя колонки даты -> array('B') с типом значения
+        self._dt_raw = {}  # имя колонки даты -> {позиция: исходная строка}
+        self._index = None  # ID записи -> позиция (строится по требованию)
+        self._id_column = None
+
+        for name, kind in self.columns:
+            if kind not in COLUMN_KINDS:
+                raise ValueError(f"Неизвестный тип колонки {name}: {kind}")
+            self._kinds[name] = kind
+            if kind == ID:
+                if self._id_column is not None:
+                    raise ValueError("Допускается только одна колонка ID")
+                self._id_column = name
+                self._data[name] = array('q')
+            elif kind == INT:
+                self._data[name] = array('i')
+            elif kind == FLOAT:
+                self._data[name] = array('d')
+            elif kind == CATEGORY:
+                self._data[name] = array('H')
+                self._categories[name] = ([], {})
+            elif kind == DATETIME:
+                self._data[name] = array('I')
+                self._dt_kinds[name] = array('B')
+                self._dt_raw[name] = {}
+            else:
+                self._data[name] = []
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """
+        Строит контейнер из кортежей выборки
+
+        Args:
+            columns: описание колонок (имя, тип)
+            rows: кортежи в порядке колонок
+
+        Returns:
+            RecordColumns
+        """
+        store = cls(columns)
+        store.extend(rows or [])
+        return store
+
+    def __len__(self):
+        return len(self._data[self.names[0]]) if self.names else 0
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.row(position)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(range(*key.indices(len(self))))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("Позиция записи вне диапазона")
+        return self.row(key)
+
+    def __contains__(self, record_id):
+        return record_id in self._get_index()
+
+    # ------------------------------------------------------------------
+    # Добавление записей
+    # ------------------------------------------------------------------
+
+    def append(self, row):
+        """
+        Добавляет запись
+
+        Args:
+            row: кортеж в порядке колонок
+        """
+        position = len(self)
+        try:
+            self._append_values(position, row)
+        except Exception:
+            # Запись добавляется целиком или не добавляется совсем
+            self._truncate(position)
+            raise
+
+    def _append_values(self, position, row):
+        for (name, kind), value in zip(self.columns, row):
+            column = self._data[name]
+            if kind == ID or kind == INT:
+                if not isinstance(column, array):
+                    column.append(value)
+                elif value is None and kind == INT:
+                    column.append(INT_NULL)
+                else:
+                    number = _exact_int(value)
+                    if number is None:
+                        self._to_list(name).append(value)
+                    else:
+                        value = number
+                        try:
+                            column.append(number)
+                        except OverflowError:
+                            # Значение не помещается в 32 (64) бита - расширяем колонку
+                            column = array('q', column) if column.typecode != 'q' else self._to_list(name)
+                            self._data[name] = column
+                            column.append(number)
+                if kind == ID and self._index is not None:
+                    self._index[value] = position
+            elif kind == FLOAT:
+                if not isinstance(column, array):
+                    column.append(value)
+                else:
+                    try:
+                        column.append(NAN if value is None else float(value))
+                    except (TypeError, ValueError):
+                        self._to_list(name).append(value)
+            elif kind == CATEGORY:
+                values, codes = self._categories[name]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(values)
+                    values.append(value)
+                    if code > 0xFFFF and column.typecode == 'H':
+                        column = self._data[name] = array('I', column)
+                column.append(code)
+            elif kind == DATETIME:
+                self._append_datetime(name, position, value)
+            else:
+                column.append(sys.intern(value) if isinstance(value, str) else value)
+
+    def _to_list(self, name):
+        """Переводит числовую колонку в список (значение не представимо в ее массиве)"""
+        column = [self.value(name, position) for position in range(len(self._data[name]))]
+        self._data[name] = column
+        return column
+
+    def _truncate(self, size):
+        for name in self.names:
+            if len(self._data[name]) > size:
+                del self._data[name][size:]
+        for name, kinds in self._dt_kinds.items():
+            if len(kinds) > size:
+                del kinds[size:]
+            self._dt_raw[name].pop(size, None)
+        self._index = None
+
+    def extend(self, rows):
+        """Добавляет несколько записей"""
+        for row in rows:
+            self.append(row)
+
+    def _append_datetime(self, name, position, value):
+        seconds, dt_kind = 0, _DT_RAW
+        if value is None:
+            dt_kind = _DT_NONE
+        elif isinstance(value, datetime):
+            if not value.microsecond and value.tzinfo is None:
+                seconds, dt_kind = _to_seconds(value), _DT_DATETIME
+        elif isinstance(value, date):
+            seconds, dt_kind = (value.toordinal() - _EPOCH_ORDINAL) * _SECONDS_PER_DAY, _DT_DATE
+        elif isinstance(value, str) and len(value) in (10, 19) and value[4:5] == '-':
+            # Строки SQLite 'ГГГГ-ММ-ДД' и 'ГГГГ-ММ-ДД ЧЧ:ММ:СС' восстанавливаются без потерь
+            try:
+                seconds = _to_seconds(datetime.fromisoformat(value))
+                dt_kind = _DT_DATE_STR if len(value) == 10 else _DT_DATETIME_STR
+            except ValueError:
+                pass
+
+        if not 0 <= seconds <= _MAX_SECONDS:
+            seconds, dt_kind = 0, _DT_RAW
+        if dt_kind == _DT_RAW:
+            self._dt_raw[name][position] = value
+        self._data[name].append(seconds)
+        self._dt_kinds[name].append(dt_kind)
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def value(self, name, position):
+        """
+        Возвращает значение колонки в исходном виде
+
+        Args:
+            name: имя колонки
+            position: позиция записи
+
+        Returns:
+            значение (None для NULL)
+        """
+        kind = self._kinds[name]
+        column = self._data[name]
+        stored = column[position]
+        if kind == ID or kind == TEXT or not isinstance(column, array):
+            return stored
+        if kind == INT:
+            return None if stored == INT_NULL else stored
+        if kind == FLOAT:
+            return None if stored != stored else stored
+        if kind == CATEGORY:
+            return self._categories[name][0][stored]
+
+        dt_kind = self._dt_kinds[name][position]
+        if dt_kind == _DT_NONE:
+            return None
+        if dt_kind == _DT_RAW:
+            return self._dt_raw[name][position]
+        moment = _from_seconds(stored)
+        if dt_kind == _DT_DATE_STR:
+            return moment.strftime("%Y-%m-%d")
+        if dt_kind == _DT_DATETIME_STR:
+            return moment.strftime("%Y-%m-%d %H:%M:%S")
+        if dt_kind == _DT_DATE:
+            return moment.date()
+        return moment
+
+    def row(self, position):
+        """Собирает кортеж записи по позиции"""
+        return tuple(self.value(name, position) for name in self.names)
+
+    def by_id(self, record_id):
+        """
+        Возвращает запись по ID
+
+        Returns:
+            tuple или None, если записи нет
+        """
+        position = self._get_index().get(record_id)
+        return None if position is None else self.row(position)
+
+    def position_of(self, record_id):
+        """Позиция записи по ID или None"""
+        return self._get_index().get(record_id)
+
+    def _get_index(self):
+        if self._index is None:
+            ids = self._data[self._id_column] if self._id_column else ()
+            self._index = {record_id: position for position, record_id in enumerate(ids)}
+        return self._index
+
+    def ids(self):
+        """Возвращает ID записей в порядке хранения"""
+        return self._data[self._id_column] if self._id_column else array('q')
+
+    def column_view(self, name):
+        """
+        Возвращает колонку без копирования
+
+        Числовые колонки и коды словарных колонок отдаются как memoryview
+        над массивом: NULL - INT_NULL в целых и NaN в дробных колонках,
+        даты - секунды от 1970-01-01. Текстовые колонки возвращаются списком.
+        Пока memoryview не освобожден, добавление записей вызывает BufferError.
+
+        Args:
+            name: имя колонки
+
+        Returns:
+            memoryview или list
+        """
+        column = self._data[name]
+        return memoryview(column) if isinstance(column, array) else column
+
+    def distinct_values(self, name):
+        """
+        Возвращает множество значений колонки без NULL
+
+        Args:
+            name: имя колонки
+
+        Returns:
+            set
+        """
+        kind = self._kinds[name]
+        if kind == CATEGORY:
+            values = self._categories[name][0]
+            return {values[code] for code in set(self._data[name])} - {None}
+        if kind == INT and isinstance(self._data[name], array):
+            return set(self._data[name]) - {INT_NULL}
+        return {self.value(name, position) for position in range(len(self))} - {None}
+
+    def category_values(self, name):
+        """Уникальные значения словарной колонки в порядке кодов"""
+        return tuple(self._categories[name][0])
+
+    # ------------------------------------------------------------------
+    # Выборка подмножеств
+    # ------------------------------------------------------------------
+
+    def take(self, positions):
+        """
+        Строит новый контейнер из записей в указанных позициях
+
+        Args:
+            positions: позиции записей
+
+        Returns:
+            RecordColumns
+        """
+        positions = list(positions)
+        return self._select(positions, lambda column: [column[position] for position in positions])
+
+    def filter(self, mask):
+        """
+        Отбирает записи по маске
+
+        Args:
+            mask: последовательность флагов (bytearray, list of bool) длиной len(self)
+
+        Returns:
+            RecordColumns
+        """
+        if len(mask) != len(self):
+            raise ValueError("Длина маски не совпадает с числом записей")
+        positions = [position for position, keep in enumerate(mask) if keep]
+        return self._select(positions, lambda column: compress(column, mask))
+
+    def _select(self, positions, pick):
+        """
+        Новый контейнер из выбранных записей, колонка за колонкой
+
+        Args:
+            positions: позиции выбранных записей по порядку
+            pick: функция (колонка) -> значения выбранных позиций
+        """
+        store = RecordColumns(self.columns)
+        for name in self.names:
+            column = self._data[name]
+            if self._kinds[name] == CATEGORY:
+                # Коды перенумеровываются: словарь содержит только оставшиеся значения
+                values = self._categories[name][0]
+                new_values, new_codes = store._categories[name]
+                remap = {}
+                codes = []
+                for code in pick(column):
+                    new_code = remap.get(code)
+                    if new_code is None:
+                        new_code = remap[code] = new_codes[values[code]] = len(new_values)
+                        new_values.append(values[code])
+                    codes.append(new_code)
+                store._data[name] = array('H' if len(new_values) <= 0x10000 else 'I', codes)
+            elif isinstance(column, array):
+                store._data[name] = array(column.typecode, pick(column))
+            else:
+                store._data[name] = list(pick(column))
+        for name, kinds in self._dt_kinds.items():
+            store._dt_kinds[name] = array('B', pick(kinds))
+            raw = self._dt_raw[name]
+            if raw:
+                store._dt_raw[name] = {new: raw[old] for new, old in enumerate(positions) if old in raw}
+        return store
+
+    def search_mask(self, query, names=None):
+        """
+        Строит маску записей, содержащих подстроку без учета регистра
+
+        Значения словарных колонок проверяются один раз на уникальное
+        значение, а не на каждую запись.
+
+        Args:
+            query: строка поиска
+            names: колонки для поиска (None - все)
+
+        Returns:
+            bytearray: 1 для найденных записей
+        """
+        query = query.lower()
+        size = len(self)
+        mask = bytearray(size)
+        for name in names or self.names:
+            kind = self._kinds[name]
+            if kind == CATEGORY:
+                matched = [bool(value) and query in str(value).lower()
+                           for value in self._categories[name][0]]
+                codes = self._data[name]
+                for position in range(size):
+                    if not mask[position] and matched[codes[position]]:
+                        mask[position] = 1
+                continue
+
+            for position in range(size):
+                if mask[position]:
+                    continue
+                value = self.value(name, position)
+                if value and query in str(value).lower():
+                    mask[position] = 1
+        return mask
+
+    def memory_usage(self):
+        """
+        Оценивает объем памяти контейнера в байтах
+
+        Учитываются массивы, списки и уникальные строки и числа в них.
+        """
+        total = sys.getsizeof(self._index) if self._index is not None else 0
+        seen = set()
+
+        def sized(value):
+            if value is None or id(value) in seen:
+                return 0
+            seen.add(id(value))
+            return sys.getsizeof(value)
+
+        for name in self.names:
+            column = self._data[name]
+            total += sys.getsizeof(column)
+            if isinstance(column, list):
+                total += sum(sized(value) for value in column)
+        for values, codes in self._categories.values():
+            total += sys.getsizeof(values) + sys.getsizeof(codes) + sum(sized(value) for value in values)
+        for name, kinds in self._dt_kinds.items():
+            total += sys.getsizeof(kinds) + sum(sized(value) for value in self._dt_raw[name].values())
+        return total
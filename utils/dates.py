@@ -0,0 +1,164 @@
+"""
+Разбор и форматирование дат для всех экранов
+
+Даты из SQLite приходят строками 'ГГГГ-ММ-ДД' или 'ГГГГ-ММ-ДД ЧЧ:ММ:СС'.
+Для них используется datetime.fromisoformat (реализован на C и в десятки раз
+быстрее strptime); strptime остается только для редких форматов.
+Готовые строки для отображения кэшируются: одна и та же дата при
+перерисовке списка или поиске форматируется один раз. Кэш учитывает
+настройку date_format и сбрасывается при ее изменении.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+# Порядок частей даты для настройки date_format
+DATE_FORMAT_PATTERNS = {
+    'dd-mm-yyyy': ('%d', '%m', '%Y'),
+    'mm-dd-yyyy': ('%m', '%d', '%Y'),
+    'yyyy-mm-dd': ('%Y', '%m', '%d'),
+}
+DEFAULT_DATE_FORMAT = 'dd-mm-yyyy'
+
+# Форматы, которые не разбирает fromisoformat
+FALLBACK_FORMATS = ("%d-%m-%Y", "%d.%m.%Y", "%d.%m.%Y %H:%M:%S", "%d-%m-%Y %H:%M:%S")
+
+# Максимальное число строк в кэше отображения
+DISPLAY_CACHE_SIZE = 8192
+
+_display_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_current_format = DEFAULT_DATE_FORMAT
+
+
+def parse_datetime(value):
+    """
+    Преобразует значение даты в datetime
+
+    Args:
+        value: строка, datetime или date
+
+    Returns:
+        datetime или None, если значение не удалось разобрать
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value:
+        return None
+
+    # Быстрый путь: форматы SQLite ('ГГГГ-ММ-ДД', 'ГГГГ-ММ-ДД ЧЧ:ММ:СС[.ffffff]')
+    if len(value) >= 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+
+    for fmt in FALLBACK_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def get_date_pattern(date_format=None, separator='-', with_time=False, seconds=False):
+    """
+    Возвращает шаблон strftime для настройки date_format
+
+    Args:
+        date_format: значение настройки ('dd-mm-yyyy', 'mm-dd-yyyy', 'yyyy-mm-dd')
+        separator: разделитель частей даты
+        with_time: добавить время
+        seconds: добавить секунды (вместе с with_time)
+
+    Returns:
+        str: шаблон strftime
+    """
+    parts = DATE_FORMAT_PATTERNS.get(date_format or _current_format, DATE_FORMAT_PATTERNS[DEFAULT_DATE_FORMAT])
+    pattern = separator.join(parts)
+    if with_time:
+        pattern += " %H:%M:%S" if seconds else " %H:%M"
+    return pattern
+
+
+def set_date_format(date_format):
+    """
+    Устанавливает текущую настройку формата даты
+
+    При изменении настройки кэш отображения сбрасывается
+
+    Args:
+        date_format: значение настройки date_format
+    """
+    global _current_format
+    date_format = date_format if date_format in DATE_FORMAT_PATTERNS else DEFAULT_DATE_FORMAT
+    with _cache_lock:
+        if date_format != _current_format:
+            _current_format = date_format
+            _display_cache.clear()
+
+
+def clear_cache():
+    """Очищает кэш отображения дат"""
+    with _cache_lock:
+        _display_cache.clear()
+
+
+def format_date(value, date_format=None, separator='-', with_time=False, seconds=False):
+    """
+    Форматирует дату для отображения с учетом настройки пользователя
+
+    Args:
+        value: строка, datetime или date
+        date_format: настройка date_format (None - текущая)
+        separator: разделитель частей даты
+        with_time: показывать время
+        seconds: показывать секунды
+
+    Returns:
+        str: отформатированная дата; нераспознанное значение возвращается как строка
+    """
+    if date_format is not None:
+        set_date_format(date_format)
+
+    key = (value, separator, with_time, seconds)
+    try:
+        with _cache_lock:
+            cached = _display_cache.get(key)
+            if cached is not None:
+                _display_cache.move_to_end(key)
+                return cached
+    except TypeError:
+        # Нехешируемое значение - форматируем без кэша
+        key = None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        text = "" if value is None else str(value)
+    else:
+        text = parsed.strftime(get_date_pattern(None, separator, with_time, seconds))
+
+    if key is not None:
+        with _cache_lock:
+            _display_cache[key] = text
+            if len(_display_cache) > DISPLAY_CACHE_SIZE:
+                _display_cache.popitem(last=False)
+    return text
+
+
+def get_user_date_format():
+    """
+    Возвращает настройку date_format текущего пользователя приложения
+
+    Returns:
+        str: значение настройки или формат по умолчанию
+    """
+    try:
+        from kivymd.app import MDApp
+        app = MDApp.get_running_app()
+        return (getattr(app, 'user_settings', None) or {}).get('date_format', DEFAULT_DATE_FORMAT)
+    except Exception:
+        return DEFAULT_DATE_FORMAT
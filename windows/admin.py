@@ -6,7 +6,6 @@
 import os
 import platform
 from datetime import datetime
-import socket
 
 from kivy.lang import Builder
 from kivy.uix.screenmanager import Screen
@@ -28,16 +27,59 @@ from kivymd.uix.gridlayout import MDGridLayout
 
 from database import (
 get_connection,
-select_all_users,
+select_users_directory,
 select_user_records_by_admin,
 select_all_records,
-insert_admin_action,
 update_user_admin_status,
 get_user_statistics,
-select_admin_actions
+select_admin_actions_page,
+get_backend_health
 )
 
+from services.audit import audit_logger
+from utils.dates import format_date, get_user_date_format
+from utils.columnar import RecordColumns, ADMIN_RECORD_COLUMNS
+from services.user_names import user_name_cache
+from services.anomalies import anomaly_detector
 from kv import ADMIN_KV
+
+# Число пользователей на одной странице списка
+USERS_PAGE_SIZE = 50
+
+# Колонки записей, по которым выполняется поиск (все, кроме даты создания)
+RECORD_SEARCH_COLUMNS = tuple(name for name, _ in ADMIN_RECORD_COLUMNS if name != 'created_at')
+
+# Число действий на одной странице журнала
+AUDIT_PAGE_SIZE = 50
+
+# Типы действий администраторов для фильтра журнала
+AUDIT_ACTION_TYPES = {
+    'view_dashboard': "Просмотр панели",
+    'view_users': "Просмотр пользователей",
+    'view_user_records': "Просмотр записей пользователя",
+    'view_records': "Просмотр записей",
+    'toggle_admin': "Изменение прав",
+    'view_audit_log': "Просмотр журнала",
+}
+
+
+def log_admin_action(action_type, details, affected_user_id=None):
+    """
+    Записывает действие текущего администратора в журнал
+
+    Событие ставится в очередь audit_logger и записывается в базу
+    в фоновом потоке, не задерживая экран
+
+    Args:
+        action_type: Тип действия
+        details: Детали действия
+        affected_user_id: ID затронутого пользователя
+    """
+    try:
+        app = MDApp.get_running_app()
+        audit_logger.log(app.get_user_id(), action_type, details, affected_user_id)
+    except Exception as e:
+        print(f"Ошибка записи действия администратора: {e}")
 # Builder.load_string(ADMIN_KV)
 
 
@@ -69,7 +111,7 @@ class AdminDashboard(Screen):
         self.load_statistics()
 
         # Записываем действие администратора
-        self.log_admin_action("view_dashboard", "Просмотр административной панели")
+        log_admin_action("view_dashboard", "Просмотр административной панели")
 
     def load_statistics(self):
         """
@@ -94,6 +136,9 @@ class AdminDashboard(Screen):
                         ("Активных за 30 дней", f"{stats.get('active_users_30_days', 0)}", "account-check"),
                     ]
 
+                    # Состояние сервера базы данных
+                    stats_cards.append(self.get_backend_health_card())
+
                     for title, value, icon in stats_cards:
                         card = self.create_stat_card(title, value, icon)
                         self.ids.stats_container.add_widget(card)
@@ -102,6 +147,31 @@ class AdminDashboard(Screen):
         except Exception as e:
             print(f"Ошибка загрузки статистики: {e}")
 
+    def get_backend_health_card(self):
+        """
+        Формирует карточку состояния сервера базы данных
+
+        Данные берутся из кэшированного снимка монитора, без подключения к серверу
+
+        Returns:
+            tuple: (заголовок, значение, иконка)
+        """
+        health = get_backend_health()
+        state_names = {
+            'closed': "MySQL",
+            'open': "Локальная БД",
+            'half_open': "Проверка...",
+        }
+
+        if not health.get('mysql_available'):
+            value = "Локальная БД"
+        else:
+            value = state_names.get(health['state'], health['state'])
+            if health['state'] == 'closed' and health.get('latency_ms') is not None:
+                value += f" ({health['latency_ms']:.0f} мс)"
+
+        return ("Сервер БД", value, "database")
+
     def create_stat_card(self, title, value, icon):
         """
         Создает карточку со статистикой
@@ -181,40 +251,6 @@ class AdminDashboard(Screen):
         )
         dialog.open()
 
-    def log_admin_action(self, action_type, details, affected_user_id=None):
-        """
-        Записывает действие администратора в журнал
-
-        Args:
-            action_type: Тип действия
-            details: Детали действия
-            affected_user_id: ID затронутого пользователя
-        """
-        try:
-            app = MDApp.get_running_app()
-            user_id = app.get_user_id()
-
-            # Получаем IP адрес
-            ip_address = None
-            try:
-                hostname = socket.gethostname()
-                ip_address = socket.gethostbyname(hostname)
-            except:
-                ip_address = "unknown"
-
-            conn = get_connection()
-            insert_admin_action(
-                conn,
-                user_id,
-                action_type,
-                details,
-                affected_user_id,
-                ip_address
-            )
-            conn.close()
-        except Exception as e:
-            print(f"Ошибка записи действия администратора: {e}")
-
     def go_back(self):
         """Возврат к профилю пользователя"""
         self.manager.current = "profile"
@@ -226,6 +262,10 @@ class AdminUsersScreen(Screen):
 
     users_menu = None
     selected_user_id = None
+    users_sort = 'created_at'  # Сортировка списка: 'created_at' или 'name'
+    _search_query = None  # Текущий поисковый запрос
+    _next_cursor = None  # Ключ следующей страницы списка
+    _search_event = None  # Отложенный поисковый запрос
 
     def on_pre_enter(self):
         """
@@ -242,85 +282,48 @@ class AdminUsersScreen(Screen):
         self.load_users()
 
         # Записываем действие администратора
-        app = MDApp.get_running_app()
-        # Используем прямую запись в базу данных вместо app.admin_dashboard
-        self.log_admin_action_direct("view_users", "Просмотр списка пользователей")
+        log_admin_action("view_users", "Просмотр списка пользователей")
 
-    def log_admin_action_direct(self, action_type, details, affected_user_id=None):
+    def load_users(self, search_query=None, append=False):
         """
-        Прямая запись действия администратора в базу данных
+        Загружает страницу списка пользователей
+
+        Поиск и постраничный вывод выполняются в базе данных,
+        поэтому доступны все пользователи, а не только первые 100
 
         Args:
-            action_type: Тип действия
-            details: Детали действия
-            affected_user_id: ID затронутого пользователя
+            search_query: Текст для поиска пользователей
+            append: True - добавить следующую страницу к уже показанным
         """
         try:
-            app = MDApp.get_running_app()
-            user_id = app.get_user_id()
-
-            # Получаем IP адрес
-            ip_address = None
-            try:
-                hostname = socket.gethostname()
-                ip_address = socket.gethostbyname(hostname)
-            except:
-                ip_address = "unknown"
+            if not append:
+                self._search_query = search_query
+                self._next_cursor = None
 
             conn = get_connection()
-            insert_admin_action(
+            users, self._next_cursor = select_users_directory(
                 conn,
-                user_id,
-                action_type,
-                details,
-                affected_user_id,
-                ip_address
+                search=self._search_query,
+                match='substring',
+                sort=self.users_sort,
+                after=self._next_cursor if append else None,
+                limit=USERS_PAGE_SIZE
             )
             conn.close()
-        except Exception as e:
-            print(f"Ошибка записи действия администратора: {e}")
-
-    def load_users(self, search_query=None):
-        """
-        Загружает список пользователей
-
-        Args:
-            search_query: Текст для поиска пользователей
-        """
-        try:
-            conn = get_connection()
-            users = select_all_users(conn)
 
             if hasattr(self.ids, 'users_list'):
-                self.ids.users_list.clear_widgets()
+                if not append:
+                    self.ids.users_list.clear_widgets()
 
                 if users:
-                    # Фильтруем пользователей, если есть поисковый запрос
-                    filtered_users = []
-                    if search_query and search_query.strip():
-                        query_lower = search_query.lower()
-                        for user in users:
-                            user_id, name, email, created_at, is_admin = user
-                            if (query_lower in name.lower() or
-                                    query_lower in email.lower() or
-                                    query_lower in str(user_id)):
-                                filtered_users.append(user)
-                    else:
-                        filtered_users = users
+                    date_format = get_user_date_format()
 
                     # Отображаем пользователей
-                    for user in filtered_users:
+                    for user in users:
                         user_id, name, email, created_at, is_admin = user
 
                         # Форматируем дату
-                        try:
-                            if isinstance(created_at, str):
-                                created_date = datetime.strptime(created_at.split()[0], "%Y-%m-%d")
-                            else:
-                                created_date = created_at
-                            formatted_date = created_date.strftime("%d.%m.%Y")
-                        except:
-                            formatted_date = str(created_at)
+                        formatted_date = format_date(created_at, date_format, separator='.')
 
                         # Создаем элемент списка
                         item = ThreeLineListItem(
@@ -338,7 +341,7 @@ class AdminUsersScreen(Screen):
                         self.show_user_menu(uid, name, is_admin, x))
 
                         self.ids.users_list.add_widget(item)
-                else:
+                elif not append:
                     # Нет пользователей
                     self.ids.users_list.add_widget(MDLabel(
                         text="Пользователи не найдены",
@@ -347,19 +350,44 @@ class AdminUsersScreen(Screen):
                         font_style="H6"
                     ))
 
-            conn.close()
+            # Кнопка следующей страницы доступна, пока есть непоказанные пользователи
+            if hasattr(self.ids, 'load_more_button'):
+                self.ids.load_more_button.disabled = self._next_cursor is None
+
         except Exception as e:
             self.show_message("Ошибка", f"Ошибка загрузки пользователей: {str(e)}")
 
+    def load_more_users(self):
+        """
+        Загружает следующую страницу пользователей
+        """
+        if self._next_cursor is not None:
+            self.load_users(append=True)
+
     def on_search(self, instance, value):
         """
         Обработчик поиска пользователей
 
+        Запрос выполняется после паузы в наборе текста,
+        а не на каждый введенный символ
+
         Args:
             instance: Поле ввода
             value: Текст поиска
         """
-        self.load_users(search_query=value)
+        if self._search_event is not None:
+            self._search_event.cancel()
+        self._search_event = Clock.schedule_once(lambda dt: self.load_users(search_query=value), 0.3)
+
+    def toggle_users_sort(self):
+        """
+        Переключает сортировку списка: по дате регистрации / по имени
+        """
+        self.users_sort = 'name' if self.users_sort == 'created_at' else 'created_at'
+        if hasattr(self.ids, 'sort_button'):
+            self.ids.sort_button.icon = "sort-alphabetical-ascending" if self.users_sort == 'name' \
+                else "sort-calendar-descending"
+        self.load_users(search_query=self._search_query)
 
     def show_user_menu(self, user_id, user_name, is_admin, list_item):
         """
@@ -414,7 +442,7 @@ class AdminUsersScreen(Screen):
         self.manager.current = "admin_records"
 
         # Записываем действие
-        self.log_admin_action_direct("view_user_records", f"Просмотр записей пользователя ID: {user_id}", user_id)
+        log_admin_action("view_user_records", f"Просмотр записей пользователя ID: {user_id}", user_id)
 
     def toggle_admin_status(self, user_id, new_status, user_name):
         """
@@ -477,7 +505,7 @@ class AdminUsersScreen(Screen):
 
             # Записываем действие
             action_details = f"Изменение статуса администратора для пользователя {user_name} (ID: {user_id}) на {status_text}"
-            self.log_admin_action_direct("toggle_admin", action_details, user_id)
+            log_admin_action("toggle_admin", action_details, user_id)
 
         except Exception as e:
             self.show_message("Ошибка", f"Ошибка изменения статуса: {str(e)}")
@@ -508,6 +536,7 @@ class AdminRecordsScreen(Screen):
 
     selected_filter = "all"  # all, specific_user
     search_query = ""
+    all_records = RecordColumns(ADMIN_RECORD_COLUMNS)  # Загруженные записи (колоночное хранилище)
 
     def on_pre_enter(self):
         """
@@ -528,42 +557,7 @@ class AdminRecordsScreen(Screen):
         if hasattr(app, 'selected_user_id') and app.selected_user_id:
             filter_type = f"записей пользователя ID: {app.selected_user_id}"
 
-        # Используем прямое логирование
-        self.log_admin_action_direct("view_records", f"Просмотр {filter_type}")
-
-    def log_admin_action_direct(self, action_type, details, affected_user_id=None):
-        """
-        Прямая запись действия администратора в базу данных
-
-        Args:
-            action_type: Тип действия
-            details: Детали действия
-            affected_user_id: ID затронутого пользователя
-        """
-        try:
-            app = MDApp.get_running_app()
-            user_id = app.get_user_id()
-
-            # Получаем IP адрес
-            ip_address = None
-            try:
-                hostname = socket.gethostname()
-                ip_address = socket.gethostbyname(hostname)
-            except:
-                ip_address = "unknown"
-
-            conn = get_connection()
-            insert_admin_action(
-                conn,
-                user_id,
-                action_type,
-                details,
-                affected_user_id,
-                ip_address
-            )
-            conn.close()
-        except Exception as e:
-            print(f"Ошибка записи действия администратора: {e}")
+        log_admin_action("view_records", f"Просмотр {filter_type}")
 
     def load_records(self, search_query=None):
         """
@@ -590,42 +584,17 @@ class AdminRecordsScreen(Screen):
             if hasattr(self.ids, 'title_label'):
                 self.ids.title_label.text = f"Записи ({filter_text})"
 
-            # Сохраняем все записи для поиска
-            self.all_records = list(records) if records else []
+            # Сохраняем все записи для поиска. Имя и email пользователя хранятся
+            # один раз на пользователя, числа и даты - в массивах
+            self.all_records = RecordColumns.from_rows(ADMIN_RECORD_COLUMNS, records)
+
+            # Личные нормы показателей всех пользователей выборки - одним запросом
+            anomaly_detector.preload(self.all_records.distinct_values('user_id'), conn)
 
             # Фильтруем записи, если есть поисковый запрос
-            filtered_records = []
             if search_query and search_query.strip():
-                query_lower = search_query.lower()
-                for record in self.all_records:
-                    # ИСПРАВЛЕНА ИНДЕКСАЦИЯ ПОЛЕЙ:
-                    # record structure: (id, user_id, user_name, user_email, weight, pressure_systolic,
-                    # pressure_diastolic, pulse, temperature, notes, record_date, created_at)
-                    record_id = str(record[0]) if record[0] else ""
-                    user_id_str = str(record[1]) if record[1] else ""
-                    user_name = str(record[2]) if record[2] else ""
-                    user_email = str(record[3]) if record[3] else ""
-                    weight_str = str(record[4]) if record[4] else ""
-                    pressure_sys_str = str(record[5]) if record[5] else ""
-                    pressure_dia_str = str(record[6]) if record[6] else ""
-                    pulse_str = str(record[7]) if record[7] else ""
-                    temp_str = str(record[8]) if record[8] else ""
-                    notes = str(record[9]) if record[9] else ""
-                    record_date_str = str(record[10]) if record[10] else ""
-
-                    # Ищем во всех полях
-                    if (query_lower in user_name.lower() or
-                            query_lower in user_email.lower() or
-                            query_lower in notes.lower() or
-                            query_lower in record_id.lower() or
-                            query_lower in user_id_str.lower() or
-                            query_lower in weight_str.lower() or
-                            query_lower in pressure_sys_str.lower() or
-                            query_lower in pressure_dia_str.lower() or
-                            query_lower in pulse_str.lower() or
-                            query_lower in temp_str.lower() or
-                            query_lower in record_date_str.lower()):
-                        filtered_records.append(record)
+                mask = self.all_records.search_mask(search_query, RECORD_SEARCH_COLUMNS)
+                filtered_records = self.all_records.filter(mask)
             else:
                 filtered_records = self.all_records
 
@@ -634,6 +603,7 @@ class AdminRecordsScreen(Screen):
                 self.ids.records_list.clear_widgets()
 
                 if filtered_records:
+                    date_format = get_user_date_format()
                     for record in filtered_records:
                         # ИСПРАВЛЕНА РАСПАКОВКА
                         try:
@@ -645,19 +615,7 @@ class AdminRecordsScreen(Screen):
                             continue
 
                         # Форматируем дату
-                        try:
-                            if isinstance(record_date, str):
-                                # Пробуем разные форматы
-                                try:
-                                    date_obj = datetime.strptime(record_date.split()[0], "%Y-%m-%d")
-                                except:
-                                    # Может быть уже в другом формате
-                                    date_obj = datetime.now()
-                            else:
-                                date_obj = record_date
-                            formatted_date = date_obj.strftime("%d.%m.%Y")
-                        except:
-                            formatted_date = str(record_date)
+                        formatted_date = format_date(record_date, date_format, separator='.')
 
                         # Формируем текст
                         primary_text = f"{user_name} ({user_email}) - {formatted_date}"
@@ -674,6 +632,9 @@ class AdminRecordsScreen(Screen):
                             indicators.append(f"Темп.: {temp}°C")
 
                         secondary_text = ", ".join(indicators) if indicators else "Нет показателей"
+                        if self.get_record_anomalies(record):
+                            # Показатель сильно отличается от обычного для пользователя
+                            secondary_text = f"[!] {secondary_text}"
 
                         # Третичный текст для заметок
                         tertiary_text = ""
@@ -691,8 +652,9 @@ class AdminRecordsScreen(Screen):
                             bg_color=(0.95, 0.95, 1, 0.3)
                         )
 
-                        # Привязываем обработчик для просмотра деталей
-                        item.bind(on_release=lambda x, rec=record: self.view_record_details(rec))
+                        # Привязываем обработчик для просмотра деталей (кортеж собирается по ID при нажатии)
+                        item.bind(on_release=lambda x, rec_id=record_id: self.view_record_details(
+                            self.all_records.by_id(rec_id)))
 
                         self.ids.records_list.add_widget(item)
                 else:
@@ -722,6 +684,24 @@ class AdminRecordsScreen(Screen):
         self.search_query = value
         self.load_records(search_query=value)
 
+    def get_record_anomalies(self, record):
+        """
+        Возвращает показатели записи, необычные для пользователя
+
+        Args:
+            record: Данные записи
+
+        Returns:
+            list: Anomaly (см. services/anomalies.py)
+        """
+        return anomaly_detector.check(record[1], {
+            'weight': record[4],
+            'pressure_systolic': record[5],
+            'pressure_diastolic': record[6],
+            'pulse': record[7],
+            'temperature': record[8],
+        })
+
     def view_record_details(self, record):
         """
         Показывает детали записи
@@ -738,25 +718,10 @@ class AdminRecordsScreen(Screen):
             self.show_message("Ошибка", f"Ошибка обработки записи: {e}")
             return
 
-        # Форматируем дату
-        try:
-            if isinstance(record_date, str):
-                date_obj = datetime.strptime(record_date.split()[0], "%Y-%m-%d")
-            else:
-                date_obj = record_date
-            formatted_date = date_obj.strftime("%d.%m.%Y")
-        except:
-            formatted_date = str(record_date)
-
-        # Форматируем дату создания
-        try:
-            if isinstance(created_at, str):
-                created_obj = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-            else:
-                created_obj = created_at
-            formatted_created = created_obj.strftime("%d.%m.%Y %H:%M")
-        except:
-            formatted_created = str(created_at)
+        # Форматируем даты записи и ее создания
+        date_format = get_user_date_format()
+        formatted_date = format_date(record_date, date_format, separator='.')
+        formatted_created = format_date(created_at, date_format, separator='.', with_time=True)
 
         # Создаем содержимое диалога
         details = MDBoxLayout(
@@ -843,6 +808,16 @@ class AdminRecordsScreen(Screen):
                 height=dp(100)
             ))
 
+        # Отклонения от личной нормы пользователя
+        anomalies = self.get_record_anomalies(record)
+        if anomalies:
+            details.add_widget(MDLabel(
+                text="\n".join(anomaly.describe() for anomaly in anomalies),
+                theme_text_color="Error",
+                size_hint_y=None,
+                height=dp(25) * len(anomalies)
+            ))
+
         # Заметки
         if notes:
             details.add_widget(MDLabel(
@@ -892,7 +867,7 @@ class AdminRecordsScreen(Screen):
         self.load_records()
 
         # Записываем действие
-        self.log_admin_action_direct("view_records", "Просмотр записей всех пользователей")
+        log_admin_action("view_records", "Просмотр записей всех пользователей")
 
     def show_message(self, title, text):
         """Показывает диалоговое окно с сообщением"""
@@ -921,8 +896,17 @@ class AdminRecordsScreen(Screen):
 class AdminAuditScreen(Screen):
     """
     Экран просмотра журнала действий администраторов
+
+    Журнал листается страницами по мере прокрутки и фильтруется
+    по типу действия, администратору и диапазону дат
     """
 
+    action_type_menu = None  # Меню выбора типа действия
+    _filters = {}  # Текущие фильтры журнала
+    _next_cursor = None  # Ключ следующей страницы журнала
+    _loading = False  # Идет загрузка страницы
+    _shown = 0  # Число показанных записей
+
     def on_pre_enter(self):
         """
         Метод, вызываемый перед переходом на экран
@@ -938,70 +922,53 @@ class AdminAuditScreen(Screen):
         self.load_audit_log()
 
         # Записываем действие администратора
-        # Используем прямое логирование
-        self.log_admin_action_direct("view_audit_log", "Просмотр журнала действий администраторов")
+        log_admin_action("view_audit_log", "Просмотр журнала действий администраторов")
 
-    def log_admin_action_direct(self, action_type, details, affected_user_id=None):
+    def load_audit_log(self, append=False):
         """
-        Прямая запись действия администратора в базу данных
+        Загружает страницу журнала действий администраторов
 
         Args:
-            action_type: Тип действия
-            details: Детали действия
-            affected_user_id: ID затронутого пользователя
+            append: True - добавить следующую страницу к уже показанным
         """
+        if self._loading:
+            return
+        self._loading = True
         try:
-            app = MDApp.get_running_app()
-            user_id = app.get_user_id()
-
-            # Получаем IP адрес
-            ip_address = None
-            try:
-                hostname = socket.gethostname()
-                ip_address = socket.gethostbyname(hostname)
-            except:
-                ip_address = "unknown"
+            if not append:
+                # Дописываем события из очереди, чтобы журнал был актуальным
+                audit_logger.flush()
+                self._next_cursor = None
+                self._shown = 0
 
             conn = get_connection()
-            insert_admin_action(
+            actions, self._next_cursor = select_admin_actions_page(
                 conn,
-                user_id,
-                action_type,
-                details,
-                affected_user_id,
-                ip_address
+                after=self._next_cursor if append else None,
+                limit=AUDIT_PAGE_SIZE,
+                **self._filters
             )
             conn.close()
-        except Exception as e:
-            print(f"Ошибка записи действия администратора: {e}")
 
-    def load_audit_log(self, limit=100):
-        """
-        Загружает журнал действий администраторов
-
-        Args:
-            limit: Ограничение количества записей
-        """
-        try:
-            conn = get_connection()
-            actions = select_admin_actions(conn, None, limit)
+            # Имена администраторов и пользователей - одним запросом на страницу
+            names = user_name_cache.resolve(
+                [action[1] for action in actions] + [action[4] for action in actions]
+            )
 
             if hasattr(self.ids, 'audit_list'):
-                self.ids.audit_list.clear_widgets()
+                if not append:
+                    self.ids.audit_list.clear_widgets()
 
                 if actions:
+                    date_format = get_user_date_format()
                     for action in actions:
-                        action_id, admin_id, admin_name, action_type, action_details, affected_user_id, affected_user_name, ip_address, created_at = action
+                        action_id, admin_id, action_type, action_details, affected_user_id, ip_address, created_at = action
+                        admin_name = names.get(admin_id, f"ID {admin_id}")
+                        affected_user_name = names.get(affected_user_id)
 
                         # Форматируем дату
-                        try:
-                            if isinstance(created_at, str):
-                                date_obj = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                            else:
-                                date_obj = created_at
-                            formatted_date = date_obj.strftime("%d.%m.%Y %H:%M:%S")
-                        except:
-                            formatted_date = str(created_at)
+                        formatted_date = format_date(created_at, date_format, separator='.',
+                                                     with_time=True, seconds=True)
 
                         # Формируем текст
                         primary_text = f"{admin_name} ({action_type})"
@@ -1020,18 +987,114 @@ class AdminAuditScreen(Screen):
                         )
 
                         self.ids.audit_list.add_widget(item)
-                else:
+                    self._shown += len(actions)
+                elif not append:
                     # Нет действий
                     self.ids.audit_list.add_widget(MDLabel(
-                        text="Журнал действий пуст",
+                        text="Журнал действий пуст" if not self._filters else "Действия не найдены",
                         halign="center",
                         theme_text_color="Secondary",
                         font_style="H6"
                     ))
 
-            conn.close()
+            if hasattr(self.ids, 'audit_status'):
+                more = " (прокрутите вниз, чтобы загрузить еще)" if self._next_cursor else ""
+                self.ids.audit_status.text = f"Показано действий: {self._shown}{more}"
+
         except Exception as e:
             self.show_message("Ошибка", f"Ошибка загрузки журнала действий: {str(e)}")
+        finally:
+            self._loading = False
+
+    def on_audit_scroll(self, scroll_view, scroll_y):
+        """
+        Подгружает следующую страницу при прокрутке к концу списка
+
+        Args:
+            scroll_view: Область прокрутки
+            scroll_y: Положение прокрутки (0 - конец списка)
+        """
+        if scroll_y <= 0.05 and self._next_cursor is not None and not self._loading:
+            Clock.schedule_once(lambda dt: self.load_audit_log(append=True), 0)
+
+    def open_action_type_menu(self, button):
+        """
+        Открывает меню выбора типа действия
+
+        Args:
+            button: Кнопка, вызвавшая меню
+        """
+        menu_items = [{
+            "text": "Все действия",
+            "viewclass": "OneLineListItem",
+            "on_release": lambda: self.set_action_type(None),
+        }] + [{
+            "text": label,
+            "viewclass": "OneLineListItem",
+            "on_release": lambda action_type=action_type: self.set_action_type(action_type),
+        } for action_type, label in AUDIT_ACTION_TYPES.items()]
+
+        self.action_type_menu = MDDropdownMenu(caller=button, items=menu_items, width_mult=4)
+        self.action_type_menu.open()
+
+    def set_action_type(self, action_type):
+        """
+        Устанавливает фильтр по типу действия
+
+        Args:
+            action_type: Тип действия или None для всех
+        """
+        if self.action_type_menu:
+            self.action_type_menu.dismiss()
+        if hasattr(self.ids, 'action_type_button'):
+            self.ids.action_type_button.text = AUDIT_ACTION_TYPES.get(action_type, "Все действия")
+        self._action_type = action_type
+        self.apply_filters()
+
+    def apply_filters(self):
+        """
+        Применяет фильтры журнала из полей ввода
+
+        Даты вводятся в формате ГГГГ-ММ-ДД, администратор - по ID
+        """
+        filters = {}
+        if getattr(self, '_action_type', None):
+            filters['action_type'] = self._action_type
+
+        try:
+            admin_text = self.ids.admin_filter.text.strip() if hasattr(self.ids, 'admin_filter') else ""
+            if admin_text:
+                if not admin_text.isdigit():
+                    raise ValueError("ID администратора должен быть числом")
+                filters['admin_id'] = int(admin_text)
+
+            for key, field in (('date_from', 'date_from_field'), ('date_to', 'date_to_field')):
+                value = self.ids[field].text.strip() if field in self.ids else ""
+                if value:
+                    try:
+                        datetime.strptime(value, "%Y-%m-%d")
+                    except ValueError:
+                        raise ValueError(f"Дата должна быть в формате ГГГГ-ММ-ДД: {value}")
+                    filters[key] = value
+        except ValueError as e:
+            self.show_message("Ошибка", str(e))
+            return
+
+        self._filters = filters
+        self.load_audit_log()
+
+    def reset_filters(self):
+        """
+        Сбрасывает все фильтры журнала
+        """
+        for field in ('admin_filter', 'date_from_field', 'date_to_field'):
+            if field in self.ids:
+                self.ids[field].text = ""
+        if hasattr(self.ids, 'action_type_button'):
+            self.ids.action_type_button.text = "Все действия"
+        self._action_type = None
+        self._filters = {}
+        self.load_audit_log()
 
     def show_message(self, title, text):
         """Показывает диалоговое окно с сообщением"""
@@ -8,6 +8,8 @@ from kivymd.app import MDApp
 # Импорт пользовательских модулей
 from database import get_connection, insert_record
 from utils.ui import UIUtils
+from services.records_view import record_view_cache
+from services.anomalies import anomaly_detector
 from utils.rules import (
     validate_weight,  # Валидация веса
     validate_pressure_systolic,  # Валидация систолического давления
@@ -71,11 +73,13 @@ class OptionsWindow(Screen):
 
         try:
             # Валидация всех полей
-            validate_weight(weight)
-            validate_pressure_systolic(pressure_systolic)
-            validate_pressure_diastolic(pressure_diastolic)
-            validate_pulse(pulse)
-            validate_temperature(temperature)
+            values = {
+                'weight': validate_weight(weight),
+                'pressure_systolic': validate_pressure_systolic(pressure_systolic),
+                'pressure_diastolic': validate_pressure_diastolic(pressure_diastolic),
+                'pulse': validate_pulse(pulse),
+                'temperature': validate_temperature(temperature),
+            }
             validate_notes(notes)
         except ValueError as e:
             # Ошибка валидации
@@ -88,8 +92,19 @@ class OptionsWindow(Screen):
         try:
             # Сохранение в базу данных
             conn = get_connection()
-            insert_record(conn, user_id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes, record_date)
-            UIUtils.show_message("Успех", "Данные сохранены успешно!")
+            record_id = insert_record(conn, user_id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes, record_date)
+            anomalies = []
+            if record_id:
+                # В историю добавляется одна строка, остальные не пересчитываются
+                record_view_cache.refresh_record(user_id, record_id, conn)
+                # Сравниваем с личной нормой и добавляем измерение в статистику
+                anomalies = anomaly_detector.observe(user_id, values, conn)
+
+            if anomalies:
+                details = "\n".join(anomaly.describe() for anomaly in anomalies)
+                UIUtils.show_message("Данные сохранены", f"Обратите внимание:\n{details}")
+            else:
+                UIUtils.show_message("Успех", "Данные сохранены успешно!")
             self.clear_form()  # Очищаем форму после успешного сохранения
         except Exception as e:
             UIUtils.show_message("Ошибка", f"Ошибка при сохранении данных: {e}")
@@ -7,7 +7,6 @@
 import os
 import platform
 import base64
-from datetime import datetime
 
 # Библиотеки Kivy для создания GUI
 from kivy.lang import Builder
@@ -26,6 +25,8 @@ from kivymd.uix.button import MDRaisedButton
 # Пользовательские модули
 from services.photoeditor import SimplePhotoEditor
 from database import get_connection, select_user_by_id, update_user_photo, update_user
+from services.user_names import user_name_cache
+from utils.dates import parse_datetime, format_date
 from kv import REG_KV, PROFILE_KV
 from utils.rules import (
     validate_email
@@ -163,39 +164,10 @@ class ProfileScreen(Screen):
                 # Обновляем статус администратора в приложении
                 app.is_admin = bool(is_admin)
 
-                # Преобразуем строку даты в объект datetime
-                created_at = None
-                if created_at_str:
-                    try:
-                        # Пробуем разные форматы дат
-                        formats = [
-                            '%Y-%m-%d %H:%M:%S',  # SQLite формат
-                            '%Y-%m-%d %H:%M:%S.%f',  # SQLite с микросекундами
-                            '%Y-%m-%d',  # Только дата
-                            '%d.%m.%Y %H:%M:%S',  # Другой возможный формат
-                        ]
-
-                        for fmt in formats:
-                            try:
-                                created_at = datetime.strptime(created_at_str, fmt)
-                                break
-                            except ValueError:
-                                continue
-                    except Exception as e:
-                        print(f"Ошибка парсинга даты {created_at_str}: {e}")
-                        created_at = None
-
                 # Форматируем дату в соответствии с настройками пользователя
-                date_format = app.user_settings.get('date_format', 'dd-mm-yyyy')
-                if created_at:
-                    if date_format == 'dd-mm-yyyy':
-                        date_str = created_at.strftime('%d.%m.%Y')
-                    elif date_format == 'mm-dd-yyyy':
-                        date_str = created_at.strftime('%m.%d.%Y')
-                    elif date_format == 'yyyy-mm-dd':
-                        date_str = created_at.strftime('%Y.%m.%d')
-                    else:
-                        date_str = created_at.strftime('%d.%m.%Y')
+                if parse_datetime(created_at_str):
+                    date_format = app.user_settings.get('date_format', 'dd-mm-yyyy')
+                    date_str = format_date(created_at_str, date_format, separator='.')
                 else:
                     date_str = "неизвестно"
 
@@ -612,6 +584,7 @@ class ProfileScreen(Screen):
             # Сохранение в базу данных
             conn = get_connection()
             update_user(conn, user_id, name.strip(), email.strip())
+            user_name_cache.invalidate(user_id)
 
             self.show_message("Успех", "Профиль обновлен")
             self.dialog.dismiss()
@@ -4,7 +4,6 @@
 """
 
 # Стандартные библиотеки Python
-import json
 import uuid
 import hashlib
 import os
@@ -41,8 +40,10 @@ from kivymd.uix.list import OneLineListItem, TwoLineListItem
 
 from kv import PROFILE_KV, SETTINGS_KV
 
-from database import get_connection, insert_user_session, delete_user_session_db, select_settings_by_user, \
-    update_user_settings, insert_user_settings
+from database import get_connection, insert_user_session, delete_user_session_db
+from services.settings_store import settings_store, DEFAULT_SETTINGS
+from services.sessions import session_cache
+from services.reminders import reminder_scheduler
 
 # Попытка импорта PIL для работы с изображениями
 try:
@@ -82,35 +83,38 @@ class SettingsScreen(Screen):
         """
         Инициализация экрана настроек
 
-        Создает меню и планирует предзагрузку настроек
+        Создает меню и подписывается на настройки пользователя
         """
         super().__init__(**kwargs)
         self.setup_theme_menu()  # Настраиваем меню выбора темы
         self.setup_date_format_menu()  # Настраиваем меню выбора формата даты
-        Clock.schedule_once(self._preload_settings, 0.5)  # Отложенная загрузка настроек
+        # Настройки приходят при входе пользователя, отдельная загрузка не нужна
+        settings_store.subscribe(self.on_user_settings)
 
-    def _preload_settings(self, dt):
+    def on_user_settings(self, user_id, settings, changed):
         """
-        Предварительная загрузка настроек пользователя
+        Получает настройки текущего пользователя из settings_store
 
-        Загружает настройки из приложения или базы данных
+        Несохраненные изменения на экране не перезаписываются
+
+        Args:
+            user_id: ID пользователя
+            settings: настройки пользователя
+            changed: None при загрузке настроек или множество измененных ключей
         """
         try:
             app = MDApp.get_running_app()
-            user_id = app.get_user_id() if hasattr(app, 'get_user_id') else None
+            if not hasattr(app, 'get_user_id') or user_id != app.get_user_id():
+                return
+            if self._pending_changes and changed is not None:
+                return
 
-            if user_id:
-                # Проверяем, есть ли настройки в объекте приложения
-                if hasattr(app, 'user_settings') and app.user_settings:
-                    self.current_settings = app.user_settings.copy()
-                    self._settings_loaded = True
-                    # Применяем настройки к UI с небольшой задержкой
-                    Clock.schedule_once(lambda dt: self._apply_ui_settings(), 0.1)
-                else:
-                    # Если нет - загружаем из базы данных
-                    self._load_settings_from_db()
+            self.current_settings = settings
+            self._settings_loaded = True
+            self._pending_changes = False
+            Clock.schedule_once(lambda dt: self._apply_ui_settings(), 0)
         except Exception as e:
-            print(f"Ошибка предзагрузки настроек: {e}")
+            print(f"Ошибка получения настроек: {e}")
 
     def _load_settings_from_db(self):
         """
@@ -125,20 +129,11 @@ class SettingsScreen(Screen):
             if not user_id:
                 return
 
-            # Загружаем настройки из базы данных
-            conn = get_connection()
-            result = select_settings_by_user(conn, user_id)
-
-            if result and result[0]:
-                # Настройки найдены - загружаем их
-                self.current_settings = json.loads(result[0])
-                # Копируем в объект приложения
-                if hasattr(app, 'user_settings'):
-                    app.user_settings = self.current_settings.copy()
-            else:
-                # Настроек нет - создаем по умолчанию
-                self.current_settings = self.get_default_settings()
-                self._save_settings_to_db()  # Сохраняем настройки по умолчанию
+            # Настройки берутся из общего кэша; из базы они читаются один раз
+            self.current_settings = settings_store.get(user_id)
+            # Копируем в объект приложения
+            if hasattr(app, 'user_settings'):
+                app.user_settings = self.current_settings.copy()
 
             self._settings_loaded = True
             # Применяем настройки к UI
@@ -168,6 +163,10 @@ class SettingsScreen(Screen):
             self.ids.auto_export_switch.active = self.current_settings.get('auto_export', False)
             self.ids.auto_login_switch.active = self.current_settings.get('auto_login', True)
             self.ids.auto_logout_switch.active = self.current_settings.get('auto_logout', False)
+            # Монитор производительности - настройка устройства, а не пользователя
+            app = MDApp.get_running_app()
+            if hasattr(app, 'perf_monitor_enabled'):
+                self.ids.perf_monitor_switch.active = app.perf_monitor_enabled()
 
             # Обновляем текстовые поля
             self.update_display_texts()
@@ -318,17 +317,7 @@ class SettingsScreen(Screen):
         Returns:
             dict: Словарь с настройками по умолчанию
         """
-        return {
-            'theme_color': 'blue',  # Цветовая тема
-            'dark_mode': False,  # Темный режим
-            'daily_reminders': False,  # Ежедневные напоминания
-            'reminder_time': '20:00',  # Время напоминаний
-            'notification_sound': True,  # Звук уведомлений
-            'date_format': 'dd-mm-yyyy',  # Формат даты
-            'auto_export': False,  # Автоматический экспорт
-            'auto_login': True,  # Автоматический вход
-            'auto_logout': False  # Автоматический выход
-        }
+        return dict(DEFAULT_SETTINGS)
 
     def open_theme_menu(self, button):
         """
@@ -420,6 +409,34 @@ class SettingsScreen(Screen):
         self.current_settings['auto_logout'] = value
         self._pending_changes = True
 
+    def on_perf_monitor_change(self, instance, value):
+        """
+        Обработчик переключателя монитора производительности
+
+        Настройка относится к устройству и применяется сразу, без кнопки сохранения
+
+        Args:
+            instance: Объект переключателя
+            value (bool): Новое значение переключателя
+        """
+        app = MDApp.get_running_app()
+        if hasattr(app, 'set_perf_monitor') and app.perf_monitor_enabled() != value:
+            app.set_perf_monitor(value)
+
+    def export_perf_report(self):
+        """
+        Сохраняет отчет монитора производительности в каталог экспорта
+        """
+        app = MDApp.get_running_app()
+        if not hasattr(app, 'export_perf_report'):
+            return
+        directory = self.manager.get_screen("story").get_export_directory()
+        path = app.export_perf_report(directory)
+        if path:
+            self.show_message("Отчет сохранен", f"Отчет о кадрах и зависаниях сохранен:\n{path}")
+        else:
+            self.show_message("Ошибка", "Не удалось сохранить отчет о зависаниях")
+
     def open_time_picker(self):
         """
         Открывает пикер выбора времени для напоминаний
@@ -549,7 +566,7 @@ class SettingsScreen(Screen):
         """
         Сохраняет настройки в базу данных
 
-        Обновляет существующие настройки или создает новые
+        Изменения из кэша записываются сразу, без ожидания отложенной записи
         """
         try:
             app = MDApp.get_running_app()
@@ -558,16 +575,12 @@ class SettingsScreen(Screen):
             if not user_id:
                 return
 
-            conn = get_connection()
-            # Проверяем, есть ли уже настройки у пользователя
-            exists = select_settings_by_user(conn, user_id, check=True)
+            # Записываются только изменившиеся ключи, одним запросом
+            settings_store.update(user_id, self.current_settings)
+            settings_store.flush(user_id)
 
-            if exists:
-                # Обновляем существующие настройки
-                update_user_settings(conn, user_id, json.dumps(self.current_settings))
-            else:
-                # Создаем новые настройки
-                insert_user_settings(conn, user_id, json.dumps(self.current_settings))
+            # Перепланируется только ежедневное напоминание и только если оно изменилось
+            reminder_scheduler.apply_settings(user_id, self.current_settings)
 
             # Обновляем настройки в объекте приложения
             if hasattr(app, 'user_settings'):
@@ -625,6 +638,7 @@ class SettingsScreen(Screen):
             # Сохраняем сессию в базу данных
             conn = get_connection()
             insert_user_session(conn, user_id, device_id, session_token, expires_at)
+            session_cache.invalidate(device_id)
 
         except Exception as e:
             print(f"Ошибка создания сессии: {e}")
@@ -649,6 +663,7 @@ class SettingsScreen(Screen):
             conn = get_connection()
 
             delete_user_session_db(conn, device_id, user_id)
+            session_cache.invalidate(device_id)
 
         except Exception as e:
             print(f"Ошибка удаления сессии: {e}")
@@ -5,7 +5,7 @@
 
 # Стандартные библиотеки Python
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import platform
 import subprocess
 import sys
@@ -27,10 +27,10 @@ from kivymd.uix.label import MDLabel
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.menu import MDDropdownMenu
 from kivymd.uix.selectioncontrol import MDCheckbox
-from kivymd.uix.list import TwoLineListItem
+from kivymd.uix.list import TwoLineListItem, MDList
 
 # Пользовательские модули
-from database import get_connection, select_records_by_user, update_record, delete_record
+from database import get_connection, update_record, delete_record, select_record_trends
 from kv import REG_KV, PROFILE_KV, SETTINGS_KV, STORY_KV
 from utils.rules import (
     validate_weight,
@@ -40,6 +40,9 @@ from utils.rules import (
     validate_temperature,
     validate_notes
 )
+from utils.dates import format_date, get_user_date_format
+from services.records_view import record_view_cache
+from services.anomalies import anomaly_detector
 
 # Попытка импорта PIL для работы с изображениями
 try:
@@ -69,6 +72,23 @@ except ImportError:
     XLSXWRITER_AVAILABLE = False
     xlsxwriter = None
 
+# Показатели тренда: название и единица измерения
+TREND_METRIC_NAMES = {
+    'weight': ("Вес", "кг"),
+    'pressure_systolic': ("Систолическое давление", "мм рт.ст."),
+    'pressure_diastolic': ("Диастолическое давление", "мм рт.ст."),
+    'pulse': ("Пульс", "уд/мин"),
+    'temperature': ("Температура", "°C"),
+}
+
+# Периоды тренда: название и глубина истории в днях
+TREND_RESOLUTIONS = {
+    'day': ("Дни", 90),
+    'week': ("Недели", 364),
+    'month': ("Месяцы", 730),
+}
+
+
 class StoryWindow(Screen):
     """
     Экран истории записей
@@ -85,7 +105,9 @@ class StoryWindow(Screen):
     chart_menu = None  # Меню выбора типа графика
     selected_chart_type = "line"  # Выбранный тип графика по умолчанию
     search_query = ""  # Текст поиска
-    all_records = []  # Все записи пользователя (для поиска)
+    trend_metric = "weight"  # Показатель в окне трендов
+    trend_resolution = "day"  # Период группировки в окне трендов
+    all_records = []  # Строки RecordRow всех записей пользователя (для поиска)
 
     def __init__(self, **kwargs):
         """
@@ -299,15 +321,9 @@ class StoryWindow(Screen):
             return
 
         try:
-            # Подключаемся к базе данных
-            conn = get_connection()
-
-            cursor = conn.cursor()
-            # Загружаем записи пользователя, отсортированные по дате (новые сверху)
-            records = select_records_by_user(conn, user_id)
-
-            # Сохраняем все записи для поиска
-            self.all_records = list(records) if records else []
+            # Строки записей (новые сверху) берутся из кэша: база читается только
+            # при первом открытии, тексты и ключи поиска уже подготовлены
+            self.all_records = record_view_cache.get_rows(user_id, get_user_date_format())
 
             # Фильтруем записи, если есть поисковый запрос
             if search_query and search_query.strip():
@@ -323,17 +339,9 @@ class StoryWindow(Screen):
 
             if records:
                 # Если есть записи - отображаем их
-                for record in records:
-                    record_id = record[0]  # ID записи
-                    # Форматируем дату для отображения
-                    record_date = self.format_display_date(record[7])
-
-                    # Формируем тексты для отображения
-                    primary_text = f"Дата: {record_date}"
-                    secondary_text = (f"Вес: {record[1] if record[1] else 'Н/Д'} кг, "
-                                      f"Давление: {record[2] if record[2] else 'Н/Д'}/{record[3] if record[3] else 'Н/Д'}, "
-                                      f"Пульс: {record[4] if record[4] else 'Н/Д'}, "
-                                      f"Темп.: {record[5] if record[5] else 'Н/Д'}°C")
+                for row in records:
+                    record = row.record
+                    record_id = row.id  # ID записи
 
                     # Создаем контейнер для записи (чекбокс + текст)
                     record_container = MDBoxLayout(
@@ -352,8 +360,8 @@ class StoryWindow(Screen):
 
                     # Создаем элемент списка с текстом записи
                     list_item = TwoLineListItem(
-                        text=primary_text,
-                        secondary_text=secondary_text
+                        text=row.primary_text,
+                        secondary_text=row.secondary_text
                     )
 
                     # Привязываем обработчик клика для редактирования
@@ -401,45 +409,21 @@ class StoryWindow(Screen):
 
         except Exception as e:
             self.show_message("Ошибка", f"Ошибка при загрузке истории: {str(e)}")
-        finally:
-            if 'conn' in locals() and conn:
-                conn.close()
 
     def filter_records(self, records, search_query):
         """
         Фильтрует записи по поисковому запросу
 
         Args:
-            records: Список записей
+            records: Список строк RecordRow
             search_query: Текст для поиска
 
         Returns:
-            list: Отфильтрованные записи
+            list: Отфильтрованные строки
         """
-        filtered = []
+        # Ключ поиска каждой строки уже приведен к нижнему регистру
         search_query_lower = search_query.lower()
-
-        for record in records:
-            record_id = record[0]
-            weight = str(record[1]) if record[1] else ""
-            pressure_sys = str(record[2]) if record[2] else ""
-            pressure_dia = str(record[3]) if record[3] else ""
-            pulse = str(record[4]) if record[4] else ""
-            temperature = str(record[5]) if record[5] else ""
-            notes = str(record[6]) if record[6] else ""
-            record_date = self.format_display_date(record[7])
-
-            # Проверяем наличие поискового запроса в различных полях
-            if (search_query_lower in weight.lower() or
-                    search_query_lower in pressure_sys.lower() or
-                    search_query_lower in pressure_dia.lower() or
-                    search_query_lower in pulse.lower() or
-                    search_query_lower in temperature.lower() or
-                    search_query_lower in notes.lower() or
-                    search_query_lower in record_date.lower()):
-                filtered.append(record)
-
-        return filtered
+        return [row for row in records if row.matches(search_query_lower)]
 
     def on_search(self, instance, value):
         """
@@ -462,39 +446,8 @@ class StoryWindow(Screen):
         Returns:
             str: Отформатированная дата
         """
-        try:
-            app = MDApp.get_running_app()
-            date_format = app.user_settings.get('date_format', 'dd-mm-yyyy')
-
-            # Преобразуем строку в datetime, если нужно
-            if isinstance(date_value, str):
-                try:
-                    # Пробуем разные форматы дат
-                    for fmt in ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y"]:
-                        try:
-                            date_value = datetime.strptime(date_value, fmt)
-                            break
-                        except ValueError:
-                            continue
-                except:
-                    return date_value  # Если не удалось преобразовать, возвращаем как есть
-
-            # Форматируем дату в соответствии с настройками
-            if date_format == 'dd-mm-yyyy':
-                return date_value.strftime("%d-%m-%Y")
-            elif date_format == 'mm-dd-yyyy':
-                return date_value.strftime("%m-%d-%Y")
-            elif date_format == 'yyyy-mm-dd':
-                return date_value.strftime("%Y-%m-%d")
-            else:
-                return date_value.strftime("%d-%m-%Y")  # Формат по умолчанию
-
-        except Exception as e:
-            print(f"Ошибка форматирования даты: {e}")
-            if isinstance(date_value, str):
-                return date_value
-            else:
-                return date_value.strftime("%d-%m-%Y")  # Формат по умолчанию
+        # Результат кэшируется: повторная отрисовка и поиск не разбирают дату заново
+        return format_date(date_value, get_user_date_format())
 
     def on_checkbox_active(self, checkbox, value, record_id):
         """
@@ -624,6 +577,11 @@ class StoryWindow(Screen):
             conn = get_connection()
 
             update_record(conn, record_id, weight, pressure_systolic, pressure_diastolic, pulse, temperature, notes)
+            # Пересчитываем только строку измененной записи
+            user_id = MDApp.get_running_app().get_user_id()
+            record_view_cache.refresh_record(user_id, record_id, conn)
+            # Личная норма показателей не учитывает исправленное значение - пересчитываем ее
+            anomaly_detector.recompute([user_id], conn)
 
             # Закрываем диалог и обновляем список
             self.dialog.dismiss()
@@ -739,10 +697,13 @@ class StoryWindow(Screen):
             cursor = conn.cursor()
 
             # Удаляем каждую выбранную запись
-            for record_id in record_ids:
-                delete_record(conn, record_id)
+            deleted_ids = [record_id for record_id in record_ids if delete_record(conn, record_id)]
 
             conn.commit()
+            user_id = MDApp.get_running_app().get_user_id()
+            record_view_cache.remove(user_id, deleted_ids)
+            if deleted_ids:
+                anomaly_detector.recompute([user_id], conn)
             dialog.dismiss()
 
             # Обновляем список записей
@@ -828,6 +789,142 @@ class StoryWindow(Screen):
         except Exception as e:
             self.show_message("Ошибка", f"Ошибка при экспорте в Word: {str(e)}")
 
+    def show_trend_dialog(self):
+        """
+        Показывает окно трендов выбранного показателя
+
+        Средние, скользящие средние и изменения рассчитываются в базе
+        данных, в окно передаются только итоги по периодам
+        """
+        buttons_box = MDBoxLayout(orientation="horizontal", adaptive_height=True, spacing=dp(5))
+
+        self.trend_metric_button = MDRaisedButton(
+            text=TREND_METRIC_NAMES[self.trend_metric][0],
+            on_release=lambda button: self.trend_metric_menu.open()
+        )
+        buttons_box.add_widget(self.trend_metric_button)
+
+        for resolution, (title, _) in TREND_RESOLUTIONS.items():
+            buttons_box.add_widget(MDRaisedButton(
+                text=title,
+                md_bg_color=(0.3, 0.6, 0.3, 1),
+                on_release=lambda button, value=resolution: self.set_trend_resolution(value)
+            ))
+
+        self.trend_metric_menu = MDDropdownMenu(
+            caller=self.trend_metric_button,
+            items=[{
+                "text": title,
+                "viewclass": "OneLineListItem",
+                "on_release": lambda value=metric: self.set_trend_metric(value)
+            } for metric, (title, _) in TREND_METRIC_NAMES.items()],
+            width_mult=4,
+        )
+
+        self.trend_list = MDList()
+        scroll = ScrollView(size_hint_y=None, height=dp(350))
+        scroll.add_widget(self.trend_list)
+
+        content = MDBoxLayout(orientation="vertical", spacing=dp(10), adaptive_height=True)
+        content.add_widget(buttons_box)
+        content.add_widget(scroll)
+
+        self.dialog = MDDialog(
+            title="Тренды",
+            type="custom",
+            content_cls=content,
+            buttons=[
+                MDRaisedButton(
+                    text="Закрыть",
+                    md_bg_color=(0.7, 0.7, 0.7, 1),
+                    on_release=lambda _: self.dialog.dismiss()
+                ),
+            ],
+        )
+        self.load_trends()
+        self.dialog.open()
+
+    def set_trend_metric(self, metric):
+        """
+        Выбирает показатель тренда
+
+        Args:
+            metric (str): Показатель из TREND_METRIC_NAMES
+        """
+        self.trend_metric = metric
+        self.trend_metric_menu.dismiss()
+        self.trend_metric_button.text = TREND_METRIC_NAMES[metric][0]
+        self.load_trends()
+
+    def set_trend_resolution(self, resolution):
+        """
+        Выбирает период группировки тренда
+
+        Args:
+            resolution (str): 'day', 'week' или 'month'
+        """
+        self.trend_resolution = resolution
+        self.load_trends()
+
+    def load_trends(self):
+        """
+        Загружает тренд из базы данных и отображает его (новые периоды сверху)
+        """
+        user_id = MDApp.get_running_app().get_user_id()
+        if not user_id or not hasattr(self, 'trend_list'):
+            return
+
+        date_to = datetime.now().date()
+        date_from = date_to - timedelta(days=TREND_RESOLUTIONS[self.trend_resolution][1])
+
+        conn = None
+        try:
+            conn = get_connection()
+            rows = select_record_trends(conn, user_id, self.trend_metric, self.trend_resolution,
+                                        date_from.isoformat(), date_to.isoformat())
+        except Exception as e:
+            print(f"Ошибка загрузки тренда: {e}")
+            rows = None
+        finally:
+            if conn:
+                conn.close()
+
+        self.trend_list.clear_widgets()
+        if not rows:
+            self.trend_list.add_widget(MDLabel(
+                text="Нет данных за период",
+                halign="center",
+                theme_text_color="Secondary",
+                size_hint_y=None,
+                height=dp(60)
+            ))
+            return
+
+        unit = TREND_METRIC_NAMES[self.trend_metric][1]
+        for period, readings, avg_value, min_value, max_value, moving_avg, delta, band_min, band_max in reversed(rows):
+            change = f", изм. {delta:+.1f}" if delta is not None else ""
+            self.trend_list.add_widget(TwoLineListItem(
+                text=f"{self.format_trend_period(period)}: {avg_value:.1f} {unit} (замеров: {readings})",
+                secondary_text=(f"Мин. {min_value:g} / макс. {max_value:g}, "
+                                f"скольз. {moving_avg:.1f} ({band_min:g}-{band_max:g}){change}")
+            ))
+
+    def format_trend_period(self, period):
+        """
+        Форматирует начало периода тренда
+
+        Args:
+            period: Дата начала периода
+
+        Returns:
+            str: Текст периода
+        """
+        if self.trend_resolution == 'month':
+            # Месяц приходит как 'ГГГГ-ММ-01'
+            return f"{str(period)[5:7]}.{str(period)[:4]}"
+        text = format_date(period, get_user_date_format())
+        return f"Неделя с {text}" if self.trend_resolution == 'week' else text
+
     def calculate_statistics(self, records):
         """
         Рассчитывает статистику по записям